@@ -0,0 +1,610 @@
+# execution_pool.py
+"""
+Пул процессов для выполнения программ КуМир.
+
+Интерпретатор — CPU-bound код, а сервер работает в одном процессе eventlet:
+программа ученика с долгим циклом, выполняемая прямо в обработчике запроса,
+останавливает все остальные HTTP- и Socket.IO-клиенты. Пул заранее запускает
+несколько рабочих процессов и отдаёт им задания по каналам (multiprocessing.Pipe),
+а обработчик запроса в это время только опрашивает канал и уступает управление.
+
+Ограничения на задание:
+  * процессорное время (RLIMIT_CPU, мягкий лимит выставляется на каждое задание);
+  * время по часам: интерпретатор сам останавливается по бюджету выполнения,
+    а процесс, не уложившийся и в KILL_GRACE сверх срока, убивается и заменяется;
+  * память (RLIMIT_AS на весь рабочий процесс);
+  * длина очереди: если все процессы заняты и очередь полна, submit бросает
+    ExecutionPoolSaturated с оценкой, через сколько секунд стоит повторить запрос.
+
+Новый рабочий процесс сначала прогревает парсер (parsing.warm_up) и только
+после сообщения 'ready' начинает получать задания; до этого задания ждут
+его, не считаясь переполнением очереди.
+
+Задание, запущенное с job_key, можно остановить методом cancel(job_key):
+каждое задание получает номер, cancel записывает номер отменяемого задания
+в общую с рабочим процессом multiprocessing.Value, а флаг отмены каждого
+запуска (_JobCancellationToken) срабатывает только на номер его текущего
+задания. Поэтому отмена не задевает ни другие запуски, припаркованные в том же
+процессе, ни следующее задание, если пришла после завершения своего.
+Вывод выполняющегося задания приходит дельтами (см. output_stream); по job_key
+его можно запросить заново с любого номера дельты (resync_output).
+
+Программа, дошедшая до ввода, паркуется в своём рабочем процессе
+(resumable.ResumableRun) и возвращает input_required с run_id; resume(run_id,
+значение) отправляет значение тому же процессу, и выполнение продолжается с
+места остановки. Пока запуск припаркован, процесс принимает другие задания.
+Продолжить запуск может только тот, кто его начал: resume с другим job_key
+бросает RunNotOwned.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .kumir_interpreter.execution_limits import CancellationToken
+from .kumir_interpreter.output_stream import OutputLog
+from .kumir_interpreter.parsing import merge_parse_stats
+from .kumir_interpreter.resumable import DEFAULT_SUSPENDED_TTL
+
+try:
+    import resource
+except ImportError:  # Windows: лимиты ресурсов недоступны
+    resource = None
+
+logger = logging.getLogger('PyRobot.ExecutionPool')
+
+# Настройки по умолчанию (можно переопределить через переменные окружения)
+DEFAULT_POOL_SIZE = int(os.environ.get('KUMIR_POOL_SIZE', os.cpu_count() or 2))
+DEFAULT_MAX_QUEUE = int(os.environ.get('KUMIR_POOL_MAX_QUEUE', 4 * DEFAULT_POOL_SIZE))
+DEFAULT_CPU_TIME_LIMIT = float(os.environ.get('KUMIR_POOL_CPU_TIME_LIMIT', 20))
+DEFAULT_WALL_TIME_LIMIT = float(os.environ.get('KUMIR_POOL_WALL_TIME_LIMIT', 30))
+DEFAULT_MEMORY_LIMIT_MB = int(os.environ.get('KUMIR_POOL_MEMORY_LIMIT_MB', 512))
+DEFAULT_START_METHOD = os.environ.get('KUMIR_POOL_START_METHOD', 'spawn')
+
+# Интервал опроса канала рабочего процесса. После eventlet.monkey_patch()
+# time.sleep уступает управление другим green-потокам.
+POLL_INTERVAL = 0.01
+# Запас времени сверх лимита, за который интерпретатор должен остановиться сам
+KILL_GRACE = 2.0
+# Как часто простаивающий рабочий процесс удаляет припаркованные запуски с истёкшим TTL
+SUSPENDED_SWEEP_INTERVAL = 5.0
+
+
+class ExecutionPoolSaturated(Exception):
+    """Все рабочие процессы заняты, а очередь ожидания заполнена."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Пул выполнения перегружен, повторите через {retry_after} с")
+        self.retry_after = retry_after
+
+
+class RunNotOwned(Exception):
+    """Продолжить припаркованный запуск пытается не тот клиент, который его начал."""
+
+    def __init__(self, run_id: str):
+        super().__init__(f"Запуск {run_id} принадлежит другому клиенту")
+        self.run_id = run_id
+
+
+@dataclass
+class ExecutionResult:
+    """Результат задания: словарь KumirLanguageInterpreter.interpret() и размеры поля."""
+    result: Dict[str, Any]
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # KumirLanguageInterpreter.timings: время разбора и выполнения, число шагов и команд робота (всего и по видам)
+    timings: Optional[Dict[str, Any]] = None
+
+
+class _CpuTimeExceeded(BaseException):
+    # BaseException, чтобы не попасть в "except Exception" внутри интерпретатора
+    pass
+
+
+# SIGXCPU прерывает только текущее задание: ядро может прислать сигнал повторно,
+# и запоздавший сигнал не должен попасть в следующее задание
+_cpu_limit_armed = False
+
+
+def _on_sigxcpu(signum, frame):
+    global _cpu_limit_armed
+    if _cpu_limit_armed:
+        _cpu_limit_armed = False
+        raise _CpuTimeExceeded()
+
+
+def _set_cpu_limit(seconds: Optional[float]) -> None:
+    """Мягкий лимит процессорного времени: текущее потребление + seconds (None - снять)."""
+    global _cpu_limit_armed
+    _cpu_limit_armed = seconds is not None
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        soft = hard
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # Округление вверх: лимит задаётся в целых секундах, и заданию должно достаться не меньше seconds
+        soft = math.ceil(usage.ru_utime + usage.ru_stime + seconds)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+class _JobCancellationToken(CancellationToken):
+    """
+    Флаг отмены одного запуска в рабочем процессе.
+
+    Выставляется локально (stop(), abandon(cancel=True)) или родителем, если
+    номер отменяемого задания cancel_job совпал с номером текущего задания
+    запуска job_id (при продолжении после ввода номер меняется).
+    """
+
+    def __init__(self, cancel_job, job_id: int):
+        super().__init__()
+        self._cancel_job = cancel_job
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self._cancel_job.value == self.job_id
+
+
+def _worker_main(conn, cancel_job, memory_limit_mb: Optional[int]) -> None:
+    """Цикл рабочего процесса: получает задания из канала и отправляет назад прогресс и результат."""
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Не удалось установить лимит памяти рабочего процесса: {e}")
+    if hasattr(signal, 'SIGXCPU'):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+
+    from .kumir_interpreter.interpreter import KumirLanguageInterpreter
+    from .kumir_interpreter.resumable import ResumableRun, get_suspended_runs
+    from .kumir_interpreter import parsing
+
+    if parsing.WARMUP_ENABLED:
+        parsing.warm_up()
+    conn.send(('ready', parsing.get_parse_stats()))
+
+    suspended = get_suspended_runs()
+
+    def progress_callback(progress_data):
+        conn.send(('progress', progress_data))
+
+    while True:
+        try:
+            if not conn.poll(SUSPENDED_SWEEP_INTERVAL):
+                suspended.evict_expired()
+                continue
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            suspended.clear()
+            return
+        # ('run', номер, cpu, time, code, field_state, input_data, options) или ('resume', номер, cpu, time, run_id, value)
+        kind, job_id, cpu_time_limit, time_limit, *args = job
+
+        run = None
+        try:
+            _set_cpu_limit(cpu_time_limit)
+            if kind == 'resume':
+                run_id, value = args
+                run = suspended.take(run_id)
+                result = None
+                if run is not None:
+                    run.interpreter.cancel_token.job_id = job_id
+                    result = run.resume(value, progress_callback)
+            else:
+                code, field_state, input_data, options = args
+                interactive = options.pop('interactive', True)
+                interpreter = KumirLanguageInterpreter(code, initial_field_state=field_state,
+                                                       time_limit=time_limit,
+                                                       cancel_token=_JobCancellationToken(cancel_job, job_id),
+                                                       **options)
+                interpreter.input_buffer = input_data or ""
+                run = ResumableRun(interpreter)
+                result = run.start(progress_callback)
+                if result.get('input_required') and not interactive:
+                    # Ввода больше не будет: запуск не паркуется
+                    run.abandon()
+                    result.pop('run_id', None)
+            if result is None:
+                message = ('expired',)
+            else:
+                if result.get('input_required') and result.get('run_id'):
+                    suspended.park(run)
+                message = ('result', result, run.interpreter.width, run.interpreter.height,
+                           run.interpreter.timings)
+        except _CpuTimeExceeded:
+            # Поток выполнения останавливается флагом отмены; если не успел, процесс завершается
+            stopped = run is None or run.abandon(cancel=True, join_timeout=KILL_GRACE)
+            message = ('cpu_limit', run.interpreter.output if run else "", not stopped)
+            if not stopped:
+                conn.send(message)
+                os._exit(1)
+        except MemoryError:
+            # Память кончилась вне программы (её нехватку interpret сам сообщает как превышение лимита)
+            message = ('memory_limit', run.interpreter.output if run else "")
+        finally:
+            _set_cpu_limit(None)
+        conn.send(('parse_stats', parsing.get_parse_stats()))
+        conn.send(message)
+
+
+class _Worker:
+    """Рабочий процесс и родительский конец его канала."""
+
+    def __init__(self, context, memory_limit_mb: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        # Номер задания, которое родитель просит остановить (0 - никакое)
+        self.cancel_job = context.Value('q', 0)
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, self.cancel_job, memory_limit_mb),
+            name='kumir-worker', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExecutionPool:
+    """
+    Ограниченный пул рабочих процессов интерпретатора.
+
+    Процессы запускаются при первом задании (или явным вызовом start()).
+    Метод execute() блокирует вызывающий поток (green-поток под eventlet) до
+    получения результата, передавая события прогресса в on_progress.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_queue: int = DEFAULT_MAX_QUEUE,
+                 cpu_time_limit: Optional[float] = DEFAULT_CPU_TIME_LIMIT,
+                 wall_time_limit: Optional[float] = DEFAULT_WALL_TIME_LIMIT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 start_method: str = DEFAULT_START_METHOD):
+        if size < 1:
+            raise ValueError("Размер пула должен быть положительным")
+        self.size = size
+        self.max_queue = max_queue
+        self.cpu_time_limit = cpu_time_limit
+        self.wall_time_limit = wall_time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: List[_Worker] = []
+        self._starting: List[_Worker] = []  # Запущены, но ещё не прислали 'ready'
+        self._parse_stats: Dict[int, Dict[str, Any]] = {}  # pid -> статистика разбора процесса
+        self._workers_started = 0
+        self._waiting = 0
+        # job_key -> (процесс, вывод, номер задания)
+        self._running: Dict[Any, Tuple[_Worker, OutputLog, int]] = {}
+        self._job_ids = itertools.count(1)
+        # run_id -> (процесс с припаркованным запуском, его вывод, время парковки, job_key владельца)
+        self._parked: Dict[str, Tuple[_Worker, OutputLog, float, Any]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+        # Скользящее среднее длительности задания, для оценки Retry-After
+        self._avg_duration = 1.0
+        self.jobs_completed = 0
+        self.jobs_rejected = 0
+        self.jobs_killed = 0
+
+    def start(self) -> None:
+        """Запускает все рабочие процессы (повторный вызов ничего не делает)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for _ in range(self.size):
+                self._starting.append(self._spawn())
+        logger.info(f"Execution pool started with {self.size} worker processes")
+
+    def shutdown(self) -> None:
+        """Останавливает простаивающие процессы; занятые завершатся вместе с родителем."""
+        with self._lock:
+            workers = self._idle + self._starting
+            self._idle, self._starting = [], []
+            self._started = False
+        for worker in workers:
+            worker.stop()
+
+    def _spawn(self) -> _Worker:
+        self._workers_started += 1
+        return _Worker(self._context, self.memory_limit_mb)
+
+    def _collect_ready(self) -> None:
+        """Переводит прогретые процессы в простаивающие (вызывается под блокировкой)."""
+        for worker in list(self._starting):
+            try:
+                if worker.conn.poll():
+                    kind, stats = worker.conn.recv()
+                    if kind == 'ready':
+                        self._parse_stats[worker.process.pid] = stats
+                        self._starting.remove(worker)
+                        self._idle.append(worker)
+                    continue
+            except (EOFError, OSError):
+                pass
+            if not worker.process.is_alive():
+                logger.warning("Рабочий процесс завершился во время запуска, запускается новый")
+                self._starting.remove(worker)
+                worker.kill()
+                self._starting.append(self._spawn())
+
+    def retry_after(self) -> int:
+        """Оценка в секундах, когда освободится место в очереди."""
+        return max(1, math.ceil(self._avg_duration * (self._waiting + 1) / self.size))
+
+    def _acquire(self, preferred: Optional[_Worker] = None) -> Optional[_Worker]:
+        """
+        Берёт простаивающий процесс (или именно preferred, дождавшись его).
+        Возвращает None, если preferred уже завершился.
+        """
+        if preferred is not None:
+            return self._acquire_preferred(preferred)
+        with self._lock:
+            self._collect_ready()
+            if self._idle:
+                return self._idle.pop()
+            # Задания, ждущие ещё не прогретые процессы, очередь не переполняют
+            if self._waiting >= self.max_queue + len(self._starting):
+                self.jobs_rejected += 1
+                raise ExecutionPoolSaturated(self.retry_after())
+            self._waiting += 1
+        try:
+            while True:
+                time.sleep(POLL_INTERVAL)
+                with self._lock:
+                    self._collect_ready()
+                    if self._idle:
+                        return self._idle.pop()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _acquire_preferred(self, worker: _Worker) -> Optional[_Worker]:
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    if worker in self._idle:
+                        self._idle.remove(worker)
+                        return worker
+                if not worker.process.is_alive():
+                    return None
+                time.sleep(POLL_INTERVAL)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        if not healthy:
+            worker.kill()
+            with self._lock:
+                # Припаркованные в этом процессе запуски потеряны
+                for run_id in [run_id for run_id, parked in self._parked.items() if parked[0] is worker]:
+                    del self._parked[run_id]
+                if self._started:
+                    self._starting.append(self._spawn())
+            return
+        with self._lock:
+            if self._started:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def cancel(self, job_key: Any) -> bool:
+        """Просит остановить задание, запущенное с job_key. Возвращает False, если такого нет."""
+        with self._lock:
+            job = self._running.get(job_key)
+        if job is None:
+            return False
+        worker, _, job_id = job
+        worker.cancel_job.value = job_id
+        return True
+
+    def resync_output(self, job_key: Any, after_seq: int) -> Optional[Dict[str, Any]]:
+        """Весь вывод задания job_key после дельты after_seq (None, если задание не выполняется)."""
+        with self._lock:
+            job = self._running.get(job_key)
+        return job[1].resync(after_seq) if job is not None else None
+
+    def execute(self, code: str, field_state: Optional[Dict[str, Any]] = None,
+                on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                job_key: Any = None, input_data: Optional[str] = None,
+                profile: bool = False, memoize: bool = False, interactive: bool = True,
+                cpu_time_limit: Optional[float] = None,
+                wall_time_limit: Optional[float] = None) -> ExecutionResult:
+        """
+        Выполняет программу в рабочем процессе.
+
+        input_data - заранее заданный ввод (строки через '\\n'); когда он
+        кончается, программа паркуется и ждёт resume(). При interactive=False
+        запуск не паркуется: результат с input_required приходит без run_id.
+        profile - добавить в результат отчёт профилировщика (см. profiler.py);
+        memoize - запоминать результаты чистых функций (см. memoization.py).
+        cpu_time_limit / wall_time_limit - лимиты этого задания (по умолчанию лимиты пула).
+
+        Бросает ExecutionPoolSaturated, если задание некуда поставить.
+        Превышение лимитов и отмена возвращаются как обычный неуспешный результат.
+        Если программа ждёт ввода, результат содержит input_required и run_id для resume().
+        """
+        self.start()
+        worker = self._acquire()
+        options = {'profile': profile, 'memoize': memoize, 'interactive': interactive}
+        limits = (self.cpu_time_limit if cpu_time_limit is None else cpu_time_limit,
+                  self.wall_time_limit if wall_time_limit is None else wall_time_limit)
+        return self._run_job(worker, ('run', code, field_state, input_data, options), OutputLog(), on_progress,
+                             job_key, limits)
+
+    def resume(self, run_id: str, value: str,
+               on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+               job_key: Any = None) -> ExecutionResult:
+        """
+        Продолжает программу, припаркованную на вводе, введённой строкой value.
+
+        Задание выполняется тем же процессом, в котором запуск припаркован
+        (дожидаясь, пока тот освободится). Неизвестный или истёкший run_id
+        возвращается как неуспешный результат. Если запуск начат с другим
+        job_key, бросает RunNotOwned, и запуск остаётся припаркованным.
+        """
+        with self._lock:
+            self._expire_parked()
+            parked = self._parked.get(run_id)
+            if parked is not None and parked[3] != job_key:
+                raise RunNotOwned(run_id)
+            self._parked.pop(run_id, None)
+        if parked is None:
+            return self._expired_result("")
+        worker, output_log, _, _ = parked
+        if self._acquire(worker) is None:
+            return self._expired_result(output_log.getvalue())
+        return self._run_job(worker, ('resume', run_id, value), output_log, on_progress, job_key)
+
+    def _expire_parked(self) -> None:
+        """Забывает запуски, простоявшие дольше TTL (вызывается под блокировкой; процесс удалит их сам)."""
+        now = time.monotonic()
+        for run_id in [run_id for run_id, parked in self._parked.items()
+                       if now - parked[2] > DEFAULT_SUSPENDED_TTL]:
+            del self._parked[run_id]
+
+    def _run_job(self, worker: _Worker, job: Tuple[Any, ...], output_log: OutputLog,
+                 on_progress: Optional[Callable[[Dict[str, Any]], Any]], job_key: Any,
+                 limits: Optional[Tuple[Optional[float], Optional[float]]] = None) -> ExecutionResult:
+        cpu_time_limit, wall_time_limit = limits or (self.cpu_time_limit, self.wall_time_limit)
+        started_at = time.monotonic()
+        deadline = started_at + wall_time_limit + KILL_GRACE if wall_time_limit else None
+        healthy = False
+        with self._lock:
+            job_id = next(self._job_ids)
+            if job_key is not None:
+                self._running[job_key] = (worker, output_log, job_id)
+        try:
+            worker.conn.send((job[0], job_id, cpu_time_limit, wall_time_limit) + job[1:])
+            while True:
+                if not worker.conn.poll():
+                    if deadline is not None and time.monotonic() > deadline:
+                        self.jobs_killed += 1
+                        return self._limit_result(
+                            f"Превышено время выполнения ({wall_time_limit:g} с)", output_log.getvalue(), 'time')
+                    if not worker.process.is_alive() and not worker.conn.poll():
+                        self.jobs_killed += 1
+                        return self._limit_result("Процесс выполнения аварийно завершился", output_log.getvalue())
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    self.jobs_killed += 1
+                    return self._limit_result("Процесс выполнения аварийно завершился", output_log.getvalue())
+                kind = message[0]
+                if kind == 'parse_stats':
+                    with self._lock:
+                        self._parse_stats[worker.process.pid] = message[1]
+                    continue
+                if kind == 'progress':
+                    output_log.append(message[1])
+                    if on_progress:
+                        try:
+                            on_progress(message[1])
+                        except Exception as e:
+                            logger.warning(f"Progress callback error: {e}")
+                    continue
+                healthy = True
+                if kind == 'result':
+                    result = message[1]
+                    if result.get('input_required') and result.get('run_id'):
+                        with self._lock:
+                            self._expire_parked()
+                            self._parked[result['run_id']] = (worker, output_log, time.monotonic(), job_key)
+                    return ExecutionResult(result, message[2], message[3], message[4])
+                if kind == 'expired':
+                    return self._expired_result(output_log.getvalue())
+                if kind == 'cpu_limit':
+                    # Третий элемент: процесс не смог остановить программу и завершается
+                    healthy = not message[2]
+                    return self._limit_result(
+                        f"Превышено процессорное время ({cpu_time_limit:g} с)", message[1], 'cpu')
+                return self._limit_result("Превышен лимит памяти", message[1], 'memory')
+        finally:
+            duration = time.monotonic() - started_at
+            with self._lock:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                self.jobs_completed += 1
+                if job_key is not None and self._running.get(job_key, (None,))[0] is worker:
+                    del self._running[job_key]
+            self._release(worker, healthy)
+
+    @staticmethod
+    def _limit_result(message: str, output: str, limit: Optional[str] = None) -> ExecutionResult:
+        """Неуспешный результат без запуска до конца; limit - какой лимит превышен ('time', 'cpu', 'memory')."""
+        result = {
+            'success': False,
+            'message': message,
+            'finalState': {'output': output},
+            'trace': []
+        }
+        if limit is not None:
+            result['limit'] = limit
+        return ExecutionResult(result)
+
+    @classmethod
+    def _expired_result(cls, output: str) -> ExecutionResult:
+        return cls._limit_result("Программа больше не ожидает ввода (истекло время ожидания), "
+                                 "запустите её заново", output)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика пула для системы мониторинга."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'starting': len(self._starting),
+                'suspended': len(self._parked),
+                'waiting': self._waiting,
+                'max_queue': self.max_queue,
+                'jobs_completed': self.jobs_completed,
+                'jobs_rejected': self.jobs_rejected,
+                'jobs_killed': self.jobs_killed,
+                'workers_started': self._workers_started,
+                'avg_job_seconds': self._avg_duration,
+                'parsing': merge_parse_stats(self._parse_stats.values()),
+            }
+
+
+# Глобальный (на процесс) экземпляр пула
+_execution_pool: Optional[ExecutionPool] = None
+_execution_pool_lock = threading.Lock()
+
+
+def get_execution_pool() -> ExecutionPool:
+    """Возвращает общий для процесса пул (процессы запускаются при первом задании)."""
+    global _execution_pool
+    if _execution_pool is None:
+        with _execution_pool_lock:
+            if _execution_pool is None:
+                _execution_pool = ExecutionPool()
+    return _execution_pool
@@ -0,0 +1,392 @@
+# grading.py
+"""
+Пакетная проверка программ КуМир на наборах тестов.
+
+Домашнее задание проверяется запуском каждой программы ученика на всех
+тестах набора: тест - ввод и ожидаемый вывод (как TEST_CASES в
+tests/test_polyakov_kum.py; ожидаемый вывод None - подходит любой вывод
+успешного запуска). Вместо отдельного запроса /execute на каждую пару
+(программа, тест) весь пакет передаётся в grade() (HTTP: /grade).
+
+grade() разбирает каждую программу один раз: при синтаксической ошибке
+все её тесты получают вердикт error без запуска. Запуски расходятся по
+пулу потоков; с ExecutionPool каждый тест выполняется в рабочем процессе
+со своими лимитами времени (дерево разбора там берётся из кэша разбора
+процесса), без пула - в этом процессе с бюджетом времени интерпретатора.
+Вердикты (CaseVerdict) выдаются по мере готовности, не в порядке тестов.
+
+Вердикты: ok, wrong_answer (вывод не совпал), error (ошибка выполнения
+или программе не хватило ввода), limit_exceeded (время, шаги, память,
+глубина рекурсии). Выводы сравниваются без учёта пробелов в конце строк
+и пустых строк в конце.
+
+Наборы тестов (TestSetStore) - файлы <id>.json в каталоге
+KUMIR_TEST_SETS_DIR: список тестов {"input": ..., "expected": ...} или
+пар [ввод, ожидаемый вывод]; наборы можно добавлять и в коде (register).
+
+Задачи для Робота проверяются на нескольких обстановках: run_on_fields()
+выполняет одну программу на списке начальных состояний поля (тот же формат,
+что fieldState в /execute; HTTP: /execute/fields). Программа разбирается
+один раз, запуски идут параллельно так же, как в grade(), а отчёт
+(FieldRun, fields_report) - по обстановке: успех, сообщение, конечное
+состояние поля, число шагов и команд робота.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .kumir_interpreter.kumir_exceptions import KumirSyntaxError
+from .kumir_interpreter.parse_cache import get_parse_cache
+from .kumir_interpreter.parsing import parse_program
+from .kumir_interpreter.robot_state import SimulatedRobot
+
+logger = logging.getLogger('PyRobot.Grading')
+
+# Настройки по умолчанию (можно переопределить через переменные окружения)
+DEFAULT_TEST_SETS_DIR = os.environ.get('KUMIR_TEST_SETS_DIR', str(Path(__file__).parent / 'test_sets'))
+DEFAULT_GRADE_TIME_LIMIT = float(os.environ.get('KUMIR_GRADE_TIME_LIMIT', 5))
+DEFAULT_GRADE_MAX_RUNS = int(os.environ.get('KUMIR_GRADE_MAX_RUNS', 2000))
+DEFAULT_GRADE_WORKERS = int(os.environ.get('KUMIR_GRADE_WORKERS', os.cpu_count() or 2))
+
+VERDICT_OK = 'ok'
+VERDICT_WRONG_ANSWER = 'wrong_answer'
+VERDICT_ERROR = 'error'
+VERDICT_LIMIT_EXCEEDED = 'limit_exceeded'
+
+_TEST_SET_ID = re.compile(r'^[\w-][\w.-]*$')
+
+
+class TestSetNotFound(KeyError):
+    """Набора тестов с таким идентификатором нет."""
+    pass
+
+
+@dataclass(frozen=True)
+class TestCase:
+    """Тест: ввод программы и ожидаемый вывод (None - вывод не проверяется)."""
+    input: Optional[str] = None
+    expected: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, item: Any) -> 'TestCase':
+        """Тест из {"input", "expected"} или пары [ввод, ожидаемый вывод]."""
+        if isinstance(item, Mapping):
+            data, expected = item.get('input'), item.get('expected')
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            data, expected = item
+        else:
+            raise ValueError(f"Некорректный тест: {item!r}")
+        if not all(value is None or isinstance(value, str) for value in (data, expected)):
+            raise ValueError(f"Ввод и ожидаемый вывод теста должны быть строками: {item!r}")
+        return cls(data, expected)
+
+
+@dataclass
+class CaseVerdict:
+    """Результат одной программы на одном тесте; seconds - время выполнения."""
+    program: str
+    case: int
+    verdict: str
+    seconds: float
+    message: str = ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'program': self.program,
+            'case': self.case,
+            'verdict': self.verdict,
+            'time': round(self.seconds, 6),
+            'message': self.message,
+        }
+
+
+@dataclass
+class FieldRun:
+    """Результат программы на одной обстановке; steps - шаги выполнения, robot_ops - команды робота."""
+    field: int
+    success: bool
+    message: str
+    final_state: Dict[str, Any]
+    steps: int
+    robot_ops: int
+    seconds: float
+    limit: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'field': self.field,
+            'success': self.success,
+            'message': self.message,
+            'finalState': self.final_state,
+            'steps': self.steps,
+            'robotOps': self.robot_ops,
+            'time': round(self.seconds, 6),
+            'limit': self.limit,
+        }
+
+
+class TestSetStore:
+    """Наборы тестов по идентификатору: зарегистрированные в коде и файлы <id>.json каталога."""
+
+    def __init__(self, directory: Optional[str] = DEFAULT_TEST_SETS_DIR):
+        self.directory = Path(directory) if directory else None
+        self._sets: Dict[str, List[TestCase]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, set_id: str, cases: Iterable[Any]) -> None:
+        """Добавляет (или заменяет) набор; тесты - TestCase или их JSON-форма."""
+        self._check_id(set_id)
+        loaded = [case if isinstance(case, TestCase) else TestCase.from_json(case) for case in cases]
+        with self._lock:
+            self._sets[set_id] = loaded
+
+    def get(self, set_id: str) -> List[TestCase]:
+        """Тесты набора; файл читается один раз. Неизвестный набор - TestSetNotFound."""
+        self._check_id(set_id)
+        with self._lock:
+            cases = self._sets.get(set_id)
+        if cases is not None:
+            return cases
+        path = self.directory / f"{set_id}.json" if self.directory is not None else None
+        if path is None or not path.is_file():
+            raise TestSetNotFound(set_id)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        items = data.get('cases', []) if isinstance(data, Mapping) else data
+        self.register(set_id, items)
+        return self.get(set_id)
+
+    @staticmethod
+    def _check_id(set_id: str) -> None:
+        if not isinstance(set_id, str) or not _TEST_SET_ID.match(set_id):
+            raise TestSetNotFound(set_id)
+
+
+def normalize_output(text: str) -> str:
+    """Вывод для сравнения: переводы строк \\n, без пробелов в конце строк и пустых строк в конце."""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).rstrip('\n')
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    return normalize_output(actual) == normalize_output(expected)
+
+
+def verdict_for(result: Mapping[str, Any], expected: Optional[str]) -> Tuple[str, str]:
+    """Вердикт и сообщение по словарю результата запуска (KumirLanguageInterpreter.interpret)."""
+    if result.get('limit'):
+        return VERDICT_LIMIT_EXCEEDED, result.get('message', '')
+    if result.get('input_required'):
+        return VERDICT_ERROR, "Программа ожидает больше ввода, чем дано в тесте."
+    if not result.get('success'):
+        return VERDICT_ERROR, result.get('message', '')
+    if expected is not None:
+        output = (result.get('finalState') or {}).get('output', '')
+        if not outputs_match(output, expected):
+            return VERDICT_WRONG_ANSWER, _first_difference(output, expected)
+    return VERDICT_OK, ''
+
+
+def _first_difference(actual: str, expected: str) -> str:
+    actual_lines = normalize_output(actual).split('\n')
+    expected_lines = normalize_output(expected).split('\n')
+    for number, (got, want) in enumerate(zip(actual_lines, expected_lines), start=1):
+        if got != want:
+            return f"Строка {number}: ожидалось {want!r}, получено {got!r}"
+    if len(actual_lines) > len(expected_lines):
+        return f"Лишние строки вывода начиная со строки {len(expected_lines) + 1}"
+    return f"Вывод обрывается на строке {len(actual_lines) + 1}"
+
+
+def _run_local(code: str, time_limit: float, input_data: Optional[str] = None,
+               field_state: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    from .kumir_interpreter.interpreter import KumirLanguageInterpreter
+
+    interpreter = KumirLanguageInterpreter(code, initial_field_state=field_state, time_limit=time_limit)
+    interpreter.input_buffer = input_data or ""
+    result = interpreter.interpret()
+    return result, interpreter.timings
+
+
+def _run_in_pool(pool, code: str, time_limit: float, input_data: Optional[str] = None,
+                 field_state: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    from .execution_pool import ExecutionPoolSaturated
+
+    while True:
+        try:
+            execution = pool.execute(code, field_state=field_state, input_data=input_data, interactive=False,
+                                     cpu_time_limit=time_limit, wall_time_limit=time_limit)
+            break
+        except ExecutionPoolSaturated as e:
+            # Пул занят другими запросами: запуск ждёт своей очереди
+            time.sleep(e.retry_after)
+    return execution.result, execution.timings or {}
+
+
+def _run(pool, code: str, time_limit: float, input_data: Optional[str] = None,
+         field_state: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Один запуск без интерактивного ввода: результат interpret() и timings интерпретатора."""
+    if pool is not None:
+        return _run_in_pool(pool, code, time_limit, input_data, field_state)
+    return _run_local(code, time_limit, input_data, field_state)
+
+
+def _workers(pool, max_workers: Optional[int]) -> int:
+    return max_workers or (pool.size if pool is not None else DEFAULT_GRADE_WORKERS)
+
+
+def _parse_error(code: str) -> Optional[str]:
+    """Сообщение о синтаксической ошибке или None; дерево разбора остаётся в кэше разбора процесса."""
+    try:
+        get_parse_cache().get_or_parse(code, parse_program)
+    except KumirSyntaxError as e:
+        return f"Синтаксическая ошибка: {e}"
+    return None
+
+
+def _fan_out(run: Callable[..., Any], jobs: Sequence[Tuple[Any, ...]], workers: int) -> Iterator[Any]:
+    """Выполняет run(*job) для всех заданий в пуле потоков; результаты - по мере готовности."""
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kumir-grade')
+    try:
+        futures = [executor.submit(run, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Генератор закрыт раньше времени: ещё не начатые запуски не выполняются
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def grade(programs: Mapping[str, str], cases: Sequence[TestCase], pool=None,
+          time_limit: float = DEFAULT_GRADE_TIME_LIMIT,
+          max_workers: Optional[int] = None) -> Iterator[CaseVerdict]:
+    """
+    Проверяет программы {идентификатор: код} на тестах cases; вердикты выдаются по мере готовности.
+
+    pool - ExecutionPool для запусков в рабочих процессах (по умолчанию - в этом
+    процессе); time_limit - лимит времени одного теста в секундах; max_workers -
+    сколько тестов выполняется одновременно (по умолчанию размер пула или
+    KUMIR_GRADE_WORKERS).
+    """
+    runnable: List[Tuple[str, str]] = []
+    for program_id, code in programs.items():
+        error = _parse_error(code)
+        if error is not None:
+            for index in range(len(cases)):
+                yield CaseVerdict(program_id, index, VERDICT_ERROR, 0.0, error)
+            continue
+        runnable.append((program_id, code))
+    if not runnable or not cases:
+        return
+
+    def run_case(program_id: str, code: str, index: int) -> CaseVerdict:
+        case = cases[index]
+        started = time.perf_counter()
+        try:
+            result, timings = _run(pool, code, time_limit, input_data=case.input)
+        except Exception as e:
+            logger.exception(f"Grading run failed for program '{program_id}', case {index}")
+            return CaseVerdict(program_id, index, VERDICT_ERROR, time.perf_counter() - started,
+                               f"Внутренняя ошибка: {type(e).__name__}: {e}")
+        verdict, message = verdict_for(result, case.expected)
+        seconds = timings.get('execute')
+        if seconds is None:
+            seconds = time.perf_counter() - started
+        return CaseVerdict(program_id, index, verdict, seconds, message)
+
+    jobs = [(program_id, code, index) for program_id, code in runnable for index in range(len(cases))]
+    yield from _fan_out(run_case, jobs, _workers(pool, max_workers))
+
+
+def field_state_error(state: Any) -> Optional[str]:
+    """Почему начальное состояние поля нельзя запустить (None - можно): проверка до запуска в пуле."""
+    if state is None:
+        return None
+    if not isinstance(state, Mapping):
+        return "Обстановка должна быть объектом."
+    try:
+        SimulatedRobot.check_size(state.get('width', 7), state.get('height', 7))
+    except ValueError as e:
+        return str(e)
+    for key, kind in (('walls', list), ('coloredCells', list), ('markers', Mapping), ('robotPos', Mapping),
+                      ('symbols', Mapping), ('radiation', Mapping), ('temperature', Mapping)):
+        if state.get(key) is not None and not isinstance(state[key], kind):
+            return f"Некорректное поле обстановки '{key}'."
+    return None
+
+
+def run_on_fields(code: str, fields: Sequence[Optional[Dict[str, Any]]], pool=None,
+                  time_limit: float = DEFAULT_GRADE_TIME_LIMIT,
+                  max_workers: Optional[int] = None) -> List[FieldRun]:
+    """
+    Выполняет программу на каждой обстановке fields (начальные состояния поля,
+    None - поле по умолчанию); результаты - в порядке fields.
+
+    Программа разбирается один раз: при синтаксической ошибке ни один запуск
+    не выполняется. Некорректная обстановка получает неуспешный результат без
+    запуска. pool, time_limit и max_workers - как в grade().
+    """
+    runs: List[Optional[FieldRun]] = [None] * len(fields)
+    error = _parse_error(code)
+    jobs = []
+    for index, state in enumerate(fields):
+        message = error or field_state_error(state)
+        if message is not None:
+            runs[index] = FieldRun(index, False, message, {}, 0, 0, 0.0)
+        else:
+            jobs.append((index,))
+
+    def run_field(index: int) -> FieldRun:
+        started = time.perf_counter()
+        try:
+            result, timings = _run(pool, code, time_limit, field_state=fields[index])
+        except Exception as e:
+            logger.exception(f"Field run failed for field {index}")
+            return FieldRun(index, False, f"Внутренняя ошибка: {type(e).__name__}: {e}", {}, 0, 0,
+                            time.perf_counter() - started)
+        seconds = timings.get('execute')
+        if seconds is None:
+            seconds = time.perf_counter() - started
+        if result.get('input_required'):
+            message = "Программа ожидает ввода, а обстановка его не задаёт."
+        else:
+            message = result.get('message', '')
+        return FieldRun(index, bool(result.get('success')), message, result.get('finalState') or {},
+                        timings.get('steps', 0), timings.get('robot_ops', 0), seconds, result.get('limit'))
+
+    for run in _fan_out(run_field, jobs, _workers(pool, max_workers)):
+        runs[run.field] = run
+    return runs
+
+
+def fields_report(runs: Sequence[FieldRun]) -> Dict[str, Any]:
+    """Сводный отчёт по обстановкам: успех на всех, число успешных и результат каждой."""
+    passed = sum(1 for run in runs if run.success)
+    return {
+        'success': passed == len(runs),
+        'passed': passed,
+        'total': len(runs),
+        'fields': [run.to_dict() for run in runs],
+    }
+
+
+# Глобальное (на процесс) хранилище наборов тестов
+_test_set_store: Optional[TestSetStore] = None
+_test_set_store_lock = threading.Lock()
+
+
+def get_test_set_store() -> TestSetStore:
+    """Возвращает общее для процесса хранилище наборов тестов (каталог KUMIR_TEST_SETS_DIR)."""
+    global _test_set_store
+    if _test_set_store is None:
+        with _test_set_store_lock:
+            if _test_set_store is None:
+                _test_set_store = TestSetStore()
+    return _test_set_store
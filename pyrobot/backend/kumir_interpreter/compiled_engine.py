@@ -0,0 +1,1889 @@
+# compiled_engine.py
+"""
+Компилирующий движок выполнения программ КуМир.
+
+Визитор на каждом шаге программы заново обходит дерево разбора, создаёт
+KumirValue для каждого промежуточного результата и ищет переменные по стеку
+словарей областей видимости. Этот модуль один раз переводит дерево разбора
+в дерево замыканий Python: каждое выражение и оператор становится функцией
+от кадра (frame) — списка значений локальных переменных алгоритма. Имена
+разрешаются в номера слотов на этапе компиляции, типы выражений выводятся
+статически, поэтому во внутренних циклах нет ни поиска по словарям, ни
+упаковки значений.
+
+Движок включается явно (engine='compiled' или переменная окружения
+KUMIR_ENGINE=compiled) и поддерживает подмножество языка. Если в программе
+встречается конструкция, которую компилятор не поддерживает, выбрасывается
+CompilationUnsupported, и программа целиком выполняется визитором.
+Откат на визитор возможен только на этапе компиляции: ошибка времени
+выполнения скомпилированной программы сообщается сразу, с тем же текстом
+и позицией, что у визитора (в путях ошибок используются его же обработчики).
+
+Вызовы пользовательских функций в выражении выносятся перед вычислением
+(в порядке вычисления визитора): результат вызова кладётся во временный слот
+кадра, а выражение читает этот слот. Рекурсия выполняется на явном стеке
+(_CallStack): алгоритмы, входящие в цикл графа вызовов, компилируются в
+генераторы, и вызов внутри такого цикла не вкладывает кадры Python, а отдаёт
+активацию вызываемого циклу стека. Глубина рекурсии ограничена
+ExecutionBudget.max_depth (KUMIR_MAX_RECURSION_DEPTH), а не стеком Python.
+Первые уровни рекурсии и остальные вызовы выполняются напрямую.
+
+При запоминании (memoize=True) вызов чистой функции сначала ищется в таблице
+запуска (memoization.FunctionMemo) по значениям параметров в кадре вызываемого,
+и при попадании тело не выполняется - ни напрямую, ни на стеке вызовов.
+"""
+
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from antlr4.tree.Tree import TerminalNode
+
+from .generated.KumirLexer import KumirLexer
+from .generated.KumirParser import KumirParser
+from .kumir_datatypes import KumirType, KumirValue, KumirTableVar
+from .kumir_exceptions import (
+    KumirExecutionError, KumirEvalError, KumirTypeError, KumirRuntimeError, KumirIndexError,
+    KumirNameError, DeclarationError, BreakSignal, ExitSignal, StopExecutionSignal
+)
+from .interpreter_components.type_utils import get_type_info_from_specifier
+
+logger = logging.getLogger(__name__)
+
+# Доступные движки выполнения
+ENGINE_VISITOR = 'visitor'
+ENGINE_COMPILED = 'compiled'
+ENGINES = (ENGINE_VISITOR, ENGINE_COMPILED)
+ENGINE_ENV_VAR = 'KUMIR_ENGINE'
+
+INT = KumirType.INT.value
+REAL = KumirType.REAL.value
+BOOL = KumirType.BOOL.value
+CHAR = KumirType.CHAR.value
+STR = KumirType.STR.value
+
+_NUMERIC = (INT, REAL)
+_TEXT = (CHAR, STR)
+
+# Значения по умолчанию, как в ScopeManager.get_default_value
+_DEFAULTS = {INT: 0, REAL: 0.0, BOOL: False, CHAR: None, STR: ""}
+
+# Глубина рекурсии, до которой вызовы выполняются напрямую, на стеке Python
+DIRECT_RECURSION_DEPTH = 32
+
+# Тип результата функции, вычисляемой компилятором: f(frame) -> значение.
+# Статический тип None означает, что функция возвращает KumirValue
+# (тип известен только во время выполнения, например у встроенных функций).
+Code = Callable[[list], Any]
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Определяет движок выполнения.
+
+    Явно переданное значение имеет приоритет над переменной окружения
+    KUMIR_ENGINE; по умолчанию используется визитор.
+    """
+    if engine is None:
+        env_engine = os.environ.get(ENGINE_ENV_VAR, ENGINE_VISITOR).strip().lower()
+        if env_engine not in ENGINES:
+            logger.warning(f"Неизвестное значение {ENGINE_ENV_VAR}={env_engine!r}, используется визитор")
+            return ENGINE_VISITOR
+        return env_engine
+    engine = engine.strip().lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Неизвестный движок выполнения: {engine!r}. Допустимые значения: {', '.join(ENGINES)}")
+    return engine
+
+
+class CompilationUnsupported(Exception):
+    """Программа содержит конструкцию, которую компилятор не поддерживает."""
+
+
+# --- Операции над значениями с типом, известным только во время выполнения ---
+
+def _box(fn: Code, typ: Optional[str]) -> Code:
+    """Приводит функцию к виду, возвращающему KumirValue."""
+    if typ is None:
+        return fn
+    return lambda f: KumirValue(fn(f), typ)
+
+
+def _dyn_power(a: KumirValue, b: KumirValue) -> KumirValue:
+    if a.kumir_type == INT and b.kumir_type == INT:
+        return KumirValue(int(a.value ** b.value), INT)
+    return KumirValue(float(a.value) ** float(b.value), REAL)
+
+
+def _promote(x: Any, y: Any) -> Tuple[Any, Any]:
+    """Приведение операндов сравнения, как в ExpressionEvaluator."""
+    if isinstance(x, int) and isinstance(y, float):
+        return float(x), y
+    if isinstance(x, float) and isinstance(y, int):
+        return x, float(y)
+    return x, y
+
+
+def _to_bool(kv: KumirValue) -> bool:
+    """Условие оператора (если, выбор, утв): ЛОГ, ЦЕЛ или ВЕЩ."""
+    t = kv.kumir_type
+    if t == BOOL:
+        return bool(kv.value)
+    if t == INT:
+        return kv.value != 0
+    if t == REAL:
+        return kv.value != 0.0
+    raise KumirTypeError(f"Условие должно быть логического или целого типа, получено: {t}")
+
+
+def _real_str(v: Any) -> str:
+    """Вывод ВЕЩ без точности: целые значения печатаются без дробной части."""
+    if isinstance(v, float) and v == float(int(v)):
+        return str(int(v))
+    return str(v)
+
+
+def _format_value(kv: KumirValue, precision: Optional[int]) -> str:
+    t = kv.kumir_type
+    if t == INT:
+        return str(kv.value)
+    if t == REAL:
+        if precision is not None:
+            return f"{kv.value:.{precision}f}"
+        return _real_str(kv.value)
+    if t == BOOL:
+        return "истина" if kv.value else "ложь"
+    if t in _TEXT:
+        return kv.value
+    raise KumirTypeError(f"Неизвестный или неподдерживаемый тип значения для вывода: {t}")
+
+
+def _wrap_builtin_result(result: Any) -> KumirValue:
+    if isinstance(result, KumirValue):
+        return result
+    if isinstance(result, bool):
+        return KumirValue(result, BOOL)
+    if isinstance(result, int):
+        return KumirValue(result, INT)
+    if isinstance(result, float):
+        return KumirValue(result, REAL)
+    if isinstance(result, str):
+        return KumirValue(result, STR)
+    return KumirValue(result, "unknown")
+
+
+def _noop(frame: list) -> None:
+    return None
+
+
+class _Resumable:
+    """
+    Код рекурсивного алгоритма, содержащий вызов внутри цикла рекурсии:
+    run(frame) возвращает генератор, который отдаёт (место вызова, активация)
+    стеку вызовов и возвращает значение кода. Если оператор - только
+    рекурсивный вызов (call), блок выполняет его сам, без отдельного генератора.
+    """
+    __slots__ = ('run', 'call')
+
+    def __init__(self, run: Callable[[list], Any], call: Optional['_CallSite'] = None):
+        self.run = run
+        self.call = call
+
+
+def _generator(code) -> Callable[[list], Any]:
+    """Функция кадра, возвращающая генератор (для обычного кода - без yield)."""
+    if isinstance(code, _Resumable):
+        return code.run
+
+    def run(frame):
+        return code(frame)
+        yield  # делает run генераторной функцией
+    return run
+
+
+def _block(statements: list):
+    """Склеивает последовательность операторов в одну функцию."""
+    if any(isinstance(statement, _Resumable) for statement in statements):
+        # Шаг: (функция, None) - обычный оператор, (генератор, True) - возобновляемый,
+        # (None, вызов) - рекурсивный вызов
+        steps = tuple(((None, statement.call) if statement.call is not None else (statement.run, True))
+                      if isinstance(statement, _Resumable) else (statement, None)
+                      for statement in statements)
+
+        def run_resumable_block(frame):
+            for statement, kind in steps:
+                if kind is None:
+                    statement(frame)
+                elif kind is True:
+                    yield from statement(frame)
+                else:
+                    callee_frame = kind.prepare(frame)
+                    exited = yield kind.ctx, kind.callee.activation(callee_frame)
+                    if kind.finish is not None:
+                        kind.finish(frame, callee_frame, exited)
+        return _Resumable(run_resumable_block)
+    if not statements:
+        return _noop
+    if len(statements) == 1:
+        return statements[0]
+    if len(statements) == 2:
+        first, second = statements
+
+        def run_pair(frame):
+            first(frame)
+            second(frame)
+        return run_pair
+    statements = tuple(statements)
+
+    def run_block(frame):
+        for statement in statements:
+            statement(frame)
+    return run_block
+
+
+# Быстрые варианты бинарных операций: (общий, правый операнд константа,
+# слот и константа, два слота). Используются, когда типы известны статически
+# и результат операции Python совпадает с результатом ExpressionEvaluator.
+_FAST_BINARY = {
+    '+': (lambda l, r: lambda f: l(f) + r(f),
+          lambda l, c: lambda f: l(f) + c,
+          lambda s, c: lambda f: f[s] + c,
+          lambda a, b: lambda f: f[a] + f[b]),
+    '-': (lambda l, r: lambda f: l(f) - r(f),
+          lambda l, c: lambda f: l(f) - c,
+          lambda s, c: lambda f: f[s] - c,
+          lambda a, b: lambda f: f[a] - f[b]),
+    '*': (lambda l, r: lambda f: l(f) * r(f),
+          lambda l, c: lambda f: l(f) * c,
+          lambda s, c: lambda f: f[s] * c,
+          lambda a, b: lambda f: f[a] * f[b]),
+    KumirLexer.EQ: (lambda l, r: lambda f: l(f) == r(f),
+                    lambda l, c: lambda f: l(f) == c,
+                    lambda s, c: lambda f: f[s] == c,
+                    lambda a, b: lambda f: f[a] == f[b]),
+    KumirLexer.NE: (lambda l, r: lambda f: l(f) != r(f),
+                    lambda l, c: lambda f: l(f) != c,
+                    lambda s, c: lambda f: f[s] != c,
+                    lambda a, b: lambda f: f[a] != f[b]),
+    KumirLexer.LT: (lambda l, r: lambda f: l(f) < r(f),
+                    lambda l, c: lambda f: l(f) < c,
+                    lambda s, c: lambda f: f[s] < c,
+                    lambda a, b: lambda f: f[a] < f[b]),
+    KumirLexer.GT: (lambda l, r: lambda f: l(f) > r(f),
+                    lambda l, c: lambda f: l(f) > c,
+                    lambda s, c: lambda f: f[s] > c,
+                    lambda a, b: lambda f: f[a] > f[b]),
+    KumirLexer.LE: (lambda l, r: lambda f: l(f) <= r(f),
+                    lambda l, c: lambda f: l(f) <= c,
+                    lambda s, c: lambda f: f[s] <= c,
+                    lambda a, b: lambda f: f[a] <= f[b]),
+    KumirLexer.GE: (lambda l, r: lambda f: l(f) >= r(f),
+                    lambda l, c: lambda f: l(f) >= c,
+                    lambda s, c: lambda f: f[s] >= c,
+                    lambda a, b: lambda f: f[a] >= f[b]),
+}
+
+_COMPARISON_FUNCS = {
+    KumirLexer.EQ: lambda x, y: x == y,
+    KumirLexer.NE: lambda x, y: x != y,
+    KumirLexer.LT: lambda x, y: x < y,
+    KumirLexer.GT: lambda x, y: x > y,
+    KumirLexer.LE: lambda x, y: x <= y,
+    KumirLexer.GE: lambda x, y: x >= y,
+}
+
+
+class _LocalVar:
+    """Локальная переменная алгоритма: слот в кадре."""
+    __slots__ = ('slot', 'typ', 'is_table')
+
+    def __init__(self, slot: int, typ: str, is_table: bool):
+        self.slot = slot
+        self.typ = typ
+        self.is_table = is_table
+
+
+class _GlobalVar:
+    """Глобальная переменная: запись в глобальной области ScopeManager."""
+    __slots__ = ('info', 'typ', 'is_table')
+
+    def __init__(self, info: Dict[str, Any], typ: str, is_table: bool):
+        self.info = info
+        self.typ = typ
+        self.is_table = is_table
+
+
+class _Algorithm:
+    """
+    Скомпилированный алгоритм: параметры, шаблон кадра и тело.
+
+    invoke(frame) выполняет алгоритм и возвращает True, если он завершился
+    оператором ВЫХОД. У рекурсивного алгоритма (recursive) есть второй вариант
+    тела - генератор: activation(frame) - активация для стека вызовов с тем же
+    результатом.
+    """
+    __slots__ = ('name', 'params', 'template', 'body', 'result', 'recursive', 'invoke', 'activation')
+
+    def __init__(self, name: str, recursive: bool):
+        self.name = name
+        self.params: List[Tuple[int, str, str]] = []  # (слот, тип, режим)
+        self.template: list = []
+        self.body: Code = _noop
+        self.result: Optional[Tuple[int, str]] = None  # слот и тип "знач" функции
+        self.recursive = recursive
+        self.invoke: Callable[[list], bool] = _noop
+        self.activation: Optional[Callable[[list], Any]] = None
+
+
+class _CallSite:
+    """
+    Вызов пользовательского алгоритма: prepare(frame) вычисляет аргументы и
+    возвращает кадр вызываемого, finish(frame, callee_frame, exited) переносит
+    результаты (рез-параметры, значение функции) в кадр вызывающего,
+    run(frame) - прямой вызов целиком. Значение функции кладётся в слот
+    result_slot кадра вызывающего.
+    """
+    __slots__ = ('callee', 'ctx', 'recursive', 'prepare', 'finish', 'run', 'result_slot')
+
+    def __init__(self, callee: _Algorithm, ctx, recursive: bool, prepare, finish, run,
+                 result_slot: Optional[int] = None):
+        self.callee = callee
+        self.ctx = ctx
+        self.recursive = recursive
+        self.prepare = prepare
+        self.finish = finish
+        self.run = run
+        self.result_slot = result_slot
+
+
+class _CallStack:
+    """
+    Явный стек вызовов рекурсивных алгоритмов.
+
+    Первые DIRECT_RECURSION_DEPTH уровней рекурсии выполняются прямыми
+    вызовами обычного тела алгоритма (это быстрее), глубже - активациями.
+
+    Активация рекурсивного алгоритма - генератор. Вызов алгоритма из того же
+    цикла рекурсии отдаёт (yield) циклу run пару (место вызова, активация
+    вызываемого); run кладёт активацию на стек, а по её завершении передаёт
+    результат вызывающей активации через send. Исключение вызываемой
+    активации бросается в вызывающую (throw), поэтому блоки finally
+    (события наблюдателей) выполняются по порядку. Вложенные run (прямой
+    вызов рекурсивного алгоритма) используют общий счётчик глубины.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.depth = 0
+        # Вызовы рекурсивных алгоритмов до этой глубины выполняются напрямую
+        max_depth = budget.max_depth or sys.maxsize
+        self.direct_limit = min(DIRECT_RECURSION_DEPTH, max_depth - 1)
+
+    def run(self, activation) -> Any:
+        """Выполняет активацию до конца и возвращает её результат."""
+        budget = self.budget
+        max_depth = budget.max_depth or sys.maxsize
+        if self.depth >= max_depth:
+            raise budget.recursion_limit_error()
+        stack = [activation]
+        self.depth += 1
+        value = None
+        error = None
+        try:
+            while True:
+                top = stack[-1]
+                try:
+                    if error is None:
+                        request = top.send(value)
+                    else:
+                        thrown, error = error, None
+                        request = top.throw(thrown)
+                except StopIteration as stop:
+                    stack.pop()
+                    self.depth -= 1
+                    if not stack:
+                        return stop.value
+                    value = stop.value
+                    continue
+                except BaseException as e:
+                    stack.pop()
+                    self.depth -= 1
+                    if not stack:
+                        raise
+                    # Трассировка Python не нужна: иначе она растёт на каждом уровне рекурсии
+                    error = e.with_traceback(None)
+                    continue
+                value = None
+                if self.depth >= max_depth:
+                    error = budget.recursion_limit_error(request[0])
+                    continue
+                stack.append(request[1])
+                self.depth += 1
+        finally:
+            self.depth -= len(stack)
+
+
+def _called_algorithms(body_ctx, procedures: Dict[str, Any]) -> set:
+    """Имена пользовательских алгоритмов, встречающиеся в теле (без учёта затенения)."""
+    names = set()
+    nodes = [body_ctx]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, TerminalNode):
+            if node.symbol.type == KumirLexer.ID:
+                name = node.getText().lower()
+                if name in procedures:
+                    names.add(name)
+        elif node.children:
+            nodes.extend(node.children)
+    return names
+
+
+def _recursion_cycles(procedures: Dict[str, Any]) -> Dict[str, frozenset]:
+    """Алгоритмы, входящие в цикл графа вызовов: имя -> все алгоритмы его цикла."""
+    calls = {name: _called_algorithms(proc['body_ctx'], procedures) if proc.get('body_ctx') is not None else set()
+             for name, proc in procedures.items()}
+    reachable: Dict[str, set] = {}
+    for name in calls:
+        seen: set = set()
+        pending = list(calls[name])
+        while pending:
+            callee = pending.pop()
+            if callee not in seen:
+                seen.add(callee)
+                pending.extend(calls[callee])
+        reachable[name] = seen
+    return {name: frozenset(other for other in seen if name in reachable[other])
+            for name, seen in reachable.items() if name in seen}
+
+
+class CompiledProgram:
+    """Результат компиляции: главный алгоритм, готовый к запуску."""
+
+    def __init__(self, main: _Algorithm):
+        self.main = main
+
+    def run(self) -> None:
+        """Выполняет главный алгоритм (аналог execute_algorithm_node)."""
+        self.main.invoke(self.main.template[:])
+
+
+class _Compiler:
+    """Переводит алгоритмы из procedure_manager в замыкания над кадрами."""
+
+    def __init__(self, visitor, memo=None):
+        self.visitor = visitor
+        # Таблица результатов чистых функций запуска (FunctionMemo) или None
+        self.memo = memo
+        self.procedures = visitor.procedure_manager.procedures
+        self.functions = visitor.builtin_function_handler.functions
+        # Бюджет выполнения визитора: шаг на итерацию цикла и вызов алгоритма
+        self.tick = visitor.execution_budget.tick
+        # Наблюдатели: операторы и тела алгоритмов оборачиваются событиями только при подписчиках
+        self.events = visitor.events
+        # Рекурсивные алгоритмы выполняются на явном стеке
+        self.cycles = _recursion_cycles(self.procedures)
+        self.call_stack = _CallStack(visitor.execution_budget)
+        self.algorithms: Dict[str, _Algorithm] = {}
+        self.local_names: set = set()
+        self.global_names: set = set()
+        self.constants: Dict[int, Tuple[Code, Any]] = {}
+        self.slot_loads: Dict[int, Tuple[Code, int]] = {}
+        # Состояние компилируемого алгоритма
+        self.current: Optional[_Algorithm] = None
+        self.resumable_pass = False
+        self.scopes: List[Dict[str, _LocalVar]] = []
+        self.slot_defaults: list = []
+        self.nesting = 0
+        # Вызовы алгоритмов, вынесенные перед вычислением текущего оператора или условия
+        self.pending_calls: Optional[List[_CallSite]] = None
+
+    # --- Алгоритмы ---
+
+    def compile_main(self, name: str) -> CompiledProgram:
+        main = self.algorithm(name)
+        if main.params:
+            # execute_algorithm_node не объявляет параметры главного алгоритма
+            raise CompilationUnsupported("главный алгоритм с параметрами")
+        overlap = self.global_names & self.local_names
+        if overlap:
+            # При динамической области видимости такое имя может разрешаться
+            # в локальную переменную вызывающего алгоритма
+            raise CompilationUnsupported(f"глобальные имена перекрываются локальными: {sorted(overlap)}")
+        return CompiledProgram(main)
+
+    def algorithm(self, name: str) -> _Algorithm:
+        name_lower = name.lower()
+        alg = self.algorithms.get(name_lower)
+        if alg is not None:
+            return alg
+        proc = self.procedures.get(name_lower)
+        if proc is None:
+            raise CompilationUnsupported(f"алгоритм '{name}' не найден")
+        is_function = bool(proc.get('is_function') or proc.get('is_func'))
+        alg = _Algorithm(proc['name'], name_lower in self.cycles)
+        self.algorithms[name_lower] = alg
+
+        saved_state = (self.current, self.scopes, self.slot_defaults, self.nesting, self.pending_calls,
+                       self.resumable_pass)
+        self.current = alg
+        try:
+            body = self._algorithm_body(alg, proc, is_function, resumable=False)
+            alg.template = list(self.slot_defaults)
+            resumable_body = None
+            if alg.recursive:
+                # Второй вариант тела: рекурсивные вызовы отдаются стеку вызовов.
+                # Компиляция детерминирована, поэтому раскладка кадра та же
+                resumable_body = _generator(self._algorithm_body(alg, proc, is_function, resumable=True))
+                if self.slot_defaults != alg.template:
+                    raise CompilationUnsupported(f"разные кадры вариантов алгоритма '{name}'")
+            if self.events is not None:
+                body = self.events.wrap_algorithm(alg.name, body)
+                if resumable_body is not None:
+                    resumable_body = self.events.wrap_algorithm(alg.name, resumable_body, resumable=True)
+            alg.body = body
+            self._bind_invoke(alg, resumable_body)
+        finally:
+            (self.current, self.scopes, self.slot_defaults, self.nesting, self.pending_calls,
+             self.resumable_pass) = saved_state
+        return alg
+
+    def _algorithm_body(self, alg: _Algorithm, proc: Dict[str, Any], is_function: bool, resumable: bool):
+        """Тело алгоритма; при resumable вызовы внутри цикла рекурсии идут через стек вызовов."""
+        self.scopes, self.slot_defaults, self.nesting, self.pending_calls = [{}], [], 0, None
+        self.resumable_pass = resumable
+        params = []
+        for param in proc['params'].values():
+            if param.get('is_table') or param.get('mode') not in ('арг', 'рез', 'аргрез'):
+                raise CompilationUnsupported("параметр-таблица или неизвестный режим")
+            if is_function and param['mode'] != 'арг':
+                raise CompilationUnsupported(f"рез-параметр функции '{alg.name}'")
+            typ = KumirType.from_string(param['base_type']).value
+            var = self._declare(param['name'], typ, is_table=False)
+            params.append((var.slot, typ, param['mode']))
+        alg.params = params
+        if is_function:
+            try:
+                result_typ = KumirType.from_string(proc['result_type']).value
+            except (KeyError, ValueError, AttributeError) as e:
+                raise CompilationUnsupported(f"тип значения функции '{alg.name}'") from e
+            if result_typ not in _DEFAULTS:
+                raise CompilationUnsupported(f"функция '{alg.name}' типа {result_typ}")
+            alg.result = (self._temp(_DEFAULTS[result_typ]), result_typ)
+        body_ctx = proc['body_ctx']
+        sequence_ctx = body_ctx.statementSequence() if body_ctx is not None else None
+        return self._sequence(sequence_ctx) if sequence_ctx is not None else _noop
+
+    def _bind_invoke(self, alg: _Algorithm, resumable_body: Optional[Callable[[list], Any]]) -> None:
+        body = alg.body
+        if resumable_body is None:
+            def invoke(frame):
+                try:
+                    body(frame)
+                except ExitSignal:
+                    return True
+                return False
+            alg.invoke = invoke
+            return
+
+        def activation(frame):
+            try:
+                yield from resumable_body(frame)
+            except ExitSignal:
+                return True
+            return False
+
+        stack = self.call_stack
+        direct_limit = stack.direct_limit
+
+        def invoke_recursive(frame):
+            # Неглубокая рекурсия выполняется напрямую (без генераторов), глубже - на стеке
+            if stack.depth < direct_limit:
+                stack.depth += 1
+                try:
+                    body(frame)
+                except ExitSignal:
+                    stack.depth -= 1
+                    return True
+                stack.depth -= 1
+                return False
+            return stack.run(activation(frame))
+        alg.activation = activation
+        alg.invoke = invoke_recursive
+        self._memoize(alg)
+
+    def _memoize(self, alg: _Algorithm) -> None:
+        """Вызовы чистой функции берут результат из таблицы запуска, если он уже вычислен."""
+        memo = self.memo
+        name = alg.name.lower()
+        if memo is None or name not in memo.pure_functions or alg.result is None:
+            return
+        slots = tuple(slot for slot, _, _ in alg.params)
+        result_slot = alg.result[0]
+        lookup, store, missing = memo.lookup, memo.store, memo.MISSING
+        invoke = alg.invoke
+
+        def invoke_memoized(frame):
+            key = (name,) + tuple(frame[slot] for slot in slots)
+            result = lookup(name, key)
+            if result is not missing:
+                frame[result_slot] = result
+                return False
+            exited = invoke(frame)
+            store(key, frame[result_slot])
+            return exited
+        alg.invoke = invoke_memoized
+
+        activation = alg.activation
+        if activation is None:
+            return
+
+        def activation_memoized(frame):
+            key = (name,) + tuple(frame[slot] for slot in slots)
+            result = lookup(name, key)
+            if result is not missing:
+                frame[result_slot] = result
+                return False
+            exited = yield from activation(frame)
+            store(key, frame[result_slot])
+            return exited
+        alg.activation = activation_memoized
+
+    # --- Имена ---
+
+    def _declare(self, name: str, typ: str, is_table: bool) -> _LocalVar:
+        name_lower = name.lower()
+        if typ not in _DEFAULTS or name_lower in self.scopes[-1]:
+            raise CompilationUnsupported(f"объявление '{name}'")
+        var = _LocalVar(len(self.slot_defaults), typ, is_table)
+        self.slot_defaults.append(None if is_table else _DEFAULTS[typ])
+        self.scopes[-1][name_lower] = var
+        self.local_names.add(name_lower)
+        return var
+
+    def _temp(self, default: Any = None) -> int:
+        """Безымянный слот кадра: "знач" функции или результат вынесенного вызова."""
+        self.slot_defaults.append(default)
+        return len(self.slot_defaults) - 1
+
+    def _resolve(self, name: str):
+        name_lower = name.lower()
+        for scope in reversed(self.scopes):
+            var = scope.get(name_lower)
+            if var is not None:
+                return var
+        info, _ = self.visitor.scope_manager.find_variable(name)
+        if info is None or not isinstance(info.get('kumir_type'), KumirType):
+            raise CompilationUnsupported(f"имя '{name}' не разрешается статически")
+        typ = info['kumir_type'].value
+        is_table = bool(info.get('is_table'))
+        value = info.get('value')
+        if typ not in _DEFAULTS or not isinstance(value, KumirTableVar if is_table else KumirValue):
+            raise CompilationUnsupported(f"глобальная переменная '{name}'")
+        self.global_names.add(name_lower)
+        return _GlobalVar(info, typ, is_table)
+
+    def _load(self, var) -> Code:
+        if isinstance(var, _LocalVar):
+            slot = var.slot
+            fn = lambda f: f[slot]
+            self.slot_loads[id(fn)] = (fn, slot)
+            return fn
+        info = var.info
+        return lambda f: info['value'].value
+
+    def _table(self, var) -> Code:
+        if isinstance(var, _LocalVar):
+            slot = var.slot
+            return lambda f: f[slot]
+        info = var.info
+        return lambda f: info['value']
+
+    def _store(self, var, value_fn: Code) -> Code:
+        if isinstance(var, _LocalVar):
+            slot = var.slot
+
+            def store_local(frame):
+                frame[slot] = value_fn(frame)
+            return store_local
+        info, typ = var.info, var.typ
+
+        def store_global(frame):
+            info['value'] = KumirValue(value_fn(frame), typ)
+            info['initialized'] = True
+        return store_global
+
+    def _writer(self, var) -> Callable[[list, Any], None]:
+        """Запись уже вычисленного значения (для рез-параметров и ввода)."""
+        if isinstance(var, _LocalVar):
+            slot = var.slot
+
+            def write_local(frame, value):
+                frame[slot] = value
+            return write_local
+        info, typ = var.info, var.typ
+
+        def write_global(frame, value):
+            info['value'] = KumirValue(value, typ)
+            info['initialized'] = True
+        return write_global
+
+    def _const(self, value: Any, typ: str) -> Tuple[Code, str]:
+        fn = lambda f: value
+        self.constants[id(fn)] = (fn, value)
+        return fn, typ
+
+    # --- Приведение значений ---
+
+    def _coerce(self, fn: Code, typ: Optional[str], target: str) -> Code:
+        """Значение для присваивания переменной типа target (update_variable)."""
+        if typ == target:
+            return fn
+        if typ == INT and target == REAL:
+            return lambda f: float(fn(f))
+        if typ is None:
+            def coerce(frame):
+                kv = fn(frame)
+                if kv.kumir_type == target:
+                    return kv.value
+                if target == REAL and kv.kumir_type == INT:
+                    return float(kv.value)
+                raise KumirTypeError(f"Несовместимые типы при присваивании: {target} := {kv.kumir_type}")
+            return coerce
+        raise CompilationUnsupported(f"присваивание {target} := {typ}")
+
+    def _condition(self, fn: Code, typ: Optional[str]) -> Code:
+        """Условие если/выбор/утв (KumirTypeConverter.to_python_bool)."""
+        if typ == BOOL:
+            return fn
+        if typ == INT:
+            return lambda f: fn(f) != 0
+        if typ == REAL:
+            return lambda f: fn(f) != 0.0
+        if typ is None:
+            return lambda f: _to_bool(fn(f))
+        raise CompilationUnsupported(f"условие типа {typ}")
+
+    def _strict_bool(self, fn: Code, typ: Optional[str]) -> Code:
+        """Условие цикла: значение обязано быть логическим."""
+        if typ == BOOL:
+            return fn
+        if typ is None:
+            def check(frame):
+                value = fn(frame).value
+                if not isinstance(value, bool):
+                    raise KumirTypeError("Условие цикла должно быть логическим")
+                return value
+            return check
+        raise CompilationUnsupported(f"условие цикла типа {typ}")
+
+    def _int_value(self, fn: Code, typ: Optional[str]) -> Code:
+        """Целое значение (границы, шаг, число повторений): проверка isinstance(int)."""
+        if typ == INT:
+            return fn
+        if typ is None:
+            def check(frame):
+                value = fn(frame).value
+                if not isinstance(value, int):
+                    raise KumirTypeError("Ожидалось целое число")
+                return value
+            return check
+        raise CompilationUnsupported(f"ожидалось целое, получено {typ}")
+
+    def _index(self, fn: Code, typ: Optional[str]) -> Code:
+        """Индекс таблицы или строки: значение типа ЦЕЛ."""
+        if typ == INT:
+            return fn
+        if typ is None:
+            def check(frame):
+                kv = fn(frame)
+                if kv.kumir_type != INT:
+                    raise KumirEvalError(f"Индекс должен быть целым числом, получено: {kv.value}")
+                return kv.value
+            return check
+        raise CompilationUnsupported(f"индекс типа {typ}")
+
+    # --- Операторы ---
+
+    def _sequence(self, ctx) -> Code:
+        statements = []
+        for statement_ctx in ctx.statement():
+            code = self._statement(statement_ctx)
+            if code is not None:
+                if self.events is not None:
+                    line = statement_ctx.start.line
+                    if isinstance(code, _Resumable):
+                        code = _Resumable(self.events.wrap_statement(line, code.run, resumable=True))
+                    else:
+                        code = self.events.wrap_statement(line, code)
+                statements.append(code)
+        return _block(statements)
+
+    def _nested(self, ctx) -> Code:
+        self.nesting += 1
+        try:
+            return self._sequence(ctx)
+        finally:
+            self.nesting -= 1
+
+    def _point(self, compile_code: Callable[[], Any]) -> Tuple[Any, List[_CallSite]]:
+        """
+        Компилирует код с собственным списком вынесенных вызовов: все вызовы
+        алгоритмов из его выражений выполняются перед ним, в порядке компиляции.
+        """
+        saved = self.pending_calls
+        self.pending_calls = []
+        try:
+            code = compile_code()
+        finally:
+            calls, self.pending_calls = self.pending_calls, saved
+        return code, calls
+
+    def _evaluation(self, compile_code: Callable[[], Any]):
+        """
+        Код, который вычисляется не при входе в оператор (условие цикла, условие
+        ветки выбора), вместе с вызовами из его выражений.
+        """
+        code, calls = self._point(compile_code)
+        return self._with_calls(calls, code)
+
+    @staticmethod
+    def _with_calls(calls: List[_CallSite], code):
+        """Выполняет вызовы calls, затем code; рекурсивные вызовы идут через стек вызовов."""
+        if not calls:
+            return code
+        if not isinstance(code, _Resumable) and not any(call.recursive for call in calls):
+            runs = [call.run for call in calls]
+            if code is _noop:
+                return _block(runs)
+            if len(runs) == 1:
+                run = runs[0]
+
+                def with_call(frame):
+                    run(frame)
+                    return code(frame)
+                return with_call
+            runs_t = tuple(runs)
+
+            def with_calls(frame):
+                for run in runs_t:
+                    run(frame)
+                return code(frame)
+            return with_calls
+
+        calls_t = tuple(calls)
+        rest = _generator(code) if code is not _noop else None
+
+        def resume_with_calls(frame):
+            for call in calls_t:
+                if call.recursive:
+                    callee_frame = call.prepare(frame)
+                    exited = yield call.ctx, call.callee.activation(callee_frame)
+                    if call.finish is not None:
+                        call.finish(frame, callee_frame, exited)
+                else:
+                    call.run(frame)
+            if rest is not None:
+                return (yield from rest(frame))
+        single_call = calls[0] if len(calls) == 1 and rest is None else None
+        return _Resumable(resume_with_calls, single_call)
+
+    def _statement(self, ctx):
+        """Оператор; вызовы из выражений, вычисляемых при входе в него, выполняются перед ним."""
+        code, calls = self._point(lambda: self._statement_code(ctx))
+        if calls:
+            return self._with_calls(calls, code if code is not None else _noop)
+        return code
+
+    def _statement_code(self, ctx):
+        child = ctx.getChild(0)
+        if isinstance(child, KumirParser.AssignmentStatementContext):
+            return self._assignment(child)
+        if isinstance(child, KumirParser.IoStatementContext):
+            return self._io(child)
+        if isinstance(child, KumirParser.LoopStatementContext):
+            return self._loop(child)
+        if isinstance(child, KumirParser.IfStatementContext):
+            return self._if(child)
+        if isinstance(child, KumirParser.VariableDeclarationContext):
+            return self._declaration(child)
+        if isinstance(child, KumirParser.SwitchStatementContext):
+            return self._switch(child)
+        if isinstance(child, KumirParser.ExitStatementContext):
+            return self._exit(child)
+        if isinstance(child, KumirParser.AssertionStatementContext):
+            return self._assertion(child)
+        if isinstance(child, KumirParser.StopStatementContext):
+            def stop(frame):
+                raise StopExecutionSignal()
+            return stop
+        if isinstance(child, KumirParser.PauseStatementContext):
+            return None
+        if child is None or getattr(getattr(child, 'symbol', None), 'type', None) == KumirLexer.SEMICOLON:
+            return None
+        raise CompilationUnsupported(f"оператор {type(child).__name__}")
+
+    def _declaration(self, ctx) -> Optional[Code]:
+        if self.nesting:
+            # Объявления внутри блоков зависят от повторного входа в области видимости
+            raise CompilationUnsupported("объявление внутри вложенного блока")
+        try:
+            base_type, is_table = get_type_info_from_specifier(self.visitor, ctx.typeSpecifier())
+        except DeclarationError as e:
+            raise CompilationUnsupported(str(e)) from e
+        typ = KumirType.from_string(base_type).value
+        runs = []
+        for item in ctx.variableList().variableDeclarationItem():
+            if item.expression() is not None:
+                raise CompilationUnsupported("объявление с инициализацией")
+            name = item.ID().getText()
+            if not is_table:
+                if item.LBRACK():
+                    raise CompilationUnsupported("границы у скалярной переменной")
+                self._declare(name, typ, is_table=False)
+                continue
+            bounds_ctxs = item.arrayBounds()
+            if not item.LBRACK() or not bounds_ctxs:
+                raise CompilationUnsupported("таблица без границ")
+            bounds = [(self._int_value(*self._expr(b.expression(0))),
+                       self._int_value(*self._expr(b.expression(1)))) for b in bounds_ctxs]
+            var = self._declare(name, typ, is_table=True)
+            runs.append(self._table_declaration(var.slot, typ, bounds, item))
+        return _block(runs) if runs else None
+
+    @staticmethod
+    def _table_declaration(slot: int, typ: str, bounds, ctx) -> Code:
+        def declare_table(frame):
+            dimensions = [(low(frame), high(frame)) for low, high in bounds]
+            frame[slot] = KumirTableVar(typ, dimensions, ctx)
+        return declare_table
+
+    def _assignment(self, ctx) -> Optional[Code]:
+        lvalue = ctx.lvalue()
+        if lvalue is None:
+            return self._expression_statement(ctx.expression())
+        if lvalue.RETURN_VALUE() is not None:
+            return self._return_value(ctx.expression())
+        if lvalue.qualifiedIdentifier() is None:
+            raise CompilationUnsupported("присваивание без имени")
+        value_fn, value_typ = self._expr(ctx.expression())
+        var = self._resolve(lvalue.qualifiedIdentifier().getText())
+        index_list = lvalue.indexList()
+        if index_list is None:
+            if var.is_table:
+                raise CompilationUnsupported("присваивание таблицы целиком")
+            return self._store(var, self._coerce(value_fn, value_typ, var.typ))
+        if not var.is_table:
+            raise CompilationUnsupported("присваивание символу строки")
+        value_fn = self._coerce(value_fn, value_typ, var.typ)
+        indices = [self._index(*self._expr(e)) for e in index_list.expression()]
+        return self._store_element(self._table(var), var.typ, value_fn, indices, lvalue)
+
+    def _return_value(self, expr) -> Code:
+        """знач := выражение. Визитор не приводит значение к типу функции, поэтому типы должны совпадать."""
+        if self.current.result is None:
+            raise CompilationUnsupported("знач в процедуре")
+        slot, typ = self.current.result
+        value_fn, value_typ = self._expr(expr)
+        if value_typ is None:
+            def check(frame):
+                kv = value_fn(frame)
+                if kv.kumir_type != typ:
+                    raise KumirTypeError(f"Несовместимые типы при присваивании: знач ({typ}) := {kv.kumir_type}")
+                return kv.value
+            value_fn = check
+        elif value_typ != typ:
+            raise CompilationUnsupported(f"знач ({typ}) := {value_typ}")
+
+        def store_return_value(frame):
+            frame[slot] = value_fn(frame)
+        return store_return_value
+
+    def _store_element(self, table_fn: Code, typ: str, value_fn: Code, indices: List[Code], ctx) -> Code:
+        """Запись элемента таблицы; ошибки записи формирует ScopeManager визитора с позицией ctx."""
+        set_table_element = self.visitor.scope_manager.set_table_element
+        line, column = ctx.start.line - 1, ctx.start.column
+
+        def store_checked(table, key, value):
+            try:
+                table.set_raw(key, value)
+            except KumirExecutionError:
+                set_table_element(table, list(key), KumirValue(value, typ), line, column)
+
+        if len(indices) == 1:
+            index_fn = indices[0]
+
+            def store_element(frame):
+                value = value_fn(frame)
+                index = index_fn(frame)
+                table = table_fn(frame)
+                low, high = table.dimension_bounds_list[0]
+                storage = table.storage
+                if storage is not None and table.dimensions == 1 and low <= index <= high:
+                    try:
+                        storage[index - low] = value
+                        table.initialized[index - low] = 1
+                        return
+                    except OverflowError:
+                        pass
+                store_checked(table, (index,), value)
+            return store_element
+
+        def store_element_nd(frame):
+            value = value_fn(frame)
+            key = tuple(index_fn(frame) for index_fn in indices)
+            store_checked(table_fn(frame), key, value)
+        return store_element_nd
+
+    def _expression_statement(self, expr) -> Optional[Code]:
+        visitor = self.visitor
+        name = visitor._extract_procedure_name_from_expression(expr)
+        if not name:
+            fn, _ = self._expr(expr)
+
+            def evaluate(frame):
+                fn(frame)
+            return evaluate
+        if not visitor.procedure_manager.is_procedure_defined(name):
+            # Визитор молча пропускает такие операторы
+            return None
+
+        arg_ctxs = []
+        postfix = visitor._extract_postfix_expression(expr)
+        if postfix is not None and postfix.argumentList():
+            arg_ctxs = postfix.argumentList(0).expression()
+        if len(postfix.children) > 4 or expr.getText() != postfix.getText():
+            raise CompilationUnsupported("вызов процедуры внутри выражения")
+
+        builtin_procedures = visitor.builtin_procedure_handler
+        if builtin_procedures.is_builtin_procedure(name):
+            if arg_ctxs or builtin_procedures.get_procedure_info(name).get('params'):
+                raise CompilationUnsupported(f"встроенная процедура с параметрами '{name}'")
+
+            line, column = expr.start.line - 1, expr.start.column
+
+            def call_builtin(frame):
+                try:
+                    builtin_procedures.call_procedure(name, [], None)
+                except ExitSignal:
+                    pass
+                except (KumirRuntimeError, KumirTypeError, KumirNameError):
+                    raise
+                except Exception as e:
+                    raise KumirRuntimeError(f"Ошибка при вызове процедуры из выражения: {e}",
+                                            line_index=line, column_index=column) from e
+            return call_builtin
+        if self.procedures[name.lower()].get('is_function'):
+            raise CompilationUnsupported(f"вызов функции '{name}' как процедуры")
+        self._call_site(name, arg_ctxs, expr)
+        return None
+
+    def _call_site(self, name: str, arg_ctxs, call_ctx) -> _CallSite:
+        """
+        Вызов пользовательского алгоритма, вынесенный перед текущим оператором
+        или условием. Вызов внутри цикла рекурсии выполняется через стек вызовов.
+        """
+        if self.pending_calls is None:
+            raise CompilationUnsupported(f"вызов '{name}' вне оператора")
+        callee = self.algorithm(name)
+        if len(arg_ctxs) != len(callee.params):
+            raise CompilationUnsupported(f"неверное число аргументов '{name}'")
+        inputs: List[Tuple[int, Code]] = []
+        outputs: List[Tuple[int, Callable[[list, Any], None]]] = []
+        for expr, (slot, typ, mode) in zip(arg_ctxs, callee.params):
+            if mode != 'арг':
+                var_name = self.visitor._extract_variable_name_from_expression(expr)
+                if not var_name or var_name != expr.getText():
+                    raise CompilationUnsupported("рез-аргумент не является переменной")
+                target = self._resolve(var_name)
+                if target.is_table:
+                    raise CompilationUnsupported("рез-аргумент-таблица")
+                if target.typ == typ:
+                    # Визитор копирует значение обратно только при совпадении типов
+                    outputs.append((slot, self._writer(target)))
+            if mode != 'рез':
+                inputs.append((slot, self._coerce(*self._expr(expr), typ)))
+        inputs_t = tuple(inputs)
+        outputs_t = tuple(outputs)
+        tick = self.tick
+
+        def prepare(frame):
+            tick(call_ctx)
+            callee_frame = callee.template[:]
+            for slot, fn in inputs_t:
+                callee_frame[slot] = fn(frame)
+            return callee_frame
+
+        finish = None
+        if callee.result is not None:
+            result_slot = self._temp()
+            callee_slot = callee.result[0]
+
+            def finish(frame, callee_frame, exited):
+                frame[result_slot] = callee_frame[callee_slot]
+        elif outputs_t:
+            def finish(frame, callee_frame, exited):
+                if exited:
+                    return
+                for slot, write in outputs_t:
+                    write(frame, callee_frame[slot])
+
+        if finish is None:
+            def run(frame):
+                callee.invoke(prepare(frame))
+        else:
+            def run(frame):
+                callee_frame = prepare(frame)
+                finish(frame, callee_frame, callee.invoke(callee_frame))
+
+        recursive = self.resumable_pass and name.lower() in self.cycles.get(self.current.name.lower(), ())
+        call = _CallSite(callee, call_ctx, recursive, prepare, finish, run,
+                         result_slot if callee.result is not None else None)
+        self.pending_calls.append(call)
+        return call
+
+    def _io(self, ctx) -> Code:
+        arguments = ctx.ioArgumentList().ioArgument()
+        write = self.visitor.io_handler.write_output
+        if ctx.OUTPUT():
+            parts = [self._output_part(arg) for arg in arguments]
+
+            def output(frame):
+                write("".join([part(frame) for part in parts]))
+            return output
+        steps, calls = self._point(lambda: [self._input_step(arg, write) for arg in arguments])
+        if calls:
+            # Индексы вычисляются между чтениями строк, вызов нельзя вынести перед вводом
+            raise CompilationUnsupported("вызов алгоритма в операторе ввода")
+
+        def input_(frame):
+            echo: List[str] = []
+            for step in steps:
+                step(frame, echo)
+            write(' '.join(echo) + '\n')
+        return input_
+
+    def _output_part(self, arg) -> Code:
+        if arg.NEWLINE_CONST():
+            return lambda f: "\n"
+        expressions = arg.expression()
+        value_fn, typ = self._expr(expressions[0])
+        width_fn = self._expr(expressions[1]) if len(expressions) > 1 else None
+        precision_fn = self._expr(expressions[2]) if len(expressions) > 2 else None
+
+        if width_fn is None and precision_fn is None:
+            if typ == INT:
+                return lambda f: str(value_fn(f))
+            if typ == REAL:
+                return lambda f: _real_str(value_fn(f))
+            if typ == BOOL:
+                return lambda f: "истина" if value_fn(f) else "ложь"
+            if typ in _TEXT:
+                return value_fn
+            if typ is None:
+                return lambda f: _format_value(value_fn(f), None)
+            raise CompilationUnsupported(f"вывод типа {typ}")
+
+        if typ is not None and typ not in _DEFAULTS:
+            raise CompilationUnsupported(f"вывод типа {typ}")
+        boxed = _box(value_fn, typ)
+        width = self._format_option(width_fn)
+        precision = self._format_option(precision_fn)
+
+        def formatted(frame):
+            kv = boxed(frame)
+            field_width = width(frame)
+            text = _format_value(kv, precision(frame))
+            if field_width is not None:
+                text = text.rjust(field_width)
+            return text
+        return formatted
+
+    @staticmethod
+    def _format_option(option) -> Code:
+        """Ширина или точность вывода: учитывается, только если она типа ЦЕЛ."""
+        if option is None:
+            return lambda f: None
+        fn, typ = option
+        if typ == INT:
+            return fn
+        if typ is None:
+            def dynamic(frame):
+                kv = fn(frame)
+                return kv.value if kv.kumir_type == INT else None
+            return dynamic
+
+        def ignored(frame):
+            fn(frame)
+            return None
+        return ignored
+
+    def _input_step(self, arg, write) -> Callable[[list, List[str]], None]:
+        if arg.NEWLINE_CONST():
+            return lambda frame, echo: write("\n")
+        expr = arg.expression(0)
+        postfix = self.visitor._extract_postfix_expression(expr)
+        if postfix is None or expr.getText() != postfix.getText():
+            raise CompilationUnsupported("ввод в выражение")
+        qid = postfix.primaryExpression().qualifiedIdentifier()
+        if qid is None:
+            raise CompilationUnsupported("ввод не в переменную")
+        var = self._resolve(qid.getText())
+        io_handler = self.visitor.io_handler
+        try:
+            read_converted = io_handler.value_reader(qid.getText(), var.typ)
+        except KumirTypeError:
+            raise CompilationUnsupported(f"ввод типа {var.typ}")
+        line, column = arg.start.line - 1, arg.start.column
+
+        def read_value():
+            try:
+                return read_converted()
+            except ValueError as e:
+                raise KumirTypeError(f"Ошибка преобразования ввода для '{qid.getText()}': {io_handler.last_input}. {e}",
+                                     line_index=line, column_index=column) from e
+
+        if postfix.getChildCount() == 1:
+            if var.is_table:
+                raise CompilationUnsupported("ввод таблицы целиком")
+            writer = self._writer(var)
+            if var.typ == REAL:
+                echo_text = _real_str
+            elif var.typ == BOOL:
+                echo_text = lambda v: "истина" if v else "ложь"
+            elif var.typ in _TEXT:
+                echo_text = lambda v: v
+            else:
+                echo_text = str
+
+            def input_variable(frame, echo):
+                value = read_value()
+                writer(frame, value)
+                echo.append(echo_text(value))
+            return input_variable
+
+        if postfix.getChildCount() != 4 or not var.is_table or postfix.indexList() is None:
+            raise CompilationUnsupported("ввод в элемент не-таблицы")
+        indices = [self._index(*self._expr(e)) for e in postfix.indexList(0).expression()]
+        holder: Dict[str, Any] = {}
+        store = self._store_element(self._table(var), var.typ, lambda f: holder['value'], indices, arg)
+
+        def input_element(frame, echo):
+            holder['value'] = read_value()
+            store(frame)
+            write(io_handler.last_input)
+        return input_element
+
+    def _if(self, ctx) -> Code:
+        condition = self._condition(*self._expr(ctx.expression()))
+        then_body = self._nested(ctx.statementSequence(0))
+        else_body = self._nested(ctx.statementSequence(1)) if ctx.ELSE() else None
+
+        if isinstance(then_body, _Resumable) or isinstance(else_body, _Resumable):
+            then_run = _generator(then_body)
+            else_run = _generator(else_body) if else_body is not None else None
+
+            def resumable_if(frame):
+                if condition(frame):
+                    yield from then_run(frame)
+                elif else_run is not None:
+                    yield from else_run(frame)
+            return _Resumable(resumable_if)
+
+        if else_body is None:
+            def if_then(frame):
+                if condition(frame):
+                    then_body(frame)
+            return if_then
+
+        def if_then_else(frame):
+            if condition(frame):
+                then_body(frame)
+            else:
+                else_body(frame)
+        return if_then_else
+
+    def _switch(self, ctx) -> Code:
+        # Ветка ИНАЧЕ визитором не выполняется (она ищется в statementSequence()
+        # по индексу len(caseBlock())), поэтому здесь она не компилируется.
+        cases = tuple((self._evaluation(lambda case=case: self._condition(*self._expr(case.expression()))),
+                       self._nested(case.statementSequence()))
+                      for case in ctx.caseBlock())
+
+        if any(isinstance(code, _Resumable) for case in cases for code in case):
+            resumable_cases = tuple((_generator(condition), _generator(body)) for condition, body in cases)
+
+            def resumable_switch(frame):
+                for condition, body in resumable_cases:
+                    if (yield from condition(frame)):
+                        yield from body(frame)
+                        return
+            return _Resumable(resumable_switch)
+
+        def switch(frame):
+            for condition, body in cases:
+                if condition(frame):
+                    body(frame)
+                    return
+        return switch
+
+    def _exit(self, ctx) -> Code:
+        parent = ctx.parentCtx
+        while parent is not None:
+            if isinstance(parent, KumirParser.LoopStatementContext):
+                def exit_loop(frame):
+                    raise BreakSignal()
+                return exit_loop
+            parent = parent.parentCtx
+
+        def exit_algorithm(frame):
+            raise ExitSignal()
+        return exit_algorithm
+
+    def _assertion(self, ctx) -> Code:
+        condition = self._condition(*self._expr(ctx.expression()))
+
+        line, column = ctx.start.line - 1, ctx.start.column
+
+        def assertion(frame):
+            if not condition(frame):
+                raise KumirRuntimeError("Утверждение не выполнено", line_index=line, column_index=column)
+        return assertion
+
+    def _loop(self, ctx) -> Code:
+        spec = ctx.loopSpecifier()
+        until_ctx = ctx.endLoopCondition()
+        if spec is not None and spec.FOR():
+            return self._for_loop(ctx, spec, until_ctx)
+        until = self._loop_condition(until_ctx.expression()) if until_ctx is not None else None
+        body = self._nested(ctx.statementSequence())
+        tick = self.tick
+        condition = self._loop_condition(spec.expression(0)) if spec is not None and spec.WHILE() else None
+        count_fn = (self._int_value(*self._expr(spec.expression(0)))
+                    if spec is not None and not spec.WHILE() else None)
+
+        if any(isinstance(code, _Resumable) for code in (body, until, condition)):
+            return self._resumable_loop(ctx, body, until, condition, count_fn)
+
+        if spec is None:
+            def loop_forever(frame):
+                while True:
+                    tick(ctx)
+                    try:
+                        body(frame)
+                    except BreakSignal:
+                        break
+                    if until is not None and until(frame):
+                        break
+            return loop_forever
+
+        if condition is not None:
+            def loop_while(frame):
+                while condition(frame):
+                    tick(ctx)
+                    try:
+                        body(frame)
+                    except BreakSignal:
+                        break
+                    if until is not None and until(frame):
+                        break
+            return loop_while
+
+        def loop_times(frame):
+            for _ in range(max(count_fn(frame), 0)):
+                tick(ctx)
+                try:
+                    body(frame)
+                except BreakSignal:
+                    break
+                if until is not None and until(frame):
+                    break
+        return loop_times
+
+    def _for_loop(self, ctx, spec, until_ctx) -> Code:
+        start_fn = self._int_value(*self._expr(spec.expression(0)))
+        end_fn = self._int_value(*self._expr(spec.expression(1)))
+        step_fn = self._loop_step(spec) if len(spec.expression()) > 2 else None
+
+        # Переменная цикла объявляется в собственной области видимости
+        self.scopes.append({})
+        self.nesting += 1
+        try:
+            slot = self._declare(spec.ID().getText(), INT, is_table=False).slot
+            body = self._sequence(ctx.statementSequence())
+            until = self._loop_condition(until_ctx.expression()) if until_ctx is not None else None
+        finally:
+            self.nesting -= 1
+            self.scopes.pop()
+        tick = self.tick
+
+        if isinstance(body, _Resumable) or isinstance(until, _Resumable):
+            return self._resumable_for_loop(ctx, slot, start_fn, end_fn, step_fn, body, until)
+
+        def loop_for(frame):
+            current = start_fn(frame)
+            end = end_fn(frame)
+            step = 1
+            if step_fn is not None:
+                step = step_fn(frame)
+            if step > 0:
+                while current <= end:
+                    tick(ctx)
+                    frame[slot] = current
+                    try:
+                        body(frame)
+                    except BreakSignal:
+                        break
+                    if until is not None and until(frame):
+                        break
+                    current += step
+            else:
+                while current >= end:
+                    tick(ctx)
+                    frame[slot] = current
+                    try:
+                        body(frame)
+                    except BreakSignal:
+                        break
+                    if until is not None and until(frame):
+                        break
+                    current += step
+        return loop_for
+
+    def _loop_step(self, spec) -> Code:
+        """Шаг цикла ДЛЯ; нулевой шаг - ошибка в позиции выражения шага."""
+        step_ctx = spec.expression(2)
+        step_fn = self._int_value(*self._expr(step_ctx))
+        message = f"Шаг в цикле ДЛЯ для '{spec.ID().getText()}' не может быть равен нулю."
+        line, column = step_ctx.start.line - 1, step_ctx.start.column
+        line_content = self.visitor.get_line_content_from_ctx(step_ctx)
+
+        def step(frame):
+            value = step_fn(frame)
+            if value == 0:
+                raise KumirRuntimeError(message, line_index=line, column_index=column, line_content=line_content)
+            return value
+        return step
+
+    def _loop_condition(self, expr):
+        """Условие ПОКА или КЦ_ПРИ: вычисляется на каждой итерации вместе со своими вызовами."""
+        return self._evaluation(lambda: self._strict_bool(*self._expr(expr)))
+
+    def _resumable_loop(self, ctx, body, until, condition, count_fn) -> _Resumable:
+        """Цикл НЦ/ПОКА/РАЗ рекурсивного алгоритма (тело или условие содержит рекурсивный вызов)."""
+        body = _generator(body)
+        until = _generator(until) if until is not None else None
+        condition = _generator(condition) if condition is not None else None
+        tick = self.tick
+
+        def resumable_loop(frame):
+            remaining = max(count_fn(frame), 0) if count_fn is not None else None
+            while True:
+                if remaining is not None:
+                    if not remaining:
+                        break
+                    remaining -= 1
+                elif condition is not None and not (yield from condition(frame)):
+                    break
+                tick(ctx)
+                try:
+                    yield from body(frame)
+                except BreakSignal:
+                    break
+                if until is not None and (yield from until(frame)):
+                    break
+        return _Resumable(resumable_loop)
+
+    def _resumable_for_loop(self, ctx, slot, start_fn, end_fn, step_fn, body, until) -> _Resumable:
+        """Цикл ДЛЯ рекурсивного алгоритма."""
+        body = _generator(body)
+        until = _generator(until) if until is not None else None
+        tick = self.tick
+
+        def resumable_for(frame):
+            current = start_fn(frame)
+            end = end_fn(frame)
+            step = 1
+            if step_fn is not None:
+                step = step_fn(frame)
+            while current <= end if step > 0 else current >= end:
+                tick(ctx)
+                frame[slot] = current
+                try:
+                    yield from body(frame)
+                except BreakSignal:
+                    break
+                if until is not None and (yield from until(frame)):
+                    break
+                current += step
+        return _Resumable(resumable_for)
+
+    # --- Выражения ---
+
+    def _expr(self, ctx) -> Tuple[Code, Optional[str]]:
+        """Компилирует ExpressionContext: возвращает (функция, статический тип)."""
+        return self._logical(ctx.logicalOrExpression(), ctx.logicalOrExpression().logicalAndExpression(), self._logical_and)
+
+    def _logical_and(self, ctx):
+        return self._logical(ctx, ctx.equalityExpression(), self._comparison)
+
+    def _logical(self, ctx, operands, compile_operand):
+        fn, typ = compile_operand(operands[0])
+        for i in range(1, len(operands)):
+            is_and = ctx.getChild(2 * i - 1).symbol.type == KumirLexer.AND
+            rfn, rtyp = compile_operand(operands[i])
+            left = fn if typ == BOOL else self._truth(fn, typ)
+            right = rfn if rtyp == BOOL else self._truth(rfn, rtyp)
+            if is_and:
+                fn = lambda f, l=left, r=right: l(f) & r(f)
+            else:
+                fn = lambda f, l=left, r=right: l(f) | r(f)
+            typ = BOOL
+        return fn, typ
+
+    @staticmethod
+    def _truth(fn: Code, typ: Optional[str]) -> Code:
+        if typ is None:
+            return lambda f: bool(fn(f).value)
+        return lambda f: bool(fn(f))
+
+    def _comparison(self, ctx):
+        """Равенство (=, <>) и отношения (<, >, <=, >=) — одинаковая семантика."""
+        if isinstance(ctx, KumirParser.EqualityExpressionContext):
+            operands, compile_operand = ctx.relationalExpression(), self._comparison
+        else:
+            operands, compile_operand = ctx.additiveExpression(), self._additive
+        fn, typ = compile_operand(operands[0])
+        for i in range(1, len(operands)):
+            op = ctx.getChild(2 * i - 1).symbol.type
+            rfn, rtyp = compile_operand(operands[i])
+            fn, typ = self._compare(op, fn, typ, rfn, rtyp), BOOL
+        return fn, typ
+
+    def _compare(self, op: int, l: Code, lt: Optional[str], r: Code, rt: Optional[str]) -> Code:
+        compare = _COMPARISON_FUNCS[op]
+        if lt is None or rt is None:
+            lv = l if lt is None else _box(l, lt)
+            rv = r if rt is None else _box(r, rt)
+            return lambda f: compare(*_promote(lv(f).value, rv(f).value))
+        if (lt == REAL and rt in (INT, BOOL)) or (rt == REAL and lt in (INT, BOOL)):
+            # Смешанное сравнение: целое приводится к float, как в ExpressionEvaluator
+            return lambda f: compare(float(l(f)), float(r(f)))
+        if lt in _TEXT or rt in _TEXT:
+            # СИМ может быть не инициализирован (None) — оставляем операцию как есть
+            return lambda f: compare(l(f), r(f))
+        return self._fast_binary(op, l, r)
+
+    def _fast_binary(self, op, l: Code, r: Code) -> Code:
+        general, with_const, slot_const, slots = _FAST_BINARY[op]
+        left_slot = self.slot_loads.get(id(l))
+        right_slot = self.slot_loads.get(id(r))
+        right_const = self.constants.get(id(r))
+        if left_slot is not None and left_slot[0] is l:
+            if right_const is not None and right_const[0] is r:
+                return slot_const(left_slot[1], right_const[1])
+            if right_slot is not None and right_slot[0] is r:
+                return slots(left_slot[1], right_slot[1])
+        if right_const is not None and right_const[0] is r:
+            return with_const(l, right_const[1])
+        return general(l, r)
+
+    def _additive(self, ctx):
+        operands = ctx.multiplicativeExpression()
+        fn, typ = self._multiplicative(operands[0])
+        for i in range(1, len(operands)):
+            op_token = ctx.getChild(2 * i - 1).symbol
+            rfn, rtyp = self._multiplicative(operands[i])
+            fn, typ = self._arith(op_token, fn, typ, rfn, rtyp)
+        return fn, typ
+
+    def _multiplicative(self, ctx):
+        operands = ctx.powerExpression()
+        fn, typ = self._power(operands[0])
+        for i in range(1, len(operands)):
+            op_token = ctx.getChild(2 * i - 1).symbol
+            rfn, rtyp = self._power(operands[i])
+            fn, typ = self._arith(op_token, fn, typ, rfn, rtyp)
+        return fn, typ
+
+    def _arith(self, op_token, l: Code, lt: Optional[str], r: Code, rt: Optional[str]):
+        op = op_token.text
+        if op not in ('+', '-', '*', '/'):
+            raise CompilationUnsupported(f"операция {op}")
+        if lt is None or rt is None:
+            # Тип известен только во время выполнения: операция визитора с его ошибками
+            binary_operation = self.visitor.expression_evaluator._binary_operation
+            op_type = op_token.type
+            lv, rv = _box(l, lt), _box(r, rt)
+            return (lambda f: binary_operation(op_type, op_token, lv(f), rv(f))), None
+        if op == '+' and lt in _TEXT and rt in _TEXT:
+            if lt == STR and rt == STR:
+                return self._fast_binary('+', l, r), STR
+            return (lambda f: str(l(f)) + str(r(f))), STR
+        if lt not in _NUMERIC or rt not in _NUMERIC:
+            raise CompilationUnsupported(f"операция {op} над {lt} и {rt}")
+        if op == '/':
+            def divide(frame):
+                a = l(frame)
+                b = r(frame)
+                if float(b) == 0:
+                    raise KumirEvalError("Деление на ноль.", line_index=op_token.line, column_index=op_token.column)
+                return float(a) / float(b)
+            return divide, REAL
+        # Для int/float операции Python дают тот же результат, что и явное float()
+        result_typ = INT if lt == INT and rt == INT else REAL
+        return self._fast_binary(op, l, r), result_typ
+
+    def _power(self, ctx):
+        base_fn, base_typ = self._unary(ctx.unaryExpression())
+        if not ctx.POWER():
+            return base_fn, base_typ
+        exp_fn, exp_typ = self._power(ctx.powerExpression())
+        if base_typ is None or exp_typ is None:
+            bv, ev = _box(base_fn, base_typ), _box(exp_fn, exp_typ)
+            return (lambda f: _dyn_power(bv(f), ev(f))), None
+        if base_typ not in _NUMERIC or exp_typ not in _NUMERIC:
+            raise CompilationUnsupported("степень нечисловых значений")
+        if base_typ == INT and exp_typ == INT:
+            return (lambda f: int(base_fn(f) ** exp_fn(f))), INT
+        return (lambda f: float(base_fn(f)) ** float(exp_fn(f))), REAL
+
+    def _unary(self, ctx):
+        if ctx.postfixExpression() is not None:
+            return self._postfix(ctx.postfixExpression())
+        fn, typ = self._unary(ctx.unaryExpression())
+        if ctx.NOT():
+            if typ == BOOL:
+                return (lambda f: not fn(f)), BOOL
+            if typ is None:
+                def logical_not(frame):
+                    kv = fn(frame)
+                    if kv.kumir_type != BOOL:
+                        raise KumirTypeError(f"Операция логическое НЕ не применима к типу {kv.kumir_type}")
+                    return not kv.value
+                return logical_not, BOOL
+            raise CompilationUnsupported(f"НЕ для типа {typ}")
+        if typ is None:
+            negate = ctx.MINUS() is not None
+
+            def dynamic_sign(frame):
+                kv = fn(frame)
+                if kv.kumir_type not in _NUMERIC:
+                    raise KumirTypeError(f"Унарная операция не применима к типу {kv.kumir_type}")
+                return KumirValue(-kv.value, kv.kumir_type) if negate else kv
+            return dynamic_sign, None
+        if typ not in _NUMERIC:
+            raise CompilationUnsupported(f"унарная операция для типа {typ}")
+        if ctx.PLUS():
+            return fn, typ
+        const = self.constants.get(id(fn))
+        if const is not None and const[0] is fn:
+            return self._const(-const[1], typ)
+        return (lambda f: -fn(f)), typ
+
+    def _postfix(self, ctx):
+        primary = ctx.primaryExpression()
+        child_count = ctx.getChildCount()
+        if child_count == 1:
+            return self._primary(primary)
+        # Визитор обрабатывает только первую постфиксную операцию
+        op = ctx.getChild(1).symbol.type
+        if op == KumirLexer.LPAREN and child_count in (3, 4):
+            return self._call(ctx, primary)
+        if op == KumirLexer.LBRACK and child_count == 4:
+            return self._subscript(ctx, primary)
+        raise CompilationUnsupported("цепочка постфиксных операций")
+
+    def _primary(self, ctx):
+        if ctx.literal() is not None:
+            return self._literal(ctx.literal())
+        if ctx.qualifiedIdentifier() is not None:
+            name = ctx.qualifiedIdentifier().getText()
+            if name in self.functions or self.visitor.algorithm_manager.has_algorithm(name):
+                raise CompilationUnsupported(f"имя алгоритма '{name}' в выражении")
+            var = self._resolve(name)
+            if var.is_table:
+                raise CompilationUnsupported(f"таблица '{name}' в выражении")
+            return self._load(var), var.typ
+        if ctx.expression() is not None:
+            return self._expr(ctx.expression())
+        if ctx.RETURN_VALUE() is not None and self.current.result is not None:
+            slot, typ = self.current.result
+            return self._load(_LocalVar(slot, typ, False)), typ
+        raise CompilationUnsupported(f"первичное выражение {ctx.getText()}")
+
+    def _literal(self, ctx):
+        text = ctx.getText()
+        try:
+            if ctx.INTEGER():
+                return self._const(int(text), INT)
+            if ctx.REAL():
+                return self._const(float(text.replace(',', '.')), REAL)
+        except ValueError as e:
+            raise CompilationUnsupported(f"литерал {text}") from e
+        if ctx.STRING():
+            return self._const(text[1:-1], STR)
+        if ctx.CHAR_LITERAL():
+            return self._const(text[1:-1], CHAR)
+        if ctx.TRUE():
+            return self._const(True, BOOL)
+        if ctx.FALSE():
+            return self._const(False, BOOL)
+        if ctx.NEWLINE_CONST():
+            return self._const("\n", STR)
+        raise CompilationUnsupported(f"литерал {text}")
+
+    def _call(self, ctx, primary):
+        qid = primary.qualifiedIdentifier()
+        name = qid.getText() if qid is not None else None
+        if name is None:
+            raise CompilationUnsupported("вызов значения выражения")
+        arg_list = ctx.argumentList()
+        if name not in self.functions:
+            proc = self.procedures.get(name.lower())
+            if proc is None or not proc.get('is_function') or not self.visitor.algorithm_manager.has_algorithm(name):
+                raise CompilationUnsupported(f"вызов '{name}' в выражении")
+            call = self._call_site(name, arg_list[0].expression() if arg_list else [], ctx)
+            return self._load(_LocalVar(call.result_slot, call.callee.result[1], False)), call.callee.result[1]
+        args = [self._expr(e) for e in arg_list[0].expression()] if arg_list else []
+
+        # Ошибки встроенных функций визитор относит к началу выражения вызова
+        line, column = ctx.start.line, ctx.start.column
+        if name in ('div', 'mod'):
+            if len(args) != 2:
+                raise CompilationUnsupported(f"{name} с {len(args)} аргументами")
+            a_fn, b_fn = (self._int_value(*arg) for arg in args)
+            if name == 'div':
+                def int_div(frame):
+                    a = a_fn(frame)
+                    b = b_fn(frame)
+                    if b == 0:
+                        raise KumirEvalError("Деление на ноль (div)", line_index=line, column_index=column)
+                    return a // b
+                return int_div, INT
+
+            def int_mod(frame):
+                a = a_fn(frame)
+                b = b_fn(frame)
+                if b == 0:
+                    raise KumirEvalError("Деление на ноль (mod)", line_index=line, column_index=column)
+                return a % b
+            return int_mod, INT
+
+        if name == 'abs':
+            if len(args) != 1:
+                raise CompilationUnsupported("abs с неверным числом аргументов")
+            fn, typ = args[0]
+            if typ in _NUMERIC:
+                return (lambda f: abs(fn(f))), typ
+            if typ is None:
+                return (lambda f: KumirValue(abs(fn(f).value), fn(f).kumir_type)), None
+            raise CompilationUnsupported(f"abs для типа {typ}")
+
+        info = self.functions[name.lower()]
+        if any('рез' in modes for modes in info.get('param_modes', [])):
+            raise CompilationUnsupported(f"встроенная функция с рез-параметрами '{name}'")
+        handler = self.visitor.builtin_function_handler
+        raw_args = tuple(fn if typ is not None else (lambda f, g=fn: g(f).value) for fn, typ in args)
+
+        def call_builtin(frame):
+            values = [arg(frame) for arg in raw_args]
+            try:
+                return _wrap_builtin_result(handler.call_function(name, values, ctx))
+            except Exception as e:
+                raise KumirEvalError(f"Ошибка при вызове функции '{name}': {e}",
+                                     line_index=line, column_index=column) from e
+        return call_builtin, None
+
+    def _subscript(self, ctx, primary):
+        index_list = ctx.indexList(0)
+        index_ctxs = index_list.expression()
+        qid = primary.qualifiedIdentifier()
+        if qid is not None:
+            name = qid.getText()
+            if name not in self.functions and not self.visitor.algorithm_manager.has_algorithm(name):
+                var = self._resolve(name)
+                if var.is_table:
+                    return self._table_element(self._table(var), var.typ, index_list), var.typ
+        string_fn, typ = self._primary(primary)
+        if typ != STR:
+            raise CompilationUnsupported(f"индексация значения типа {typ}")
+        indices = [self._index(*self._expr(e)) for e in index_ctxs]
+        # Ошибку индекса формирует визитор: тот же текст и позиция списка индексов
+        string_element = self.visitor.expression_evaluator.string_element
+        if len(indices) == 1:
+            index_fn = indices[0]
+
+            def char_at(frame):
+                s = string_fn(frame)
+                k = index_fn(frame)
+                if k < 1 or k > len(s):
+                    string_element(s, [k], index_list)
+                return s[k - 1]
+            return char_at, CHAR
+        if len(indices) == 2:
+            start_fn, end_fn = indices
+
+            def substring(frame):
+                s = string_fn(frame)
+                k1 = start_fn(frame)
+                k2 = end_fn(frame)
+                if k1 < 1 or k2 < k1:
+                    string_element(s, [k1, k2], index_list)
+                if k1 - 1 >= len(s):
+                    return ""
+                return s[k1 - 1:min(k2, len(s))]
+            return substring, STR
+        raise CompilationUnsupported("индексация строки более чем двумя индексами")
+
+    def _table_element(self, table_fn: Code, typ: str, index_list) -> Code:
+        indices = [self._index(*self._expr(e)) for e in index_list.expression()]
+        table_element = self.visitor.expression_evaluator.table_element
+        what = "строкового массива" if typ == STR else "массива"
+
+        def get_raw(table, key):
+            try:
+                return table.get_raw(key)
+            except KumirExecutionError:
+                # Повторяем доступ через визитор ради его сообщения и позиции
+                return table_element(table, list(key), index_list, what).value
+
+        if len(indices) == 1:
+            index_fn = indices[0]
+            is_bool = typ == BOOL
+
+            def element(frame):
+                table = table_fn(frame)
+                index = index_fn(frame)
+                storage = table.storage
+                if storage is not None and table.dimensions == 1:
+                    offset = index - table.dimension_bounds_list[0][0]
+                    # Отрицательное смещение или выход за конец - за границами таблицы
+                    if 0 <= offset < table.size and table.initialized[offset]:
+                        return bool(storage[offset]) if is_bool else storage[offset]
+                return get_raw(table, (index,))
+            return element
+
+        def element_nd(frame):
+            return get_raw(table_fn(frame), tuple(index_fn(frame) for index_fn in indices))
+        return element_nd
+
+
+def compile_program(visitor, algorithm_name: str, memo=None) -> CompiledProgram:
+    """
+    Компилирует программу, уже загруженную визитором (после visitProgram).
+
+    Глобальные переменные берутся из области видимости визитора, встроенные
+    функции, процедуры и ввод-вывод — из его обработчиков. memo - таблица
+    результатов чистых функций запуска (memoization.FunctionMemo).
+
+    Raises:
+        CompilationUnsupported: программа использует неподдерживаемые конструкции.
+    """
+    return _Compiler(visitor, memo).compile_main(algorithm_name)
+
+
+def run_compiled(visitor, algorithm_name: str) -> None:
+    """Компилирует и выполняет главный алгоритм программы."""
+    compile_program(visitor, algorithm_name).run()
@@ -0,0 +1,136 @@
+# execution_limits.py
+"""
+Бюджет выполнения программы КуМир: число шагов, ограничение по времени и отмена.
+
+Шагом считается итерация любого цикла и вызов пользовательского алгоритма —
+именно там программа может "зависнуть". Проверка шага дешёвая: счётчик и одно
+сравнение; время и флаг отмены проверяются раз в CHECK_INTERVAL шагов.
+
+Глубина рекурсии (max_depth) ограничивает явный стек вызовов компилирующего
+движка (compiled_engine._CallStack): число одновременно активных вызовов
+рекурсивных алгоритмов.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .kumir_exceptions import KumirLimitExceededError
+
+# Ограничения по умолчанию для KumirLanguageInterpreter (0 - без ограничения)
+DEFAULT_MAX_STEPS = int(os.environ.get('KUMIR_MAX_STEPS', 10_000_000))
+DEFAULT_TIME_LIMIT = float(os.environ.get('KUMIR_TIME_LIMIT', 0))
+DEFAULT_MAX_RECURSION_DEPTH = int(os.environ.get('KUMIR_MAX_RECURSION_DEPTH', 100_000))
+
+# Как часто (в шагах) проверять время и флаг отмены
+CHECK_INTERVAL = 256
+
+
+class CancellationToken:
+    """
+    Флаг отмены выполнения, который можно выставить из другого потока.
+
+    event - любой объект с методами set/is_set/clear (например,
+    multiprocessing.Event, если отменять нужно из другого процесса).
+    """
+
+    def __init__(self, event: Any = None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def reset(self) -> None:
+        self._event.clear()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ExecutionBudget:
+    """Счётчик шагов одного запуска программы с лимитами и отменой."""
+
+    def __init__(self, max_steps: Optional[int] = None, time_limit: Optional[float] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 max_depth: Optional[int] = DEFAULT_MAX_RECURSION_DEPTH):
+        self.max_steps = max_steps or None
+        self.max_depth = max_depth or None
+        self.time_limit = time_limit or None
+        self.cancel_token = cancel_token
+        self.steps = 0
+        self.deadline = time.monotonic() + self.time_limit if self.time_limit else None
+        # Первая ошибка превышения; после неё каждый шаг бросает её снова
+        self.error: Optional[KumirLimitExceededError] = None
+        # Вызывается при каждой периодической проверке (например, сброс буфера вывода)
+        self.on_check: Optional[Callable[[], Any]] = None
+        self._paused_at: Optional[float] = None
+        self.paused_seconds = 0.0  # Сколько всего программа ждала ввода
+        self._next_check = self._schedule()
+
+    def _schedule(self) -> int:
+        next_check = self.steps + CHECK_INTERVAL
+        if self.max_steps is not None and self.max_steps < next_check:
+            next_check = self.max_steps
+        return next_check
+
+    def tick(self, ctx: Any = None, line_index: Optional[int] = None,
+             column_index: Optional[int] = None) -> None:
+        """
+        Учитывает один шаг. ctx (контекст ANTLR) или line_index/column_index
+        указывают место программы для сообщения об ошибке.
+        """
+        self.steps += 1
+        if self.steps >= self._next_check:
+            self._check(ctx, line_index, column_index)
+
+    def _check(self, ctx, line_index, column_index) -> None:
+        if self.error is None:
+            if self.on_check is not None:
+                self.on_check()
+            if self.max_steps is not None and self.steps >= self.max_steps:
+                self._fail(f"Превышено максимальное число шагов выполнения ({self.max_steps}).",
+                           'steps', ctx, line_index, column_index)
+            elif self.cancel_token is not None and self.cancel_token.cancelled:
+                self._fail("Выполнение остановлено пользователем.", 'cancelled', ctx, line_index, column_index)
+            elif self.deadline is not None and time.monotonic() > self.deadline:
+                self._fail(f"Превышено максимальное время выполнения ({self.time_limit:g} с).",
+                           'time', ctx, line_index, column_index)
+            self._next_check = self._schedule()
+            return
+        raise self.error
+
+    def pause(self) -> None:
+        """Останавливает отсчёт времени (программа ждёт ввода от пользователя)."""
+        if self._paused_at is None:
+            self._paused_at = time.monotonic()
+
+    def resume(self) -> None:
+        """Продолжает отсчёт времени: ожидание ввода в лимит не засчитывается."""
+        if self._paused_at is not None:
+            paused = time.monotonic() - self._paused_at
+            self.paused_seconds += paused
+            if self.deadline is not None:
+                self.deadline += paused
+            self._paused_at = None
+
+    def recursion_limit_error(self, ctx: Any = None) -> KumirLimitExceededError:
+        """
+        Ошибка превышения глубины рекурсии в месте вызова ctx. Не выбрасывается:
+        стек вызовов передаёт её в вызывающую активацию.
+        """
+        return self._limit_error(f"Превышена максимальная глубина рекурсии ({self.max_depth}).",
+                                 'recursion', ctx, None, None)
+
+    def _limit_error(self, message: str, reason: str, ctx, line_index, column_index) -> KumirLimitExceededError:
+        if ctx is not None and getattr(ctx, 'start', None) is not None:
+            line_index = ctx.start.line - 1
+            column_index = ctx.start.column
+        self.error = KumirLimitExceededError(message, reason, line_index=line_index, column_index=column_index)
+        # Все следующие шаги сразу повторяют ошибку
+        self._next_check = self.steps
+        return self.error
+
+    def _fail(self, message: str, reason: str, ctx, line_index, column_index) -> None:
+        raise self._limit_error(message, reason, ctx, line_index, column_index)
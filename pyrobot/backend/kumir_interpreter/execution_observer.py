@@ -0,0 +1,225 @@
+# execution_observer.py
+"""
+Наблюдатели выполнения программы КуМир: единый канал событий для трассы,
+профилировщика, метрик и потоковой передачи вывода.
+
+Наблюдатель (ExecutionObserver) переопределяет только нужные ему события:
+    on_statement_start(line) / on_statement_end(line) - оператор на строке line;
+    on_algorithm_enter(name) / on_algorithm_exit(name) - вход в алгоритм и выход из него;
+    on_robot_command(command, ok)                     - выполнена команда робота (ok=False - отказ);
+    on_output(text)                                   - фрагмент вывода программы;
+    on_error(error)                                   - выполнение завершилось ошибкой.
+
+Наблюдатели регистрируются на один запуск (KumirLanguageInterpreter.interpret(observers=...)).
+ObserverDispatcher "компилирует" подписки: для каждого события атрибут диспетчера -
+None (никто не подписан), метод единственного подписчика или функция рассылки.
+Точки выполнения оборачиваются только для событий, у которых есть подписчики:
+методы экземпляра визитора (visitStatement, вход в алгоритмы), команды
+RobotCommandHandler, IOHandler.write_output и замыкания компилирующего движка.
+Без подписчиков горячий путь остаётся прежним.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+EVENTS = (
+    'statement_start', 'statement_end',
+    'algorithm_enter', 'algorithm_exit',
+    'robot_command', 'output', 'error',
+)
+
+
+class ExecutionObserver:
+    """Базовый наблюдатель: все события игнорируются."""
+
+    def on_statement_start(self, line: int) -> None:
+        pass
+
+    def on_statement_end(self, line: int) -> None:
+        pass
+
+    def on_algorithm_enter(self, name: str) -> None:
+        pass
+
+    def on_algorithm_exit(self, name: str) -> None:
+        pass
+
+    def on_robot_command(self, command: str, ok: bool) -> None:
+        pass
+
+    def on_output(self, text: str) -> None:
+        pass
+
+    def on_error(self, error: BaseException) -> None:
+        pass
+
+
+def _ignore(*args) -> None:
+    return None
+
+
+def _subscribed_handler(observer, event: str) -> Optional[Callable]:
+    """Метод on_<event> наблюдателя или None, если он не переопределён."""
+    method_name = 'on_' + event
+    method = getattr(observer, method_name, None)
+    if method is None or getattr(method, '__func__', None) is getattr(ExecutionObserver, method_name):
+        return None
+    return method
+
+
+def _fan_out(handlers: List[Callable]) -> Optional[Callable]:
+    if not handlers:
+        return None
+    if len(handlers) == 1:
+        return handlers[0]
+    handlers_t = tuple(handlers)
+
+    def dispatch(*args):
+        for handler in handlers_t:
+            handler(*args)
+    return dispatch
+
+
+class ObserverDispatcher:
+    """
+    Рассылка событий наблюдателям одного запуска.
+
+    Атрибут с именем события (statement_start, output, ...) - функция рассылки
+    или None, если на событие никто не подписан.
+    """
+
+    def __init__(self, observers: Iterable[Any] = ()):
+        self.observers: List[Any] = []
+        for event in EVENTS:
+            setattr(self, event, None)
+        for observer in observers:
+            self.subscribe(observer)
+
+    def subscribe(self, observer) -> None:
+        """Добавляет наблюдателя. Точки выполнения, уже обёрнутые attach(), не меняются."""
+        self.observers.append(observer)
+        for event in EVENTS:
+            setattr(self, event, _fan_out([handler for handler in
+                                           (_subscribed_handler(o, event) for o in self.observers)
+                                           if handler is not None]))
+
+    def wants(self, *events: str) -> bool:
+        return any(getattr(self, event) is not None for event in events)
+
+    # --- Подключение к визитору ---
+
+    def attach(self, visitor) -> None:
+        """
+        Оборачивает точки выполнения визитора для событий, на которые есть подписчики.
+        Компилирующий движок берёт диспетчер из visitor.events.
+        """
+        visitor.events = self
+        if self.wants('statement_start', 'statement_end'):
+            start = self.statement_start or _ignore
+            end = self.statement_end or _ignore
+            visit_statement = visitor.visitStatement
+
+            def observed_statement(ctx):
+                line = ctx.start.line
+                start(line)
+                try:
+                    return visit_statement(ctx)
+                finally:
+                    end(line)
+            visitor.visitStatement = observed_statement
+
+        if self.wants('algorithm_enter', 'algorithm_exit'):
+            procedure_manager = visitor.procedure_manager
+            # Главный алгоритм, вызовы процедур из операторов и функций из выражений
+            self._observe_calls(visitor, 'execute_algorithm_node', procedure_manager.procedures,
+                                lambda alg_name, *args: alg_name)
+            self._observe_calls(procedure_manager, 'call_procedure_with_analyzed_args',
+                                procedure_manager.procedures, lambda proc_name, *args: proc_name)
+            self._observe_calls(procedure_manager, '_execute_procedure_call',
+                                procedure_manager.procedures, lambda call_data, *args: call_data['name'])
+
+        if self.robot_command is not None and visitor.robot_command_handler is not None:
+            visitor.robot_command_handler.observe(self.robot_command)
+        if self.output is not None:
+            visitor.io_handler.observe(self.output)
+
+    def _observe_calls(self, owner, method_name: str, procedures, name_of: Callable[..., str]) -> None:
+        method = getattr(owner, method_name)
+        enter = self.algorithm_enter or _ignore
+        exit_ = self.algorithm_exit or _ignore
+
+        def observed_call(*args, **kwargs):
+            info = procedures.get(name_of(*args).lower())
+            if info is None:  # встроенная процедура
+                return method(*args, **kwargs)
+            name = info['name']
+            enter(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                exit_(name)
+        setattr(owner, method_name, observed_call)
+
+    # --- Компилирующий движок ---
+
+    def wrap_statement(self, line: int, code: Callable[[list], Any], resumable: bool = False) -> Callable[[list], Any]:
+        """
+        Замыкание оператора с событиями statement_start/statement_end (если есть подписчики).
+        resumable - code возвращает генератор (оператор рекурсивного алгоритма).
+        """
+        if not self.wants('statement_start', 'statement_end'):
+            return code
+        start = self.statement_start or _ignore
+        end = self.statement_end or _ignore
+
+        if resumable:
+            def observed_resumable_statement(frame):
+                start(line)
+                try:
+                    return (yield from code(frame))
+                finally:
+                    end(line)
+            return observed_resumable_statement
+
+        def observed_statement(frame):
+            start(line)
+            try:
+                return code(frame)
+            finally:
+                end(line)
+        return observed_statement
+
+    def wrap_algorithm(self, name: str, body: Callable[[list], Any], resumable: bool = False) -> Callable[[list], Any]:
+        """Тело алгоритма с событиями algorithm_enter/algorithm_exit (если есть подписчики)."""
+        if not self.wants('algorithm_enter', 'algorithm_exit'):
+            return body
+        enter = self.algorithm_enter or _ignore
+        exit_ = self.algorithm_exit or _ignore
+
+        if resumable:
+            def observed_resumable_body(frame):
+                enter(name)
+                try:
+                    return (yield from body(frame))
+                finally:
+                    exit_(name)
+            return observed_resumable_body
+
+        def observed_body(frame):
+            enter(name)
+            try:
+                return body(frame)
+            finally:
+                exit_(name)
+        return observed_body
+
+
+class RobotCommandCounter(ExecutionObserver):
+    """Число команд робота за запуск, всего и по видам (для метрик)."""
+
+    def __init__(self):
+        self.total = 0
+        self.by_command: Dict[str, int] = {}
+
+    def on_robot_command(self, command: str, ok: bool) -> None:
+        self.total += 1
+        self.by_command[command] = self.by_command.get(command, 0) + 1
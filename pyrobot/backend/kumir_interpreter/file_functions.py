@@ -6,13 +6,23 @@
 безопасного базового каталога (песочницы).
 """
 
+import contextvars
 import logging
 import os
 import sys
+from contextlib import contextmanager
 from pathlib import Path  # Используем pathlib для удобной работы с путями
 
+from .file_storage import (
+	DiskStorage, FileQuotaError, MemoryStorage, SandboxError, create_storage,
+)
+from .interpreter_components.input_scanner import InputScanner
+
 logger = logging.getLogger('KumirFileFunctions')
 
+# Сколько символов файла сканер ввода забирает за одно чтение (целыми строками)
+DEFAULT_SCAN_CHUNK = int(os.environ.get('KUMIR_SCAN_CHUNK', 64 * 1024))
+
 # --- Настройка Песочницы ---
 
 # Определяем базовый каталог для песочницы.
@@ -33,69 +43,66 @@ except Exception as e:
 	logger.exception(f"CRITICAL: Failed to initialize file sandbox directory: {e}")
 	# Если песочница не создана, дальнейшая работа опасна.
 	# Можно либо остановить приложение, либо установить sandbox_base_dir в None
-	# и проверять это в _resolve_sandbox_path. Установим в None для явной ошибки.
+	# и проверять это в DiskStorage.key. Установим в None для явной ошибки.
 	sandbox_base_dir = None
 	sandbox_base_path_str = None  # raise RuntimeError(f"Failed to initialize file sandbox: {e}") # Можно раскомментировать для остановки
 
 
-class SandboxError(Exception):
-	"""Исключение для ошибок, связанных с выходом из песочницы."""
-	pass
+# --- Файловое состояние запуска ---
 
-
-def _resolve_sandbox_path(user_path):
+class FileContext:
 	"""
-    Преобразует пользовательский путь в абсолютный путь внутри песочницы.
-    Проверяет, что результирующий путь не выходит за пределы песочницы.
-
-    Args:
-        user_path (str): Путь, указанный пользователем (может быть относительным).
+	Файловое состояние одного запуска программы: открытые файлы, кодировка,
+	файлы ввода/вывода по умолчанию и консоль запуска.
 
-    Returns:
-        Path: Объект Path с абсолютным путем внутри песочницы.
-
-    Raises:
-        SandboxError: Если путь выходит за пределы песочницы или песочница не инициализирована.
-        TypeError: Если user_path не является строкой.
-    """
-	if sandbox_base_dir is None or sandbox_base_path_str is None:
-		logger.critical("Sandbox base directory is not configured. File operations denied.")
-		raise SandboxError("Файловая песочница не инициализирована.")
+	console_output / console_input - куда пишет и откуда читает "консоль"
+	(вывод и ввод программы). Если не заданы, используются sys.stdout / sys.stdin.
+	storage - хранилище файлов (file_storage); по умолчанию - новое хранилище
+	запуска по KUMIR_FILE_STORAGE (в памяти или общая песочница на диске).
+	"""
 
-	if not isinstance(user_path, str):
-		raise TypeError(f"Путь должен быть строкой, получен {type(user_path)}")
+	def __init__(self, console_output=None, console_input=None, storage=None):
+		self.storage = storage if storage is not None else create_storage(disk_base_dir=sandbox_base_dir)
+		self.open_files = {}
+		self.encoding = "UTF-8"
+		self.default_input = None
+		self.default_output = None
+		self.console_output = console_output
+		self.console_input = console_input
+		self.scanners = {}  # Имя файла -> InputScanner (см. file_scanner)
+
+	def close_all(self):
+		"""Закрывает файлы, оставшиеся открытыми к концу запуска."""
+		for path_str, f in list(self.open_files.items()):
+			try:
+				f.close()
+			except Exception as e:
+				logger.warning(f"Could not close file '{path_str}' at the end of run: {e}")
+		self.open_files.clear()
+		self.scanners.clear()
+		self.default_input = None
+		self.default_output = None
 
-	# Создаем путь относительно базового каталога песочницы
-	combined_path = sandbox_base_dir / user_path
 
-	# Получаем канонический абсолютный путь (разрешает '..', '.', симлинки)
-	try:
-		# Используем resolve() для получения реального пути в файловой системе
-		# strict=True вызовет ошибку, если путь не существует (может быть не нужно для создания)
-		# Поэтому используем abspath() для начального разрешения, а потом проверим префикс
-		abs_path = combined_path.absolute()
-		abs_path_str = str(abs_path)
-	except Exception as e:
-		# Ошибки могут возникнуть из-за слишком длинного имени, некорректных символов и т.д.
-		logger.error(f"Error resolving path '{user_path}' relative to sandbox: {e}")
-		raise SandboxError(f"Некорректный путь: '{user_path}'")
+# Состояние для вызовов вне запуска (общая песочница на диске) и состояние текущего запуска
+_process_context = FileContext(storage=DiskStorage(sandbox_base_dir))
+_current_context = contextvars.ContextVar('kumir_file_context', default=None)
 
-	# ГЛАВНАЯ ПРОВЕРКА: Убеждаемся, что абсолютный путь начинается с пути к песочнице
-	# Это предотвращает выход из песочницы через '..' или абсолютные пути.
-	if not abs_path_str.startswith(sandbox_base_path_str):
-		logger.warning(
-			f"Path traversal attempt detected: User path '{user_path}' resolved to '{abs_path_str}', which is outside sandbox '{sandbox_base_path_str}'.")
-		raise SandboxError(f"Доступ запрещен: путь '{user_path}' выходит за пределы песочницы.")
 
-	logger.debug(f"Resolved sandboxed path for '{user_path}' -> '{abs_path}'")
-	return abs_path  # Возвращаем объект Path
+def current_file_context():
+	"""Файловое состояние текущего запуска (вне запуска - общее состояние процесса)."""
+	return _current_context.get() or _process_context
 
 
-# --- Глобальные настройки (без изменений) ---
-_open_files = {}
-_default_encoding = "UTF-8"
-_default_input = None
-_default_output = None
+@contextmanager
+def file_context(context):
+	"""Делает context текущим файловым состоянием на время блока, по выходу закрывает его файлы."""
+	token = _current_context.set(context)
+	try:
+		yield context
+	finally:
+		context.close_all()
+		_current_context.reset(token)
 
 
 # Функция _normalize_encoding остается без изменений
@@ -117,141 +124,112 @@ def _normalize_encoding(enc):
 
 # Функция set_encoding остается без изменений
 def set_encoding(encoding_name):
-	"""Устанавливает глобальную кодировку."""
+	"""Устанавливает кодировку файлов текущего запуска."""
 	# ... (код без изменений) ...
-	global _default_encoding
+	ctx = current_file_context()
 	norm = _normalize_encoding(encoding_name)
 	if norm is None:
 		raise Exception(f"Invalid encoding name: {encoding_name}")
-	_default_encoding = norm
-	logger.info(f"Default file encoding set to: {_default_encoding}")
+	ctx.encoding = norm
+	logger.info(f"Default file encoding set to: {ctx.encoding}")
 	return "да"  # Возвращаем "да" для совместимости с Кумиром
 
 
 # --- Модифицированные файловые функции ---
 
+# Режим открытия -> название для сообщений об ошибках
+_MODE_NAMES = {"r": "чтения", "w": "записи", "a": "добавления"}
+
+
+def _storage_key(ctx, filename, action):
+	"""Имя файла в хранилище запуска; ошибка пути -> Exception с описанием действия."""
+	try:
+		return ctx.storage.key(filename)
+	except (SandboxError, TypeError) as e:
+		raise Exception(f"Ошибка {action} '{filename}': {e}")
+
+
+def _check_writable(ctx, filename, key, action):
+	"""Проверяет права на запись в файл key (или на его создание)."""
+	storage = ctx.storage
+	if storage.exists(key):
+		if not storage.is_file(key):
+			raise Exception(f"Путь '{filename}' указывает на директорию, {action}.")
+		if not storage.writable(key):
+			raise Exception(f"Нет прав на запись в файл '{filename}'.")
+	elif not storage.writable(key):
+		# Родительская директория должна существовать и быть доступной для записи
+		parent = os.path.dirname(storage.relative(key).rstrip('/')) or '/'
+		raise Exception(f"Нет прав на создание файла '{filename}' в директории '{parent}'.")
+
+
+def _open_in_storage(ctx, filename, key, mode, action):
+	try:
+		f = ctx.storage.open(key, mode, ctx.encoding)
+		logger.info(f"Opened file '{filename}' (path: {key}) for {action}.")
+	except FileQuotaError:
+		raise
+	except Exception as e:
+		raise Exception(f"Ошибка при открытии файла '{filename}' для {_MODE_NAMES[mode]}: {e}")
+	ctx.open_files[key] = f
+	return f
+
+
 def open_for_reading(filename):
 	"""
     Открывает текстовый файл ВНУТРИ ПЕСОЧНИЦЫ для чтения.
     """
-	global _open_files, _default_encoding
-	try:
-		# Разрешаем путь внутри песочницы
-		path_obj = _resolve_sandbox_path(filename)
-		path_str = str(path_obj)
-	except (SandboxError, TypeError) as e:
-		raise Exception(f"Ошибка открытия файла для чтения '{filename}': {e}")
+	ctx = current_file_context()
+	storage = ctx.storage
+	key = _storage_key(ctx, filename, "открытия файла для чтения")
 
-	if path_str in _open_files:
+	if key in ctx.open_files:
 		raise Exception(f"Файл '{filename}' уже открыт.")
-	# Используем path_obj для проверок и открытия
-	if not path_obj.exists():
+	if not storage.exists(key):
 		raise Exception(f"Файл '{filename}' не найден в песочнице.")
-	if not path_obj.is_file():
+	if not storage.is_file(key):
 		raise Exception(f"Путь '{filename}' указывает на директорию, а не на файл.")
-	if not os.access(path_str, os.R_OK):  # os.access все еще нужен для проверки прав
+	if not storage.readable(key):
 		raise Exception(f"Нет прав на чтение файла '{filename}'.")
-
-	try:
-		# Открываем файл с использованием path_obj (или path_str)
-		f = open(path_obj, "r", encoding=_default_encoding)
-		logger.info(f"Opened file '{filename}' (path: {path_str}) for reading.")
-	except Exception as e:
-		raise Exception(f"Ошибка при открытии файла '{filename}' для чтения: {e}")
-
-	_open_files[path_str] = f
-	return f
+	return _open_in_storage(ctx, filename, key, "r", "reading")
 
 
 def open_for_writing(filename):
 	"""
     Открывает текстовый файл ВНУТРИ ПЕСОЧНИЦЫ для записи ("w").
     """
-	global _open_files, _default_encoding
-	try:
-		path_obj = _resolve_sandbox_path(filename)
-		path_str = str(path_obj)
-	except (SandboxError, TypeError) as e:
-		raise Exception(f"Ошибка открытия файла для записи '{filename}': {e}")
-
-	if path_str in _open_files:
+	ctx = current_file_context()
+	key = _storage_key(ctx, filename, "открытия файла для записи")
+	if key in ctx.open_files:
 		raise Exception(f"Файл '{filename}' уже открыт.")
-
-	# Проверяем права на запись (или создание)
-	parent_dir = path_obj.parent
-	if path_obj.exists():
-		if not path_obj.is_file():
-			raise Exception(f"Путь '{filename}' указывает на директорию, запись невозможна.")
-		if not os.access(path_str, os.W_OK):
-			raise Exception(f"Нет прав на запись в файл '{filename}'.")
-	elif not parent_dir.exists() or not os.access(str(parent_dir), os.W_OK):
-		# Проверяем существование родительской директории и права на запись в нее
-		sandbox_rel_path = parent_dir.relative_to(sandbox_base_dir) if sandbox_base_dir else str(parent_dir)
-		raise Exception(
-			f"Нет прав на создание файла '{filename}' в директории '{sandbox_rel_path}'.")
-
-	try:
-		# Открываем файл в режиме записи
-		f = open(path_obj, "w", encoding=_default_encoding)
-		logger.info(f"Opened file '{filename}' (path: {path_str}) for writing.")
-	except Exception as e:
-		raise Exception(f"Ошибка при открытии файла '{filename}' для записи: {e}")
-
-	_open_files[path_str] = f
-	return f
+	_check_writable(ctx, filename, key, "запись невозможна")
+	return _open_in_storage(ctx, filename, key, "w", "writing")
 
 
 def open_for_append(filename):
 	"""
     Открывает текстовый файл ВНУТРИ ПЕСОЧНИЦЫ для добавления ("a").
     """
-	global _open_files, _default_encoding
-	try:
-		path_obj = _resolve_sandbox_path(filename)
-		path_str = str(path_obj)
-	except (SandboxError, TypeError) as e:
-		raise Exception(f"Ошибка открытия файла для добавления '{filename}': {e}")
-
-	if path_str in _open_files:
+	ctx = current_file_context()
+	key = _storage_key(ctx, filename, "открытия файла для добавления")
+	if key in ctx.open_files:
 		raise Exception(f"Файл '{filename}' уже открыт.")
-
-	# Проверяем права на запись/создание (аналогично open_for_writing)
-	parent_dir = path_obj.parent
-	if path_obj.exists():
-		if not path_obj.is_file():
-			raise Exception(f"Путь '{filename}' указывает на директорию, добавление невозможно.")
-		if not os.access(path_str, os.W_OK):
-			raise Exception(f"Нет прав на запись (добавление) в файл '{filename}'.")
-	elif not parent_dir.exists() or not os.access(str(parent_dir), os.W_OK):
-		sandbox_rel_path = parent_dir.relative_to(sandbox_base_dir) if sandbox_base_dir else str(parent_dir)
-		raise Exception(
-			f"Нет прав на создание файла '{filename}' для добавления в директории '{sandbox_rel_path}'.")
-
-	try:
-		# Открываем файл в режиме добавления
-		f = open(path_obj, "a", encoding=_default_encoding)
-		logger.info(f"Opened file '{filename}' (path: {path_str}) for appending.")
-	except Exception as e:
-		raise Exception(f"Ошибка при открытии файла '{filename}' для добавления: {e}")
-
-	_open_files[path_str] = f
-	return f
+	_check_writable(ctx, filename, key, "добавление невозможно")
+	return _open_in_storage(ctx, filename, key, "a", "appending")
 
 
-# Функция close_file остается почти без изменений, но использует имя файла из объекта f
 def close_file(f):
 	"""Закрывает ранее открытый файл."""
-	global _open_files
+	ctx = current_file_context()
 	if not hasattr(f, 'name') or not f.name:
 		raise Exception("Некорректный файловый объект передан для закрытия.")
 
-	# Получаем абсолютный путь файла по его имени
-	# Важно: имя файла в f.name уже должно быть абсолютным путем, который мы сохранили
+	# Имя файла (f.name) - его ключ в хранилище запуска
 	path_str = f.name
-	if path_str not in _open_files:
+	if path_str not in ctx.open_files:
 		# Это может случиться, если файл был открыт не нашими функциями
-		# или был закрыт ранее. Проверяем, начинается ли путь с песочницы для безопасности.
-		if sandbox_base_path_str and path_str.startswith(sandbox_base_path_str):
+		# или был закрыт ранее. Проверяем, что файл из хранилища запуска.
+		if ctx.storage.owns(path_str):
 			logger.warning(f"Attempting to close file '{f.name}' which was not tracked as open. Closing anyway.")
 		else:
 			# Попытка закрыть файл вне песочницы или некорректный путь
@@ -260,24 +238,43 @@ def close_file(f):
 
 	try:
 		f.close()
-		rel_path = os.path.relpath(path_str, sandbox_base_path_str) if sandbox_base_path_str else path_str
-		logger.info(f"Closed file '{rel_path}' (path: {path_str}).")
+		logger.info(f"Closed file '{ctx.storage.relative(path_str)}' (path: {path_str}).")
 	except Exception as e:
-		# Удаляем из _open_files даже если закрытие вызвало ошибку,
+		# Удаляем из ctx.open_files даже если закрытие вызвало ошибку,
 		# чтобы не блокировать повторное открытие
-		if path_str in _open_files:
-			del _open_files[path_str]
+		ctx.open_files.pop(path_str, None)
 		raise Exception(f"Ошибка при закрытии файла '{f.name}': {e}")
 
 	# Удаляем запись об открытом файле только при успешном закрытии
-	if path_str in _open_files:
-		del _open_files[path_str]
+	ctx.open_files.pop(path_str, None)
+	ctx.scanners.pop(path_str, None)
+
+
+def file_scanner(f):
+	"""
+    Сканер ввода для файла f: чтение лексем и значений по типам (InputScanner.read_int,
+    read_real, read_str, ...). Файл читается блоками целых строк, а не по одной строке
+    на значение. Сканер один на файл до его закрытия или сброса чтения.
+    """
+	ctx = current_file_context()
+	scanner = ctx.scanners.get(f.name)
+	if scanner is None:
+		if hasattr(f, 'readlines'):
+			def read_lines():
+				return [line.rstrip('\r\n') for line in f.readlines(DEFAULT_SCAN_CHUNK)]
+			scanner = InputScanner(read_lines=read_lines)
+		else:
+			# Консоль: построчно через её read()
+			scanner = InputScanner(read_line=lambda: f.read().rstrip('\n'))
+		ctx.scanners[f.name] = scanner
+	return scanner
 
 
 # Функции reset_reading, eof, has_data остаются без изменений (работают с файловым объектом)
 def reset_reading(f):
 	"""Сбрасывает указатель файла f в начало файла."""
 	# ... (код без изменений) ...
+	current_file_context().scanners.pop(getattr(f, 'name', None), None)
 	try:
 		f.seek(0)
 	except Exception as e:
@@ -287,6 +284,9 @@ def reset_reading(f):
 def eof(f):
 	"""Проверяет, достигнут ли конец файла."""
 	# ... (код без изменений) ...
+	scanner = current_file_context().scanners.get(getattr(f, 'name', None))
+	if scanner is not None and scanner.has_more():
+		return "нет"  # Прочитанное сканером, но ещё не выданное
 	try:
 		cur = f.tell()
 		f.seek(0, os.SEEK_END)
@@ -300,6 +300,9 @@ def eof(f):
 def has_data(f):
 	"""Проверяет, имеется ли хотя бы один видимый символ после текущей позиции."""
 	# ... (код без изменений) ...
+	scanner = current_file_context().scanners.get(getattr(f, 'name', None))
+	if scanner is not None and scanner.has_more():
+		return "да"
 	try:
 		cur = f.tell()
 		char = f.read(1)
@@ -311,86 +314,51 @@ def has_data(f):
 
 # --- Функции проверки ---
 
-def can_open_for_reading(filename):
-	"""Проверяет, существует ли файл ВНУТРИ ПЕСОЧНИЦЫ и доступен ли он для чтения."""
+def _check(name, check, function_name):
+	"""'да'/'нет' для проверки check(storage, key); некорректный путь - 'нет'."""
+	storage = current_file_context().storage
 	try:
-		path_obj = _resolve_sandbox_path(filename)
-		# Проверяем существование, что это файл, и права на чтение
-		if path_obj.exists() and path_obj.is_file() and os.access(str(path_obj), os.R_OK):
-			return "да"
-		else:
-			return "нет"
+		return "да" if check(storage, storage.key(name)) else "нет"
 	except (SandboxError, TypeError):
 		return "нет"  # Если путь некорректен или вне песочницы, то открыть нельзя
 	except Exception as e:
-		logger.warning(f"Error in can_open_for_reading for '{filename}': {e}")
+		logger.warning(f"Error in {function_name} for '{name}': {e}")
 		return "нет"
 
 
+def can_open_for_reading(filename):
+	"""Проверяет, существует ли файл ВНУТРИ ПЕСОЧНИЦЫ и доступен ли он для чтения."""
+	return _check(filename, lambda storage, key: storage.readable(key), "can_open_for_reading")
+
+
 def can_open_for_writing(filename):
 	"""
     Проверяет, существует ли файл ВНУТРИ ПЕСОЧНИЦЫ и доступен ли для записи,
     либо может ли быть создан.
     """
-	try:
-		path_obj = _resolve_sandbox_path(filename)
-		path_str = str(path_obj)
-		parent_dir = path_obj.parent
-
-		if path_obj.exists():
-			# Файл существует: проверяем, что это файл и есть права на запись
-			if path_obj.is_file() and os.access(path_str, os.W_OK):
-				return "да"
-			else:
-				return "нет"
-		else:
-			# Файл не существует: проверяем, что родительская папка существует и есть права на запись в нее
-			if parent_dir.exists() and parent_dir.is_dir() and os.access(str(parent_dir), os.W_OK):
-				return "да"
-			else:
-				return "нет"
-	except (SandboxError, TypeError):
-		return "нет"
-	except Exception as e:
-		logger.warning(f"Error in can_open_for_writing for '{filename}': {e}")
-		return "нет"
+	return _check(filename, lambda storage, key: storage.writable(key), "can_open_for_writing")
 
 
 def exists(name):
 	"""Проверяет, существует ли файл или директория с заданным именем ВНУТРИ ПЕСОЧНИЦЫ."""
-	try:
-		path_obj = _resolve_sandbox_path(name)
-		return "да" if path_obj.exists() else "нет"
-	except (SandboxError, TypeError):
-		return "нет"
-	except Exception as e:
-		logger.warning(f"Error in exists for '{name}': {e}")
-		return "нет"
+	return _check(name, lambda storage, key: storage.exists(key), "exists")
 
 
 def is_directory(name):
 	"""Проверяет, является ли объект с заданным именем директорией ВНУТРИ ПЕСОЧНИЦЫ."""
-	try:
-		path_obj = _resolve_sandbox_path(name)
-		# Проверяем существование перед проверкой на директорию
-		return "да" if path_obj.exists() and path_obj.is_dir() else "нет"
-	except (SandboxError, TypeError):
-		return "нет"
-	except Exception as e:
-		logger.warning(f"Error in is_directory for '{name}': {e}")
-		return "нет"
+	return _check(name, lambda storage, key: storage.is_dir(key), "is_directory")
 
 
 # --- Функции модификации ---
 
 def create_directory(dirname):
 	"""Создает директорию с заданным именем ВНУТРИ ПЕСОЧНИЦЫ."""
+	storage = current_file_context().storage
 	try:
-		path_obj = _resolve_sandbox_path(dirname)
-		# exist_ok=True: не вызывать ошибку, если папка уже существует
-		# parents=True: создавать родительские директории при необходимости
-		path_obj.mkdir(parents=True, exist_ok=True)
-		logger.info(f"Directory '{dirname}' (path: {path_obj}) created or already exists.")
+		key = storage.key(dirname)
+		# Родительские директории создаются при необходимости, существующая - не ошибка
+		storage.mkdir(key)
+		logger.info(f"Directory '{dirname}' (path: {key}) created or already exists.")
 		return "да"
 	except (SandboxError, TypeError) as e:
 		raise Exception(f"Ошибка создания директории '{dirname}': {e}")
@@ -400,20 +368,21 @@ def create_directory(dirname):
 
 def delete_file(filename):
 	"""Удаляет файл с заданным именем ВНУТРИ ПЕСОЧНИЦЫ."""
+	ctx = current_file_context()
+	storage = ctx.storage
 	try:
-		path_obj = _resolve_sandbox_path(filename)
-		path_str = str(path_obj)
+		key = storage.key(filename)
 
 		# Дополнительная проверка перед удалением
-		if not path_obj.exists():
+		if not storage.exists(key):
 			raise FileNotFoundError(f"Файл '{filename}' не найден для удаления.")
-		if not path_obj.is_file():
+		if not storage.is_file(key):
 			raise IsADirectoryError(f"Путь '{filename}' указывает на директорию, а не файл.")
-		if path_str in _open_files:
+		if key in ctx.open_files:
 			raise Exception(f"Нельзя удалить файл '{filename}', так как он открыт.")
 
-		path_obj.unlink()  # Используем unlink для удаления файла
-		logger.info(f"File '{filename}' (path: {path_obj}) deleted.")
+		storage.remove_file(key)
+		logger.info(f"File '{filename}' (path: {key}) deleted.")
 		return "да"
 	except (SandboxError, TypeError, FileNotFoundError, IsADirectoryError) as e:
 		raise Exception(f"Ошибка удаления файла '{filename}': {e}")
@@ -423,20 +392,21 @@ def delete_file(filename):
 
 def delete_directory(dirname):
 	"""Удаляет ПУСТУЮ директорию с заданным именем ВНУТРИ ПЕСОЧНИЦЫ."""
+	storage = current_file_context().storage
 	try:
-		path_obj = _resolve_sandbox_path(dirname)
+		key = storage.key(dirname)
 
-		if not path_obj.exists():
+		if not storage.exists(key):
 			raise FileNotFoundError(f"Директория '{dirname}' не найдена для удаления.")
-		if not path_obj.is_dir():
+		if not storage.is_dir(key):
 			raise NotADirectoryError(f"Путь '{dirname}' указывает на файл, а не директорию.")
 
 		# Проверяем, что директория пуста
-		if any(path_obj.iterdir()):
+		if not storage.is_empty_dir(key):
 			raise OSError(f"Директория '{dirname}' не пуста, удаление невозможно.")
 
-		path_obj.rmdir()  # Удаляем директорию
-		logger.info(f"Directory '{dirname}' (path: {path_obj}) deleted.")
+		storage.remove_dir(key)
+		logger.info(f"Directory '{dirname}' (path: {key}) deleted.")
 		return "да"
 	except (SandboxError, TypeError, FileNotFoundError, NotADirectoryError, OSError) as e:
 		raise Exception(f"Ошибка удаления директории '{dirname}': {e}")
@@ -451,17 +421,11 @@ def full_path(name):
     Возвращает 'песочный' относительный путь для заданного имени.
     Показывает путь относительно базы песочницы.
     """
+	storage = current_file_context().storage
 	try:
-		path_obj = _resolve_sandbox_path(name)
-		# Возвращаем путь относительно базы песочницы
-		if sandbox_base_dir:
-			relative_path = path_obj.relative_to(sandbox_base_dir)
-		else:
-			relative_path = path_obj
-		# Возвращаем как строку в стиле Unix (с '/')
-		return str(relative_path).replace('\\', '/')
+		# Путь относительно базы песочницы в стиле Unix (с '/')
+		return storage.relative(storage.key(name))
 	except (SandboxError, TypeError) as e:
-		# В случае ошибки возвращаем исходное имя или пустую строку?
 		# Вернем исходное имя, как если бы разрешение не удалось.
 		logger.warning(f"Could not resolve sandboxed full_path for '{name}': {e}")
 		return name
@@ -472,7 +436,8 @@ def full_path(name):
 
 def WORKING_DIRECTORY():
 	"""Возвращает путь к корневому каталогу песочницы."""
-	if sandbox_base_path_str:
+	storage = current_file_context().storage
+	if isinstance(storage, MemoryStorage) or sandbox_base_path_str:
 		# Возвращаем просто '/', обозначая корень песочницы
 		return "/"
 	else:
@@ -488,61 +453,44 @@ def PROGRAM_DIRECTORY():
 
 # --- Функции стандартного ввода/вывода ---
 
+def _reset_default_stream(ctx, attribute, console):
+	"""Закрывает файл ввода/вывода по умолчанию (если это файл) и возвращает консоль."""
+	current = getattr(ctx, attribute)
+	if current and current is not console:
+		try:
+			# close_file удалит файл из ctx.open_files
+			close_file(current)
+		except Exception as e:
+			logger.warning(f"Could not close previous default stream '{current.name}': {e}")
+	setattr(ctx, attribute, console)
+
+
 def set_input(filename):
 	"""
     Устанавливает файл (ВНУТРИ ПЕСОЧНИЦЫ) или консоль в качестве источника ввода.
     """
-	global _default_input, _default_encoding
+	ctx = current_file_context()
 	filename_strip = filename.strip()
 
-	# Специальное имя для консоли
-	if filename_strip.lower() == "консоль":
-		if _default_input and _default_input is not sys.stdin:
-			try:
-				# Закрываем предыдущий файл, если он был открыт нами
-				# Используем путь из f.name для удаления из _open_files
-				close_file(_default_input)  # close_file обработает _open_files
-			except Exception as e:
-				logger.warning(f"Could not close previous default input '{_default_input.name}': {e}")
-		_default_input = sys.stdin  # Стандартный ввод Python (input())
+	# Специальное имя для консоли и пустая строка - ввод с консоли
+	if filename_strip.lower() == "консоль" or filename_strip == "":
+		_reset_default_stream(ctx, 'default_input', sys.stdin)
 		logger.info("Default input set to console (stdin).")
 		return "да"
 
-	# Пустая строка - сброс на stdin
-	if filename_strip == "":
-		if _default_input and _default_input is not sys.stdin:
-			try:
-				close_file(_default_input)
-			except Exception as e:
-				logger.warning(f"Could not close previous default input '{_default_input.name}': {e}")
-		_default_input = sys.stdin  # input()
-		logger.info("Default input reset to console (stdin).")
-		return "да"
-
 	# Иначе - это имя файла в песочнице
-	try:
-		path_obj = _resolve_sandbox_path(filename_strip)
-		path_str = str(path_obj)
-	except (SandboxError, TypeError) as e:
-		raise Exception(f"Ошибка установки файла ввода '{filename}': {e}")
+	key = _storage_key(ctx, filename_strip, "установки файла ввода")
 
 	# Проверяем возможность чтения
 	if can_open_for_reading(filename_strip) != "да":
 		raise Exception(f"Файл '{filename}' не найден или недоступен для чтения в песочнице.")
 
 	# Закрываем предыдущий файл ввода, если он был
-	if _default_input and _default_input is not sys.stdin:
-		try:
-			close_file(_default_input)
-		except Exception as e:
-			logger.warning(f"Could not close previous default input '{_default_input.name}': {e}")
-
+	_reset_default_stream(ctx, 'default_input', sys.stdin)
 	try:
-		# Открываем новый файл
-		new_input_file = open(path_obj, "r", encoding=_default_encoding)
-		_open_files[path_str] = new_input_file  # Регистрируем как открытый
-		_default_input = new_input_file
-		logger.info(f"Default input set to file '{filename_strip}' (path: {path_str}).")
+		ctx.default_input = ctx.storage.open(key, "r", ctx.encoding)
+		ctx.open_files[key] = ctx.default_input  # Регистрируем как открытый
+		logger.info(f"Default input set to file '{filename_strip}' (path: {key}).")
 		return "да"
 	except Exception as e:
 		raise Exception(f"Ошибка при открытии файла '{filename}' для ввода: {e}")
@@ -552,55 +500,29 @@ def set_output(filename):
 	"""
     Устанавливает файл (ВНУТРИ ПЕСОЧНИЦЫ) или консоль в качестве места вывода.
     """
-	global _default_output, _default_encoding
+	ctx = current_file_context()
 	filename_strip = filename.strip()
 
-	# Специальное имя для консоли
-	if filename_strip.lower() == "консоль":
-		if _default_output and _default_output is not sys.stdout:
-			try:
-				close_file(_default_output)
-			except Exception as e:
-				logger.warning(f"Could not close previous default output '{_default_output.name}': {e}")
-		_default_output = sys.stdout  # Стандартный вывод Python (print())
+	# Специальное имя для консоли и пустая строка - вывод на консоль
+	if filename_strip.lower() == "консоль" or filename_strip == "":
+		_reset_default_stream(ctx, 'default_output', sys.stdout)
 		logger.info("Default output set to console (stdout).")
 		return "да"
 
-	# Пустая строка - сброс на stdout
-	if filename_strip == "":
-		if _default_output and _default_output is not sys.stdout:
-			try:
-				close_file(_default_output)
-			except Exception as e:
-				logger.warning(f"Could not close previous default output '{_default_output.name}': {e}")
-		_default_output = sys.stdout
-		logger.info("Default output reset to console (stdout).")
-		return "да"
-
 	# Иначе - это имя файла в песочнице
-	try:
-		path_obj = _resolve_sandbox_path(filename_strip)
-		path_str = str(path_obj)
-	except (SandboxError, TypeError) as e:
-		raise Exception(f"Ошибка установки файла вывода '{filename}': {e}")
+	key = _storage_key(ctx, filename_strip, "установки файла вывода")
 
 	# Проверяем возможность записи
 	if can_open_for_writing(filename_strip) != "да":
 		raise Exception(f"Файл '{filename}' не может быть открыт или создан для записи в песочнице.")
 
 	# Закрываем предыдущий файл вывода, если он был
-	if _default_output and _default_output is not sys.stdout:
-		try:
-			close_file(_default_output)
-		except Exception as e:
-			logger.warning(f"Could not close previous default output '{_default_output.name}': {e}")
-
+	_reset_default_stream(ctx, 'default_output', sys.stdout)
 	try:
 		# Открываем новый файл для записи (перезаписи!)
-		new_output_file = open(path_obj, "w", encoding=_default_encoding)
-		_open_files[path_str] = new_output_file  # Регистрируем
-		_default_output = new_output_file
-		logger.info(f"Default output set to file '{filename_strip}' (path: {path_str}).")
+		ctx.default_output = ctx.storage.open(key, "w", ctx.encoding)
+		ctx.open_files[key] = ctx.default_output  # Регистрируем
+		logger.info(f"Default output set to file '{filename_strip}' (path: {key}).")
 		return "да"
 	except Exception as e:
 		raise Exception(f"Ошибка при открытии файла '{filename}' для вывода: {e}")
@@ -622,13 +544,17 @@ class ConsoleFile:
 		# Используем стандартный вывод
 		# В веб-сервере это может не отображаться пользователю напрямую,
 		# а перехватываться логгером или буферизироваться.
-		# Если _default_output перенаправлен, запись пойдет туда.
-		# Мы должны писать в sys.stdout, если хотим именно на консоль сервера.
-		# print(s, end="", file=sys.stdout) # Явно в stdout сервера
-		# Или используем текущий _default_output
-		output_stream = get_default_output() or sys.stdout
+		# Если вывод по умолчанию перенаправлен в файл, запись пойдет туда,
+		# иначе - в вывод текущего запуска (console_output) или в sys.stdout.
+		ctx = current_file_context()
+		output_stream = ctx.default_output or sys.stdout
 		try:
-			print(s, end="", file=output_stream, flush=True)
+			if output_stream is not sys.stdout:
+				output_stream.write(s)  # Файл буферизован, сбрасывается при закрытии
+			elif ctx.console_output is not None:
+				ctx.console_output(s)
+			else:
+				print(s, end="", file=output_stream, flush=True)
 		except Exception as e:
 			logger.error(
 				f"Error writing to console/default output: {e}")  # Не бросаем исключение наверх, чтобы не прерывать программу из-за ошибки вывода
@@ -641,12 +567,15 @@ class ConsoleFile:
 		if self.closed:
 			raise Exception("Ошибка: Попытка чтения из закрытого файла 'консоль'.")
 
-		input_stream = get_default_input() or sys.stdin
+		ctx = current_file_context()
+		input_stream = ctx.default_input or sys.stdin
 		if input_stream is sys.stdin:
-			# Чтение из реальной консоли (блокирующее!)
-			logger.warning("Reading from console (stdin) requested. This is blocking!")
+			if ctx.console_input is None:
+				# Чтение из реальной консоли (блокирующее!)
+				logger.warning("Reading from console (stdin) requested. This is blocking!")
 			try:
-				line = input()  # Блокирующий вызов
+				# Ввод текущего запуска или блокирующий input()
+				line = ctx.console_input() if ctx.console_input is not None else input()
 				# В Кумире обычно читают построчно, добавим \n
 				return line + "\n" if n == -1 or n >= len(line) + 1 else line[:n]
 			except EOFError:
@@ -702,13 +631,11 @@ def console_file():
 
 def get_default_input():
 	"""Возвращает текущий источник ввода по умолчанию (файл или sys.stdin)."""
-	global _default_input
-	return _default_input
+	return current_file_context().default_input
 
 
 def get_default_output():
 	"""Возвращает текущий выходной поток по умолчанию (файл или sys.stdout)."""
-	global _default_output
-	return _default_output
+	return current_file_context().default_output
 
 # FILE END: file_functions.py
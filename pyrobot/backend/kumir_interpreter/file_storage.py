@@ -0,0 +1,314 @@
+# file_storage.py
+"""
+Хранилища файлов для файловых функций КуМира (file_functions).
+
+Файловые функции работают не с диском напрямую, а с хранилищем текущего
+запуска (FileContext.storage). У хранилища единый интерфейс:
+    key(user_path)       - имя файла в хранилище (ключ открытых файлов и f.name);
+                           выход за пределы песочницы -> SandboxError;
+    exists / is_file / is_dir / readable / writable - проверки по ключу;
+    open(key, mode, encoding) - текстовый файл ('r', 'w', 'a');
+    mkdir / remove_file / remove_dir / is_empty_dir - изменение каталогов;
+    relative(key)        - путь относительно корня песочницы ("data/in.txt");
+    owns(name)           - принадлежит ли имя файла этому хранилищу.
+
+DiskStorage - каталог на диске (общая песочница kumir_sandbox, прежнее поведение).
+MemoryStorage - файлы в памяти одного запуска: диск не используется, запуски
+не видят файлов друг друга. Заполняется заранее набором файлов учителя
+(словарь или zip-архив) и ограничивается квотами на общий объём и число
+файлов и папок. Файлы читаются и пишутся через буферы в памяти; записанное
+попадает в хранилище при flush()/close(), а квота проверяется при каждой записи.
+"""
+
+import io
+import os
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Set, Union
+
+DEFAULT_VFS_MAX_BYTES = int(os.environ.get('KUMIR_VFS_MAX_BYTES', 16 * 1024 * 1024))
+DEFAULT_VFS_MAX_FILES = int(os.environ.get('KUMIR_VFS_MAX_FILES', 1000))
+# Хранилище файлов запуска по умолчанию: 'memory' (своё для каждого запуска) или 'disk'
+DEFAULT_FILE_STORAGE = os.environ.get('KUMIR_FILE_STORAGE', 'memory')
+
+STORAGE_MEMORY = 'memory'
+STORAGE_DISK = 'disk'
+
+
+class SandboxError(Exception):
+    """Исключение для ошибок, связанных с выходом из песочницы."""
+    pass
+
+
+class FileQuotaError(SandboxError):
+    """Превышена квота хранилища файлов запуска (объём или число файлов)."""
+    pass
+
+
+def sandbox_relative_path(user_path) -> str:
+    """
+    Нормализует путь программы к пути относительно корня песочницы
+    ('a/./b/../c.txt' -> 'a/c.txt'; корень - '').
+
+    Raises:
+        SandboxError: абсолютный путь или выход за корень через '..'.
+        TypeError: user_path не строка.
+    """
+    if not isinstance(user_path, str):
+        raise TypeError(f"Путь должен быть строкой, получен {type(user_path)}")
+    normalized = user_path.replace('\\', '/')
+    if normalized.startswith('/') or (len(normalized) > 1 and normalized[1] == ':'):
+        raise SandboxError(f"Доступ запрещен: путь '{user_path}' выходит за пределы песочницы.")
+    parts = []
+    for part in normalized.split('/'):
+        if part in ('', '.'):
+            continue
+        if part == '..':
+            if not parts:
+                raise SandboxError(f"Доступ запрещен: путь '{user_path}' выходит за пределы песочницы.")
+            parts.pop()
+        else:
+            parts.append(part)
+    return '/'.join(parts)
+
+
+class DiskStorage:
+    """Файлы в каталоге на диске; ключ - абсолютный путь внутри каталога."""
+
+    def __init__(self, base_dir: Optional[Path]):
+        self.base_dir = base_dir
+        self.base_path_str = str(base_dir) if base_dir is not None else None
+
+    def key(self, user_path) -> str:
+        if self.base_dir is None:
+            raise SandboxError("Файловая песочница не инициализирована.")
+        if not isinstance(user_path, str):
+            raise TypeError(f"Путь должен быть строкой, получен {type(user_path)}")
+        try:
+            # normpath раскрывает '..' до проверки префикса
+            abs_path_str = os.path.normpath(str((self.base_dir / user_path).absolute()))
+        except Exception:
+            raise SandboxError(f"Некорректный путь: '{user_path}'")
+        # Запрещаем выход из песочницы через '..' и абсолютные пути
+        if abs_path_str != self.base_path_str and not abs_path_str.startswith(self.base_path_str + os.sep):
+            raise SandboxError(f"Доступ запрещен: путь '{user_path}' выходит за пределы песочницы.")
+        return abs_path_str
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(key)
+
+    def is_file(self, key: str) -> bool:
+        return os.path.isfile(key)
+
+    def is_dir(self, key: str) -> bool:
+        return os.path.isdir(key)
+
+    def readable(self, key: str) -> bool:
+        return os.path.isfile(key) and os.access(key, os.R_OK)
+
+    def writable(self, key: str) -> bool:
+        if os.path.exists(key):
+            return os.path.isfile(key) and os.access(key, os.W_OK)
+        parent = os.path.dirname(key)
+        return os.path.isdir(parent) and os.access(parent, os.W_OK)
+
+    def open(self, key: str, mode: str, encoding: str):
+        return open(key, mode, encoding=encoding)
+
+    def mkdir(self, key: str) -> None:
+        Path(key).mkdir(parents=True, exist_ok=True)
+
+    def remove_file(self, key: str) -> None:
+        os.unlink(key)
+
+    def is_empty_dir(self, key: str) -> bool:
+        return not any(Path(key).iterdir())
+
+    def remove_dir(self, key: str) -> None:
+        os.rmdir(key)
+
+    def relative(self, key: str) -> str:
+        if self.base_path_str is None:
+            return key
+        return Path(os.path.relpath(key, self.base_path_str)).as_posix().lstrip('.')
+
+    def owns(self, name: str) -> bool:
+        return bool(self.base_path_str) and str(name).startswith(self.base_path_str)
+
+
+class _MemoryReader(io.StringIO):
+    """Файл для чтения: всё содержимое декодируется при открытии."""
+
+    def __init__(self, name: str, text: str):
+        super().__init__(text)
+        self.name = name
+
+
+class _MemoryWriter(io.StringIO):
+    """Файл для записи в MemoryStorage: буфер в памяти, квота проверяется при каждой записи."""
+
+    def __init__(self, storage: 'MemoryStorage', name: str, encoding: str, text: str, size: int):
+        super().__init__(text)
+        self.seek(0, io.SEEK_END)
+        self.name = name
+        self._storage = storage
+        self._encoding = encoding
+        self._size = size  # Байт файла, учтённых в storage.used_bytes
+
+    def write(self, s: str) -> int:
+        delta = len(s) if s.isascii() else len(s.encode(self._encoding, errors='replace'))
+        self._storage.reserve(delta)
+        self._size += delta
+        return super().write(s)
+
+    def flush(self) -> None:
+        if not self.closed:
+            self._storage.commit(self.name, self.getvalue().encode(self._encoding, errors='replace'), self._size)
+            self._size = len(self._storage.files[self.name])
+
+    def close(self) -> None:
+        if not self.closed:
+            self.flush()
+        super().close()
+
+
+class MemoryStorage:
+    """
+    Файлы одного запуска в памяти; ключ - путь относительно корня ('data/in.txt').
+
+    max_bytes - общий объём содержимого файлов, max_files - число файлов и папок;
+    набор файлов учителя (files) учитывается в квотах.
+    """
+
+    def __init__(self, files: Optional[Mapping[str, Union[str, bytes]]] = None,
+                 max_bytes: int = DEFAULT_VFS_MAX_BYTES, max_files: int = DEFAULT_VFS_MAX_FILES):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.files: Dict[str, bytes] = {}
+        self.dirs: Set[str] = {''}
+        self.used_bytes = 0
+        for path, content in (files or {}).items():
+            self.put(path, content)
+
+    @classmethod
+    def from_zip(cls, archive: Union[str, bytes, Path], **quotas) -> 'MemoryStorage':
+        """Хранилище с файлами из zip-архива (путь к архиву или его содержимое)."""
+        source = io.BytesIO(archive) if isinstance(archive, bytes) else archive
+        with zipfile.ZipFile(source) as bundle:
+            files = {info.filename: bundle.read(info) for info in bundle.infolist() if not info.is_dir()}
+        return cls(files, **quotas)
+
+    def put(self, user_path: str, content: Union[str, bytes]) -> None:
+        """Добавляет файл (текст сохраняется в UTF-8), создавая недостающие папки."""
+        key = self.key(user_path)
+        data = content.encode('utf-8') if isinstance(content, str) else bytes(content)
+        self._make_dirs(posixpath.dirname(key))
+        self._add_entry(key)
+        self.reserve(len(data) - len(self.files.get(key, b'')))
+        self.files[key] = data
+
+    def get(self, user_path: str) -> bytes:
+        """Содержимое файла (например, для проверки результата программы)."""
+        return self.files[self.key(user_path)]
+
+    # --- Квоты ---
+
+    def reserve(self, delta: int) -> None:
+        if self.used_bytes + delta > self.max_bytes:
+            raise FileQuotaError(f"Превышена квота хранилища файлов: не более {self.max_bytes} байт.")
+        self.used_bytes += delta
+
+    def commit(self, key: str, data: bytes, reserved: int) -> None:
+        """Сохраняет содержимое записанного файла; reserved - уже учтённый объём."""
+        self.used_bytes += len(data) - reserved
+        self.files[key] = data
+
+    def _add_entry(self, key: str) -> None:
+        if key not in self.files and key not in self.dirs:
+            if len(self.files) + len(self.dirs) - 1 >= self.max_files:
+                raise FileQuotaError(f"Превышена квота хранилища файлов: не более {self.max_files} файлов и папок.")
+
+    def _make_dirs(self, key: str) -> None:
+        missing = []
+        while key not in self.dirs:
+            if key in self.files:
+                raise SandboxError(f"Путь '{key}' указывает на файл, а не на директорию.")
+            missing.append(key)
+            key = posixpath.dirname(key)
+        for directory in reversed(missing):
+            self._add_entry(directory)
+            self.dirs.add(directory)
+
+    # --- Интерфейс хранилища ---
+
+    def key(self, user_path) -> str:
+        return sandbox_relative_path(user_path)
+
+    def exists(self, key: str) -> bool:
+        return key in self.files or key in self.dirs
+
+    def is_file(self, key: str) -> bool:
+        return key in self.files
+
+    def is_dir(self, key: str) -> bool:
+        return key in self.dirs
+
+    def readable(self, key: str) -> bool:
+        return key in self.files
+
+    def writable(self, key: str) -> bool:
+        if key in self.dirs:
+            return False
+        return key in self.files or posixpath.dirname(key) in self.dirs
+
+    def open(self, key: str, mode: str, encoding: str):
+        if mode == 'r':
+            if key not in self.files:
+                raise FileNotFoundError(f"Файл '{key}' не найден.")
+            return _MemoryReader(key, self.files[key].decode(encoding, errors='replace'))
+        if mode not in ('w', 'a'):
+            raise ValueError(f"Неподдерживаемый режим открытия файла: {mode}")
+        if not self.writable(key):
+            raise FileNotFoundError(f"Нет директории для файла '{key}'.")
+        self._add_entry(key)
+        old = self.files.get(key, b'')
+        if mode == 'w':
+            self.used_bytes -= len(old)
+            self.files[key] = b''
+            return _MemoryWriter(self, key, encoding, '', 0)
+        self.files.setdefault(key, b'')
+        return _MemoryWriter(self, key, encoding, old.decode(encoding, errors='replace'), len(old))
+
+    def mkdir(self, key: str) -> None:
+        self._make_dirs(key)
+
+    def remove_file(self, key: str) -> None:
+        self.used_bytes -= len(self.files.pop(key))
+
+    def is_empty_dir(self, key: str) -> bool:
+        prefix = key + '/' if key else ''
+        return not any(path.startswith(prefix) for path in self.files) and \
+            not any(path != key and path.startswith(prefix) for path in self.dirs)
+
+    def remove_dir(self, key: str) -> None:
+        if key == '':
+            raise OSError("Нельзя удалить корень песочницы.")
+        self.dirs.discard(key)
+
+    def relative(self, key: str) -> str:
+        return key
+
+    def owns(self, name: str) -> bool:
+        return name in self.files
+
+
+def create_storage(kind: Optional[str] = None, files: Optional[Mapping[str, Union[str, bytes]]] = None,
+                   disk_base_dir: Optional[Path] = None):
+    """
+    Хранилище для нового запуска: kind - STORAGE_MEMORY или STORAGE_DISK
+    (по умолчанию DEFAULT_FILE_STORAGE). С набором файлов files хранилище всегда в памяти.
+    """
+    if files is not None or (kind or DEFAULT_FILE_STORAGE) == STORAGE_MEMORY:
+        return MemoryStorage(files)
+    return DiskStorage(disk_base_dir)
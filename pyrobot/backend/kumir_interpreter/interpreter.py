@@ -5,59 +5,95 @@
 """
 
 import logging
-from typing import Optional, Dict, Any, Callable
-from io import StringIO
+import time
+from typing import Optional, Dict, Any, Callable, List, Mapping, Union
 import sys
 
-# ANTLR
-from antlr4 import InputStream, CommonTokenStream
-from antlr4.error.ErrorListener import ErrorListener
-
 # Наши компоненты
-from .generated.KumirLexer import KumirLexer
-from .generated.KumirParser import KumirParser
 from .interpreter_components.main_visitor import KumirInterpreterVisitor
 from .kumir_exceptions import (
     KumirSyntaxError, KumirInputRequiredError, KumirRuntimeError, 
-    ExitSignal, StopExecutionSignal
+    ExitSignal, StopExecutionSignal, KumirLimitExceededError
 )
 from .robot_state import SimulatedRobot
 from .robot_integration import integrate_robot_with_visitor
+from .parse_cache import get_parse_cache
+from .parsing import parse_program
+from .output_stream import OutputBuffer, DeltaStreamer
+from .trace_recorder import TraceRecorder
+from .profiler import ExecutionProfiler
+from .execution_observer import ObserverDispatcher, RobotCommandCounter
+from .memoization import FunctionMemo, find_pure_functions
+from .file_functions import FileContext, file_context
+from .file_storage import MemoryStorage
+from .compiled_engine import (
+    ENGINE_COMPILED, ENGINE_VISITOR, CompilationUnsupported, CompiledProgram, compile_program, resolve_engine
+)
+from .execution_limits import (
+    CancellationToken, ExecutionBudget, DEFAULT_MAX_STEPS, DEFAULT_TIME_LIMIT,
+    DEFAULT_MAX_RECURSION_DEPTH
+)
 
 
 logger = logging.getLogger(__name__)
 
 
-class DiagnosticErrorListener(ErrorListener):
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        error_msg = f"Синтаксическая ошибка: {msg}"
-        raise KumirSyntaxError(error_msg, line_index=line - 1, column_index=column)
-
-
 class KumirLanguageInterpreter:
     """
     Главный класс интерпретатора языка КуМир.
     Обеспечивает совместимость с server.py и управляет выполнением программ.
     """
     
-    def __init__(self, code: str, initial_field_state: Optional[Dict[str, Any]] = None):
+    def __init__(self, code: str, initial_field_state: Optional[Dict[str, Any]] = None,
+                 engine: Optional[str] = None, max_steps: Optional[int] = None,
+                 time_limit: Optional[float] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 input_provider: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 profile: bool = False, observers: Optional[List[Any]] = None,
+                 memoize: bool = False, max_depth: Optional[int] = None,
+                 file_bundle: Optional[Mapping[str, Union[str, bytes]]] = None):
         """
         Инициализация интерпретатора.
         
         Args:
             code: Исходный код программы КуМир
             initial_field_state: Начальное состояние поля (ширина, высота, позиция робота и т.д.)
+            engine: Движок выполнения: 'visitor' или 'compiled' (по умолчанию из KUMIR_ENGINE)
+            max_steps: Лимит шагов (итераций циклов и вызовов), 0 - без лимита (по умолчанию KUMIR_MAX_STEPS)
+            time_limit: Лимит времени выполнения в секундах, 0 - без лимита (по умолчанию KUMIR_TIME_LIMIT)
+            cancel_token: Флаг отмены; stop() выставляет его
+            input_provider: Источник ввода, когда input_buffer пуст. Получает запрос
+                {'var_name', 'prompt', 'target_type'} и возвращает строку (может ждать,
+                см. resumable.ResumableRun). Без него выполнение прерывается с input_required
+            profile: Профилировать запуски по умолчанию (см. interpret)
+            observers: Наблюдатели (execution_observer.ExecutionObserver) каждого запуска
+            memoize: Запоминать результаты чистых функций по умолчанию (см. interpret)
+            max_depth: Лимит глубины рекурсии компилирующего движка, 0 - без лимита
+                (по умолчанию KUMIR_MAX_RECURSION_DEPTH)
+            file_bundle: Файлы задания {путь: содержимое}; каждый запуск получает их
+                копию в своём хранилище в памяти (file_storage.MemoryStorage)
         """
         self.code = code
         self.program_lines = code.splitlines()
+        self.engine = resolve_engine(engine)
+        self.max_steps = DEFAULT_MAX_STEPS if max_steps is None else max_steps
+        self.time_limit = DEFAULT_TIME_LIMIT if time_limit is None else time_limit
+        self.max_depth = DEFAULT_MAX_RECURSION_DEPTH if max_depth is None else max_depth
+        self.cancel_token = cancel_token if cancel_token is not None else CancellationToken()
+        self.budget: Optional[ExecutionBudget] = None
+        # Движок, выполнивший главный алгоритм последнего запуска (ENGINE_VISITOR или ENGINE_COMPILED)
+        self.engine_used: Optional[str] = None
         
         # Инициализация состояния поля и робота
+        self.initial_field_state = initial_field_state
         self._init_field_state(initial_field_state)
         
         # Буферы для ввода/вывода
-        self.output = ""
+        self._streamer: Optional[DeltaStreamer] = None
+        self._output = OutputBuffer()
         self.input_buffer = ""
         self.input_requests = []
+        self.input_provider = input_provider
         
         # Флаги состояния
         self.is_running = False
@@ -67,11 +103,49 @@ class KumirLanguageInterpreter:
         # Callback для прогресса выполнения
         self.progress_callback: Optional[Callable[..., Any]] = None
         
-        # Трассировка выполнения
+        # Трассировка выполнения: trace - прежний список событий (не заполняется),
+        # trace_recorder - компактная запись изменений поля по шагам
         self.trace = []
+        self.trace_recorder: Optional[TraceRecorder] = None
+        # Время разбора и выполнения (без ожидания ввода), число шагов и команд робота последнего запуска
+        self.timings: Dict[str, Any] = {}
+        # Профилировщик строк и алгоритмов (только для запусков с profile=True)
+        self.profile = profile
+        self.profiler: Optional[ExecutionProfiler] = None
+        # Наблюдатели выполнения: заданные снаружи и собранные для текущего запуска
+        self.observers: List[Any] = list(observers or [])
+        self._run_observers: List[Any] = []
+        self.events: Optional[ObserverDispatcher] = None
+        self.robot_commands: Optional[RobotCommandCounter] = None
+        # Запоминание результатов чистых функций (только для запусков с memoize=True)
+        self.memoize = memoize
+        self._memoize_run = False
+        self.memo: Optional[FunctionMemo] = None
+        # Файловое состояние запуска (хранилище, открытые файлы, уст_ввод/уст_вывод, консоль)
+        self.file_bundle = file_bundle
+        self.files: Optional[FileContext] = None
         
         logger.debug(f"KumirLanguageInterpreter initialized with code length: {len(code)}")
 
+    @property
+    def output(self) -> str:
+        """Весь вывод программы (склеивается из фрагментов при чтении)."""
+        return self._output.getvalue()
+
+    @output.setter
+    def output(self, value: str) -> None:
+        self._output = OutputBuffer(value)
+        if self._streamer is not None:
+            self._streamer.reset(len(value))
+
+    def _emit_output_delta(self, delta_message: Dict[str, Any]) -> None:
+        """Отправляет дельту вывода (с позицией робота) в progress_callback."""
+        try:
+            delta_message['robotPos'] = self.robot.robot_pos.copy() if self.robot else {'x': 0, 'y': 0}
+            self.progress_callback(delta_message)
+        except Exception as e:
+            logger.warning(f"Progress callback error: {e}")
+
     def _init_field_state(self, initial_state: Optional[Dict[str, Any]]):
         """Инициализация состояния поля и робота."""
         if initial_state:
@@ -79,44 +153,20 @@ class KumirLanguageInterpreter:
             self.height = initial_state.get('height', 7)
             robot_pos = initial_state.get('robotPos', {'x': 0, 'y': 0})
             
-            # Создаем симулированного робота
+            # Создаем симулированного робота; строковые ключи стен и клеток
+            # разбираются в целочисленное представление поля внутри SimulatedRobot
             self.robot = SimulatedRobot(
                 width=self.width,
                 height=self.height,
-                initial_pos=robot_pos
+                initial_pos=robot_pos,
+                initial_walls=initial_state.get('walls', []),
+                initial_markers=initial_state.get('markers', {}),
+                initial_colored_cells=initial_state.get('coloredCells', []),
+                initial_symbols=initial_state.get('symbols'),
+                initial_radiation=initial_state.get('radiation'),
+                initial_temperature=initial_state.get('temperature')
             )
-            
-            # Применяем состояние поля
-            walls = initial_state.get('walls', [])
-            for wall in walls:
-                # Парсим стену в формате "x1,y1,x2,y2"
-                try:
-                    coords = wall.split(',')
-                    if len(coords) == 4:
-                        x1, y1, x2, y2 = map(int, coords)
-                        # Добавляем стену в множество walls робота
-                        self.robot.walls.add(f"{x1},{y1},{x2},{y2}")
-                except (ValueError, IndexError):
-                    logger.warning(f"Invalid wall format: {wall}")
-            
-            # Маркеры
-            markers = initial_state.get('markers', {})
-            for pos_key, count in markers.items():
-                try:
-                    # Устанавливаем маркеры напрямую
-                    self.robot.markers[pos_key] = count
-                except (ValueError, IndexError):
-                    logger.warning(f"Invalid marker position: {pos_key}")
-            
-            # Закрашенные клетки
-            colored_cells = initial_state.get('coloredCells', [])
-            for cell in colored_cells:
-                try:
-                    # Добавляем в множество закрашенных клеток
-                    self.robot.colored_cells.add(cell)
-                except (ValueError, IndexError):
-                    logger.warning(f"Invalid colored cell: {cell}")
-                    
+
         else:
             # Значения по умолчанию
             self.width = 7
@@ -127,23 +177,72 @@ class KumirLanguageInterpreter:
                 initial_pos={'x': 0, 'y': 0}
             )
 
-    def interpret(self, progress_callback: Optional[Callable[..., Any]] = None) -> Dict[str, Any]:
+    def interpret(self, progress_callback: Optional[Callable[..., Any]] = None,
+                  profile: Optional[bool] = None,
+                  observers: Optional[List[Any]] = None,
+                  memoize: Optional[bool] = None) -> Dict[str, Any]:
         """
         Выполнение программы КуМир.
         
         Args:
-            progress_callback: Функция для отправки прогресса выполнения
+            progress_callback: Функция для отправки прогресса выполнения. Получает
+                дельты вывода {'seq', 'offset', 'delta', 'robotPos'}
+                (см. output_stream.DeltaStreamer)
+            profile: Профилировать запуск (по умолчанию self.profile). Без
+                профилировщика операторы и вызовы выполняются без замеров
+            observers: Дополнительные наблюдатели этого запуска (см. execution_observer)
+            memoize: Запоминать результаты чистых функций (по умолчанию self.memoize),
+                см. memoization.py
             
         Returns:
-            Словарь с результатами выполнения
+            Словарь с результатами выполнения; traceData - компактная трасса
+            (TraceRecorder.to_payload), по которой восстанавливается поле на любом шаге;
+            при профилировании profile - отчёт ExecutionProfiler.report (число выполнений
+            и время по строкам и алгоритмам, свёрнутые стеки для flamegraph);
+            при запоминании memo - FunctionMemo.report (чистые функции и число попаданий)
         """
+        started = time.perf_counter()
+        self.timings = {'parse': 0.0}
+        self.profiler = ExecutionProfiler() if (self.profile if profile is None else profile) else None
+        self._run_observers = self.observers + list(observers or [])
+        self._memoize_run = self.memoize if memoize is None else memoize
+        self.memo = None
+        result = self._interpret(progress_callback)
+        elapsed = time.perf_counter() - started - (self.budget.paused_seconds if self.budget else 0.0)
+        self.timings['execute'] = max(0.0, elapsed - self.timings['parse'])
+        if self.budget is not None:
+            self.timings['steps'] = self.budget.steps
+        if self.robot_commands is not None:
+            self.timings['robot_ops'] = self.robot_commands.total
+            self.timings['robot_commands'] = dict(self.robot_commands.by_command)
+        if self.trace_recorder is not None:
+            result['traceData'] = self.trace_recorder.to_payload()
+        if self.profiler is not None:
+            result['profile'] = self.profiler.report(self.program_lines)
+        if self.memo is not None:
+            result['memo'] = self.memo.report()
+        return result
+
+    def _interpret(self, progress_callback: Optional[Callable[..., Any]]) -> Dict[str, Any]:
         self.progress_callback = progress_callback
         self.is_running = True
         self.trace = []
+        self.engine_used = None
+        self._streamer = DeltaStreamer(self._emit_output_delta) if progress_callback else None
+        self.trace_recorder = TraceRecorder.for_robot(self.robot)
+        self.events = self._create_dispatcher()
         
         try:
+            # Бюджет выполнения отсчитывается с начала запуска (включая разбор)
+            self.budget = ExecutionBudget(self.max_steps, self.time_limit, self.cancel_token, self.max_depth)
+            if self._streamer is not None:
+                # Хвост вывода уходит клиенту, даже пока программа только считает
+                self.budget.on_check = self._streamer.flush_if_due
+
             # Парсинг кода
+            parse_started = time.perf_counter()
             tree = self._parse_code()
+            self.timings['parse'] = time.perf_counter() - parse_started
             
             # Выполнение программы
             result = self._execute_program(tree)
@@ -157,20 +256,51 @@ class KumirLanguageInterpreter:
                 'var_name': getattr(e, 'var_name', 'unknown'),
                 'prompt': getattr(e, 'prompt', 'Введите значение:'),
                 'target_type': getattr(e, 'target_type', 'лит'),
+                'finalState': self.get_state(),
                 'trace': self.trace
             }
             
         except (KumirSyntaxError, KumirRuntimeError) as e:
-            return {
+            if self.budget is not None and self.budget.error is not None:
+                # Ошибку превышения лимита могли обернуть по дороге наверх
+                e = self.budget.error
+            self._emit_error(e)
+            return self._with_limit({
                 'success': False,
                 'message': str(e),
                 'errorIndex': getattr(e, 'line_index', -1),
                 'finalState': self.get_state(),
                 'trace': self.trace
-            }
+            }, e)
+
+        except (RecursionError, MemoryError) as e:
+            # Визитор выполняет вызовы на стеке Python и упирается в его предел;
+            # память программы ограничена лимитом адресного пространства процесса (пул)
+            if isinstance(e, MemoryError):
+                error = KumirLimitExceededError("Превышен лимит памяти.", 'memory')
+            else:
+                error = KumirLimitExceededError("Превышена максимальная глубина рекурсии.", 'recursion')
+            self._emit_error(error)
+            return self._with_limit({
+                'success': False,
+                'message': str(error),
+                'errorIndex': -1,
+                'finalState': self.get_state(),
+                'trace': self.trace
+            }, error)
             
         except Exception as e:
+            if self.budget is not None and self.budget.error is not None:
+                self._emit_error(self.budget.error)
+                return self._with_limit({
+                    'success': False,
+                    'message': str(self.budget.error),
+                    'errorIndex': self.budget.error.line_index,
+                    'finalState': self.get_state(),
+                    'trace': self.trace
+                }, self.budget.error)
             logger.exception("Unexpected error during interpretation")
+            self._emit_error(e)
             return {
                 'success': False,
                 'message': f"Внутренняя ошибка: {type(e).__name__}: {str(e)}",
@@ -179,90 +309,162 @@ class KumirLanguageInterpreter:
             }
             
         finally:
+            if self._streamer is not None:
+                self._streamer.flush()
+                self._streamer = None
             self.is_running = False
 
+    def _create_dispatcher(self) -> ObserverDispatcher:
+        """Наблюдатели запуска: трасса, счётчик команд робота, поток вывода, профилировщик и внешние."""
+        self.robot_commands = RobotCommandCounter()
+        observers = [self.trace_recorder, self.robot_commands]
+        if self._streamer is not None:
+            observers.append(self._streamer)
+        if self.profiler is not None:
+            observers.append(self.profiler)
+        observers.extend(self._run_observers)
+        return ObserverDispatcher(observers)
+
+    def _attach_memo(self, visitor) -> None:
+        """Таблица результатов чистых функций (после visitProgram, когда алгоритмы собраны)."""
+        if self._memoize_run:
+            self.memo = FunctionMemo(find_pure_functions(visitor.procedure_manager.procedures))
+            self.memo.attach(visitor.procedure_manager)
+
+    @staticmethod
+    def _with_limit(result: Dict[str, Any], error: BaseException) -> Dict[str, Any]:
+        """Для превышения бюджета выполнения добавляет в результат limit - причину (KumirLimitExceededError.reason)."""
+        if isinstance(error, KumirLimitExceededError):
+            result['limit'] = error.reason
+        return result
+
+    def _emit_error(self, error: BaseException) -> None:
+        if self.events is not None and self.events.error is not None:
+            self.events.error(error)
+
     def _parse_code(self):
-        """Парсинг исходного кода."""
-        input_stream = InputStream(self.code)
-        lexer = KumirLexer(input_stream)
-        lexer.removeErrorListeners()
-        
-        error_listener = DiagnosticErrorListener()
-        lexer.addErrorListener(error_listener)
-        
-        token_stream = CommonTokenStream(lexer)
-        parser = KumirParser(token_stream)
-        parser.removeErrorListeners()
-        parser.addErrorListener(error_listener)
-        
-        return parser.program()
+        """Парсинг исходного кода (SLL с откатом на LL, с общим кэшем деревьев разбора)."""
+        return get_parse_cache().get_or_parse(self.code, parse_program)
 
     def _execute_program(self, tree) -> Dict[str, Any]:
         """Выполнение программы с использованием visitor."""
-        # Перехват вывода
-        original_stdout = sys.stdout
-        captured_output = StringIO()
-        
         def output_fn(text: str):
-            self.output += text
-            captured_output.write(text)
-            # Отправляем прогресс через callback если есть
-            if self.progress_callback:
-                try:
-                    progress_data = {
-                        'output': self.output,
-                        'robotPos': self.robot.robot_pos.copy() if self.robot else {'x': 0, 'y': 0}
-                    }
-                    self.progress_callback(progress_data)
-                except Exception as e:
-                    logger.warning(f"Progress callback error: {e}")
+            # Трасса и поток вывода получают текст через событие output (self.events)
+            self._output.write(text)
             
+        current = {}
+
+        def input_lines():
+            # Сканер ввода забирает весь накопленный буфер одним вызовом
+            if not self.input_buffer:
+                return []
+            lines = self.input_buffer.split('\n')
+            if not lines[-1]:
+                lines.pop()
+            self.input_buffer = ''
+            return lines
+
         def input_fn():
-            # В данный момент просто возвращаем пустую строку
-            # В будущем здесь будет обработка ввода
-            return ""
+            if self.input_buffer:
+                line, _, self.input_buffer = self.input_buffer.partition('\n')
+            else:
+                request = dict(current['visitor'].io_handler.pending_request or {})
+                request.setdefault('var_name', 'unknown')
+                request.setdefault('target_type', 'лит')
+                request['prompt'] = 'Введите значение:'
+                self.requires_input = True
+                self.current_input_request = request
+                if self.input_provider is None:
+                    raise KumirInputRequiredError(request['var_name'], request['prompt'], request['target_type'])
+                if self._streamer is not None:
+                    # Вывод перед вводом должен дойти до клиента до того, как программа встанет
+                    self._streamer.flush()
+                line = self.input_provider(request)
+                self.requires_input = False
+                self.current_input_request = None
+            return line
             
         def error_fn(text: str):
             sys.stderr.write(text)
 
-        try:
-            # Создаем visitor
+        def create_visitor():
             visitor = KumirInterpreterVisitor(
                 input_stream=input_fn,
                 output_stream=output_fn,
                 error_stream=error_fn,
-                program_lines=self.program_lines
+                program_lines=self.program_lines,
+                input_lines=input_lines
             )
-            
             # Интегрируем робота с visitor
             integrate_robot_with_visitor(visitor, self.robot)
+            visitor.execution_budget = self.budget
+            self.events.attach(visitor)
+            current['visitor'] = visitor
+            return visitor
+
+        def console_input():
+            # Консоль файловых функций читает через сканер ввода, чтобы не обогнать "ввод"
+            if 'visitor' in current:
+                return current['visitor'].io_handler.get_input_line("")
+            return input_fn()
+
+        # Ввод-вывод запуска не использует sys.stdout и глобальные переменные модулей:
+        # "консоль" файловых функций пишет в вывод программы и читает её ввод
+        storage = MemoryStorage(self.file_bundle) if self.file_bundle is not None else None
+        self.files = FileContext(console_output=output_fn, console_input=console_input, storage=storage)
+        with file_context(self.files):
+            try:
+                # Создаем visitor
+                visitor = create_visitor()
             
-            # Выполняем программу
-            visitor.visitProgram(tree)
+                # Выполняем программу
+                visitor.visitProgram(tree)
+                self._attach_memo(visitor)
             
-            # Ищем главный алгоритм и выполняем
-            if hasattr(visitor, 'procedure_manager') and visitor.procedure_manager.procedures:
-                algorithm_to_run = self._find_main_algorithm(visitor.procedure_manager.procedures)
-                if algorithm_to_run and hasattr(visitor, 'execute_algorithm_node'):
-                    visitor.execute_algorithm_node(algorithm_to_run)
-            return {
-                'success': True,
-                'message': 'Программа выполнена успешно',
-                'finalState': self.get_state(),
-                'trace': self.trace
-            }
+                # Ищем главный алгоритм и выполняем
+                if hasattr(visitor, 'procedure_manager') and visitor.procedure_manager.procedures:
+                    algorithm_to_run = self._find_main_algorithm(visitor.procedure_manager.procedures)
+                    if algorithm_to_run and hasattr(visitor, 'execute_algorithm_node'):
+                        program = self._compile(visitor, algorithm_to_run)
+                        if program is not None:
+                            program.run()
+                        else:
+                            visitor.execute_algorithm_node(algorithm_to_run)
+                return {
+                    'success': True,
+                    'message': 'Программа выполнена успешно',
+                    'finalState': self.get_state(),
+                    'trace': self.trace
+                }
             
-        except (ExitSignal, StopExecutionSignal):
-            # Нормальное завершение программы
-            return {
-                'success': True,
-                'message': 'Программа завершена',
-                'finalState': self.get_state(),
-                'trace': self.trace
-            }
-            
-        finally:
-            sys.stdout = original_stdout
+            except (ExitSignal, StopExecutionSignal):
+                # Нормальное завершение программы
+                return {
+                    'success': True,
+                    'message': 'Программа завершена',
+                    'finalState': self.get_state(),
+                    'trace': self.trace
+                }
+
+    def _compile(self, visitor, algorithm_name: str) -> Optional[CompiledProgram]:
+        """
+        Компилирует главный алгоритм, если выбран компилирующий движок.
+
+        Возвращает None, если алгоритм выполняет визитор: выбран визитор или
+        компилятор не поддерживает какую-то конструкцию. Компиляция ничего не
+        выполняет, поэтому визитор продолжает с того же места. Ошибки выполнения
+        скомпилированной программы не приводят к перезапуску визитором.
+        """
+        self.engine_used = ENGINE_VISITOR
+        if self.engine != ENGINE_COMPILED:
+            return None
+        try:
+            program = compile_program(visitor, algorithm_name, self.memo)
+        except CompilationUnsupported as e:
+            logger.debug(f"Compiled engine fallback to visitor: {e}")
+            return None
+        self.engine_used = ENGINE_COMPILED
+        return program
 
     def _find_main_algorithm(self, procedures: Dict[str, Any]) -> Optional[str]:
         """Поиск главного алгоритма для выполнения."""
@@ -295,17 +497,13 @@ class KumirLanguageInterpreter:
         }
         
         if self.robot:
-            # Собираем стены
-            if hasattr(self.robot, 'walls'):
-                state['walls'] = [f"{x1},{y1},{x2},{y2}" for (x1, y1, x2, y2) in self.robot.walls]
-            
-            # Собираем маркеры
-            if hasattr(self.robot, 'markers'):
-                state['markers'] = {pos: count for pos, count in self.robot.markers.items() if count > 0}
-            
-            # Собираем закрашенные клетки
-            if hasattr(self.robot, 'colored_cells'):
-                state['coloredCells'] = list(self.robot.colored_cells)
+            # Стены, маркеры и закраску робот отдаёт уже в строковом виде для JSON
+            state['walls'] = sorted(self.robot.walls)
+            state['markers'] = self.robot.markers
+            state['coloredCells'] = sorted(self.robot.colored_cells)
+            state['symbols'] = dict(self.robot.symbols)
+            state['radiation'] = dict(self.robot.radiation)
+            state['temperature'] = dict(self.robot.temperature)
             
             # Собираем направление ошибки движения
             if hasattr(self.robot, 'error_direction'):
@@ -320,7 +518,13 @@ class KumirLanguageInterpreter:
         self.current_input_request = None
 
     def stop(self):
-        """Остановка выполнения программы."""
+        """
+        Остановка выполнения программы.
+
+        Можно вызывать из другого потока: выполнение прервётся на ближайшем
+        шаге ошибкой KumirLimitExceededError с reason='cancelled'.
+        """
+        self.cancel_token.cancel()
         self.is_running = False
 
     def reset(self):
@@ -330,6 +534,7 @@ class KumirLanguageInterpreter:
         self.input_requests = []
         self.trace = []
         self.is_running = False
+        self.cancel_token.reset()
         self.requires_input = False
         self.current_input_request = None
         
@@ -37,6 +37,8 @@ class ControlFlowVisitorMixin:
         statement_sequence_ctx = ctx.statementSequence()
         end_loop_condition_ctx = ctx.endLoopCondition() # Может быть None
         end_loop_simple_ctx = ctx.ENDLOOP() # Может быть None
+        # Каждая итерация - шаг бюджета выполнения (защита от бесконечных циклов)
+        tick = kiv_self.execution_budget.tick
 
         try:
             if loop_specifier_ctx:
@@ -69,7 +71,7 @@ class ControlFlowVisitorMixin:
                         if step_val == 0:
                              raise KumirRuntimeError(f"Шаг в цикле ДЛЯ для '{loop_var_name}' не может быть равен нулю.", line_index=step_expr_ctx.start.line-1, column_index=step_expr_ctx.start.column, line_content=kiv_self.get_line_content_from_ctx(step_expr_ctx))
                     
-                    kiv_self.scope_manager.enter_scope() # Removed f-string scope name, not used by scope_manager
+                    kiv_self.scope_manager.enter_scope(kiv_self.scope_manager.loop_layout(ctx))
                     try:
                         # Объявляем переменную цикла как ЦЕЛ
                         loop_var_id_token = loop_specifier_ctx.ID().symbol
@@ -89,15 +91,15 @@ class ControlFlowVisitorMixin:
                             column_index=loop_var_id_token.column
                         )
 
+                        # Запись переменной цикла в кадре: на каждой итерации обновляем её напрямую
+                        loop_var_record = kiv_self.scope_manager.scopes[-1][loop_var_name.lower()]
+
                         while (step_val > 0 and current_val <= end_val) or \
                               (step_val < 0 and current_val >= end_val):
+                            tick(ctx)
                             # Обновление значения переменной цикла на каждой итерации
-                            kiv_self.scope_manager.update_variable(
-                                loop_var_name, 
-                                KumirValue(current_val, KumirType.INT.value),
-                                line_index=loop_var_id_token.line - 1, # Используем позицию ID переменной цикла
-                                column_index=loop_var_id_token.column
-                            )
+                            loop_var_record.value = KumirValue(current_val, KumirType.INT.value)
+                            loop_var_record.initialized = True
                             try:
                                 if statement_sequence_ctx:
                                     kiv_self.visit(statement_sequence_ctx)
@@ -126,6 +128,7 @@ class ControlFlowVisitorMixin:
                         if not condition_val:
                             break
 
+                        tick(ctx)
                         try:
                             if statement_sequence_ctx:
                                 kiv_self.visit(statement_sequence_ctx)
@@ -152,6 +155,7 @@ class ControlFlowVisitorMixin:
                         times_val = 0
 
                     for _ in range(times_val):
+                        tick(ctx)
                         try:
                             if statement_sequence_ctx:
                                 kiv_self.visit(statement_sequence_ctx)
@@ -170,6 +174,7 @@ class ControlFlowVisitorMixin:
 
             else: # Бесконечный цикл (нц ... кц) или цикл с условием выхода (нц ... кц при)
                 while True:
+                    tick(ctx)
                     try:
                         if statement_sequence_ctx:
                             kiv_self.visit(statement_sequence_ctx)
@@ -3,26 +3,24 @@
 
 from __future__ import annotations
 from antlr4 import ParserRuleContext, Token
-from typing import Any, List, Tuple, Callable
+from typing import Any, Dict, List, Tuple, Callable
 from ..generated.KumirParser import KumirParser # Оставляем только этот импорт для KumirParser
 from .scope_manager import ScopeManager
 from .procedure_manager import ProcedureManager
 from ..generated.KumirParserVisitor import KumirParserVisitor
 from ..generated.KumirParser import KumirParser
 from .scope_manager import ScopeManager # Исправленный импорт ScopeManager
-from ..kumir_datatypes import KumirValue, KumirType, KumirTableVar # Добавлено
+from ..kumir_datatypes import KumirValue, KumirType, KumirTableVar, KUMIR_TRUE, KUMIR_FALSE, TYPE_TAGS, TAG_OTHER, TAG_COUNT # Добавлено
 from ..kumir_exceptions import KumirEvalError, KumirTypeError, KumirNameError, KumirRuntimeError, KumirNotImplementedError, KumirArgumentError, KumirSyntaxError, KumirIndexError # Добавлены KumirRuntimeError, KumirNotImplementedError, KumirArgumentError, KumirSyntaxError, КумирIndexError
 import operator # Добавлено для реляционных операций
 from ..generated.KumirLexer import KumirLexer # Добавлено для констант токенов
+from .operator_dispatch import BINARY_OPERATIONS, UNARY_OPERATIONS, binary_type_error
 
-# Словарь операций сравнения для реляционных выражений
-COMPARISON_OPS = {
-    KumirLexer.EQ: operator.eq,
-    KumirLexer.NE: operator.ne,
-    KumirLexer.LT: operator.lt,
-    KumirLexer.GT: operator.gt,
-    KumirLexer.LE: operator.le,
-    KumirLexer.GE: operator.ge,
+# Допустимые типы операнда унарных операций (для сообщения об ошибке при промахе таблицы)
+_UNARY_OPERAND_TYPES = {
+    KumirLexer.MINUS: ([KumirType.INT, KumirType.REAL], "унарный минус"),
+    KumirLexer.PLUS: ([KumirType.INT, KumirType.REAL], "унарный плюс"),
+    KumirLexer.NOT: ([KumirType.BOOL], "логическое НЕ"),
 }
 
 # Словарь логических операций
@@ -42,6 +40,8 @@ class ExpressionEvaluator(KumirParserVisitor):
         self.main_visitor = main_visitor # Сохраняем main_visitor
         self.scope_manager = scope_manager
         self.procedure_manager = procedure_manager
+        # Разобранные узлы выражений: цепочки операторов, унарные и степенные формы
+        self._expression_forms: Dict[ParserRuleContext, tuple] = {}
 
     @staticmethod
     def _position_from_token(token: Token) -> Tuple[int, int]:
@@ -134,9 +134,9 @@ class ExpressionEvaluator(KumirParserVisitor):
             # Удаляем апострофы в начале и в конце для символьного литерала
             return KumirValue(value=text[1:-1], kumir_type=KumirType.CHAR.value)
         elif ctx.TRUE():
-            return KumirValue(value=True, kumir_type=KumirType.BOOL.value)
+            return KUMIR_TRUE
         elif ctx.FALSE():
-            return KumirValue(value=False, kumir_type=KumirType.BOOL.value)
+            return KUMIR_FALSE
         elif ctx.NEWLINE_CONST(): # константа нс
             # self.main_visitor.error_stream_out(f"DEBUG: ExpressionEvaluator.visitLiteral NEWLINE_CONST detected. Type: {type(ctx.NEWLINE_CONST())}, Text: {ctx.NEWLINE_CONST().getText()}\\n")
             return KumirValue("\n", KumirType.STR.value) # Настоящий символ перевода строки как строка
@@ -225,377 +225,121 @@ class ExpressionEvaluator(KumirParserVisitor):
     # UnaryMinusExpression -> UnaryExpression с правильной логикой
     def visitUnaryExpression(self, ctx: KumirParser.UnaryExpressionContext) -> KumirValue:
         """Обрабатывает унарные выражения: +expr, -expr, !expr или просто postfixExpression"""
-        
-        # Проверяем, есть ли унарный оператор
-        if ctx.MINUS():
-            op_token = ctx.MINUS().getSymbol()
-            operand_val = self.visit(ctx.unaryExpression())
-            self._check_operand_type(operand_val, [KumirType.INT, KumirType.REAL], "унарный минус", op_token)
-            if operand_val.kumir_type == KumirType.INT.value:
-                return KumirValue(value=-operand_val.value, kumir_type=KumirType.INT.value)
-            elif operand_val.kumir_type == KumirType.REAL.value:
-                return KumirValue(value=-operand_val.value, kumir_type=KumirType.REAL.value)
-        elif ctx.PLUS():
-            op_token = ctx.PLUS().getSymbol()
-            operand_val = self.visit(ctx.unaryExpression())
-            self._check_operand_type(operand_val, [KumirType.INT, KumirType.REAL], "унарный плюс", op_token)
-            return operand_val
-        elif ctx.NOT():
-            op_token = ctx.NOT().getSymbol()
-            operand_val = self.visit(ctx.unaryExpression())
-            self._check_operand_type(operand_val, [KumirType.BOOL], "логическое НЕ", op_token)
-            return KumirValue(value=not operand_val.value, kumir_type=KumirType.BOOL.value)
-        elif ctx.postfixExpression():
+        form = self._expression_forms.get(ctx)
+        if form is None:
+            form = self._expression_forms[ctx] = self._unary_form(ctx)
+        op_token, operand_ctx = form
+        if op_token is None:
             # Простое postfixExpression без унарного оператора
-            return self.visit(ctx.postfixExpression())
-        else:
-            # Не должно происходить, если грамматика корректна
-            pos = self._position_from_token(self._get_token_for_position(ctx))
-            raise KumirRuntimeError("Неизвестный тип унарного выражения", line_index=pos[0], column_index=pos[1])
-            
-        # На всякий случай возвращаем что-то, хотя до сюда не должны дойти
-        return KumirValue(value=0, kumir_type=KumirType.INT.value)
-
+            return self.visit(operand_ctx)
+        operand_val = self.visit(operand_ctx)
+        operation = UNARY_OPERATIONS[op_token.type][TYPE_TAGS.get(operand_val.kumir_type, TAG_OTHER)]
+        if operation is None:
+            expected_types, operation_name = _UNARY_OPERAND_TYPES[op_token.type]
+            self._check_operand_type(operand_val, expected_types, operation_name, op_token)
+        return KumirValue(operation.apply(operand_val.value), operation.result_type)
+
+    def _unary_form(self, ctx: KumirParser.UnaryExpressionContext) -> Tuple[Any, ParserRuleContext]:
+        """(токен унарного оператора или None, операнд) - разбирается один раз для узла."""
+        for operator_node in (ctx.MINUS(), ctx.PLUS(), ctx.NOT()):
+            if operator_node is not None:
+                return operator_node.getSymbol(), ctx.unaryExpression()
+        if ctx.postfixExpression():
+            return None, ctx.postfixExpression()
+        # Не должно происходить, если грамматика корректна
+        pos = self._position_from_token(self._get_token_for_position(ctx))
+        raise KumirRuntimeError("Неизвестный тип унарного выражения", line_index=pos[0], column_index=pos[1])
 
+    def _operator_chain(self, ctx: ParserRuleContext, operands: Callable[[], List[ParserRuleContext]]) -> Tuple[Any, tuple]:
+        """
+        Цепочка бинарных операций узла: первый операнд и (тип оператора, токен,
+        операнд) для остальных. Разбирается один раз для узла: дочерние узлы и
+        токены операторов не ищутся при каждом вычислении.
+        """
+        chain = self._expression_forms.get(ctx)
+        if chain is None:
+            operand_ctxs = operands()
+            rest = []
+            for i in range(1, len(operand_ctxs)):
+                op_token = ctx.getChild(2*i - 1).symbol  # Операторы находятся между выражениями
+                rest.append((op_token.type, op_token, operand_ctxs[i]))
+            chain = self._expression_forms[ctx] = (operand_ctxs[0], tuple(rest))
+        return chain
+
+    def _binary_operation(self, op_type: int, op_token: Token, left: KumirValue, right: KumirValue) -> KumirValue:
+        """Бинарная операция по таблице (оператор, метка левого типа, метка правого типа)."""
+        operation = BINARY_OPERATIONS[op_type][TYPE_TAGS.get(left.kumir_type, TAG_OTHER) * TAG_COUNT
+                                               + TYPE_TAGS.get(right.kumir_type, TAG_OTHER)]
+        if operation is None:
+            raise binary_type_error(op_type, left, right, op_token)
+        try:
+            return KumirValue(operation.apply(left.value, right.value), operation.result_type)
+        except ZeroDivisionError:
+            if op_type != KumirLexer.DIV:
+                raise
+            raise KumirEvalError("Деление на ноль.", line_index=op_token.line, column_index=op_token.column)
+
+    def _logical_chain(self, ctx: ParserRuleContext, operands: Callable[[], List[ParserRuleContext]]) -> KumirValue:
+        """Цепочка И/ИЛИ слева направо (вычисляются все операнды)."""
+        first, rest = self._operator_chain(ctx, operands)
+        result = self.visit(first)
+        for op_type, op_token, operand_ctx in rest:
+            right = self.visit(operand_ctx)
+            op_func = LOGICAL_OPS.get(op_type)
+            if op_func is None:
+                # Этого не должно произойти, если грамматика верна
+                raise KumirRuntimeError(f"Неизвестный логический оператор: {op_token.text}", 
+                                      line_index=op_token.line, column_index=op_token.column)
+            # Приводим операнды к boolean
+            result = KUMIR_TRUE if op_func(bool(result.value), bool(right.value)) else KUMIR_FALSE
+        return result
 
+    def _binary_chain(self, ctx: ParserRuleContext, operands: Callable[[], List[ParserRuleContext]]) -> KumirValue:
+        """Цепочка арифметических операций или сравнений слева направо."""
+        first, rest = self._operator_chain(ctx, operands)
+        result = self.visit(first)
+        for op_type, op_token, operand_ctx in rest:
+            result = self._binary_operation(op_type, op_token, result, self.visit(operand_ctx))
+        return result
 
     def visitLogicalOrExpression(self, ctx: KumirParser.LogicalOrExpressionContext) -> KumirValue:
         """Обрабатывает логическое ИЛИ выражение"""
-        # Проверяем, есть ли логическая операция ИЛИ
-        logical_and_expressions = ctx.logicalAndExpression()
-        
-        if len(logical_and_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(logical_and_expressions[0])
-        
-        # Есть операции ИЛИ: вычисляем слева направо
-        result = self.visit(logical_and_expressions[0])
-        
-        for i in range(1, len(logical_and_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(logical_and_expressions[i])
-            
-            # Получаем тип токена для логической операции
-            if hasattr(op_token, 'symbol'):
-                op_token_type = op_token.symbol.type
-            else:
-                op_token_type = op_token.type
-            
-            # Приводим операнды к boolean
-            left_val = bool(result.value)
-            right_val = bool(right.value)
-            
-            # Используем LOGICAL_OPS
-            op_func = LOGICAL_OPS.get(op_token_type)
-            if op_func:
-                bool_result = op_func(left_val, right_val)
-                result = KumirValue(value=bool_result, kumir_type=KumirType.BOOL.value)
-            else:
-                # Этого не должно произойти, если грамматика верна
-                op_text = op_token.getText()
-                pos = self._position_from_token(op_token.symbol if hasattr(op_token, 'symbol') else ctx.start)
-                raise KumirRuntimeError(f"Неизвестный логический оператор: {op_text}", 
-                                      line_index=pos[0], column_index=pos[1])
-        
-        return result
+        return self._logical_chain(ctx, ctx.logicalAndExpression)
 
     def visitLogicalAndExpression(self, ctx: KumirParser.LogicalAndExpressionContext) -> KumirValue:
         """Обрабатывает логическое И выражение"""
-        # Проверяем, есть ли логическая операция И
-        equality_expressions = ctx.equalityExpression()
-        
-        if len(equality_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(equality_expressions[0])
-        
-        # Есть операции И: вычисляем слева направо
-        result = self.visit(equality_expressions[0])
-        
-        for i in range(1, len(equality_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(equality_expressions[i])
-            
-            # Получаем тип токена для логической операции
-            if hasattr(op_token, 'symbol'):
-                op_token_type = op_token.symbol.type
-            else:
-                op_token_type = op_token.type
-            
-            # Приводим операнды к boolean
-            left_val = bool(result.value)
-            right_val = bool(right.value)
-            
-            # Используем LOGICAL_OPS
-            op_func = LOGICAL_OPS.get(op_token_type)
-            if op_func:
-                bool_result = op_func(left_val, right_val)
-                result = KumirValue(value=bool_result, kumir_type=KumirType.BOOL.value)
-            else:
-                # Этого не должно произойти, если грамматика верна
-                op_text = op_token.getText()
-                pos = self._position_from_token(op_token.symbol if hasattr(op_token, 'symbol') else ctx.start)
-                raise KumirRuntimeError(f"Неизвестный логический оператор: {op_text}", 
-                                      line_index=pos[0], column_index=pos[1])
-        
-        return result
+        return self._logical_chain(ctx, ctx.equalityExpression)
 
     def visitEqualityExpression(self, ctx: KumirParser.EqualityExpressionContext) -> KumirValue:
         """Обрабатывает выражения равенства"""
-        
-        # Проверяем, есть ли бинарная операция равенства
-        relational_expressions = ctx.relationalExpression()
-        
-        if len(relational_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(relational_expressions[0])
-          # Есть операции равенства: вычисляем слева направо
-        result = self.visit(relational_expressions[0])
-        
-        for i in range(1, len(relational_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(relational_expressions[i])
-            
-            op_text = op_token.getText()
-            
-            # Получаем тип токена для операции равенства
-            if hasattr(op_token, 'symbol'):
-                op_token_type = op_token.symbol.type
-            else:
-                op_token_type = op_token.type
-            
-            # Приводим типы для сравнения (берем значения из KumirValue)
-            left_val = result.value
-            right_val = right.value
-              # Простое приведение типов для сравнения
-            if isinstance(left_val, int) and isinstance(right_val, float):
-                left_val = float(left_val)
-            elif isinstance(left_val, float) and isinstance(right_val, int):
-                right_val = float(right_val)
-            
-            # Используем COMPARISON_OPS (который содержит и операции равенства)
-            op_func = COMPARISON_OPS.get(op_token_type)
-            if op_func:
-                bool_result = op_func(left_val, right_val)
-                result = KumirValue(value=bool_result, kumir_type=KumirType.BOOL.value)
-            else:
-                # Этого не должно произойти, если грамматика верна
-                # Для TerminalNodeImpl используем .symbol для получения токена
-                pos = self._position_from_token(op_token.symbol if hasattr(op_token, 'symbol') else ctx.start)
-                raise KumirRuntimeError(f"Неизвестный оператор равенства: {op_text}", 
-                                      line_index=pos[0], column_index=pos[1])
-        
-        return result
+        return self._binary_chain(ctx, ctx.relationalExpression)
 
     def visitRelationalExpression(self, ctx: KumirParser.RelationalExpressionContext) -> KumirValue:
         """Обрабатывает реляционные выражения"""
-        
-        # Проверяем, есть ли бинарная операция сравнения
-        additive_expressions = ctx.additiveExpression()
-        
-        if len(additive_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(additive_expressions[0])
-          # Есть операции сравнения: вычисляем слева направо
-        result = self.visit(additive_expressions[0])
-        
-        for i in range(1, len(additive_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(additive_expressions[i])
-            
-            # result и right гарантированно KumirValue согласно типизации
-            # Проверка не нужна - если типы неправильные, будет ошибка времени выполнения
+        return self._binary_chain(ctx, ctx.additiveExpression)
 
-            op_text = op_token.getText()
-            
-            # Получаем тип токена для операции сравнения
-            if hasattr(op_token, 'symbol'):
-                op_token_type = op_token.symbol.type
-            else:
-                op_token_type = op_token.type
-            
-            # Приводим типы для сравнения (берем значения из KumirValue)
-            left_val = result.value
-            right_val = right.value
-            
-            # Простое приведение типов для сравнения
-            if isinstance(left_val, int) and isinstance(right_val, float):
-                left_val = float(left_val)
-            elif isinstance(left_val, float) and isinstance(right_val, int):
-                right_val = float(right_val)
-            
-            # Используем COMPARISON_OPS
-            op_func = COMPARISON_OPS.get(op_token_type)
-            if op_func:
-                bool_result = op_func(left_val, right_val)
-                result = KumirValue(value=bool_result, kumir_type=KumirType.BOOL.value)
-            else:
-                # Этого не должно произойти, если грамматика верна
-                # Для TerminalNodeImpl используем .symbol для получения токена
-                pos = self._position_from_token(op_token.symbol if hasattr(op_token, 'symbol') else ctx.start)
-                raise KumirRuntimeError(f"Неизвестный оператор отношения: {op_text}", 
-                                      line_index=pos[0], column_index=pos[1])
-        
-        return result
     def visitAdditiveExpression(self, ctx: KumirParser.AdditiveExpressionContext) -> KumirValue:
         """Обрабатывает аддитивные выражения (например, expr + expr или expr - expr)"""
-
-        # Проверяем, есть ли бинарная операция (число элементов в контексте)
-        multiplicative_expressions = ctx.multiplicativeExpression()
-        
-        if len(multiplicative_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(multiplicative_expressions[0])
-          # Есть операции: вычисляем слева направо
-        result = self.visit(multiplicative_expressions[0])
-        
-        for i in range(1, len(multiplicative_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(multiplicative_expressions[i])
-            
-            # result и right гарантированно KumirValue согласно типизации
-            op_text = op_token.getText()
-            actual_token = self._get_token_from_node(op_token)
-            
-            if op_text == '+':
-                # Сложение: числа или строки (ЛИТ и СИМ)
-                if ((result.kumir_type == KumirType.STR.value or result.kumir_type == KumirType.CHAR.value) and 
-                    (right.kumir_type == KumirType.STR.value or right.kumir_type == KumirType.CHAR.value)):
-                    result = KumirValue(value=str(result.value) + str(right.value), kumir_type=KumirType.STR.value)
-                elif ((result.kumir_type == KumirType.INT.value or result.kumir_type == KumirType.REAL.value) and 
-                      (right.kumir_type == KumirType.INT.value or right.kumir_type == KumirType.REAL.value)):
-                    if result.kumir_type == KumirType.INT.value and right.kumir_type == KumirType.INT.value:
-                        result = KumirValue(value=result.value + right.value, kumir_type=KumirType.INT.value)
-                    else:
-                        result = KumirValue(value=float(result.value) + float(right.value), kumir_type=KumirType.REAL.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция сложения не применима к типам '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            elif op_text == '-':
-                # Вычитание: только числа
-                if ((result.kumir_type == KumirType.INT.value or result.kumir_type == KumirType.REAL.value) and 
-                    (right.kumir_type == KumirType.INT.value or right.kumir_type == KumirType.REAL.value)):
-                    if result.kumir_type == KumirType.INT.value and right.kumir_type == KumirType.INT.value:
-                        result = KumirValue(value=result.value - right.value, kumir_type=KumirType.INT.value)
-                    else:
-                        result = KumirValue(value=float(result.value) - float(right.value), kumir_type=KumirType.REAL.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция вычитания не применима к типам '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            else:
-                raise KumirEvalError(f"Неизвестный аддитивный оператор: {op_text}", 
-                                   line_index=actual_token.line, column_index=actual_token.column)
-        
-        return result
+        return self._binary_chain(ctx, ctx.multiplicativeExpression)
 
     def visitMultiplicativeExpression(self, ctx: KumirParser.MultiplicativeExpressionContext) -> KumirValue:
         """Обрабатывает мультипликативные выражения"""
-        
-        # Проверяем, есть ли бинарная операция
-        power_expressions = ctx.powerExpression()
-        
-        if len(power_expressions) == 1:
-            # Простой случай: нет операции, просто делегируем дальше
-            return self.visit(power_expressions[0])
-        
-        # Есть операции: вычисляем слева направо
-        result = self.visit(power_expressions[0])
-        
-        for i in range(1, len(power_expressions)):
-            op_token = ctx.getChild(2*i - 1)  # Операторы находятся между выражениями
-            right = self.visit(power_expressions[i])
-            
-            op_text = op_token.getText()
-            actual_token = self._get_token_from_node(op_token)
-            
-            if op_text == '*':
-                # Умножение: только числа
-                # Нормализуем типы для сравнения
-                result_type_normalized = result.kumir_type
-                right_type_normalized = right.kumir_type
-                
-                # Извлекаем базовые Python-значения из KumirValue объектов
-                result_value = result.value
-                if isinstance(result_value, KumirValue):
-                    result_value = result_value.value
-                
-                right_value = right.value
-                if isinstance(right_value, KumirValue):
-                    right_value = right_value.value
-                
-                if ((result_type_normalized == KumirType.INT.value or result_type_normalized == KumirType.REAL.value) and
-                    (right_type_normalized == KumirType.INT.value or right_type_normalized == KumirType.REAL.value)):
-                    if result_type_normalized == KumirType.INT.value and right_type_normalized == KumirType.INT.value:
-                        result = KumirValue(value=result_value * right_value, kumir_type=KumirType.INT.value)
-                    else:
-                        result = KumirValue(value=float(result_value) * float(right_value), kumir_type=KumirType.REAL.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция умножения не применима к типам '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            elif op_text == '/':
-                # Обычное деление
-                if ((result.kumir_type == KumirType.INT.value or result.kumir_type == KumirType.REAL.value) and
-                    (right.kumir_type == KumirType.INT.value or right.kumir_type == KumirType.REAL.value)):
-                    if float(right.value) == 0:
-                        raise KumirEvalError("Деление на ноль.", line_index=actual_token.line, column_index=actual_token.column)
-                    result = KumirValue(value=float(result.value) / float(right.value), kumir_type=KumirType.REAL.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция деления не применима к типам '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            elif op_text == 'div':
-                # Целочисленное деление
-                if (result.kumir_type == KumirType.INT.value and right.kumir_type == KumirType.INT.value):
-                    if right.value == 0:
-                        raise KumirEvalError("Деление на ноль (div).", line_index=actual_token.line, column_index=actual_token.column)
-                    result = KumirValue(value=result.value // right.value, kumir_type=KumirType.INT.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция div применима только к целым числам, получены типы '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            elif op_text == 'mod':
-                # Остаток от деления
-                if (result.kumir_type == KumirType.INT.value and right.kumir_type == KumirType.INT.value):
-                    if right.value == 0:
-                        raise KumirEvalError("Деление на ноль (mod).", line_index=actual_token.line, column_index=actual_token.column)
-                    result = KumirValue(value=result.value % right.value, kumir_type=KumirType.INT.value)
-                else:
-                    raise KumirTypeError(
-                        f"Операция mod применима только к целым числам, получены типы '{result.kumir_type}' и '{right.kumir_type}'.",
-                        line_index=actual_token.line, column_index=actual_token.column
-                    )
-            else:
-                raise KumirEvalError(f"Неизвестный мультипликативный оператор: {op_text}", 
-                                   line_index=actual_token.line, column_index=actual_token.column)
-        
-        return result
+        return self._binary_chain(ctx, ctx.powerExpression)
 
     # Метод для обработки степенных выражений
     def visitPowerExpression(self, ctx: KumirParser.PowerExpressionContext) -> KumirValue:
         # PowerExpression: unaryExpression (POWER powerExpression)?
-        unary_expr = self.visit(ctx.unaryExpression())
-        if ctx.POWER():
-            power_expr = self.visit(ctx.powerExpression())
-            # Реализуем возведение в степень (правоассоциативно)
-            base = unary_expr.value
-            exponent = power_expr.value
-            # Если оба int — результат int, иначе float
-            if unary_expr.kumir_type == KumirType.INT.value and power_expr.kumir_type == KumirType.INT.value:
-                result_value = int(base ** exponent)
-                result_type = KumirType.INT.value
-            else:
-                result_value = float(base) ** float(exponent)
-                result_type = KumirType.REAL.value
-            return KumirValue(result_value, result_type)
-        else:
+        form = self._expression_forms.get(ctx)
+        if form is None:
+            power_node = ctx.POWER()
+            form = self._expression_forms[ctx] = (ctx.unaryExpression(), power_node.getSymbol() if power_node else None,
+                                                  ctx.powerExpression())
+        unary_ctx, op_token, power_ctx = form
+        unary_expr = self.visit(unary_ctx)
+        if op_token is None:
             return unary_expr
+        # Возведение в степень правоассоциативно: если оба int — результат int, иначе float
+        return self._binary_operation(KumirLexer.POWER, op_token, unary_expr, self.visit(power_ctx))
     
     # Метод для обработки постфиксных выражений
     def visitPostfixExpression(self, ctx: KumirParser.PostfixExpressionContext) -> KumirValue:
@@ -673,72 +417,15 @@ class ExpressionEvaluator(KumirParserVisitor):
                 if (primary_expr.kumir_type == KumirType.STR.value and 
                     isinstance(primary_expr.value, KumirTableVar)):
                     # Это строковый массив - обрабатываем как массив
-                    table_var = primary_expr.value
-                    try:
-                        element_value = table_var.get_value(tuple(indices), index_list_ctx)
-                        return element_value
-                    except Exception as e:
-                        pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
-                        raise KumirEvalError(
-                            f"Ошибка при доступе к элементу строкового массива: {e}",
-                            line_index=pos[0], column_index=pos[1]
-                        )
+                    return self.table_element(primary_expr.value, indices, index_list_ctx, "строкового массива")
                         
                 elif primary_expr.kumir_type == KumirType.STR.value:
                     # Доступ к символам обычной строки (не массива)
-                    string_value = primary_expr.value
-                    actual_string = string_value
-                    
-                    if len(indices) == 1:
-                        # Доступ к одному символу
-                        kumir_idx = indices[0]
-                        if kumir_idx < 1 or kumir_idx > len(actual_string):
-                            pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
-                            raise KumirIndexError(
-                                f"Индекс символа {kumir_idx} вне допустимого диапазона [1..{len(actual_string)}]",
-                                line_index=pos[0], column_index=pos[1]
-                            )
-                        py_idx = kumir_idx - 1  # КуМир 1-based -> Python 0-based
-                        char_value = actual_string[py_idx]
-                        return KumirValue(value=char_value, kumir_type=KumirType.CHAR.value)
-                        
-                    elif len(indices) == 2:
-                        # Срез строки
-                        k_idx1, k_idx2 = indices[0], indices[1]
-                        if k_idx1 < 1 or k_idx2 < k_idx1:
-                            pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
-                            raise KumirIndexError(
-                                f"Неверные границы среза. Начальный индекс ({k_idx1}) должен быть >= 1, конечный ({k_idx2}) >= начального",
-                                line_index=pos[0], column_index=pos[1]
-                            )
-                        
-                        py_start = k_idx1 - 1
-                        py_end = min(k_idx2, len(actual_string))
-                        if py_start >= len(actual_string):
-                            slice_value = ""
-                        else:
-                            slice_value = actual_string[py_start:py_end]
-                        return KumirValue(value=slice_value, kumir_type=KumirType.STR.value)
-                        
-                    else:
-                        pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
-                        raise KumirIndexError(
-                            f"Для строки ожидается 1 индекс (символ) или 2 индекса (срез). Получено {len(indices)}",
-                            line_index=pos[0], column_index=pos[1]
-                        )
+                    return self.string_element(primary_expr.value, indices, index_list_ctx)
                         
                 elif hasattr(primary_expr.value, 'get_value'):
                     # Это объект массива (KumirTableVar)
-                    table_var = primary_expr.value
-                    try:
-                        element_value = table_var.get_value(tuple(indices), index_list_ctx)
-                        return element_value
-                    except Exception as e:
-                        pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
-                        raise KumirEvalError(
-                            f"Ошибка при доступе к элементу массива: {e}",
-                            line_index=pos[0], column_index=pos[1]
-                        )
+                    return self.table_element(primary_expr.value, indices, index_list_ctx)
                         
                 else:
                     pos = self._position_from_token(self._get_token_for_position(ctx))
@@ -751,6 +438,58 @@ class ExpressionEvaluator(KumirParserVisitor):
                 i += 2
         
         return primary_expr
+    def string_element(self, actual_string: str, indices: List[int], index_list_ctx: ParserRuleContext) -> KumirValue:
+        """Символ (один индекс) или срез (два индекса) строки; ошибки - с позицией списка индексов."""
+        if len(indices) == 1:
+            # Доступ к одному символу
+            kumir_idx = indices[0]
+            if kumir_idx < 1 or kumir_idx > len(actual_string):
+                pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
+                raise KumirIndexError(
+                    f"Индекс символа {kumir_idx} вне допустимого диапазона [1..{len(actual_string)}]",
+                    line_index=pos[0], column_index=pos[1]
+                )
+            py_idx = kumir_idx - 1  # КуМир 1-based -> Python 0-based
+            char_value = actual_string[py_idx]
+            return KumirValue(value=char_value, kumir_type=KumirType.CHAR.value)
+            
+        elif len(indices) == 2:
+            # Срез строки
+            k_idx1, k_idx2 = indices[0], indices[1]
+            if k_idx1 < 1 or k_idx2 < k_idx1:
+                pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
+                raise KumirIndexError(
+                    f"Неверные границы среза. Начальный индекс ({k_idx1}) должен быть >= 1, конечный ({k_idx2}) >= начального",
+                    line_index=pos[0], column_index=pos[1]
+                )
+            
+            py_start = k_idx1 - 1
+            py_end = min(k_idx2, len(actual_string))
+            if py_start >= len(actual_string):
+                slice_value = ""
+            else:
+                slice_value = actual_string[py_start:py_end]
+            return KumirValue(value=slice_value, kumir_type=KumirType.STR.value)
+            
+        else:
+            pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
+            raise KumirIndexError(
+                f"Для строки ожидается 1 индекс (символ) или 2 индекса (срез). Получено {len(indices)}",
+                line_index=pos[0], column_index=pos[1]
+            )
+
+    def table_element(self, table_var: KumirTableVar, indices: List[int], index_list_ctx: ParserRuleContext,
+                      what: str = "массива") -> KumirValue:
+        """Элемент таблицы; ошибка доступа оборачивается в KumirEvalError с позицией списка индексов."""
+        try:
+            return table_var.get_value(tuple(indices), index_list_ctx)
+        except Exception as e:
+            pos = self._position_from_token(self._get_token_for_position(index_list_ctx))
+            raise KumirEvalError(
+                f"Ошибка при доступе к элементу {what}: {e}",
+                line_index=pos[0], column_index=pos[1]
+            )
+
       # Метод для обработки первичных выражений
     def visitPrimaryExpression(self, ctx: KumirParser.PrimaryExpressionContext) -> KumirValue:
         # PrimaryExpression может быть literal, identifier, parenthesizedExpr и т.д.
@@ -805,13 +544,13 @@ class ExpressionEvaluator(KumirParserVisitor):
                 # Это процедура - возвращаем имя для обработки в postfixExpression
                 return KumirValue(var_name, KumirType.STR.value)
           # Ищем переменную в scope_manager (возвращает кортеж (var_info, scope))
-        var_info, _scope = self.scope_manager.find_variable(var_name)
+        var_info = self.scope_manager.resolve_variable(var_name, ctx)
         if var_info is None:
             pos = self._position_from_token(ctx.ID().symbol)
             raise KumirNameError(f"Переменная '{var_name}' не объявлена.", line_index=pos[0], column_index=pos[1])
-          # var_info это словарь с ключами 'value', 'kumir_type', etc.
-        value = var_info['value']
-        kumir_type = var_info['kumir_type']
+        # var_info - запись VariableRecord (value, kumir_type, ...)
+        value = var_info.value
+        kumir_type = var_info.kumir_type
         
         # Для массивов (таблиц) возвращаем специальный KumirValue, содержащий KumirTableVar
         if hasattr(value, 'get_value') and hasattr(value, 'set_value'):  # Это KumirTableVar
@@ -969,14 +708,15 @@ class ExpressionEvaluator(KumirParserVisitor):
                     
                     # Оборачиваем результат в KumirValue, если нужно
                     if not isinstance(result, KumirValue):
-                        if isinstance(result, int):
+                        # bool - подкласс int, поэтому проверяется первым (условия Робота)
+                        if isinstance(result, bool):
+                            result = KumirValue(result, KumirType.BOOL.value)
+                        elif isinstance(result, int):
                             result = KumirValue(result, KumirType.INT.value)
                         elif isinstance(result, float):
                             result = KumirValue(result, KumirType.REAL.value)
                         elif isinstance(result, str):
                             result = KumirValue(result, KumirType.STR.value)
-                        elif isinstance(result, bool):
-                            result = KumirValue(result, KumirType.BOOL.value)
                         else:
                             result = KumirValue(result, "unknown")
                     
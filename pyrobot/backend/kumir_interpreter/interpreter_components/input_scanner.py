@@ -0,0 +1,153 @@
+# input_scanner.py
+"""
+Сканер ввода для оператора "ввод" и файлов.
+
+Источник строк задаётся двумя функциями:
+    read_lines() - все уже доступные строки сразу (буфер ввода консоли,
+                   очередной блок файла); пустой список - буфер исчерпан;
+    read_line()  - одна строка, возможно с ожиданием пользователя
+                   (запрос ввода); вызывается, только когда буфер пуст.
+Строки из read_lines() забираются в очередь одним вызовом, дальше значения
+берутся из очереди без обращения к источнику.
+
+Числа, логические значения и символы - лексемы, разделённые пробелами и
+переводами строк (как в КуМире: "ввод a, b" читает "3 4" из одной строки).
+Литерал - остаток текущей строки, а если он пуст - следующая строка целиком.
+Для каждого типа есть своя функция чтения (read_int, read_real, ...);
+read(тип) выбирает её по типу переменной. Ошибка формата - ValueError;
+прочитанный текст остаётся в last_text (для эха и сообщений об ошибках).
+"""
+
+import re
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+from ..kumir_datatypes import KumirType
+
+_TRUE_WORDS = frozenset({"истина", "true", "1"})
+_FALSE_WORDS = frozenset({"ложь", "false", "0"})
+
+
+class InputScanner:
+    """Лексемы и строки ввода с типизированным чтением значений."""
+
+    def __init__(self, read_line: Optional[Callable[[], str]] = None,
+                 read_lines: Optional[Callable[[], List[str]]] = None):
+        self._read_line = read_line
+        self._read_lines = read_lines
+        self._lines: Deque[str] = deque()
+        self._line = ''
+        self._tokens: List[str] = []  # Лексемы текущей строки
+        self._index = 0  # Сколько из них уже прочитано
+        self.last_text = ''
+        self._readers = {
+            KumirType.INT.value: self.read_int,
+            KumirType.REAL.value: self.read_real,
+            KumirType.BOOL.value: self.read_bool,
+            KumirType.CHAR.value: self.read_char,
+            KumirType.STR.value: self.read_str,
+        }
+
+    def _next_line(self, buffered_only: bool = False) -> Optional[str]:
+        """Следующая строка: из очереди, из буфера источника или (если не buffered_only) от read_line."""
+        lines = self._lines
+        if not lines and self._read_lines is not None:
+            lines.extend(self._read_lines())
+        if lines:
+            return lines.popleft()
+        if buffered_only:
+            return None
+        if self._read_line is None:
+            raise ValueError("Неожиданный конец ввода.")
+        return self._read_line()
+
+    def _start_line(self, line: str) -> None:
+        self._line = line
+        self._tokens = line.split()
+        self._index = 0
+
+    def token(self) -> str:
+        """
+        Следующая лексема. Пустые строки буфера пропускаются; пустая строка,
+        полученная от read_line, даёт пустую лексему (ошибку формата у чисел),
+        а не новый запрос ввода.
+        """
+        index = self._index
+        tokens = self._tokens
+        while index >= len(tokens):
+            line = self._next_line(buffered_only=True)
+            if line is None:
+                line = self._next_line()
+                if not line.strip():
+                    self._start_line('')
+                    self.last_text = ''
+                    return ''
+            self._start_line(line)
+            index, tokens = 0, self._tokens
+        self._index = index + 1
+        self.last_text = text = tokens[index]
+        return text
+
+    def read_text(self) -> str:
+        """Остаток текущей строки без ведущих пробелов, а если он пуст - следующая строка."""
+        if self._index < len(self._tokens):
+            # Строка начата (или заглянули в неё в has_more): пропускаем прочитанные лексемы
+            rest = self._line
+            if self._index:
+                rest = rest[re.match(r'(?:\s*\S+){%d}\s*' % self._index, rest).end():]
+            self._start_line('')
+            self.last_text = rest
+            return rest
+        line = self._next_line()
+        self._start_line('')
+        self.last_text = line
+        return line
+
+    def has_more(self) -> bool:
+        """Есть ли в уже прочитанном буфере ещё хотя бы одна лексема (без запроса ввода)."""
+        while self._index >= len(self._tokens):
+            line = self._next_line(buffered_only=True)
+            if line is None:
+                return False
+            self._start_line(line)
+        return True
+
+    # --- Чтение значений по типам ---
+
+    def read_int(self) -> int:
+        text = self.token()
+        if text[:1] == '$':
+            return int(text[1:], 16)
+        return int(text)
+
+    def read_real(self) -> float:
+        return float(self.token().replace(',', '.'))
+
+    def read_bool(self) -> bool:
+        lowered = self.token().lower()
+        if lowered in _TRUE_WORDS:
+            return True
+        if lowered in _FALSE_WORDS:
+            return False
+        raise ValueError("Для лог типа ожидалось 'истина' или 'ложь'.")
+
+    def read_char(self) -> str:
+        text = self.token()
+        if len(text) != 1:
+            raise ValueError("Для лит типа ожидался один символ.")
+        return text
+
+    def read_str(self) -> str:
+        return self.read_text()
+
+    def reader(self, target_type: Any) -> Callable[[], Any]:
+        """Функция чтения значения типа target_type (KumirType или его строковое значение)."""
+        type_name = getattr(target_type, 'value', target_type)
+        reader = self._readers.get(type_name)
+        if reader is None:
+            raise TypeError(f"Ввод для переменной типа {type_name} не поддерживается.")
+        return reader
+
+    def read(self, target_type: Any) -> Any:
+        """Значение типа target_type (значение Python: int, float, bool, str)."""
+        return self.reader(target_type)()
@@ -1,42 +1,79 @@
 # Functions for handling input and output operations
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+from .input_scanner import InputScanner
 
 class IOHandler:
-    def __init__(self, kumir_exceptions_module, visitor = None, input_stream: Optional[Callable[[], str]] = None, output_stream: Optional[Callable[[str], None]] = None, error_stream: Optional[Callable[[str], None]] = None):
+    def __init__(self, kumir_exceptions_module, visitor = None, input_stream: Optional[Callable[[], str]] = None, output_stream: Optional[Callable[[str], None]] = None, error_stream: Optional[Callable[[str], None]] = None,
+                 input_lines: Optional[Callable[[], List[str]]] = None):
         self.kumir_exceptions = kumir_exceptions_module
         self.visitor = visitor
         self.input_stream = input_stream
         self.output_stream = output_stream
         self.error_stream = error_stream # Добавляем error_stream
-        # TODO: Implement input/output methods (ввод, вывод)
+        # Сканер ввода: input_lines() отдаёт весь уже известный ввод сразу,
+        # input_stream() - следующую строку (когда буфер исчерпан)
+        self.scanner = InputScanner(read_line=input_stream or self._read_console_line, read_lines=input_lines)
+        # Что сейчас вводится: (имя переменной, тип); pending_request строится по запросу
+        self._pending = (None, None)
+
+    @property
+    def pending_request(self) -> Dict[str, str]:
+        """Что сейчас вводится: {'var_name', 'target_type'} (для запроса ввода у пользователя)."""
+        var_name, target_type = self._pending
+        target_type = getattr(target_type, 'value', target_type)
+        return {
+            'var_name': var_name or 'unknown',
+            'target_type': target_type.lower() if isinstance(target_type, str) else 'лит',
+        }
+
+    @property
+    def last_input(self) -> str:
+        """Текст последнего прочитанного значения (для эха и сообщений об ошибках)."""
+        return self.scanner.last_text
 
-    def get_input_line(self, prompt: str) -> str:
+    def get_input_line(self, prompt: str, var_name: Optional[str] = None, target_type=None) -> str:
         # Сначала выводим подсказку, если она есть и есть куда выводить
         if prompt and self.output_stream:
-            self.output_stream(prompt)
-        
-        if self.input_stream:
-            input_value = self.input_stream()
-            return input_value
-        else:
-            # Если input_stream не предоставлен, можно либо вызвать исключение,
-            # либо вернуть какое-то значение по умолчанию, либо запросить ввод через stdin.
-            # Для тестов и CLI это может быть input().
-            try:
-                input_value = input(prompt if not self.output_stream else "") # Если prompt уже вывели, не дублируем
-                return input_value
-            except EOFError:
-                # В случае EOF (например, если ввод перенаправлен из пустого файла)
-                # можно вернуть пустую строку или вызвать специфическое исключение КуМира.
-                # Пока вернем пустую строку, как это часто делают REPL.
-                return ""
-            except RuntimeError as e:
-                # Это может случиться, если stdin не доступен (например, в некоторых средах без консоли)
-                # TODO: Решить, какое исключение КуМир должно быть здесь. InputOutputError?
-                raise self.kumir_exceptions.InputOutputError(
-                    f"Ошибка при попытке чтения ввода: {e}",
-                    # line_index, column_index, line_content можно будет получить из visitor, если нужно
-                )
+            self.write_output(prompt)
+        self._pending = (var_name, target_type)
+        return self.scanner.read_text()
+
+    def read_value(self, var_name: str, target_type) -> Any:
+        """
+        Значение для "ввод" в переменную типа target_type (цел, вещ, лог, сим, лит)
+        как значение Python. Ошибка формата - ValueError, текст - в last_input.
+        """
+        return self.value_reader(var_name, target_type)()
+
+    def value_reader(self, var_name: str, target_type) -> Callable[[], Any]:
+        """read_value с заранее выбранной функцией чтения (для многократного ввода в одну переменную)."""
+        try:
+            reader = self.scanner.reader(target_type)
+        except TypeError as e:
+            raise self.kumir_exceptions.KumirTypeError(str(e))
+        pending = (var_name, target_type)
+
+        def read():
+            self._pending = pending
+            return reader()
+        return read
+
+    def _read_console_line(self) -> str:
+        # input_stream не предоставлен: для тестов и CLI читаем stdin через input()
+        try:
+            return input()
+        except EOFError:
+            # В случае EOF (например, если ввод перенаправлен из пустого файла)
+            # вернем пустую строку, как это часто делают REPL.
+            return ""
+        except RuntimeError as e:
+            # Это может случиться, если stdin не доступен (например, в некоторых средах без консоли)
+            # TODO: Решить, какое исключение КуМир должно быть здесь. InputOutputError?
+            raise self.kumir_exceptions.InputOutputError(
+                f"Ошибка при попытке чтения ввода: {e}",
+                # line_index, column_index, line_content можно будет получить из visitor, если нужно
+            )
 
     def write_output(self, text: str) -> None:
         """Записывает текст в выходной поток."""
@@ -53,6 +90,15 @@ class IOHandler:
                 # Дополнительные параметры ошибки можно передать при необходимости
             )
 
+    def observe(self, on_output: Callable[[str], None]) -> None:
+        """Сообщает on_output о каждом фрагменте вывода (событие output, см. execution_observer)."""
+        write_output = self.write_output
+
+        def observed_write_output(text: str) -> None:
+            write_output(text)
+            on_output(text)
+        self.write_output = observed_write_output
+
     def show_message(self, message: str) -> None:
         """Отображает сообщение пользователю (например, для команды ПАУЗА)."""
         # Пока что просто выводим в output_stream или stdout
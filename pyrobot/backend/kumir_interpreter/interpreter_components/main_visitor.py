@@ -13,9 +13,10 @@ from ..kumir_exceptions import KumirRuntimeError, KumirSyntaxError, ExitSignal,
 from ..kumir_datatypes import KumirReturnValue, KumirValue, KumirType 
 from ..definitions import AlgorithmManager  # Импорт наших новых классов
 from ..utils import KumirTypeConverter  # Импорт type converter
+from ..execution_limits import ExecutionBudget
 
 # Импорты компонентов интерпретатора из __init__.py текущего пакета
-from .scope_manager import ScopeManager
+from .scope_manager import ScopeManager, VariableRecord
 from .procedure_manager import ProcedureManager
 from .expression_evaluator import ExpressionEvaluator
 from .declaration_visitors import DeclarationVisitorMixin
@@ -68,7 +69,8 @@ class KumirInterpreterVisitor(DeclarationVisitorMixin, StatementHandlerMixin, St
                  program_lines: Optional[List[str]] = None,
                  global_vars: Optional[Dict[str, Any]] = None,
                  precision: int = DEFAULT_PRECISION,
-                 echo_input: bool = True):
+                 echo_input: bool = True,
+                 input_lines: Optional[Callable[[], List[str]]] = None):
         super().__init__() 
         
         # Настраиваем logger
@@ -98,9 +100,12 @@ class KumirInterpreterVisitor(DeclarationVisitorMixin, StatementHandlerMixin, St
             visitor=None, # Visitor будет установлен позже
             input_stream=input_stream, 
             output_stream=output_stream,
-            error_stream=error_stream # error_stream уже есть в конструкторе KumirInterpreterVisitor
+            error_stream=error_stream, # error_stream уже есть в конструкторе KumirInterpreterVisitor
+            input_lines=input_lines # Весь уже известный ввод одним вызовом (для сканера ввода)
         )
         self.io_handler.set_visitor(self) # Устанавливаем visitor в IOHandler
+        # Разобранные аргументы операторов ввода: узел ioArgument -> цель ввода (см. _input_target)
+        self._input_targets: Dict[Any, tuple] = {}
 
         self.builtin_function_handler = BuiltinFunctionHandler(self) # Предполагаем наличие
         self.builtin_procedure_handler = BuiltinProcedureHandler(self) # Предполагаем наличие
@@ -131,9 +136,16 @@ class KumirInterpreterVisitor(DeclarationVisitorMixin, StatementHandlerMixin, St
         self.robot_command_handler = None
         self.progress_callback = None
 
+        # Бюджет выполнения (шаги, время, отмена); по умолчанию без ограничений
+        self.execution_budget = ExecutionBudget()
+        # События выполнения для наблюдателей (execution_observer.ObserverDispatcher.attach)
+        self.events = None
+
         if global_vars:
             for name, value_info in global_vars.items():
-                self.scope_manager.scopes[0][name.lower()] = {'value': value_info, 'type': 'глоб_неизв', 'is_table': False, 'dimensions': None, 'initialized': True}
+                self.scope_manager.scopes[0][name.lower()] = VariableRecord(
+                    name_original=name, kumir_type=None, value=value_info, is_table=False,
+                    initialized=True, line_declared=None, col_declared=None)
 
     def validate_and_convert_value_for_assignment(self, value: Any, target_kumir_type: str, var_name: str, is_target_table: bool, element_type: Optional[str] = None) -> Any:
         # TODO: Implement actual validation and conversion logic based on the original interpreter.
@@ -302,7 +314,7 @@ class KumirInterpreterVisitor(DeclarationVisitorMixin, StatementHandlerMixin, St
         self.return_value = None # Сбрасываем предыдущее значение
 
         # Создаем новую область видимости для параметров и локальных переменных алгоритма
-        self.scope_manager.enter_scope() 
+        self.scope_manager.enter_scope(self.scope_manager.algorithm_layout(proc_info))
         
         try:
             # Логика подготовки параметров и 'знач' (если функция) теперь в DeclarationVisitorMixin.visitAlgorithmDefinition
@@ -715,7 +727,7 @@ class KumirInterpreterVisitor(DeclarationVisitorMixin, StatementHandlerMixin, St
         if self.stop_execution_flag:            return None 
         return super().visit(tree)
     
-    def _call_user_function(self, func_name: str, args: List[Any], ctx: ParserRuleContext) -> 'KumirValue':
+    def call_user_function(self, func_name: str, args: List[Any], ctx: ParserRuleContext) -> 'KumirValue':
         """Вызывает пользовательскую функцию с заданными аргументами через procedure_manager"""
         from ..kumir_datatypes import KumirValue
         
@@ -0,0 +1,132 @@
+# operator_dispatch.py
+"""
+Таблицы диспетчеризации операций над значениями КуМира.
+
+Тип значения (KumirValue.kumir_type) сводится к малой целой метке
+(kumir_datatypes.TYPE_TAGS), а реализация бинарной операции берётся из
+таблицы по типу токена оператора и номеру пары меток
+(левая * TAG_COUNT + правая). Элемент таблицы (Operation) - функция над
+значениями Python и тип результата; None означает, что операция к этим
+типам неприменима. Таблицы строятся один раз при импорте, ошибки
+создаются только при промахе (binary_type_error).
+
+Правила повторяют прежние проверки ExpressionEvaluator:
+    +        числа (цел + цел -> цел, иначе вещ) и строки/символы (-> лит);
+    -, *     числа;
+    /        числа, результат вещ;
+    **       цел ** цел -> цел, остальное через float -> вещ;
+    сравнения - любые типы; цел с вещ сравниваются как вещ.
+"""
+
+import operator
+from typing import Any, Callable, Dict, List, Optional
+
+from ..generated.KumirLexer import KumirLexer
+from ..kumir_datatypes import (
+    KumirValue, TAG_BOOL, TAG_CHAR, TAG_COUNT, TAG_INT, TAG_REAL, TAG_STR, TAG_TYPES,
+)
+from ..kumir_exceptions import KumirTypeError
+
+_NUMERIC = (TAG_INT, TAG_REAL)
+_NUMERIC_PAIRS = tuple((left, right) for left in _NUMERIC for right in _NUMERIC)
+_TEXT = (TAG_STR, TAG_CHAR)
+_ALL_TAGS = range(TAG_COUNT)
+
+
+class Operation:
+    """Реализация операции для пары типов: apply над значениями Python и тип результата."""
+    __slots__ = ('apply', 'result_tag', 'result_type')
+
+    def __init__(self, apply: Callable[..., Any], result_tag: int):
+        self.apply = apply
+        self.result_tag = result_tag
+        self.result_type = TAG_TYPES[result_tag]
+
+
+def pair_index(left_tag: int, right_tag: int) -> int:
+    """Номер пары меток в строке таблицы бинарной операции."""
+    return left_tag * TAG_COUNT + right_tag
+
+
+def _row(entries: Dict[tuple, Operation]) -> List[Optional[Operation]]:
+    row: List[Optional[Operation]] = [None] * (TAG_COUNT * TAG_COUNT)
+    for (left_tag, right_tag), entry in entries.items():
+        row[pair_index(left_tag, right_tag)] = entry
+    return row
+
+
+def _arithmetic(int_apply: Callable[[Any, Any], Any], real_apply: Callable[[Any, Any], Any]) -> Dict[tuple, Operation]:
+    """Числовая операция: цел с цел - int_apply (цел), остальные пары чисел - real_apply (вещ)."""
+    entries = {pair: Operation(real_apply, TAG_REAL) for pair in _NUMERIC_PAIRS}
+    entries[(TAG_INT, TAG_INT)] = Operation(int_apply, TAG_INT)
+    return entries
+
+
+def _comparison(compare: Callable[[Any, Any], bool]) -> Dict[tuple, Operation]:
+    """Сравнение определено для любых типов; цел с вещ приводятся к вещ."""
+    entries = {(left, right): Operation(compare, TAG_BOOL) for left in _ALL_TAGS for right in _ALL_TAGS}
+    coerced = Operation(lambda a, b: compare(float(a), float(b)), TAG_BOOL)
+    entries[(TAG_INT, TAG_REAL)] = entries[(TAG_REAL, TAG_INT)] = coerced
+    return entries
+
+
+def _addition() -> Dict[tuple, Operation]:
+    entries = _arithmetic(operator.add, lambda a, b: float(a) + float(b))
+    concat = Operation(lambda a, b: str(a) + str(b), TAG_STR)
+    entries.update({(left, right): concat for left in _TEXT for right in _TEXT})
+    return entries
+
+
+def _power() -> Dict[tuple, Operation]:
+    entries = {(left, right): Operation(lambda a, b: float(a) ** float(b), TAG_REAL)
+               for left in _ALL_TAGS for right in _ALL_TAGS}
+    entries[(TAG_INT, TAG_INT)] = Operation(lambda a, b: int(a ** b), TAG_INT)
+    return entries
+
+
+# Тип токена оператора -> строка таблицы (по pair_index)
+BINARY_OPERATIONS: Dict[int, List[Optional[Operation]]] = {
+    KumirLexer.PLUS: _row(_addition()),
+    KumirLexer.MINUS: _row(_arithmetic(operator.sub, lambda a, b: float(a) - float(b))),
+    KumirLexer.MUL: _row(_arithmetic(operator.mul, lambda a, b: float(a) * float(b))),
+    KumirLexer.DIV: _row({pair: Operation(lambda a, b: float(a) / float(b), TAG_REAL) for pair in _NUMERIC_PAIRS}),
+    KumirLexer.POWER: _row(_power()),
+    KumirLexer.EQ: _row(_comparison(operator.eq)),
+    KumirLexer.NE: _row(_comparison(operator.ne)),
+    KumirLexer.LT: _row(_comparison(operator.lt)),
+    KumirLexer.GT: _row(_comparison(operator.gt)),
+    KumirLexer.LE: _row(_comparison(operator.le)),
+    KumirLexer.GE: _row(_comparison(operator.ge)),
+}
+
+def _unary_row(entries: Dict[int, Operation]) -> List[Optional[Operation]]:
+    row: List[Optional[Operation]] = [None] * TAG_COUNT
+    for tag, entry in entries.items():
+        row[tag] = entry
+    return row
+
+
+# Унарные операции: тип токена -> реализация по метке операнда
+UNARY_OPERATIONS: Dict[int, List[Optional[Operation]]] = {
+    KumirLexer.MINUS: _unary_row({TAG_INT: Operation(operator.neg, TAG_INT), TAG_REAL: Operation(operator.neg, TAG_REAL)}),
+    KumirLexer.PLUS: _unary_row({TAG_INT: Operation(operator.pos, TAG_INT), TAG_REAL: Operation(operator.pos, TAG_REAL)}),
+    KumirLexer.NOT: _unary_row({TAG_BOOL: Operation(operator.not_, TAG_BOOL)}),
+}
+
+# Названия операций для сообщений об ошибках типов
+_BINARY_NAMES = {
+    KumirLexer.PLUS: 'сложения',
+    KumirLexer.MINUS: 'вычитания',
+    KumirLexer.MUL: 'умножения',
+    KumirLexer.DIV: 'деления',
+}
+
+
+def binary_type_error(op_type: int, left: KumirValue, right: KumirValue, op_token) -> KumirTypeError:
+    """Ошибка применения операции к неподходящим типам (промах таблицы)."""
+    return KumirTypeError(
+        f"Операция {_BINARY_NAMES.get(op_type, op_token.text)} не применима к типам "
+        f"'{left.kumir_type}' и '{right.kumir_type}'.",
+        line_index=op_token.line, column_index=op_token.column
+    )
+
@@ -8,12 +8,82 @@ from ..generated.KumirParser import KumirParser # Исправленный им
 from ..kumir_exceptions import DeclarationError, KumirArgumentError, KumirNameError, KumirTypeError, ExitSignal, AssignmentError, KumirEvalError, BreakSignal, KumirRuntimeError # Заменены ProcedureExitCalled на ExitSignal и LoopExitException на BreakSignal, добавлен KumirRuntimeError
 from ..kumir_datatypes import KumirTableVar, KumirFunction, KumirValue, KumirType # <--- ДОБАВЛЕН KumirType
 from .constants import VOID_TYPE # <--- УДАЛЕНЫ неиспользуемые типы
-from .scope_manager import get_default_value # <--- Import get_default_value
+from .scope_manager import get_default_value, VariableRecord # <--- Import get_default_value
 from .type_utils import get_type_info_from_specifier # <--- ДОБАВЛЕН ИМПОРТ
 
 if TYPE_CHECKING:
     from ..interpreter import KumirInterpreterVisitor # Для тайп-хинтинга родительского визитора
 
+# Режимы параметров (как в анализе аргументов процедуры), в которых значение передаётся внутрь / копируется обратно
+_INPUT_MODES = ('арг', 'arg', 'аргрез', 'argres')
+_OUTPUT_MODES = ('рез', 'res', 'аргрез', 'argres')
+# Режимы evaluator'а с копированием результата в вызывающую область
+_COPY_BACK_MODES = ('рез', 'arg_res', 'arg_res_table_special')
+
+
+class TypeBinding:
+    """
+    Тип переменной параметра, разобранный заранее: значение по умолчанию
+    (как в ScopeManager.declare_variable) и приведение значения аргумента
+    (как в ScopeManager.update_variable).
+    """
+    __slots__ = ('kumir_type', 'type_value', 'default', 'default_initialized', 'widens_int')
+
+    def __init__(self, kumir_type: KumirType):
+        self.kumir_type = kumir_type
+        self.type_value = kumir_type.value
+        self.default = get_default_value(kumir_type)
+        self.default_initialized = self.default.value is not None
+        self.widens_int = kumir_type == KumirType.REAL
+
+    def convert(self, value: KumirValue) -> Optional[KumirValue]:
+        """Значение для переменной этого типа или None, если типы несовместимы."""
+        if value.kumir_type == self.type_value:
+            return value
+        if self.widens_int and value.kumir_type == KumirType.INT.value:
+            return KumirValue(float(value.value), self.type_value)
+        return None
+
+    def record(self, name: str, value: Optional[KumirValue], line_index: int, column_index: int) -> VariableRecord:
+        """Запись переменной параметра: со значением или (value is None) по умолчанию."""
+        if value is None:
+            return VariableRecord(name, self.kumir_type, self.default, False,
+                                  self.default_initialized, line_index, column_index)
+        return VariableRecord(name, self.kumir_type, value, False, True, line_index, column_index)
+
+
+class ParameterBinding:
+    """Формальный параметр алгоритма с разобранными типами и режимами."""
+    __slots__ = ('name', 'name_lower', 'mode', 'evaluator_mode', 'is_table', 'declared', 'base')
+
+    def __init__(self, param_info: Dict[str, Any]):
+        self.name = param_info['name']
+        self.name_lower = self.name.lower()
+        self.mode = param_info['mode']
+        self.evaluator_mode = param_info['mode_for_evaluator']
+        self.is_table = param_info['is_table']
+        # Вызов функции объявляет параметр полным типом ('целтаб'), вызов процедуры - базовым
+        self.declared = TypeBinding(KumirType.from_string(param_info['type']))
+        self.base = TypeBinding(KumirType.from_string(param_info['base_type']))
+
+
+class BindingPlan:
+    """
+    План привязки аргументов при вызове алгоритма. Строится один раз при
+    регистрации: разбор типов (KumirType.from_string), режимов и значений
+    по умолчанию не повторяется на каждом вызове.
+    """
+    __slots__ = ('params', 'copy_back', 'result')
+
+    def __init__(self, params_info: Dict[str, Dict[str, Any]], result_type: Optional[str]):
+        self.params = tuple(ParameterBinding(info) for info in params_info.values())
+        # (номер аргумента, параметр) для рез-параметров, копируемых обратно после вызова функции
+        self.copy_back = tuple((i, binding) for i, binding in enumerate(self.params)
+                               if binding.evaluator_mode in _COPY_BACK_MODES)
+        self.result = (TypeBinding(KumirType.from_string(result_type))
+                       if result_type and result_type != VOID_TYPE else None)
+
+
 class ProcedureManager:
     def __init__(self, visitor: 'KumirInterpreterVisitor'):
         self.visitor = visitor
@@ -83,7 +153,9 @@ class ProcedureManager:
             'params': params_info,  # Теперь правильно извлекаем параметры!
             'is_func': is_function,
             'is_function': is_function,  # Добавляем для совместимости
-            'result_type': result_type        }
+            'result_type': result_type,
+            'binding_plan': BindingPlan(params_info, result_type if is_function else VOID_TYPE)
+        }
         
 
     def call_procedure(self, proc_name: str, actual_args: List[KumirValue], 
@@ -186,53 +258,34 @@ class ProcedureManager:
                                  line_index=line_index, column_index=column_index)
         
         proc_data = self.procedures[proc_name_lower]
-        formal_params_list = list(proc_data['params'].values())
+        plan = self.binding_plan(proc_data)
+        self.visitor.execution_budget.tick(line_index=line_index, column_index=column_index)
         
         # 2. Подготовка области видимости для выполнения процедуры
-        self.visitor.scope_manager.push_scope()
+        scope_manager = self.visitor.scope_manager
+        scope_manager.push_scope(scope_manager.algorithm_layout(proc_data))
         try:
-            # 3. Инициализация параметров в новой области видимости
+            # 3. Инициализация параметров в новой области видимости (по плану привязки)
+            scope = scope_manager.scopes[-1]
             output_parameters = []  # Параметры, которые нужно скопировать обратно
             
-            for analyzed_arg, formal_param in zip(analyzed_args, formal_params_list):
-                param_name = formal_param['name']
+            for analyzed_arg, binding in zip(analyzed_args, plan.params):
                 param_mode = analyzed_arg['mode']
-                param_kumir_type_str = formal_param['base_type']  # это строка типа "цел"
-                
-                # Конвертируем строку в KumirType enum
-                param_kumir_type = KumirType.from_string(param_kumir_type_str)
-                
-                # DEBUG: убран лог обработки параметров
-                
-                # Объявляем параметр в локальной области видимости
-                self.visitor.scope_manager.declare_variable(
-                    param_name, 
-                    param_kumir_type,
-                    initial_value=None,  # изначально None
-                    line_index=line_index,
-                    column_index=column_index
-                )
-                
-                # Инициализируем значение в зависимости от режима
-                if param_mode in ['арг', 'arg', 'аргрез', 'argres']:
-                    # Для 'арг' и 'аргрез' - используем переданное значение
-                    if analyzed_arg['value'] is not None:
-                        self.visitor.scope_manager.update_variable(
-                            param_name,
-                            analyzed_arg['value'],
-                            line_index=line_index,
-                            column_index=column_index
-                        )
-                        # DEBUG: убран лог инициализации параметра
+                value = analyzed_arg['value'] if param_mode in _INPUT_MODES else None
+                converted = binding.base.convert(value) if value is not None else None
+                scope[binding.name_lower] = binding.base.record(binding.name, converted, line_index, column_index)
+                if value is not None and converted is None:
+                    # Несовместимые типы: update_variable выбросит ошибку с привычным текстом
+                    scope_manager.update_variable(binding.name, value,
+                                                  line_index=line_index, column_index=column_index)
                 
                 # Запоминаем output параметры для копирования обратно
-                if param_mode in ['рез', 'res', 'аргрез', 'argres'] and analyzed_arg.get('variable_info'):
+                if param_mode in _OUTPUT_MODES and analyzed_arg.get('variable_info'):
                     output_parameters.append({
-                        'param_name': param_name,
+                        'param_name': binding.name,
                         'variable_info': analyzed_arg['variable_info'],
                         'mode': param_mode
                     })
-                    # DEBUG: убран лог пометки для копирования
             
             # 4. Выполнение тела процедуры
             # Debug: выполняем тело процедуры
@@ -510,6 +563,14 @@ class ProcedureManager:
                                  line_index=call_site_ctx.start.line -1, column_index=call_site_ctx.start.column, line_content=lc_internal_err)
 
 
+    def binding_plan(self, proc_def: Dict[str, Any]) -> BindingPlan:
+        """План привязки аргументов алгоритма (для описаний без плана строится при первом вызове)."""
+        plan = proc_def.get('binding_plan')
+        if plan is None:
+            plan = proc_def['binding_plan'] = BindingPlan(
+                proc_def['params'], proc_def.get('result_type') if proc_def.get('is_function') else VOID_TYPE)
+        return plan
+
     def clear_procedures(self):
         '''Очищает список известных процедур.'''
         self.procedures = {}    # Сюда будут перенесены:
@@ -651,7 +712,8 @@ class ProcedureManager:
                 'is_function': is_function,
                 'result_type': result_type if is_function else VOID_TYPE, # Сохраняем VOID_TYPE для процедур
                 'body_ctx': ctx.algorithmBody(),
-                'header_ctx': header_ctx 
+                'header_ctx': header_ctx,
+                'binding_plan': BindingPlan(params_info, result_type if is_function else VOID_TYPE)
             }
 
         # Рекурсивный обход дочерних узлов, если они есть
@@ -676,6 +738,7 @@ class ProcedureManager:
                         self._collect_procedure_definitions(child)
 
     def _execute_procedure_call(self, call_data: dict[str, Any], args: List[Any], call_site_ctx: Any) -> Any:
+        self.visitor.execution_budget.tick(call_site_ctx)
         proc_name = call_data['name']
         proc_def = self.procedures.get(proc_name.lower())
 
@@ -694,109 +757,65 @@ class ProcedureManager:
                                  column_index=call_site_ctx.start.column if call_site_ctx else None,
                                  line_content=lc_no_body)
 
-        self.visitor.scope_manager.push_scope()
-        # self.visitor.call_stack.append(proc_name) # Если будет использоваться стек вызовов        # Объявление и инициализация параметров в новой области видимости
-        for i, (_, formal_param_info) in enumerate(proc_def['params'].items()):
-            param_name_original_case = formal_param_info['name']
-            # param_base_type = formal_param_info['base_type'] # Не используется напрямую здесь после рефакторинга declare_variable
-            param_is_table = formal_param_info['is_table']
-            param_mode_for_evaluator = formal_param_info['mode_for_evaluator']
+        plan = self.binding_plan(proc_def)
+        if len(args) < len(plan.params): # pragma: no cover
+            lc_arg_count = self.visitor.get_line_content_from_ctx(call_site_ctx)
+            raise KumirArgumentError(f"Строка {call_site_ctx.start.line if call_site_ctx else '??'}: Недостаточно аргументов для вызова процедуры '{proc_name}'.",
+                                     line_index=(call_site_ctx.start.line-1) if call_site_ctx else None, 
+                                     column_index=call_site_ctx.start.column if call_site_ctx else None,
+                                     line_content=lc_arg_count)
+        declared_line = (call_site_ctx.start.line-1) if call_site_ctx and call_site_ctx.start else 0
+        declared_column = call_site_ctx.start.column if call_site_ctx and call_site_ctx.start else 0
+
+        scope_manager = self.visitor.scope_manager
+        scope_manager.push_scope()
+        scope = scope_manager.scopes[-1]
+        # Объявление и инициализация параметров в новой области видимости (по плану привязки)
+        for binding, arg_data in zip(plan.params, args):
+            param_mode_for_evaluator = binding.evaluator_mode
             actual_arg_value = None
             
-            if i < len(args):
-                arg_data = args[i]
-                
-                if param_mode_for_evaluator == 'arg':
-                    # Для режима 'arg' извлекаем значение из KumirValue
-                    if hasattr(arg_data, 'value'):
-                        actual_arg_value = arg_data.value
-                    else:
-                        actual_arg_value = arg_data
-                elif param_mode_for_evaluator == 'arg_res' or param_mode_for_evaluator == 'arg_res_table_special':
-                    if isinstance(arg_data, dict) and 'value' in arg_data:
-                        actual_arg_value = arg_data['value']
-                        if param_is_table and isinstance(actual_arg_value, KumirTableVar):
-                             # Размеры таблицы используются для объявления параметра
-                             pass 
-                    else: 
-                        lc_arg_res = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                        raise KumirArgumentError(f"Строка {call_site_ctx.start.line if call_site_ctx else '??'}: Некорректная структура аргумента для параметра '{param_name_original_case}' (режим 'арг рез').",
-                                                 line_index=(call_site_ctx.start.line -1) if call_site_ctx else None, 
-                                                 column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                                 line_content=lc_arg_res)
-            else: # pragma: no cover
-                lc_arg_count = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                raise KumirArgumentError(f"Строка {call_site_ctx.start.line if call_site_ctx else '??'}: Недостаточно аргументов для вызова процедуры '{proc_name}'.",
-                                         line_index=(call_site_ctx.start.line-1) if call_site_ctx else None, 
-                                         column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                         line_content=lc_arg_count)
-            
-            # 1. Объявляем переменную параметра
-            self.visitor.scope_manager.declare_variable(
-                name=param_name_original_case,
-                kumir_type=KumirType.from_string(formal_param_info['type']), 
-                initial_value=None,  # Будет установлено ниже при присваивании
-                line_index=(call_site_ctx.start.line-1) if call_site_ctx and call_site_ctx.start else 0,
-                column_index=call_site_ctx.start.column if call_site_ctx and call_site_ctx.start else 0
-            )
+            if param_mode_for_evaluator == 'arg':
+                # Для режима 'arg' извлекаем значение из KumirValue
+                actual_arg_value = arg_data.value if hasattr(arg_data, 'value') else arg_data
+            elif param_mode_for_evaluator == 'arg_res' or param_mode_for_evaluator == 'arg_res_table_special':
+                if isinstance(arg_data, dict) and 'value' in arg_data:
+                    actual_arg_value = arg_data['value']
+                else: 
+                    lc_arg_res = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                    raise KumirArgumentError(f"Строка {call_site_ctx.start.line if call_site_ctx else '??'}: Некорректная структура аргумента для параметра '{binding.name}' (режим 'арг рез').",
+                                             line_index=(call_site_ctx.start.line -1) if call_site_ctx else None, 
+                                             column_index=call_site_ctx.start.column if call_site_ctx else None,
+                                             line_content=lc_arg_res)
+            # Для 'рез' параметров actual_arg_value остаётся None: значение по умолчанию их типа
 
-            # 2. Присваиваем значение параметру (если нужно)
-            if param_mode_for_evaluator == 'arg' or param_mode_for_evaluator == 'arg_res' or param_mode_for_evaluator == 'arg_res_table_special':
-                if actual_arg_value is not None:
-                    try:
-                        # Check if parameter is a table type
-                        is_param_table = 'таб' in formal_param_info['type'].lower()
-                        validated_value = self.visitor.validate_and_convert_value_for_assignment(
-                            actual_arg_value,
-                            formal_param_info['type'], 
-                            var_name=f"параметру '{param_name_original_case}'",
-                            is_target_table=is_param_table
-                        )
-                          # Оборачиваем валидированное значение в KumirValue для update_variable
-                        if not isinstance(validated_value, KumirValue):                            # Используем нормализованное значение типа из KumirType enum
-                            normalized_type = KumirType.from_string(formal_param_info['type']).value
-                            kumir_value_for_update = KumirValue(validated_value, normalized_type)
-                        else:
-                            kumir_value_for_update = validated_value
-                        
-                        # Извлекаем координаты из контекста для update_variable
-                        line_index = call_site_ctx.start.line if call_site_ctx and hasattr(call_site_ctx, 'start') else -1
-                        column_index = call_site_ctx.start.column if call_site_ctx and hasattr(call_site_ctx, 'start') else -1
-                        
-                        self.visitor.scope_manager.update_variable(param_name_original_case, kumir_value_for_update, line_index, column_index)
-                        
-                        # Проверяем, что параметр действительно сохранился
-                        var_info, _ = self.visitor.scope_manager.find_variable(param_name_original_case)
-                        if var_info:
-                            # Параметр найден в scope после присваивания
-                            pass
-                        else:
-                            # Параметр НЕ найден в scope после присваивания
-                            pass
-                    except (KumirTypeError, KumirEvalError, AssignmentError) as e: 
-                        lc_assign = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                        if not hasattr(e, 'line_index') or e.line_index is None:
-                           e.line_index = call_site_ctx.start.line - 1 if call_site_ctx else None
-                        if not hasattr(e, 'column_index') or e.column_index is None:
-                           e.column_index = call_site_ctx.start.column if call_site_ctx else None
-                        if not hasattr(e, 'line_content') or e.line_content is None:
-                           e.line_content = lc_assign
-                        raise
-            elif param_mode_for_evaluator == 'рез':
-                # Для 'рез' параметров, они инициализируются значением по умолчанию их типа.
-                # KumirTableVar сама себя инициализирует при создании через declare_variable.
-                # Для простых типов, get_default_value было вызвано внутри declare_variable (в ScopeManager).
-                pass        # Если это функция, инициализируем '__знач__' значением по умолчанию для ее типа
-        if proc_def['is_function']:
-            expected_return_type = proc_def['result_type']
-            if expected_return_type and expected_return_type != VOID_TYPE:
-                self.visitor.scope_manager.declare_variable(
-                    name="__знач__", 
-                    kumir_type=KumirType.from_string(expected_return_type), 
-                    initial_value=None,  # Будет установлено значение по умолчанию
-                    line_index=(call_site_ctx.start.line-1) if call_site_ctx and call_site_ctx.start else 0,
-                    column_index=call_site_ctx.start.column if call_site_ctx and call_site_ctx.start else 0
-                )
+            declared = binding.declared
+            if actual_arg_value is None:
+                scope[binding.name_lower] = declared.record(binding.name, None, declared_line, declared_column)
+                continue
+            value = (actual_arg_value if isinstance(actual_arg_value, KumirValue)
+                     else KumirValue(actual_arg_value, declared.type_value))
+            converted = declared.convert(value)
+            scope[binding.name_lower] = declared.record(binding.name, converted, declared_line, declared_column)
+            if converted is None:
+                # Несовместимые типы: update_variable выбросит ошибку, дополняем её позицией вызова
+                try:
+                    line_index = call_site_ctx.start.line if call_site_ctx and hasattr(call_site_ctx, 'start') else -1
+                    column_index = call_site_ctx.start.column if call_site_ctx and hasattr(call_site_ctx, 'start') else -1
+                    scope_manager.update_variable(binding.name, value, line_index, column_index)
+                except (KumirTypeError, KumirEvalError, AssignmentError) as e: 
+                    lc_assign = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                    if not hasattr(e, 'line_index') or e.line_index is None:
+                       e.line_index = call_site_ctx.start.line - 1 if call_site_ctx else None
+                    if not hasattr(e, 'column_index') or e.column_index is None:
+                       e.column_index = call_site_ctx.start.column if call_site_ctx else None
+                    if not hasattr(e, 'line_content') or e.line_content is None:
+                       e.line_content = lc_assign
+                    raise
+
+        # Если это функция, инициализируем '__знач__' значением по умолчанию для ее типа
+        if proc_def['is_function'] and plan.result is not None:
+            scope['__знач__'] = plan.result.record("__знач__", None, declared_line, declared_column)
 
         self.visitor.function_call_active = proc_def['is_function']
         execution_result = None
@@ -845,104 +864,103 @@ class ProcedureManager:
         # Для параметров 'рез' и 'арг рез' обновляем переменные в вызывающей области видимости
         if len(self.visitor.scope_manager.scopes) > 1: # Убедимся, что есть вызывающая область
             caller_scope = self.visitor.scope_manager.scopes[-2]
-            for i, (_, formal_param_info) in enumerate(proc_def['params'].items()):
-                param_name_local_original_case = formal_param_info['name']
-                param_mode_for_evaluator = formal_param_info['mode_for_evaluator']
-
-                if param_mode_for_evaluator in ['рез', 'arg_res', 'arg_res_table_special']:
-                    local_var_info, _ = self.visitor.scope_manager.find_variable(param_name_local_original_case) 
-                    if local_var_info is None: # pragma: no cover
-                        lc_local_var = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                        raise KumirNameError(f"Внутренняя ошибка: локальная переменная параметра '{param_name_local_original_case}' не найдена.",
-                                             line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
-                                             column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                             line_content=lc_local_var)
+            for i, binding in plan.copy_back:
+                param_name_local_original_case = binding.name
+                param_mode_for_evaluator = binding.evaluator_mode
+
+                local_var_info, _ = self.visitor.scope_manager.find_variable(param_name_local_original_case) 
+                if local_var_info is None: # pragma: no cover
+                    lc_local_var = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                    raise KumirNameError(f"Внутренняя ошибка: локальная переменная параметра '{param_name_local_original_case}' не найдена.",
+                                         line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
+                                         column_index=call_site_ctx.start.column if call_site_ctx else None,
+                                         line_content=lc_local_var)
                     
-                    value_to_copy_back = local_var_info['value']
-                    original_arg_spec = args[i] 
+                value_to_copy_back = local_var_info['value']
+                original_arg_spec = args[i] 
 
-                    if isinstance(original_arg_spec, dict) and 'name_for_ref' in original_arg_spec:
-                        original_var_name = original_arg_spec['name_for_ref']
-                        original_var_scope_depth = original_arg_spec.get('scope_depth_for_ref') 
+                if isinstance(original_arg_spec, dict) and 'name_for_ref' in original_arg_spec:
+                    original_var_name = original_arg_spec['name_for_ref']
+                    original_var_scope_depth = original_arg_spec.get('scope_depth_for_ref') 
                         
-                        try:
-                            if original_var_scope_depth is not None and 0 <= original_var_scope_depth < len(self.visitor.scope_manager.scopes):
-                                target_scope = self.visitor.scope_manager.scopes[original_var_scope_depth]
-                                var_info_in_target_scope = target_scope.get(original_var_name.lower())
-
-                                if not var_info_in_target_scope: # pragma: no cover
-                                    lc_target_scope = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                                    raise KumirNameError(f"Переменная '{original_var_name}' для параметра '{param_name_local_original_case}' не найдена в целевой области видимости для обновления.",
-                                                         line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
-                                                         column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                                         line_content=lc_target_scope)                                # For both table and scalar, we use _validate_and_convert_value_for_assignment from the visitor
-                                # Check if target is a table type
-                                is_target_table = 'таб' in var_info_in_target_scope['type'].lower()
-                                validated_value_for_target = self.visitor.validate_and_convert_value_for_assignment(
-                                    value_to_copy_back, # This is the value from the procedure's scope
-                                    var_info_in_target_scope['type'],
-                                    var_name=original_var_name,
-                                    is_target_table=is_target_table
-                                )
-                                target_scope[original_var_name.lower()]['value'] = validated_value_for_target
-                                target_scope[original_var_name.lower()]['initialized'] = True
-                            else: # pragma: no cover
-                                lc_scope_depth = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                                raise KumirEvalError(f"Ошибка обновления ссылочного параметра '{original_var_name}': некорректная глубина области видимости.",
+                    try:
+                        if original_var_scope_depth is not None and 0 <= original_var_scope_depth < len(self.visitor.scope_manager.scopes):
+                            target_scope = self.visitor.scope_manager.scopes[original_var_scope_depth]
+                            var_info_in_target_scope = target_scope.get(original_var_name.lower())
+
+                            if not var_info_in_target_scope: # pragma: no cover
+                                lc_target_scope = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                                raise KumirNameError(f"Переменная '{original_var_name}' для параметра '{param_name_local_original_case}' не найдена в целевой области видимости для обновления.",
                                                      line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
                                                      column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                                     line_content=lc_scope_depth)
-
-                        except (KumirNameError, KumirTypeError, AssignmentError) as e: 
-                            # lc_copy_back = self.visitor.get_line_content_from_ctx(call_site_ctx)  # Не используется
-                            self.visitor.error_stream.write(f"Внутренняя ошибка при копировании результата параметра '{param_name_local_original_case}' в '{original_var_name}' (строка {call_site_ctx.start.line if call_site_ctx else '??'}): {e}\\n")
-                    elif isinstance(original_arg_spec, str): 
-                        original_var_name = original_arg_spec
-                        var_info_in_caller = caller_scope.get(original_var_name.lower())
-
-                        if not var_info_in_caller: # pragma: no cover
-                            lc_var_caller = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                            raise KumirNameError(f"Переменная '{original_var_name}' для 'рез' параметра не найдена в вызывающей области.",
+                                                     line_content=lc_target_scope)                                # For both table and scalar, we use _validate_and_convert_value_for_assignment from the visitor
+                            # Check if target is a table type
+                            is_target_table = 'таб' in var_info_in_target_scope['type'].lower()
+                            validated_value_for_target = self.visitor.validate_and_convert_value_for_assignment(
+                                value_to_copy_back, # This is the value from the procedure's scope
+                                var_info_in_target_scope['type'],
+                                var_name=original_var_name,
+                                is_target_table=is_target_table
+                            )
+                            target_scope[original_var_name.lower()]['value'] = validated_value_for_target
+                            target_scope[original_var_name.lower()]['initialized'] = True
+                        else: # pragma: no cover
+                            lc_scope_depth = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                            raise KumirEvalError(f"Ошибка обновления ссылочного параметра '{original_var_name}': некорректная глубина области видимости.",
                                                  line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
                                                  column_index=call_site_ctx.start.column if call_site_ctx else None,
-                                                 line_content=lc_var_caller)
-                        try:
-                            # Check if caller var is a table type
-                            is_caller_table = 'таб' in var_info_in_caller['type'].lower()
-                            validated_value_for_caller = self.visitor.validate_and_convert_value_for_assignment(
-                                value_to_copy_back,
-                                var_info_in_caller['type'],
-                                original_var_name,
-                                is_target_table=is_caller_table
-                            )
-                            caller_scope[original_var_name.lower()]['value'] = validated_value_for_caller
-                            caller_scope[original_var_name.lower()]['initialized'] = True
-                        except (KumirTypeError, KumirEvalError, AssignmentError) as e: 
-                             lc_assign_res = self.visitor.get_line_content_from_ctx(call_site_ctx)
-                             if not hasattr(e, 'line_index') or e.line_index is None: e.line_index = call_site_ctx.start.line -1 if call_site_ctx else None
-                             if not hasattr(e, 'column_index') or e.column_index is None: e.column_index = call_site_ctx.start.column if call_site_ctx else None
-                             if not hasattr(e, 'line_content') or e.line_content is None: e.line_content = lc_assign_res
-                             raise
-                    else: # pragma: no cover
-                        arg_expr_ctx_for_error = call_site_ctx
-                        # Safely try to get a more specific context for the argument
-                        postfix_op = getattr(call_site_ctx, 'postfixOperator', lambda: None)()
-                        if postfix_op:
-                            arg_list_node = getattr(postfix_op, 'argumentList', lambda: None)()
-                            if arg_list_node:
-                                expressions = getattr(arg_list_node, 'expression', lambda: [])()  # type: ignore[misc]
-                                if i < len(expressions):
-                                    arg_expr_ctx_for_error = expressions[i]
-                        
-                        lc_arg_mode = self.visitor.get_line_content_from_ctx(arg_expr_ctx_for_error)
-                        err_line = arg_expr_ctx_for_error.start.line if arg_expr_ctx_for_error and hasattr(arg_expr_ctx_for_error, 'start') else None
-                        err_col = arg_expr_ctx_for_error.start.column if arg_expr_ctx_for_error and hasattr(arg_expr_ctx_for_error, 'start') else None
-                        raise KumirArgumentError(
-                            f"Строка {err_line or '??'}: Для параметра '{param_name_local_original_case}' (режим '{param_mode_for_evaluator}') процедуры '{proc_name}' передан аргумент неподдерживаемого типа для обратного копирования ({type(original_arg_spec).__name__}).",
-                            line_index=err_line -1 if err_line else None,
-                            column_index=err_col,
-                            line_content=lc_arg_mode
+                                                 line_content=lc_scope_depth)
+
+                    except (KumirNameError, KumirTypeError, AssignmentError) as e: 
+                        # lc_copy_back = self.visitor.get_line_content_from_ctx(call_site_ctx)  # Не используется
+                        self.visitor.error_stream.write(f"Внутренняя ошибка при копировании результата параметра '{param_name_local_original_case}' в '{original_var_name}' (строка {call_site_ctx.start.line if call_site_ctx else '??'}): {e}\\n")
+                elif isinstance(original_arg_spec, str): 
+                    original_var_name = original_arg_spec
+                    var_info_in_caller = caller_scope.get(original_var_name.lower())
+
+                    if not var_info_in_caller: # pragma: no cover
+                        lc_var_caller = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                        raise KumirNameError(f"Переменная '{original_var_name}' для 'рез' параметра не найдена в вызывающей области.",
+                                             line_index=(call_site_ctx.start.line -1) if call_site_ctx else None,
+                                             column_index=call_site_ctx.start.column if call_site_ctx else None,
+                                             line_content=lc_var_caller)
+                    try:
+                        # Check if caller var is a table type
+                        is_caller_table = 'таб' in var_info_in_caller['type'].lower()
+                        validated_value_for_caller = self.visitor.validate_and_convert_value_for_assignment(
+                            value_to_copy_back,
+                            var_info_in_caller['type'],
+                            original_var_name,
+                            is_target_table=is_caller_table
                         )
+                        caller_scope[original_var_name.lower()]['value'] = validated_value_for_caller
+                        caller_scope[original_var_name.lower()]['initialized'] = True
+                    except (KumirTypeError, KumirEvalError, AssignmentError) as e: 
+                         lc_assign_res = self.visitor.get_line_content_from_ctx(call_site_ctx)
+                         if not hasattr(e, 'line_index') or e.line_index is None: e.line_index = call_site_ctx.start.line -1 if call_site_ctx else None
+                         if not hasattr(e, 'column_index') or e.column_index is None: e.column_index = call_site_ctx.start.column if call_site_ctx else None
+                         if not hasattr(e, 'line_content') or e.line_content is None: e.line_content = lc_assign_res
+                         raise
+                else: # pragma: no cover
+                    arg_expr_ctx_for_error = call_site_ctx
+                    # Safely try to get a more specific context for the argument
+                    postfix_op = getattr(call_site_ctx, 'postfixOperator', lambda: None)()
+                    if postfix_op:
+                        arg_list_node = getattr(postfix_op, 'argumentList', lambda: None)()
+                        if arg_list_node:
+                            expressions = getattr(arg_list_node, 'expression', lambda: [])()  # type: ignore[misc]
+                            if i < len(expressions):
+                                arg_expr_ctx_for_error = expressions[i]
+                        
+                    lc_arg_mode = self.visitor.get_line_content_from_ctx(arg_expr_ctx_for_error)
+                    err_line = arg_expr_ctx_for_error.start.line if arg_expr_ctx_for_error and hasattr(arg_expr_ctx_for_error, 'start') else None
+                    err_col = arg_expr_ctx_for_error.start.column if arg_expr_ctx_for_error and hasattr(arg_expr_ctx_for_error, 'start') else None
+                    raise KumirArgumentError(
+                        f"Строка {err_line or '??'}: Для параметра '{param_name_local_original_case}' (режим '{param_mode_for_evaluator}') процедуры '{proc_name}' передан аргумент неподдерживаемого типа для обратного копирования ({type(original_arg_spec).__name__}).",
+                        line_index=err_line -1 if err_line else None,
+                        column_index=err_col,
+                        line_content=lc_arg_mode
+                    )
         
         self.visitor.scope_manager.pop_scope()
         self.visitor.function_call_active = False
@@ -2,6 +2,8 @@
 from typing import Any, Tuple, Optional, Dict, List
 from antlr4 import ParserRuleContext
 
+from ..generated.KumirParser import KumirParser
+
 from ..kumir_exceptions import DeclarationError, KumirEvalError, KumirIndexError, KumirTypeError, KumirNameError
 from ..kumir_datatypes import KumirType, KumirValue, KumirTableVar
 
@@ -34,11 +36,115 @@ def get_default_value(kumir_type: KumirType) -> KumirValue:
     return KumirValue(None, kumir_type.value) 
 
 
+class VariableRecord:
+    """
+    Запись о переменной в кадре области видимости.
+
+    Компактная замена словаря с информацией о переменной. Для совместимости
+    с существующим кодом поддерживает доступ как к словарю: var_info['value'],
+    var_info.get('kumir_type') и т.д.
+    """
+    __slots__ = ('name_original', 'kumir_type', 'value', 'is_table',
+                 'initialized', 'line_declared', 'col_declared')
+
+    def __init__(self, name_original: str, kumir_type: KumirType, value: Any,
+                 is_table: bool, initialized: bool,
+                 line_declared: Optional[int], col_declared: Optional[int]):
+        self.name_original = name_original
+        self.kumir_type = kumir_type  # KumirType enum для простых типов ИЛИ ТИП ЭЛЕМЕНТОВ для таблиц
+        self.value = value            # KumirValue | KumirTableVar
+        self.is_table = is_table
+        self.initialized = initialized
+        self.line_declared = line_declared
+        self.col_declared = col_declared
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+class FrameLayout:
+    """
+    Раскладка кадра: номер слота для каждого имени, объявленного в области
+    видимости (параметры и локальные переменные алгоритма или переменная
+    цикла ДЛЯ и переменные, объявленные в его теле). Строится один раз
+    на область видимости и общая для всех её активаций.
+    """
+    __slots__ = ('slots',)
+
+    def __init__(self, names: List[str]):
+        self.slots: Dict[str, int] = {}
+        for name in names:
+            self.slots.setdefault(name, len(self.slots))
+
+
+class Frame(dict):
+    """
+    Кадр области видимости: словарь {имя в нижнем регистре: запись} плюс
+    список записей по слотам раскладки. Поиск по имени (динамическая
+    область видимости КуМира) идёт через словарь, чтение статически
+    разрешённого идентификатора — через индекс в списке records.
+    """
+    __slots__ = ('layout', 'records')
+
+    def __init__(self, layout: Optional[FrameLayout] = None):
+        super().__init__()
+        self.layout = layout
+        self.records: Optional[List[Any]] = [None] * len(layout.slots) if layout is not None else None
+
+    def __setitem__(self, name_lower: str, record: Any) -> None:
+        dict.__setitem__(self, name_lower, record)
+        if self.layout is not None:
+            slot = self.layout.slots.get(name_lower)
+            if slot is not None:
+                self.records[slot] = record
+
+
+def _collect_declared_names(node, names: List[str]) -> None:
+    """
+    Собирает имена переменных, объявленных в поддереве (в нижнем регистре).
+    Не заходит в циклы ДЛЯ: у них собственная область видимости.
+    """
+    if isinstance(node, KumirParser.VariableDeclarationContext):
+        for item in node.variableList().variableDeclarationItem():
+            names.append(item.ID().getText().lower())
+        return
+    if isinstance(node, KumirParser.ExpressionContext) or _is_for_loop(node):
+        return
+    for child in getattr(node, 'children', None) or ():
+        if isinstance(child, ParserRuleContext):
+            _collect_declared_names(child, names)
+
+
+def _is_for_loop(node) -> bool:
+    if not isinstance(node, KumirParser.LoopStatementContext):
+        return False
+    spec = node.loopSpecifier()
+    return spec is not None and spec.FOR() is not None
+
+
+_UNRESOLVED = object()
+
+
 class ScopeManager:
     def __init__(self, visitor_ref):
         self.visitor = visitor_ref  # Ссылка на основной KumirInterpreterVisitor
-        self.scopes: List[Dict[str, Any]] = [{}]  # Глобальная область видимости
-        # Структура для хранения информации о переменной:
+        self.scopes: List[Frame] = [Frame()]  # Глобальная область видимости
+        # Кадр хранит записи VariableRecord (см. выше), доступные и как словари:
         # {
         #   'name_original': str, 
         #   'kumir_type': KumirType, # KumirType enum для простых типов ИЛИ ТИП ЭЛЕМЕНТОВ для таблиц
@@ -48,6 +154,11 @@ class ScopeManager:
         #   'line_declared': int, 
         #   'col_declared': int   
         # }
+        # Раскладки кадров по контексту области видимости (алгоритм или цикл ДЛЯ)
+        self._layouts: Dict[Any, FrameLayout] = {}
+        # Статическое разрешение идентификаторов: контекст -> (имя, глубина, слот, раскладка)
+        self._resolved: Dict[Any, Any] = {}
+        self._algorithms_by_ctx: Optional[Dict[Any, Dict[str, Any]]] = None
 
     def get_program_lines_for_error(self):
         # Helper to safely access program_lines from the visitor
@@ -71,13 +182,99 @@ class ScopeManager:
                 return program_lines[line_num_0_indexed]
         return None
 
-    def enter_scope(self) -> None:
-        """Входит в новую локальную область видимости."""
-        self.scopes.append({})
+    def enter_scope(self, layout: Optional[FrameLayout] = None) -> None:
+        """Входит в новую локальную область видимости (с раскладкой кадра, если она известна)."""
+        self.scopes.append(Frame(layout))
 
-    def push_scope(self) -> None:
+    def push_scope(self, layout: Optional[FrameLayout] = None) -> None:
         """Синоним для enter_scope."""
-        self.enter_scope()
+        self.enter_scope(layout)
+
+    def algorithm_layout(self, proc_info: Dict[str, Any]) -> FrameLayout:
+        """Раскладка кадра алгоритма: параметры, затем локальные переменные тела."""
+        alg_ctx = proc_info.get('ctx')
+        layout = self._layouts.get(alg_ctx)
+        if layout is None:
+            names = [param['name'].lower() for param in proc_info.get('params', {}).values()]
+            body_ctx = proc_info.get('body_ctx')
+            if body_ctx is not None:
+                _collect_declared_names(body_ctx, names)
+            layout = FrameLayout(names)
+            self._layouts[alg_ctx] = layout
+        return layout
+
+    def loop_layout(self, loop_ctx: KumirParser.LoopStatementContext) -> FrameLayout:
+        """Раскладка кадра цикла ДЛЯ: переменная цикла и переменные, объявленные в теле."""
+        layout = self._layouts.get(loop_ctx)
+        if layout is None:
+            names = [loop_ctx.loopSpecifier().ID().getText().lower()]
+            if loop_ctx.statementSequence() is not None:
+                _collect_declared_names(loop_ctx.statementSequence(), names)
+            layout = FrameLayout(names)
+            self._layouts[loop_ctx] = layout
+        return layout
+
+    def _resolve_static(self, name_ctx: ParserRuleContext) -> Optional[Tuple[str, int, int, FrameLayout]]:
+        """
+        Разрешает идентификатор в (глубина кадра от вершины стека, слот) по
+        положению в дереве разбора. None — имя не объявлено в алгоритме
+        (глобальная переменная или переменная вызывающего алгоритма).
+        """
+        name_lower = name_ctx.getText().lower()
+        depth = 0
+        child, node = name_ctx, name_ctx.parentCtx
+        while node is not None:
+            if _is_for_loop(node) and child is not node.loopSpecifier():
+                # Границы и шаг цикла вычисляются до входа в его область видимости
+                layout = self.loop_layout(node)
+                slot = layout.slots.get(name_lower)
+                if slot is not None:
+                    return name_lower, depth, slot, layout
+                depth += 1
+            elif isinstance(node, KumirParser.AlgorithmDefinitionContext):
+                if self._algorithms_by_ctx is None:
+                    self._algorithms_by_ctx = {
+                        info.get('ctx'): info for info in self.visitor.procedure_manager.procedures.values()
+                    }
+                proc_info = self._algorithms_by_ctx.get(node)
+                if proc_info is None:
+                    return None
+                layout = self.algorithm_layout(proc_info)
+                slot = layout.slots.get(name_lower)
+                return (name_lower, depth, slot, layout) if slot is not None else None
+            child, node = node, node.parentCtx
+        return None
+
+    def resolve_variable(self, var_name: str, name_ctx: Optional[ParserRuleContext] = None) -> Optional[Any]:
+        """
+        Ищет переменную по идентификатору в дереве разбора.
+
+        Если имя статически разрешено в слот кадра, чтение сводится к индексу
+        в списке; результат всегда совпадает с find_variable (при сомнениях
+        выполняется обычный поиск по имени).
+        """
+        if name_ctx is not None:
+            resolved = self._resolved.get(name_ctx, _UNRESOLVED)
+            if resolved is _UNRESOLVED:
+                resolved = self._resolved[name_ctx] = self._resolve_static(name_ctx)
+            if resolved is not None:
+                name_lower, depth, slot, layout = resolved
+                scopes = self.scopes
+                if depth < len(scopes):
+                    frame = scopes[-1 - depth]
+                    if frame.layout is layout:
+                        record = frame.records[slot]
+                        if record is not None and (depth == 0 or not self._is_shadowed(name_lower, depth)):
+                            return record
+        return self.find_variable(var_name)[0]
+
+    def _is_shadowed(self, name_lower: str, depth: int) -> bool:
+        """Проверяет, не объявлено ли имя в кадрах выше разрешённого."""
+        scopes = self.scopes
+        for i in range(1, depth + 1):
+            if name_lower in scopes[-i]:
+                return True
+        return False
 
     def exit_scope(self) -> None:
         """Выходит из текущей локальной области видимости."""
@@ -136,15 +333,9 @@ class ScopeManager:
                 final_value_obj = KumirValue(float(initial_value.value), KumirType.REAL.value)
 
 
-        current_scope[name_lower] = {
-            'name_original': name,
-            'kumir_type': kumir_type, # Храним KumirType enum
-            'value': final_value_obj, # Храним KumirValue
-            'is_table': False,
-            'initialized': initialized,
-            'line_declared': line_index,
-            'col_declared': column_index
-        }
+        # Храним KumirType enum и KumirValue
+        current_scope[name_lower] = VariableRecord(name, kumir_type, final_value_obj, False,
+                                                   initialized, line_index, column_index)
 
     def declare_array(self, var_name: str, element_kumir_type: KumirType,
                       dimensions: List[Tuple[int, int]],
@@ -170,15 +361,15 @@ class ScopeManager:
             ctx=dummy_ctx
         )
 
-        current_scope[name_lower] = {
-            'name_original': var_name,
-            'kumir_type': element_kumir_type, # Храним KumirType enum базового типа элементов
-            'value': table_value,             # Храним экземпляр KumirTableVar
-            'is_table': True,
-            'initialized': True, 
-            'line_declared': line_index,
-            'col_declared': column_index
-        }
+        current_scope[name_lower] = VariableRecord(
+            name_original=var_name,
+            kumir_type=element_kumir_type,  # Храним KumirType enum базового типа элементов
+            value=table_value,              # Храним экземпляр KumirTableVar
+            is_table=True,
+            initialized=True,
+            line_declared=line_index,
+            col_declared=column_index
+        )
 
     def find_variable(self, var_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
         """Ищет переменную во всех областях видимости, начиная с текущей. Возвращает (var_info, scope) или (None, None)."""
@@ -201,35 +392,34 @@ class ScopeManager:
         return None
 
     def update_variable(self, var_name: str, value_to_assign: KumirValue,
-                        line_index: int, column_index: int) -> None:
+                        line_index: int, column_index: int,
+                        name_ctx: Optional[ParserRuleContext] = None) -> None:
         """Обновляет значение существующей переменной (простой или целой таблицы)."""
-        var_info, scope = self.find_variable(var_name)
+        var_info = self.resolve_variable(var_name, name_ctx)
         
-        if not var_info or scope is None:
+        if not var_info:
             l_content = self.get_line_content_from_coords(line_index)
             raise KumirNameError(
                 f"Переменная '{var_name}' не найдена для обновления.",
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
 
-        var_name_lower = var_info['name_original'].lower() 
-
-        if var_info['is_table']:
+        if var_info.is_table:
             if not (value_to_assign.kumir_type == KumirType.TABLE.value and isinstance(value_to_assign.value, KumirTableVar)):
                 l_content = self.get_line_content_from_coords(line_index)
                 raise KumirTypeError(
-                    f"Попытка присвоить не-табличное значение таблице '{var_info['name_original']}'. "
+                    f"Попытка присвоить не-табличное значение таблице '{var_info.name_original}'. "
                     f"Получен тип {value_to_assign.kumir_type}.",
                     line_index=line_index, column_index=column_index, line_content=l_content
                 )
             
             table_to_assign: KumirTableVar = value_to_assign.value
-            current_table: KumirTableVar = var_info['value']
+            current_table: KumirTableVar = var_info.value
 
             if current_table.element_kumir_type != table_to_assign.element_kumir_type:
                 l_content = self.get_line_content_from_coords(line_index)
                 raise KumirTypeError(
-                    f"Несовместимые типы элементов таблиц при присваивании \'{var_info['name_original']}\'. "
+                    f"Несовместимые типы элементов таблиц при присваивании \'{var_info.name_original}\'. "
                     f"Ожидался {current_table.element_kumir_type}, получен {table_to_assign.element_kumir_type}.",
                     line_index=line_index, column_index=column_index, line_content=l_content
                 )
@@ -238,36 +428,36 @@ class ScopeManager:
                 current_table.dimension_bounds_list != table_to_assign.dimension_bounds_list):
                 l_content = self.get_line_content_from_coords(line_index)
                 raise KumirIndexError( 
-                    f"Несовместимые размерности таблиц при присваивании \'{var_info['name_original']}\'.",
+                    f"Несовместимые размерности таблиц при присваивании \'{var_info.name_original}\'.",
                     line_index=line_index, column_index=column_index, line_content=l_content
                 )
               # Проводим присваивание таблицы
             # Заменяем содержимое текущей таблицы содержимым новой таблицы
-            current_table.data.clear()  # Очищаем старые данные
-            current_table.data.update(table_to_assign.data)  # Копируем новые данные
-            scope[var_name_lower]['initialized'] = True
+            current_table.copy_from(table_to_assign)
+            var_info.initialized = True
         else:
             # Простая переменная
-            target_kumir_type: KumirType = var_info['kumir_type'] # Это KumirType enum
+            target_kumir_type: KumirType = var_info.kumir_type # Это KumirType enum
             
             if value_to_assign.kumir_type == target_kumir_type.value:
-                scope[var_name_lower]['value'] = value_to_assign
+                var_info.value = value_to_assign
             elif target_kumir_type == KumirType.REAL and value_to_assign.kumir_type == KumirType.INT.value:
                 converted_value = KumirValue(float(value_to_assign.value), KumirType.REAL.value)
-                scope[var_name_lower]['value'] = converted_value
+                var_info.value = converted_value
             else:
                 l_content = self.get_line_content_from_coords(line_index)
                 raise KumirTypeError(
-                    f"Несовместимость типов при присваивании переменной '{var_info['name_original']}'. "
+                    f"Несовместимость типов при присваивании переменной '{var_info.name_original}'. "
                     f"Ожидался тип {target_kumir_type.name}, получен {value_to_assign.kumir_type}.",
                     line_index=line_index, column_index=column_index, line_content=l_content
                 )
-            scope[var_name_lower]['initialized'] = True
+            var_info.initialized = True
         
     def update_table_element(self, var_name: str, indices: List[int], value_to_assign: KumirValue,
-                               line_index: int, column_index: int) -> None:
+                               line_index: int, column_index: int,
+                               name_ctx: Optional[ParserRuleContext] = None) -> None:
         """Обновляет значение элемента таблицы."""
-        var_info, _ = self.find_variable(var_name) 
+        var_info = self.resolve_variable(var_name, name_ctx)
 
         if not var_info:
             l_content = self.get_line_content_from_coords(line_index)
@@ -276,20 +466,24 @@ class ScopeManager:
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
 
-        if not var_info['is_table'] or not isinstance(var_info['value'], KumirTableVar):
+        if not var_info.is_table or not isinstance(var_info.value, KumirTableVar):
             l_content = self.get_line_content_from_coords(line_index)
             raise KumirTypeError(
-                f"Переменная '{var_info['name_original']}' не является таблицей.",
+                f"Переменная '{var_info.name_original}' не является таблицей.",
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
 
-        table_var: KumirTableVar = var_info['value']
+        self.set_table_element(var_info.value, indices, value_to_assign, line_index, column_index)
+        var_info.initialized = True
+
+    def set_table_element(self, table_var: KumirTableVar, indices: List[int], value_to_assign: KumirValue,
+                          line_index: int, column_index: int) -> None:
+        """Записывает элемент таблицы; ошибка получает позицию и текст строки оператора."""
         # line_index 0-based, ctx.start.line 1-based
         # column_index 0-based, ctx.start.column 0-based
         dummy_access_ctx = DummyCtx(line_index + 1, column_index)
         try:
             table_var.set_value(tuple(indices), value_to_assign, dummy_access_ctx)
-            var_info['initialized'] = True 
         except (KumirTypeError, KumirIndexError, KumirEvalError) as e:
             # Перезаписываем информацию о позиции, если она не была установлена в KumirTableVar
             # или если мы хотим использовать позицию операции присваивания элемента.
@@ -302,10 +496,11 @@ class ScopeManager:
     def get_variable_info(self, var_name: str,
                           line_index: Optional[int] = None,
                           column_index: Optional[int] = None,
-                          is_read_operation: bool = False) -> Dict[str, Any]:
+                          is_read_operation: bool = False,
+                          name_ctx: Optional[ParserRuleContext] = None) -> Dict[str, Any]:
         """Ищет переменную и возвращает её информацию. 
         Возбуждает KumirNameError если не найдена, или KumirEvalError если не инициализирована (при is_read_operation=True)."""
-        var_info, _ = self.find_variable(var_name)
+        var_info = self.resolve_variable(var_name, name_ctx)
         if var_info is None:
             l_content = self.get_line_content_from_coords(line_index) if line_index is not None else None
             raise KumirNameError(
@@ -313,10 +508,10 @@ class ScopeManager:
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
         
-        if is_read_operation and not var_info['is_table'] and not var_info['initialized']:
+        if is_read_operation and not var_info.is_table and not var_info.initialized:
             l_content = self.get_line_content_from_coords(line_index) if line_index is not None else None
             raise KumirEvalError(
-                f"Переменная '{var_info['name_original']}' используется до инициализации.",
+                f"Переменная '{var_info.name_original}' используется до инициализации.",
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
         return var_info
@@ -342,12 +537,12 @@ class ScopeManager:
             )
 
         # Проверяем, что это действительно строка
-        if (var_info['is_table'] or 
-            not isinstance(var_info['value'], KumirValue) or 
-            var_info['value'].kumir_type != KumirType.STR.value):
+        if (var_info.is_table or 
+            not isinstance(var_info.value, KumirValue) or 
+            var_info.value.kumir_type != KumirType.STR.value):
             l_content = self.get_line_content_from_coords(line_index)
             raise KumirTypeError(
-                f"Переменная '{var_info['name_original']}' не является строкой.",
+                f"Переменная '{var_info.name_original}' не является строкой.",
                 line_index=line_index, column_index=column_index, line_content=l_content
             )
 
@@ -360,7 +555,7 @@ class ScopeManager:
             )
 
         # Получаем текущую строку
-        current_string = var_info['value'].value
+        current_string = var_info.value.value
         if not isinstance(current_string, str):
             l_content = self.get_line_content_from_coords(line_index)
             raise KumirTypeError(
@@ -393,5 +588,5 @@ class ScopeManager:
         new_string = current_string[:py_index] + char_to_assign + current_string[py_index + 1:]
         
         # Обновляем значение переменной
-        var_info['value'] = KumirValue(value=new_string, kumir_type=KumirType.STR.value)
-        var_info['initialized'] = True
\ No newline at end of file
+        var_info.value = KumirValue(value=new_string, kumir_type=KumirType.STR.value)
+        var_info.initialized = True
\ No newline at end of file
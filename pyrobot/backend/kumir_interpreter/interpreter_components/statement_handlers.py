@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, cast, Optional, List, Dict, Any
+from typing import TYPE_CHECKING, cast, Optional, List, Dict, Any, Tuple
 from pyrobot.backend.kumir_interpreter.kumir_exceptions import (
     KumirRuntimeError, KumirNameError, KumirSyntaxError,
     KumirTypeError, KumirArgumentError, BreakSignal, ContinueSignal, StopExecutionSignal, ExitSignal,
@@ -205,7 +205,7 @@ class StatementHandlerMixin(KumirParserVisitor):
 
                     # Проверяем, является ли переменная строкой
                     try:
-                        var_info = kiv_self.scope_manager.get_variable_info(var_name)
+                        var_info = kiv_self.scope_manager.get_variable_info(var_name, name_ctx=var_name_node)
                         if (not var_info['is_table'] and 
                             isinstance(var_info['value'], KumirValue) and 
                             var_info['value'].kumir_type == KumirType.STR.value):
@@ -230,7 +230,8 @@ class StatementHandlerMixin(KumirParserVisitor):
                                 indices,
                                 value_to_assign,
                                 line_index=lvalue_ctx.start.line -1,
-                                column_index=lvalue_ctx.start.column
+                                column_index=lvalue_ctx.start.column,
+                                name_ctx=var_name_node
                             )
                     except KumirNameError:
                         # Переменная не найдена - пытаемся обработать как таблицу
@@ -246,7 +247,8 @@ class StatementHandlerMixin(KumirParserVisitor):
                         var_name,
                         value_to_assign,
                         line_index=lvalue_ctx.start.line -1,
-                        column_index=lvalue_ctx.start.column
+                        column_index=lvalue_ctx.start.column,
+                        name_ctx=var_name_node
                     )
             else:
                 raise KumirSyntaxError(
@@ -374,41 +376,11 @@ class StatementHandlerMixin(KumirParserVisitor):
                     continue
                 
                 if arg_ctx.expression():
-                    # For INPUT, we need to get the lvalue to assign to
-                    # This is a bit tricky since we're expecting the expression to be an lvalue
-                    # Но пока просто поддержим ввод в простые переменные
-                    expressions = arg_ctx.expression()
-                    if expressions:
-                        # Берём первое выражение (основное значение для ввода)
-                        expr_ctx = expressions[0]
-                        
-                        # Try to extract variable info from the expression
-                        # Check if this is an array element access (e.g., A[i])
-                        postfix_expr = self._extract_postfix_expression(expr_ctx)
-                        
-                        # Debug: проверим что у нас есть
-                        if '[' in expr_ctx.getText() and ']' in expr_ctx.getText():
-                            # Если в тексте есть скобки массива, это должно быть обращение к массиву
-                            is_array_element = True
-                            target_var_name = expr_ctx.getText().split('[')[0]
-                        elif postfix_expr and self._has_array_access(postfix_expr):
-                            # This is array element access
-                            primary_expr = postfix_expr.primaryExpression()
-                            if primary_expr and primary_expr.qualifiedIdentifier():
-                                target_var_name = primary_expr.qualifiedIdentifier().getText()
-                                is_array_element = True
-                            else:
-                                target_var_name = expr_ctx.getText()
-                        else:
-                            # Simple variable
-                            target_var_name = expr_ctx.getText()
-                            # Clean up potential array notation for error messages
-                            if '[' in target_var_name and ']' in target_var_name:
-                                target_var_name = target_var_name.split('[')[0]
-                    else:
-                        raise KumirSyntaxError("Не найдено выражение для ввода", 
-                                               line_index=arg_ctx.start.line - 1, 
-                                               column_index=arg_ctx.start.column)
+                    # Цель ввода (имя переменной, элемент ли таблицы) разбирается один раз для узла
+                    target = kiv_self._input_targets.get(arg_ctx)
+                    if target is None:
+                        target = kiv_self._input_targets[arg_ctx] = self._input_target(arg_ctx)
+                    target_var_name, is_array_element, expr_ctx, postfix_expr = target
 
                     try:
                         var_info = kiv_self.scope_manager.get_variable_info(target_var_name)
@@ -420,9 +392,14 @@ class StatementHandlerMixin(KumirParserVisitor):
                                              line_index=arg_ctx.start.line -1,
                                              column_index=arg_ctx.start.column)
 
-                    input_str = kiv_self.io_handler.get_input_line("")
+                    # Для элемента таблицы читаем значение типа её элементов
+                    input_type = target_type
+                    if is_array_element and isinstance(var_info['value'], KumirTableVar):
+                        input_type = var_info['value'].element_kumir_type
 
                     try:
+                        input_value = kiv_self.io_handler.read_value(target_var_name, input_type)
+                        input_str = kiv_self.io_handler.last_input
                         if is_array_element:
                             # Ввод в элемент массива
                             # Используем уже извлеченное выражение из expr_ctx, а не arg_ctx
@@ -502,24 +479,9 @@ class StatementHandlerMixin(KumirParserVisitor):
                             
                             # Определяем тип элементов и конвертируем введенную строку
                             element_type_str = table_var.element_kumir_type
-                            if element_type_str == KumirType.INT.value:
-                                converted_value = KumirValue(int(input_str), KumirType.INT.value)
-                            elif element_type_str == KumirType.REAL.value:
-                                converted_value = KumirValue(float(input_str.replace(',', '.')), KumirType.REAL.value)
-                            elif element_type_str == KumirType.BOOL.value:
-                                if input_str.lower() in ["истина", "true", "1"]:
-                                    converted_value = KumirValue(True, KumirType.BOOL.value)
-                                elif input_str.lower() in ["ложь", "false", "0"]:
-                                    converted_value = KumirValue(False, KumirType.BOOL.value)
-                                else:
-                                    raise ValueError("Для лог типа ожидалось 'истина' или 'ложь'.")
-                            elif element_type_str == KumirType.CHAR.value:
-                                if len(input_str) == 1:
-                                    converted_value = KumirValue(input_str, KumirType.CHAR.value)
-                                else:
-                                    raise ValueError("Для лит типа ожидался один символ.")
-                            elif element_type_str == KumirType.STR.value:
-                                converted_value = KumirValue(input_str, KumirType.STR.value)
+                            if element_type_str in (KumirType.INT.value, KumirType.REAL.value, KumirType.BOOL.value,
+                                                    KumirType.CHAR.value, KumirType.STR.value):
+                                converted_value = KumirValue(input_value, element_type_str)
                             else:
                                 raise KumirTypeError(f"Ввод для элементов массива типа {element_type_str} не поддерживается.")
                             
@@ -534,24 +496,8 @@ class StatementHandlerMixin(KumirParserVisitor):
                             kiv_self.io_handler.write_output(input_str)
                             
                         else: # Ввод в простую переменную
-                            if target_type == KumirType.INT:
-                                converted_value = KumirValue(int(input_str), KumirType.INT.value)
-                            elif target_type == KumirType.REAL:
-                                converted_value = KumirValue(float(input_str.replace(',', '.')), KumirType.REAL.value)
-                            elif target_type == KumirType.BOOL:
-                                if input_str.lower() in ["истина", "true", "1"]:
-                                    converted_value = KumirValue(True, KumirType.BOOL.value)
-                                elif input_str.lower() in ["ложь", "false", "0"]:
-                                    converted_value = KumirValue(False, KumirType.BOOL.value)
-                                else:
-                                    raise ValueError("Для лог типа ожидалось 'истина' или 'ложь'.")
-                            elif target_type == KumirType.CHAR:
-                                if len(input_str) == 1:
-                                    converted_value = KumirValue(input_str, KumirType.CHAR.value)
-                                else:
-                                    raise ValueError("Для лит типа ожидался один символ.")
-                            elif target_type == KumirType.STR:
-                                converted_value = KumirValue(input_str, KumirType.STR.value)
+                            if target_type in (KumirType.INT, KumirType.REAL, KumirType.BOOL, KumirType.CHAR, KumirType.STR):
+                                converted_value = KumirValue(input_value, target_type.value)
                             else:
                                 raise KumirTypeError(f"Ввод для переменной типа {target_type} не поддерживается.")
                             
@@ -578,7 +524,7 @@ class StatementHandlerMixin(KumirParserVisitor):
                             echo_values.append(echo_text)
 
                     except ValueError as e:
-                        raise KumirTypeError(f"Ошибка преобразования ввода для '{target_var_name}': {input_str}. {e}",
+                        raise KumirTypeError(f"Ошибка преобразования ввода для '{target_var_name}': {kiv_self.io_handler.last_input}. {e}",
                                              line_index=arg_ctx.start.line -1,
                                              column_index=arg_ctx.start.column)
                 else:
@@ -591,6 +537,35 @@ class StatementHandlerMixin(KumirParserVisitor):
             kiv_self.io_handler.write_output(echo_line)
         return None
 
+    def _input_target(self, arg_ctx) -> Tuple[str, bool, Any, Any]:
+        """Имя переменной для ВВОД, признак элемента таблицы, выражение и его postfixExpression."""
+        expressions = arg_ctx.expression()
+        if not expressions:
+            raise KumirSyntaxError("Не найдено выражение для ввода",
+                                   line_index=arg_ctx.start.line - 1,
+                                   column_index=arg_ctx.start.column)
+        # Берём первое выражение (основное значение для ввода)
+        expr_ctx = expressions[0]
+        # Check if this is an array element access (e.g., A[i])
+        postfix_expr = self._extract_postfix_expression(expr_ctx)
+        expr_text = expr_ctx.getText()
+        is_array_element = False
+        if '[' in expr_text and ']' in expr_text:
+            # Если в тексте есть скобки массива, это должно быть обращение к массиву
+            is_array_element = True
+            target_var_name = expr_text.split('[')[0]
+        elif postfix_expr and self._has_array_access(postfix_expr):
+            primary_expr = postfix_expr.primaryExpression()
+            if primary_expr and primary_expr.qualifiedIdentifier():
+                target_var_name = primary_expr.qualifiedIdentifier().getText()
+                is_array_element = True
+            else:
+                target_var_name = expr_text
+        else:
+            # Simple variable
+            target_var_name = expr_text
+        return target_var_name, is_array_element, expr_ctx, postfix_expr
+
     def visitIfStatement(self, ctx: KumirParser.IfStatementContext) -> None:
         kiv_self = cast('KumirInterpreterVisitor', self)
         condition_val = kiv_self.expression_evaluator.visit(ctx.expression())
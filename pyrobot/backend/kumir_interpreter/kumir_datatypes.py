@@ -1,3 +1,4 @@
+from array import array
 from typing import Any, List, Optional
 from .kumir_exceptions import KumirEvalError, KumirTypeError 
 from enum import Enum
@@ -51,14 +52,67 @@ class KumirType(Enum):
         # This part might need adjustment based on how type strings are generated/used.
         return KumirType.UNKNOWN
 
+# Малые целые метки типов значений (KumirValue.kumir_type -> метка): по ним
+# выбираются реализации операций (interpreter_components/operator_dispatch.py)
+TAG_INT, TAG_REAL, TAG_BOOL, TAG_STR, TAG_CHAR, TAG_OTHER = range(6)
+TAG_COUNT = 6
+TYPE_TAGS = {
+    KumirType.INT.value: TAG_INT,
+    KumirType.REAL.value: TAG_REAL,
+    KumirType.BOOL.value: TAG_BOOL,
+    KumirType.STR.value: TAG_STR,
+    KumirType.CHAR.value: TAG_CHAR,
+}
+# Тип значения по метке (у TAG_OTHER своего типа нет)
+TAG_TYPES = (KumirType.INT.value, KumirType.REAL.value, KumirType.BOOL.value,
+             KumirType.STR.value, KumirType.CHAR.value, None)
+
+
+def type_tag(kumir_type: Optional[str]) -> int:
+    """Метка типа значения; таблицы, цвет и прочие типы - TAG_OTHER."""
+    return TYPE_TAGS.get(kumir_type, TAG_OTHER)
+
+
+# Диапазон целых, для которых KumirValue создаётся заранее (как кэш малых int в CPython)
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+
+
 class KumirValue:
     """
     Represents a value in the Kumir language, encapsulating both the
     Python-level value and its Kumir type.
+
+    Значения неизменяемы, поэтому часто встречающиеся из них (да/нет, малые
+    целые, пустая строка) создаются один раз и переиспользуются: конструктор
+    возвращает готовый экземпляр вместо нового.
     """
-    def __init__(self, value: Any, kumir_type: str): # kumir_type должен быть строкой, например, KumirType.INT.value
-        self.value: Any = value
-        self.kumir_type: str = kumir_type 
+    __slots__ = ('value', 'kumir_type')
+
+    def __new__(cls, value: Any = None, kumir_type: Optional[str] = None): # kumir_type должен быть строкой, например, KumirType.INT.value
+        value_type = type(value)
+        if value_type is int:
+            if SMALL_INT_MIN <= value <= SMALL_INT_MAX and kumir_type == _INT and cls is KumirValue:
+                return _SMALL_INTS[value - SMALL_INT_MIN]
+        elif value_type is bool:
+            if kumir_type == _BOOL and cls is KumirValue:
+                return _TRUE if value else _FALSE
+        elif value_type is str:
+            if not value and kumir_type == _STR and cls is KumirValue:
+                return _EMPTY_STR
+        instance = _object_new(cls)
+        _set_value(instance, value)
+        _set_kumir_type(instance, kumir_type)
+        return instance
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"KumirValue неизменяем: нельзя присвоить атрибут '{name}'")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"KumirValue неизменяем: нельзя удалить атрибут '{name}'")
+
+    def __reduce__(self):
+        return (self.__class__, (self.value, self.kumir_type))
 
     def __repr__(self) -> str:
         return f"KumirValue(value={self.value!r}, kumir_type='{self.kumir_type}')"
@@ -85,7 +139,51 @@ class KumirValue:
         # но пока что просто str(). Это может потребовать доработки для точного соответствия.
         return str(self.value)
 
+_INT = KumirType.INT.value
+_BOOL = KumirType.BOOL.value
+_STR = KumirType.STR.value
+_object_new = object.__new__
+_set_value = KumirValue.value.__set__
+_set_kumir_type = KumirValue.kumir_type.__set__
+
+
+def _make_value(cls, value: Any, kumir_type: Optional[str]) -> KumirValue:
+    """Создаёт новый экземпляр в обход кэша и запрета на присваивание."""
+    instance = object.__new__(cls)
+    _set_value(instance, value)
+    _set_kumir_type(instance, kumir_type)
+    return instance
+
+
+_SMALL_INTS = tuple(_make_value(KumirValue, i, _INT) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1))
+_TRUE = KUMIR_TRUE = _make_value(KumirValue, True, _BOOL)
+_FALSE = KUMIR_FALSE = _make_value(KumirValue, False, _BOOL)
+_EMPTY_STR = KUMIR_EMPTY_STR = _make_value(KumirValue, "", _STR)
+
+
+# Плотное хранение таблиц: коды типов array.array для элементов ЦЕЛ, ВЕЩ и ЛОГ
+_DENSE_TYPECODES = {
+    KumirType.INT.value: 'q',
+    KumirType.REAL.value: 'd',
+    KumirType.BOOL.value: 'B',
+}
+# Таблицы большего размера хранятся разреженно (словарём), чтобы объявление
+# вроде "цел таб а[1:1000000000]" не выделяло память под все элементы сразу
+DENSE_MAX_ELEMENTS = 1 << 22
+
+
 class KumirTableVar:
+    """
+    Таблица КуМира.
+
+    Таблицы с элементами ЦЕЛ, ВЕЩ и ЛОГ хранятся плотно: значения лежат
+    в array.array (8 байт на элемент для ЦЕЛ и ВЕЩ, 1 байт для ЛОГ), адрес
+    элемента вычисляется по заранее посчитанным шагам (strides), а признак
+    инициализации хранится в отдельной битовой карте (bytearray). Остальные
+    таблицы (и слишком большие) хранят KumirValue в словаре data с ключами —
+    кортежами индексов. Снаружи оба режима одинаковы: get_value/set_value.
+    """
+
     def __init__(self, element_kumir_type: str, dimension_bounds_list: List[tuple[int, int]], ctx: Any):
         # element_kumir_type: 'ЦЕЛ', 'ВЕЩ', 'ЛИТ', 'ЛОГ' (нормализованный)
         # dimension_bounds_list: список кортежей, например, [(-5, 5), (1, 10)] для 2D
@@ -96,7 +194,6 @@ class KumirTableVar:
         self.dimension_bounds_list: List[tuple[int, int]] = dimension_bounds_list # Добавлен type hint
         self.dimensions: int = len(dimension_bounds_list) # Добавлен type hint
         self.declaration_ctx = ctx # Сохраняем контекст для возможных ошибок
-        self.data = {}  # Хранит актуальные данные, ключи - кортежи индексов
 
         for i, (min_idx, max_idx) in enumerate(self.dimension_bounds_list):
             if min_idx > max_idx:
@@ -105,51 +202,93 @@ class KumirTableVar:
                     self.declaration_ctx.start.line, self.declaration_ctx.start.column
                 )
 
-    def _validate_indices(self, indices_tuple, access_ctx):
+        # Шаги по измерениям (построчное, row-major, размещение) и общее число элементов
+        self.strides: List[int] = [0] * self.dimensions
+        size = 1
+        for i in range(self.dimensions - 1, -1, -1):
+            self.strides[i] = size
+            min_idx, max_idx = self.dimension_bounds_list[i]
+            size *= max_idx - min_idx + 1
+        self.size: int = size
+
+        typecode = _DENSE_TYPECODES.get(element_kumir_type)
+        self.data: Optional[dict] = None  # Разреженный режим: ключи - кортежи индексов
+        self.storage: Optional[array] = None
+        self.initialized: Optional[bytearray] = None
+        if typecode is not None and size <= DENSE_MAX_ELEMENTS:
+            self.storage = array(typecode, bytes(array(typecode).itemsize * size))
+            self.initialized = bytearray(size)
+        else:
+            self.data = {}
+
+    @property
+    def is_dense(self) -> bool:
+        return self.storage is not None
+
+    def _error_position(self, access_ctx):
+        if access_ctx is not None and hasattr(access_ctx, 'start'):
+            return access_ctx.start.line, access_ctx.start.column
+        return None, None
+
+    def _validate_indices(self, indices_tuple, access_ctx) -> int:
+        """Проверяет индексы и возвращает смещение элемента в плотном хранилище."""
         # access_ctx: контекст доступа к элементу для информации об ошибках
         if not isinstance(indices_tuple, tuple):
             raise KumirEvalError(
                 "Внутренняя ошибка: индексы таблицы должны быть кортежем.",
-                access_ctx.start.line, access_ctx.start.column
+                *self._error_position(access_ctx)
             )
 
         if len(indices_tuple) != self.dimensions:
             raise KumirEvalError(
                 f"Неверное количество индексов для таблицы. Ожидается {self.dimensions}, получено {len(indices_tuple)}.",
-                access_ctx.start.line, access_ctx.start.column
+                *self._error_position(access_ctx)
             )
 
+        offset = 0
         for i, index_val in enumerate(indices_tuple):
             if not isinstance(index_val, int):
                 raise KumirEvalError(
                     f"Индекс для измерения {i+1} должен быть целым числом. Получено: '{index_val}' (тип: {type(index_val).__name__}).",
-                    access_ctx.start.line, access_ctx.start.column
+                    *self._error_position(access_ctx)
                 )
             
             min_bound, max_bound = self.dimension_bounds_list[i]
             if not (min_bound <= index_val <= max_bound):
                 raise KumirEvalError(
                     f"Индекс [{index_val}] вне допустимых границ [{min_bound}:{max_bound}] для измерения {i+1}.",
-                    access_ctx.start.line, access_ctx.start.column
+                    *self._error_position(access_ctx)
                 )
-        return True
+            offset += (index_val - min_bound) * self.strides[i]
+        return offset
+
+    def _uninitialized_error(self, indices_tuple, access_ctx) -> KumirEvalError:
+        # Элемент не инициализирован. В Кумире это ошибка при чтении.
+        # В некоторых реализациях может быть значение по умолчанию, но стандарт требует инициализации.
+        pos = self._error_position(access_ctx)
+        return KumirEvalError(
+            f"Попытка чтения неинициализированного элемента таблицы по индексам {indices_tuple}.",
+            line_index=pos[0], column_index=pos[1]
+        )
 
     def get_value(self, indices_tuple, access_ctx) -> KumirValue: # Добавляем type hint для возвращаемого значения
-        self._validate_indices(indices_tuple, access_ctx)
+        offset = self._validate_indices(indices_tuple, access_ctx)
         
+        if self.storage is not None:
+            if not self.initialized[offset]:
+                raise self._uninitialized_error(indices_tuple, access_ctx)
+            raw = self.storage[offset]
+            if self.element_kumir_type == KumirType.BOOL.value:
+                raw = bool(raw)
+            return KumirValue(raw, self.element_kumir_type)
+
         if indices_tuple not in self.data:
-            # Элемент не инициализирован. В Кумире это ошибка при чтении.
-            # В некоторых реализациях может быть значение по умолчанию, но стандарт требует инициализации.
-            pos = (access_ctx.start.line, access_ctx.start.column) if access_ctx and hasattr(access_ctx, 'start') else (None, None)
-            raise KumirEvalError(
-                f"Попытка чтения неинициализированного элемента таблицы по индексам {indices_tuple}.",
-                line_index=pos[0], column_index=pos[1]
-            )
+            raise self._uninitialized_error(indices_tuple, access_ctx)
         # Ожидаем, что в self.data уже хранится KumirValue благодаря set_value
         return self.data[indices_tuple]
 
     def set_value(self, indices_tuple, value: Any, access_ctx: Any):
-        self._validate_indices(indices_tuple, access_ctx)
+        offset = self._validate_indices(indices_tuple, access_ctx)
         
         final_value_to_store: KumirValue
         pos_line = access_ctx.start.line if access_ctx and hasattr(access_ctx, 'start') else None
@@ -194,7 +333,75 @@ class KumirTableVar:
                 # TODO: Рассмотреть, как обрабатывать более сложные типы, если они появятся для элементов таблиц
                 raise KumirTypeError(f"Неподдерживаемый тип элемента таблицы для присваивания Python-значения: '{target_kumir_type_str}'.", line_index=pos_line, column_index=pos_col)
 
-        self.data[indices_tuple] = final_value_to_store
+        self._store(indices_tuple, offset, final_value_to_store.value)
+
+    def _store(self, indices_tuple, offset: int, raw: Any) -> None:
+        """Записывает уже проверенное значение типа элемента таблицы."""
+        if self.storage is not None:
+            try:
+                self.storage[offset] = raw
+                self.initialized[offset] = 1
+                return
+            except OverflowError:
+                # Целое не помещается в 64 бита: переходим на разреженное хранение
+                self._make_sparse()
+        self.data[indices_tuple] = KumirValue(raw, self.element_kumir_type)
+
+    def _make_sparse(self) -> None:
+        self.data = dict(self.items())
+        self.storage = None
+        self.initialized = None
+
+    def get_raw(self, indices_tuple) -> Any:
+        """
+        Значение элемента без обёртки KumirValue (для скомпилированного кода).
+        Ошибки те же, что у get_value, но без позиции в исходном тексте.
+        """
+        offset = self._validate_indices(indices_tuple, None)
+        if self.storage is not None:
+            if not self.initialized[offset]:
+                raise self._uninitialized_error(indices_tuple, None)
+            raw = self.storage[offset]
+            return bool(raw) if self.element_kumir_type == KumirType.BOOL.value else raw
+        if indices_tuple not in self.data:
+            raise self._uninitialized_error(indices_tuple, None)
+        return self.data[indices_tuple].value
+
+    def set_raw(self, indices_tuple, raw: Any) -> None:
+        """Записывает значение, уже приведённое к типу элемента (для скомпилированного кода)."""
+        self._store(indices_tuple, self._validate_indices(indices_tuple, None), raw)
+
+    def items(self):
+        """Инициализированные элементы: пары (кортеж индексов, KumirValue)."""
+        if self.storage is None:
+            yield from self.data.items()
+            return
+        is_bool = self.element_kumir_type == KumirType.BOOL.value
+        for offset, flag in enumerate(self.initialized):
+            if not flag:
+                continue
+            indices = []
+            rest = offset
+            for (min_idx, _), stride in zip(self.dimension_bounds_list, self.strides):
+                indices.append(min_idx + rest // stride)
+                rest %= stride
+            raw = self.storage[offset]
+            yield tuple(indices), KumirValue(bool(raw) if is_bool else raw, self.element_kumir_type)
+
+    def copy_from(self, other: 'KumirTableVar') -> None:
+        """Заменяет содержимое таблицы содержимым другой таблицы тех же размеров и типа."""
+        if self.storage is not None and other.storage is not None and self.storage.typecode == other.storage.typecode:
+            self.storage[:] = other.storage
+            self.initialized[:] = other.initialized
+            return
+        if self.storage is not None:
+            self.storage = array(self.storage.typecode, bytes(self.storage.itemsize * self.size))
+            self.initialized = bytearray(self.size)
+            for indices, value in other.items():
+                self._store(indices, self._validate_indices(indices, None), value.value)
+            return
+        self.data.clear()  # Очищаем старые данные
+        self.data.update(other.items())  # Копируем новые данные
 
 class KumirVariable:
     """
@@ -84,6 +84,16 @@ class KumirEvalError(KumirRuntimeError):
     """Ошибка времени вычисления выражения."""
     pass
 
+# Превышен лимит выполнения (шаги, время) или выполнение отменено
+class KumirLimitExceededError(KumirRuntimeError):
+    """
+    Программа превысила бюджет выполнения или была остановлена.
+    reason: 'steps', 'time', 'cancelled', 'recursion' (глубина рекурсии) или 'memory'.
+    """
+    def __init__(self, message, reason, line_index=None, column_index=None, line_content=None):
+        super().__init__(message, line_index, column_index, line_content)
+        self.reason = reason
+
 class KumirArgumentError(KumirValueError):
     """Ошибка в аргументах функции или процедуры."""
     pass
@@ -0,0 +1,191 @@
+# memoization.py
+"""
+Запоминание результатов чистых пользовательских функций КуМир.
+
+Рекурсивные функции из учебных программ (числа Фибоначчи, сумма цифр, НОД)
+многократно вычисляют одни и те же вызовы. Функция считается чистой, если:
+    - все её параметры - скалярные "арг" (цел, вещ, лог, сим, лит);
+    - в теле нет ввода-вывода, "стоп" и "пауза", файлов;
+    - все имена в теле - её параметры и локальные переменные, встроенные
+      детерминированные функции (PURE_BUILTIN_FUNCTIONS) или чистые
+      пользовательские функции. Любое другое имя (глобальная переменная,
+      команда или датчик робота, процедура, rand) делает функцию нечистой.
+Анализ (find_pure_functions) работает по дереву разбора из
+ProcedureManager.procedures; взаимные вызовы проверяются до неподвижной точки.
+
+Результаты вызовов чистых функций хранятся в ограниченной таблице одного
+запуска (FunctionMemo, вытеснение по LRU). Визитор обращается к таблице через
+подменённый execute_user_function (attach), компилирующий движок - при вызове
+скомпилированной функции (lookup/store, ключ - значения параметров в кадре).
+Включается явно: KumirLanguageInterpreter.interpret(memoize=True); число
+попаданий возвращается в result['memo'].
+"""
+
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from antlr4.tree.Tree import TerminalNode
+
+from .generated.KumirLexer import KumirLexer
+from .generated.KumirParser import KumirParser
+from .interpreter_components.builtin_handlers import BUILTIN_FUNCTIONS
+from .kumir_datatypes import KumirType, KumirValue
+
+DEFAULT_MEMO_MAX_ENTRIES = int(os.environ.get('KUMIR_MEMO_MAX_ENTRIES', 100_000))
+
+# Встроенные функции, результат которых зависит не только от аргументов
+NONDETERMINISTIC_BUILTINS = frozenset({
+    'rand', 'irand', 'rnd', 'irnd', 'случайноецелое', 'случайноевещественное', 'время',
+})
+PURE_BUILTIN_FUNCTIONS = frozenset(set(BUILTIN_FUNCTIONS) - NONDETERMINISTIC_BUILTINS)
+
+_SCALAR_TYPES = frozenset({KumirType.INT, KumirType.REAL, KumirType.BOOL, KumirType.STR, KumirType.CHAR})
+_IMPURE_STATEMENTS = (KumirParser.IoStatementContext, KumirParser.StopStatementContext,
+                      KumirParser.PauseStatementContext)
+
+
+def _walk(ctx):
+    stack = [ctx]
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, TerminalNode) and node.children:
+            stack.extend(node.children)
+
+
+def _scalar_arg_parameters(proc: Dict[str, Any]) -> bool:
+    for param in proc['params'].values():
+        if param.get('mode') != 'арг' or param.get('is_table'):
+            return False
+        try:
+            if KumirType.from_string(param['base_type']) not in _SCALAR_TYPES:
+                return False
+        except (KeyError, AttributeError):
+            return False
+    return True
+
+
+def _called_algorithms(proc: Dict[str, Any], procedures: Dict[str, Any]) -> Optional[Set[str]]:
+    """Пользовательские алгоритмы, вызываемые функцией, или None, если она нечиста сама по себе."""
+    body_ctx = proc.get('body_ctx')
+    if body_ctx is None or not _scalar_arg_parameters(proc):
+        return None
+    nodes = list(_walk(body_ctx))
+    local_names = set(proc['params'])
+    for node in nodes:
+        if isinstance(node, KumirParser.VariableDeclarationContext):
+            local_names.update(item.ID().getText().lower()
+                               for item in node.variableList().variableDeclarationItem())
+    calls: Set[str] = set()
+    for node in nodes:
+        if isinstance(node, _IMPURE_STATEMENTS):
+            return None
+        if not isinstance(node, TerminalNode):
+            continue
+        token_type = node.symbol.type
+        if token_type == KumirLexer.FILE_TYPE:
+            return None
+        if token_type != KumirLexer.ID:
+            continue
+        name = node.getText().lower()
+        if name in local_names or name in PURE_BUILTIN_FUNCTIONS:
+            continue
+        if name in procedures:
+            calls.add(name)
+            continue
+        return None
+    return calls
+
+
+def find_pure_functions(procedures: Dict[str, Any]) -> Set[str]:
+    """Имена (в нижнем регистре) чистых функций из ProcedureManager.procedures."""
+    candidates: Dict[str, Set[str]] = {}
+    for name, proc in procedures.items():
+        if proc.get('is_function'):
+            calls = _called_algorithms(proc, procedures)
+            if calls is not None:
+                candidates[name] = calls
+    changed = True
+    while changed:
+        changed = False
+        for name, calls in list(candidates.items()):
+            if not calls.issubset(candidates):
+                del candidates[name]
+                changed = True
+    return set(candidates)
+
+
+def _memo_key(name: str, args: Iterable[Any]) -> Tuple:
+    return (name,) + tuple((arg.kumir_type, arg.value) if isinstance(arg, KumirValue) else arg
+                           for arg in args)
+
+
+class FunctionMemo:
+    """Таблица результатов чистых функций одного запуска (LRU по числу записей)."""
+
+    # Результат lookup, если вызова нет в таблице
+    MISSING = object()
+
+    def __init__(self, pure_functions: Set[str], max_entries: int = DEFAULT_MEMO_MAX_ENTRIES):
+        self.pure_functions = pure_functions
+        self.max_entries = max_entries
+        self._results: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+
+    def lookup(self, name: str, key: Tuple) -> Any:
+        """Запомненный результат вызова функции name (в нижнем регистре) или MISSING; считает попадания."""
+        results = self._results
+        result = results.get(key, self.MISSING)
+        if result is self.MISSING:
+            self.misses[name] = self.misses.get(name, 0) + 1
+            return result
+        results.move_to_end(key)
+        self.hits[name] = self.hits.get(name, 0) + 1
+        return result
+
+    def store(self, key: Tuple, result: Any) -> None:
+        """Запоминает результат вызова; самая давняя запись вытесняется при переполнении."""
+        results = self._results
+        results[key] = result
+        if len(results) > self.max_entries:
+            results.popitem(last=False)
+            self.evictions += 1
+
+    def attach(self, procedure_manager) -> None:
+        """Подменяет execute_user_function экземпляра: вызовы чистых функций идут через таблицу."""
+        if not self.pure_functions:
+            return
+        execute_user_function = procedure_manager.execute_user_function
+        pure_functions, lookup, store, missing = self.pure_functions, self.lookup, self.store, self.MISSING
+
+        def memoized_user_function(func_name, args, call_site_ctx):
+            name = func_name.lower()
+            if name not in pure_functions:
+                return execute_user_function(func_name, args, call_site_ctx)
+            try:
+                key = _memo_key(name, args)
+                result = lookup(name, key)
+            except TypeError:  # нехешируемый аргумент
+                return execute_user_function(func_name, args, call_site_ctx)
+            if result is not missing:
+                return result
+            result = execute_user_function(func_name, args, call_site_ctx)
+            store(key, result)
+            return result
+
+        procedure_manager.execute_user_function = memoized_user_function
+
+    def report(self) -> Dict[str, Any]:
+        names = sorted(set(self.hits) | set(self.misses))
+        return {
+            'pure_functions': sorted(self.pure_functions),
+            'hits': sum(self.hits.values()),
+            'misses': sum(self.misses.values()),
+            'entries': len(self._results),
+            'evictions': self.evictions,
+            'by_function': {name: {'hits': self.hits.get(name, 0), 'misses': self.misses.get(name, 0)}
+                            for name in names},
+        }
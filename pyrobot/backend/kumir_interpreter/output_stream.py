@@ -0,0 +1,144 @@
+# output_stream.py
+"""
+Буфер вывода программы и потоковая передача вывода порциями (дельтами).
+
+Раньше при каждой записи весь накопленный вывод склеивался заново и целиком
+отправлялся клиенту: программа, печатающая n строк, порождала O(n²) байт.
+Теперь вывод копится в списке фрагментов, а клиенту уходят только новые
+фрагменты с последовательными номерами:
+
+    {'seq': 3, 'offset': 120, 'delta': '...'}
+
+offset — длина вывода (в символах) перед delta. Дельты объединяются по окну
+времени и размера. Клиент, заметивший пропуск номера, запрашивает всё после
+последнего полученного номера (OutputLog.resync).
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .execution_observer import ExecutionObserver
+
+# Окно объединения дельт: не чаще, чем раз в FLUSH_INTERVAL секунд,
+# если только не накопилось FLUSH_SIZE символов
+FLUSH_INTERVAL = 0.05
+FLUSH_SIZE = 4096
+
+
+class OutputBuffer:
+    """Буфер вывода на списке фрагментов; склейка выполняется только при чтении."""
+
+    def __init__(self, text: str = ""):
+        self._chunks: List[str] = [text] if text else []
+        self._length = len(text)
+        self._joined: Optional[str] = text
+
+    def write(self, text: str) -> None:
+        if text:
+            self._chunks.append(text)
+            self._length += len(text)
+            self._joined = None
+
+    def getvalue(self) -> str:
+        if self._joined is None:
+            self._joined = ''.join(self._chunks)
+            self._chunks = [self._joined] if self._joined else []
+        return self._joined
+
+    def text_since(self, offset: int) -> str:
+        return self.getvalue()[offset:]
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class DeltaStreamer(ExecutionObserver):
+    """
+    Объединяет записи в дельты и передаёт их в emit.
+    Как наблюдатель выполнения получает вывод программы через событие output.
+
+    write() отправляет дельту, если окно истекло или накопилось FLUSH_SIZE
+    символов; flush_if_due() можно вызывать периодически (например, из бюджета
+    выполнения), чтобы хвост вывода не задерживался, пока программа считает.
+    flush() в конце выполнения отправляет всё, что осталось.
+    """
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], Any], interval: float = FLUSH_INTERVAL,
+                 max_size: int = FLUSH_SIZE, clock: Callable[[], float] = time.monotonic):
+        self.emit = emit
+        self.interval = interval
+        self.max_size = max_size
+        self.clock = clock
+        self.seq = 0
+        self.offset = 0
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._last_flush = clock()
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self.max_size or self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    on_output = write
+
+    def reset(self, offset: int = 0) -> None:
+        """Вывод начат заново с длины offset: неотправленное отбрасывается, следующая дельта придёт с этим offset."""
+        self._pending = []
+        self._pending_size = 0
+        self.offset = offset
+
+    def flush_if_due(self) -> None:
+        if self._pending and self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = self.clock()
+        if not self._pending:
+            return
+        delta = ''.join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        self.seq += 1
+        self.emit({'seq': self.seq, 'offset': self.offset, 'delta': delta})
+        self.offset += len(delta)
+
+
+class OutputLog:
+    """
+    Вывод, восстановленный из полученных дельт, для повторной отправки клиенту.
+
+    Хранит текст и смещение конца каждой дельты, чтобы ответить на запрос
+    "всё после номера seq".
+    """
+
+    def __init__(self):
+        self.buffer = OutputBuffer()
+        self._ends: List[int] = []  # _ends[i] - длина вывода после дельты с seq = i + 1
+
+    @property
+    def seq(self) -> int:
+        return len(self._ends)
+
+    def append(self, delta_message: Dict[str, Any]) -> None:
+        if delta_message['seq'] != self.seq + 1:
+            return  # Дельты приходят по одному каналу по порядку; повтор игнорируем
+        offset = delta_message['offset']
+        if offset != len(self.buffer):
+            # Вывод начат заново (например, после перезапуска другим движком)
+            self.buffer = OutputBuffer(self.buffer.getvalue()[:offset])
+            self._ends = [min(end, offset) for end in self._ends]
+        self.buffer.write(delta_message['delta'])
+        self._ends.append(len(self.buffer))
+
+    def resync(self, after_seq: int) -> Dict[str, Any]:
+        """Одна дельта со всем выводом после after_seq (0 - с начала)."""
+        after_seq = max(0, min(after_seq, self.seq))
+        offset = self._ends[after_seq - 1] if after_seq else 0
+        return {'seq': self.seq, 'offset': offset, 'delta': self.buffer.text_since(offset), 'resync': True}
+
+    def getvalue(self) -> str:
+        return self.buffer.getvalue()
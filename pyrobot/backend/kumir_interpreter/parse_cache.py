@@ -0,0 +1,154 @@
+# parse_cache.py
+"""
+Кэш деревьев разбора программ КуМир.
+
+Одна и та же программа (например, шаблон задания, который класс отправляет
+десятки раз подряд) всегда даёт одно и то же дерево разбора, поэтому повторно
+гонять лексер и парсер ANTLR не нужно. Кэш общий для процесса, ограничен
+по числу записей (LRU) и по приблизительному объёму памяти.
+
+Дерево разбора визиторами только читается, поэтому один и тот же экземпляр
+безопасно переиспользовать между запусками.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ограничения по умолчанию (можно переопределить через переменные окружения)
+DEFAULT_MAX_ENTRIES = int(os.environ.get('KUMIR_PARSE_CACHE_MAX_ENTRIES', 256))
+DEFAULT_MAX_BYTES = int(os.environ.get('KUMIR_PARSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Грубая оценка памяти, занимаемой деревом разбора, в пересчёте на один токен
+# (объект токена + узлы контекстов ANTLR, которые на него ссылаются).
+ESTIMATED_BYTES_PER_TOKEN = 700
+
+
+def normalize_source(code: str) -> str:
+    """
+    Нормализует исходный код перед хэшированием.
+
+    Приводит переводы строк к '\\n' и убирает хвостовые пробелы в строках.
+    Номера строк и позиции значимых символов при этом не меняются, поэтому
+    сообщения об ошибках остаются корректными.
+    """
+    if code.startswith('\ufeff'):
+        code = code[1:]
+    lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+
+def source_hash(normalized_code: str) -> str:
+    """Возвращает ключ кэша для нормализованного исходного кода."""
+    return hashlib.sha256(normalized_code.encode('utf-8')).hexdigest()
+
+
+def estimate_tree_size(normalized_code: str, tree: Any) -> int:
+    """Приблизительная оценка объёма дерева разбора в байтах."""
+    token_count = 0
+    parser = getattr(tree, 'parser', None)
+    token_stream = getattr(parser, '_input', None) if parser is not None else None
+    tokens = getattr(token_stream, 'tokens', None)
+    if tokens is not None:
+        token_count = len(tokens)
+    if not token_count:
+        # Если поток токенов недоступен, оцениваем по длине исходника
+        token_count = max(1, len(normalized_code) // 4)
+    return len(normalized_code.encode('utf-8')) + token_count * ESTIMATED_BYTES_PER_TOKEN
+
+
+class ParseCache:
+    """
+    Потокобезопасный LRU-кэш деревьев разбора с ограничением по объёму.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_parse(self, code: str, parse_fn: Callable[[str], Any]) -> Any:
+        """
+        Возвращает дерево разбора для кода, при необходимости вызывая parse_fn.
+
+        parse_fn получает нормализованный исходный код. Исключения parse_fn
+        (например, KumirSyntaxError) пробрасываются наружу и в кэш не попадают.
+        """
+        normalized = normalize_source(code)
+        key = source_hash(normalized)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Разбор выполняется вне блокировки, чтобы не задерживать другие запросы
+        tree = parse_fn(normalized)
+        self.put(key, tree, estimate_tree_size(normalized, tree))
+        return tree
+
+    def put(self, key: str, tree: Any, size: int) -> None:
+        """Добавляет дерево в кэш и вытесняет старые записи при переполнении."""
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (tree, size)
+            self._total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+                logger.debug(f"Parse cache eviction, {len(self._entries)} entries left")
+
+    def clear(self) -> None:
+        """Очищает кэш (счётчики сохраняются)."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша для системы мониторинга."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Глобальный (на процесс) экземпляр кэша
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """Возвращает общий для процесса кэш деревьев разбора."""
+    global _parse_cache
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                _parse_cache = ParseCache()
+    return _parse_cache
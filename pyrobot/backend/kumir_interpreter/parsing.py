@@ -0,0 +1,208 @@
+# parsing.py
+"""
+Разбор программ КуМир в два этапа (SLL → LL) и прогрев парсера.
+
+Полный LL-режим предсказания ANTLR медленный, а для корректных программ
+почти всегда достаточно быстрого SLL. Поэтому сначала программа
+разбирается в режиме SLL со стратегией BailErrorStrategy: первая же ошибка
+прерывает разбор. Только тогда поток токенов перематывается и программа
+разбирается заново в полном LL с обычным восстановлением и сообщениями об
+ошибках. Для корректной программы SLL даёт то же дерево, что и LL, а
+сообщения о синтаксических ошибках остаются прежними (их выдаёт LL-проход).
+
+Кэш DFA сгенерированного парсера общий для процесса, но в новом процессе
+пуст, и первые запросы разбираются очень медленно. warm_up() заранее
+разбирает программы из каталогов примеров (kumir_lang/examples,
+tests/polyakov_kum), чтобы рабочий процесс принимал задания с заполненным кэшем.
+
+Время разбора по режимам копится в get_parse_stats() и отдаётся в метриках.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from antlr4 import InputStream, CommonTokenStream
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+from .generated.KumirLexer import KumirLexer
+from .generated.KumirParser import KumirParser
+from .kumir_exceptions import KumirSyntaxError
+
+logger = logging.getLogger(__name__)
+
+MODE_TWO_STAGE = 'two-stage'
+MODE_LL = 'll'
+# 'two-stage' - SLL с откатом на LL, 'll' - сразу полный LL (для сравнения)
+DEFAULT_PARSE_MODE = os.environ.get('KUMIR_PARSE_MODE', MODE_TWO_STAGE)
+
+# Корень репозитория: kumir_interpreter -> backend -> pyrobot -> корень
+_REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_WARMUP_DIRS = [_REPO_ROOT / 'kumir_lang' / 'examples', _REPO_ROOT / 'tests' / 'polyakov_kum']
+WARMUP_ENABLED = os.environ.get('KUMIR_PARSE_WARMUP', '1') not in ('0', 'false', 'no')
+
+
+class DiagnosticErrorListener(ErrorListener):
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        error_msg = f"Синтаксическая ошибка: {msg}"
+        # KumirSyntaxError ожидает line_index (0-based).
+        raise KumirSyntaxError(error_msg, line_index=line - 1, column_index=column)
+
+
+class ParseStats:
+    """Счётчики и суммарное время разбора по режимам (потокобезопасно)."""
+
+    MODES = ('sll', 'll')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._modes = {mode: {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0} for mode in self.MODES}
+            self.fallbacks = 0
+            self.syntax_errors = 0
+            self.warmup = {'files': 0, 'failed': 0, 'seconds': 0.0}
+
+    def record(self, mode: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._modes[mode]
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def record_syntax_error(self) -> None:
+        with self._lock:
+            self.syntax_errors += 1
+
+    def record_warmup(self, files: int, failed: int, seconds: float) -> None:
+        with self._lock:
+            self.warmup['files'] += files
+            self.warmup['failed'] += failed
+            self.warmup['seconds'] += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Статистика для системы мониторинга."""
+        with self._lock:
+            modes = {}
+            for mode, entry in self._modes.items():
+                modes[mode] = dict(entry)
+                modes[mode]['avg_ms'] = entry['seconds'] / entry['count'] * 1000 if entry['count'] else 0.0
+            return {
+                'mode': DEFAULT_PARSE_MODE,
+                'modes': modes,
+                'fallbacks': self.fallbacks,
+                'syntax_errors': self.syntax_errors,
+                'warmup': dict(self.warmup),
+            }
+
+
+def merge_parse_stats(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Складывает снимки ParseStats нескольких процессов в один."""
+    merged = ParseStats().snapshot()
+    for snapshot in snapshots:
+        for mode, entry in snapshot.get('modes', {}).items():
+            target = merged['modes'].setdefault(mode, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            target['count'] += entry['count']
+            target['seconds'] += entry['seconds']
+            target['max_seconds'] = max(target['max_seconds'], entry['max_seconds'])
+        merged['fallbacks'] += snapshot.get('fallbacks', 0)
+        merged['syntax_errors'] += snapshot.get('syntax_errors', 0)
+        for key in merged['warmup']:
+            merged['warmup'][key] += snapshot.get('warmup', {}).get(key, 0)
+    for entry in merged['modes'].values():
+        entry['avg_ms'] = entry['seconds'] / entry['count'] * 1000 if entry['count'] else 0.0
+    return merged
+
+
+_parse_stats = ParseStats()
+
+
+def get_parse_stats() -> Dict[str, Any]:
+    """Статистика разбора в текущем процессе."""
+    return _parse_stats.snapshot()
+
+
+def parse_program(code: str, mode: Optional[str] = None):
+    """
+    Разбирает программу и возвращает дерево (KumirParser.ProgramContext).
+
+    Синтаксические ошибки бросаются как KumirSyntaxError с тем же текстом,
+    что и при обычном LL-разборе.
+    """
+    mode = mode or DEFAULT_PARSE_MODE
+    error_listener = DiagnosticErrorListener()
+    lexer = KumirLexer(InputStream(code))
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(error_listener)
+    token_stream = CommonTokenStream(lexer)
+    parser = KumirParser(token_stream)
+    parser.removeErrorListeners()
+
+    if mode != MODE_LL:
+        # Этап 1: SLL без восстановления после ошибок
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        started = time.perf_counter()
+        try:
+            return parser.program()
+        except ParseCancellationException:
+            _parse_stats.record_fallback()
+        except KumirSyntaxError:
+            _parse_stats.record_syntax_error()  # Ошибка лексера от режима разбора не зависит
+            raise
+        finally:
+            _parse_stats.record('sll', time.perf_counter() - started)
+        token_stream.seek(0)
+        parser.reset()
+
+    # Этап 2 (или единственный): полный LL с обычными сообщениями об ошибках
+    parser._interp.predictionMode = PredictionMode.LL
+    parser._errHandler = DefaultErrorStrategy()
+    parser.addErrorListener(error_listener)
+    started = time.perf_counter()
+    try:
+        return parser.program()
+    except KumirSyntaxError:
+        _parse_stats.record_syntax_error()
+        raise
+    finally:
+        _parse_stats.record('ll', time.perf_counter() - started)
+
+
+def warm_up(directories: Optional[List[Path]] = None) -> Dict[str, Any]:
+    """
+    Разбирает все .kum файлы из каталогов, заполняя кэш DFA парсера.
+
+    Отсутствующие каталоги пропускаются; программы с ошибками считаются, но не мешают прогреву.
+    """
+    if directories is None:
+        env_dirs = os.environ.get('KUMIR_PARSE_WARMUP_DIRS')
+        directories = [Path(d) for d in env_dirs.split(os.pathsep) if d] if env_dirs else DEFAULT_WARMUP_DIRS
+    files = failed = 0
+    started = time.perf_counter()
+    for directory in directories:
+        if not Path(directory).is_dir():
+            logger.debug(f"Parser warm-up: directory {directory} not found, skipped")
+            continue
+        for path in sorted(Path(directory).glob('*.kum')):
+            files += 1
+            try:
+                parse_program(path.read_text(encoding='utf-8'))
+            except Exception:
+                failed += 1
+    seconds = time.perf_counter() - started
+    _parse_stats.record_warmup(files, failed, seconds)
+    logger.info(f"Parser warm-up: {files} programs in {seconds:.2f}s ({failed} with errors)")
+    return {'files': files, 'failed': failed, 'seconds': seconds}
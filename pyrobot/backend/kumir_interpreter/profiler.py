@@ -0,0 +1,122 @@
+# profiler.py
+"""
+Профилировщик программ КуМир: число выполнений и время по строкам и алгоритмам.
+
+Включается явно: KumirLanguageInterpreter.interpret(profile=True). Профилировщик -
+наблюдатель выполнения (execution_observer): он подписан на события операторов
+и алгоритмов, поэтому без него эти точки выполнения не оборачиваются.
+
+Время каждого узла (строки или алгоритма) считается двумя способами:
+    time       - полное время, включая вложенные операторы и вызовы
+                 (при рекурсии учитывается только внешний вход);
+    self_time  - время за вычетом вложенных узлов.
+Отчёт (report) содержит таблицы по строкам и алгоритмам и стеки в "свёрнутом"
+формате flamegraph.pl/speedscope: "главный;вычислить;строка 12 350" —
+стек алгоритмов, строка и собственное время в микросекундах.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .execution_observer import ExecutionObserver
+
+LINE_FRAME = 'строка'
+
+
+class ExecutionProfiler(ExecutionObserver):
+    """Счётчики и время по строкам и алгоритмам одного запуска."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        # ключ -> [выполнений, полное время, собственное время]
+        self.lines: Dict[int, List[float]] = {}
+        self.algorithms: Dict[str, List[float]] = {}
+        self.collapsed: Dict[Tuple[str, ...], float] = {}
+        # Стек активных узлов: [тип, ключ, путь стека, начало, время вложенных]
+        self._stack: List[list] = []
+        self._active: Dict[Tuple[str, Any], int] = {}
+        self._path: Tuple[str, ...] = ()
+
+    # --- Запись ---
+
+    def enter(self, kind: str, key: Any) -> None:
+        if kind == 'algorithm':
+            self._path = self._path + (key,)
+            path = self._path
+        else:
+            path = self._path + (f"{LINE_FRAME} {key}",)
+        self._active[(kind, key)] = self._active.get((kind, key), 0) + 1
+        self._stack.append([kind, key, path, self.clock(), 0.0])
+
+    def exit(self) -> None:
+        kind, key, path, started, children = self._stack.pop()
+        elapsed = self.clock() - started
+        if self._stack:
+            self._stack[-1][4] += elapsed
+        table = self.algorithms if kind == 'algorithm' else self.lines
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        active_key = (kind, key)
+        self._active[active_key] -= 1
+        if not self._active[active_key]:
+            entry[1] += elapsed
+        self_time = elapsed - children
+        entry[2] += self_time
+        self.collapsed[path] = self.collapsed.get(path, 0.0) + self_time
+        if kind == 'algorithm':
+            self._path = self._path[:-1]
+
+    def unwind(self, depth: int) -> None:
+        """Закрывает узлы выше depth (выполнение прервано исключением)."""
+        while len(self._stack) > depth:
+            self.exit()
+
+    # --- События выполнения ---
+
+    def on_statement_start(self, line: int) -> None:
+        self.enter('line', line)
+
+    def on_statement_end(self, line: int) -> None:
+        self.exit()
+
+    def on_algorithm_enter(self, name: str) -> None:
+        self.enter('algorithm', name)
+
+    def on_algorithm_exit(self, name: str) -> None:
+        self.exit()
+
+    # --- Отчёт ---
+
+    def report(self, program_lines: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Таблицы по строкам и алгоритмам (по убыванию собственного времени) и свёрнутые стеки."""
+        self.unwind(0)
+        lines = []
+        for line, (hits, total, self_time) in self.lines.items():
+            entry = {'line': line, 'hits': int(hits), 'time_ms': total * 1000, 'self_time_ms': self_time * 1000}
+            if program_lines and 0 < line <= len(program_lines):
+                entry['source'] = program_lines[line - 1].strip()
+            lines.append(entry)
+        lines.sort(key=lambda entry: entry['self_time_ms'], reverse=True)
+        algorithms = [
+            {'name': name, 'calls': int(calls), 'time_ms': total * 1000, 'self_time_ms': self_time * 1000}
+            for name, (calls, total, self_time) in self.algorithms.items()
+        ]
+        algorithms.sort(key=lambda entry: entry['time_ms'], reverse=True)
+        return {
+            'lines': lines[:limit] if limit else lines,
+            'algorithms': algorithms,
+            'collapsed': self.collapsed_stacks(),
+        }
+
+    def collapsed_stacks(self) -> str:
+        """Стеки в формате flamegraph.pl: "кадр;кадр;... микросекунды" по строке на стек."""
+        return ''.join(
+            f"{';'.join(frame.replace(';', ':') for frame in path)} {round(seconds * 1_000_000)}\n"
+            for path, seconds in sorted(self.collapsed.items())
+            if seconds > 0
+        )
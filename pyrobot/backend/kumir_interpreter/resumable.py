@@ -0,0 +1,299 @@
+# resumable.py
+"""
+Выполнение программы с остановкой на вводе и продолжением с того же места.
+
+Раньше программа, дошедшая до "ввод", завершалась с input_required, и после
+ввода значения её приходилось запускать заново. Теперь интерпретатор
+выполняется в отдельном потоке (ResumableRun): на вводе поток засыпает
+("паркуется") со всем своим состоянием — стеком вызовов, переменными,
+полем робота, трассой и выводом, — а вызывающий получает input_required с
+run_id. resume(run_id, значение) будит поток, и программа продолжается.
+
+Пока программа ждёт ввода, её бюджет времени не расходуется
+(ExecutionBudget.pause/resume). Припаркованные запуски хранятся в
+SuspendedRuns: запуск, простоявший дольше TTL, удаляется, а при нехватке
+памяти (или сверх KUMIR_SUSPENDED_MAX_RUNS) первыми вытесняются самые старые.
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows: лимиты ресурсов недоступны
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUSPENDED_TTL = float(os.environ.get('KUMIR_SUSPENDED_TTL', 300))
+DEFAULT_SUSPENDED_MAX_RUNS = int(os.environ.get('KUMIR_SUSPENDED_MAX_RUNS', 8))
+# Доля RLIMIT_AS процесса и процент занятой памяти системы, после которых припаркованные запуски вытесняются
+DEFAULT_ADDRESS_SPACE_FRACTION = 0.8
+DEFAULT_MAX_MEMORY_PERCENT = float(os.environ.get('KUMIR_SUSPENDED_MAX_MEMORY_PERCENT', 90))
+# Сколько ждать завершения потока вытесненного запуска
+ABANDON_JOIN_TIMEOUT = 1.0
+
+STATE_NEW = 'new'
+STATE_RUNNING = 'running'
+STATE_PARKED = 'parked'
+STATE_FINISHED = 'finished'
+STATE_ABANDONED = 'abandoned'
+
+
+class RunAbandoned(BaseException):
+    # BaseException, чтобы не попасть в "except Exception" внутри интерпретатора
+    pass
+
+
+class ResumableRun:
+    """
+    Запуск KumirLanguageInterpreter, который можно остановить на вводе и продолжить.
+
+    start() и resume() блокируют вызывающего, пока программа не завершится или
+    не дойдёт до следующего ввода, и возвращают словарь результата
+    interpret() или input_required с run_id.
+    """
+
+    def __init__(self, interpreter, run_id: Optional[str] = None):
+        self.interpreter = interpreter
+        self.run_id = run_id or uuid.uuid4().hex
+        interpreter.input_provider = self._await_input
+        self.state = STATE_NEW
+        self.parked_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._request: Optional[Dict[str, Any]] = None
+        self._value: Optional[str] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._error: Optional[BaseException] = None
+        self._progress: Optional[Callable[[Dict[str, Any]], Any]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        with self._cond:
+            if self.state != STATE_NEW:
+                raise RuntimeError("Запуск уже начат")
+            self.state = STATE_RUNNING
+            self._progress = progress_callback
+        self._thread = threading.Thread(target=self._run, name=f'kumir-run-{self.run_id[:8]}', daemon=True)
+        self._thread.start()
+        return self._wait()
+
+    def resume(self, value: str,
+               progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """Продолжает припаркованный запуск строкой value."""
+        with self._cond:
+            if self.state != STATE_PARKED:
+                raise RuntimeError("Запуск не ожидает ввода")
+            self._value = value
+            self._progress = progress_callback
+            self.state = STATE_RUNNING
+            self.parked_at = None
+            self._cond.notify_all()
+        return self._wait()
+
+    def abandon(self, cancel: bool = False, join_timeout: Optional[float] = None) -> bool:
+        """
+        Бросает запуск: припаркованный поток завершается, выполняющийся (при
+        cancel=True) останавливается через флаг отмены интерпретатора.
+        Возвращает True, если поток завершился за join_timeout.
+        """
+        with self._cond:
+            if self.state == STATE_PARKED:
+                self.state = STATE_ABANDONED
+                self._cond.notify_all()
+            elif self.state == STATE_RUNNING and cancel:
+                self.interpreter.stop()
+            self._progress = None
+        if self._thread is not None and join_timeout is not None:
+            self._thread.join(join_timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _emit_progress(self, progress_data: Dict[str, Any]) -> None:
+        callback = self._progress
+        if callback is not None:
+            callback(progress_data)
+
+    def _run(self) -> None:
+        result, error = None, None
+        try:
+            result = self.interpreter.interpret(progress_callback=self._emit_progress)
+        except RunAbandoned:
+            logger.debug(f"Suspended run {self.run_id} abandoned")
+        except BaseException as e:  # MemoryError и т.п. передаются вызывающему
+            error = e
+        with self._cond:
+            if self.state != STATE_ABANDONED:
+                self.state = STATE_FINISHED
+            self._result, self._error = result, error
+            self._cond.notify_all()
+
+    def _await_input(self, request: Dict[str, Any]) -> str:
+        """input_provider интерпретатора: вызывается в потоке выполнения и ждёт resume()."""
+        budget = self.interpreter.budget
+        if budget is not None:
+            budget.pause()
+        with self._cond:
+            self._request = request
+            self.state = STATE_PARKED
+            self.parked_at = time.monotonic()
+            self._cond.notify_all()
+            while self.state == STATE_PARKED:
+                self._cond.wait()
+            if self.state == STATE_ABANDONED:
+                raise RunAbandoned()
+            value, self._value = self._value, None
+        if budget is not None:
+            budget.resume()
+        return value
+
+    def _wait(self) -> Dict[str, Any]:
+        with self._cond:
+            # Ожидание с таймаутом, чтобы сигналы (SIGXCPU) обрабатывались в главном потоке
+            while self.state == STATE_RUNNING:
+                self._cond.wait(0.1)
+            if self.state == STATE_PARKED:
+                self._progress = None
+                return self._input_required()
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+    def _input_required(self) -> Dict[str, Any]:
+        request = self._request or {}
+        return {
+            'success': False,
+            'input_required': True,
+            'run_id': self.run_id,
+            'var_name': request.get('var_name', 'unknown'),
+            'prompt': request.get('prompt', 'Введите значение:'),
+            'target_type': request.get('target_type', 'лит'),
+            'finalState': self.interpreter.get_state(),
+            'trace': []
+        }
+
+
+def _memory_pressure(max_memory_percent: float) -> bool:
+    """Не хватает ли памяти: процесс близок к RLIMIT_AS или занята почти вся память системы."""
+    try:
+        if resource is not None:
+            soft, _ = resource.getrlimit(resource.RLIMIT_AS)
+            if soft != resource.RLIM_INFINITY:
+                if psutil.Process().memory_info().vms > soft * DEFAULT_ADDRESS_SPACE_FRACTION:
+                    return True
+        return psutil.virtual_memory().percent > max_memory_percent
+    except (psutil.Error, OSError) as e:
+        logger.warning(f"Cannot read memory usage: {e}")
+        return False
+
+
+class SuspendedRuns:
+    """Припаркованные запуски по run_id с TTL и вытеснением самых старых при нехватке памяти."""
+
+    def __init__(self, ttl: float = DEFAULT_SUSPENDED_TTL, max_runs: int = DEFAULT_SUSPENDED_MAX_RUNS,
+                 max_memory_percent: float = DEFAULT_MAX_MEMORY_PERCENT):
+        self.ttl = ttl
+        self.max_runs = max_runs
+        self.max_memory_percent = max_memory_percent
+        self._runs: 'OrderedDict[str, ResumableRun]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.parked = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def park(self, run: ResumableRun) -> None:
+        """Сохраняет запуск, ждущий ввода; при необходимости вытесняет старые."""
+        self.evict_expired()
+        self.make_room()
+        with self._lock:
+            self._runs[run.run_id] = run
+            self.parked += 1
+
+    def take(self, run_id: str) -> Optional[ResumableRun]:
+        """Забирает запуск для продолжения (None - нет такого или истёк TTL)."""
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        if self._is_expired(run, time.monotonic()):
+            self.expired += 1
+            run.abandon(join_timeout=ABANDON_JOIN_TIMEOUT)
+            return None
+        self.resumed += 1
+        return run
+
+    def _is_expired(self, run: ResumableRun, now: float) -> bool:
+        return run.parked_at is not None and now - run.parked_at > self.ttl
+
+    def evict_expired(self) -> int:
+        """Удаляет запуски, простоявшие дольше TTL. Возвращает их число."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [run_id for run_id, run in self._runs.items() if self._is_expired(run, now)]
+            runs = [self._runs.pop(run_id) for run_id in expired]
+        for run in runs:
+            run.abandon(join_timeout=ABANDON_JOIN_TIMEOUT)
+        self.expired += len(runs)
+        return len(runs)
+
+    def make_room(self) -> int:
+        """Вытесняет самые старые запуски, пока их слишком много или не хватает памяти."""
+        evicted = 0
+        while True:
+            with self._lock:
+                if not self._runs:
+                    break
+                if len(self._runs) < self.max_runs and not _memory_pressure(self.max_memory_percent):
+                    break
+                run_id, run = self._runs.popitem(last=False)
+            logger.info(f"Evicting suspended run {run_id} (suspended runs: {len(self._runs) + 1})")
+            run.abandon(join_timeout=ABANDON_JOIN_TIMEOUT)
+            gc.collect()  # Состояние брошенного интерпретатора освобождается до следующей проверки памяти
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            runs = list(self._runs.values())
+            self._runs.clear()
+        for run in runs:
+            run.abandon(join_timeout=ABANDON_JOIN_TIMEOUT)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'suspended': len(self._runs),
+                'ttl': self.ttl,
+                'max_runs': self.max_runs,
+                'parked': self.parked,
+                'resumed': self.resumed,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
+
+
+_suspended_runs: Optional[SuspendedRuns] = None
+_suspended_runs_lock = threading.Lock()
+
+
+def get_suspended_runs() -> SuspendedRuns:
+    """Общий для процесса реестр припаркованных запусков."""
+    global _suspended_runs
+    if _suspended_runs is None:
+        with _suspended_runs_lock:
+            if _suspended_runs is None:
+                _suspended_runs = SuspendedRuns()
+    return _suspended_runs
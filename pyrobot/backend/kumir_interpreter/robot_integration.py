@@ -5,7 +5,7 @@
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 from .robot_state import SimulatedRobot
 from .kumir_exceptions import RobotError
 
@@ -79,6 +79,23 @@ class RobotCommandHandler:
         
         return False
     
+    def observe(self, on_command: Callable[[str, bool], None]) -> None:
+        """
+        Сообщает on_command(команда, успех) о каждой выполненной команде
+        (событие robot_command, см. execution_observer).
+        """
+        def observed(command: str, method):
+            def run():
+                try:
+                    method()
+                except RobotError:
+                    on_command(command, False)
+                    raise
+                on_command(command, True)
+            return run
+
+        self.command_map = {command: observed(command, method) for command, method in self.command_map.items()}
+    
     def execute_measurement(self, measurement_type: str) -> float:
         """
         Выполняет команду измерения робота.
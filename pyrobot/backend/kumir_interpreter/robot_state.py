@@ -17,38 +17,59 @@ logger.setLevel(logging.INFO)  # Уровень можно настроить
 # Определение RobotError УДАЛЕНО
 
 class SimulatedRobot:
-	""" Состояние и действия симулированного робота на поле. """
+	"""
+	Состояние и действия симулированного робота на поле.
+
+	Поле хранится в целочисленном виде: стены, закраска и маркеры - байтовые
+	массивы с индексом клетки y * width + x. Строковые ключи ("x,y" для клеток,
+	"x1,y1,x2,y2" для стен) используются только на границе JSON: при разборе
+	начального состояния и в свойствах walls/colored_cells/markers.
+
+	Горизонтальные стены: _h_walls[y * width + x] - стена над клеткой (x, y),
+	y от 0 до height (строки 0 и height - границы поля).
+	Вертикальные стены: _v_walls[y * (width + 1) + x] - стена слева от клетки (x, y),
+	x от 0 до width (столбцы 0 и width - границы поля).
+	"""
 
 	def __init__(self, width, height, initial_pos=None, initial_walls=None, initial_markers=None,
 	             initial_colored_cells=None, initial_symbols=None, initial_radiation=None,
 	             initial_temperature=None):
-		# Проверяем ограничения размеров поля согласно документации КуМир
-		# Столбцы: 1-255, Строки: 1-128
-		if not isinstance(width, int) or not (1 <= width <= 255): 
-			raise ValueError("Width must be an integer between 1 and 255 (Kumir spec)")
-		if not isinstance(height, int) or not (1 <= height <= 128): 
-			raise ValueError("Height must be an integer between 1 and 128 (Kumir spec)")
-		
+		self.check_size(width, height)
 		self.width = width
 		self.height = height
 		self.logger = logger
 		# Используем _clamp_pos для инициализации, чтобы гарантировать корректность
 		self.robot_pos = self._clamp_pos(initial_pos or {'x': 0, 'y': 0})
-		# Гарантируем, что это множества
-		self.walls = set(initial_walls) if initial_walls is not None else set()
-		self.colored_cells = set(initial_colored_cells) if initial_colored_cells is not None else set()
+		self._allocate_grid()
+		for wall in initial_walls or ():
+			self.add_wall(wall)
+		for cell in initial_colored_cells or ():
+			self.set_painted(cell)
+		for cell, count in (initial_markers or {}).items():
+			self.set_marker(cell, count)
 		# Гарантируем, что это словари
-		self.markers = dict(initial_markers) if initial_markers is not None else {}
 		self.symbols = dict(initial_symbols) if initial_symbols is not None else {}
 		self.radiation = dict(initial_radiation) if initial_radiation is not None else {}
 		self.temperature = dict(initial_temperature) if initial_temperature is not None else {}
 		
 		# Направление ошибки движения для визуализации (left, right, up, down или None)
 		self.error_direction = None
+		# Запись изменений поля по шагам (TraceRecorder), подключается интерпретатором
+		self.trace_recorder = None
 
-		self.permanent_walls = self._setup_permanent_walls()
 		self.logger.info(
-			f"Robot initialized: {width}x{height} at {self.robot_pos}. Walls: {len(self.walls)}, Markers: {len(self.markers)}, Colored: {len(self.colored_cells)}")
+			"Robot initialized: %dx%d at %s. Walls: %d, Markers: %d, Colored: %d",
+			width, height, self.robot_pos, len(self.walls), len(self.markers), len(self.colored_cells))
+
+	@staticmethod
+	def check_size(width, height):
+		""" Проверяет размеры поля (ValueError, если они вне ограничений КуМира). """
+		# Проверяем ограничения размеров поля согласно документации КуМир
+		# Столбцы: 1-255, Строки: 1-128
+		if not isinstance(width, int) or not (1 <= width <= 255):
+			raise ValueError("Width must be an integer between 1 and 255 (Kumir spec)")
+		if not isinstance(height, int) or not (1 <= height <= 128):
+			raise ValueError("Height must be an integer between 1 and 128 (Kumir spec)")
 
 	def _clamp_pos(self, pos):
 		# Гарантирует, что координаты находятся в пределах поля
@@ -75,8 +96,75 @@ class SimulatedRobot:
 		clamped_y = min(max(0, y), self.height - 1)
 		return {'x': clamped_x, 'y': clamped_y}
 
-	def _setup_permanent_walls(self):
-		# Создает множество строк, представляющих границы поля
+	# --- Внутреннее представление поля ---
+	def _allocate_grid(self):
+		w, h = self.width, self.height
+		self._h_walls = bytearray(w * (h + 1))
+		self._v_walls = bytearray((w + 1) * h)
+		self._painted = bytearray(w * h)
+		self._marker_counts = bytearray(w * h)
+
+	def _cell_index(self, cell):
+		""" Индекс клетки "x,y" в массивах поля или None, если ключ некорректен или вне поля. """
+		try:
+			x, y = map(int, cell.split(','))
+		except (AttributeError, ValueError):
+			self.logger.warning(f"Invalid cell key: {cell}")
+			return None
+		if not (0 <= x < self.width and 0 <= y < self.height):
+			self.logger.warning(f"Cell {cell} is outside the field, ignored.")
+			return None
+		return y * self.width + x
+
+	def add_wall(self, wall):
+		""" Добавляет стену, заданную строкой "x1,y1,x2,y2" (отрезок единичной длины между узлами сетки). """
+		try:
+			x1, y1, x2, y2 = map(int, wall.split(','))
+		except (AttributeError, ValueError):
+			self.logger.warning(f"Invalid wall format: {wall}")
+			return
+		x1, x2 = min(x1, x2), max(x1, x2)
+		y1, y2 = min(y1, y2), max(y1, y2)
+		if y1 == y2 and x2 == x1 + 1 and 0 <= x1 < self.width and 0 <= y1 <= self.height:
+			self._h_walls[y1 * self.width + x1] = 1
+		elif x1 == x2 and y2 == y1 + 1 and 0 <= x1 <= self.width and 0 <= y1 < self.height:
+			self._v_walls[y1 * (self.width + 1) + x1] = 1
+		else:
+			self.logger.warning(f"Wall {wall} is not a unit segment inside the field, ignored.")
+
+	def set_painted(self, cell):
+		""" Закрашивает клетку "x,y" (при разборе начального состояния). """
+		index = self._cell_index(cell)
+		if index is not None:
+			self._painted[index] = 1
+
+	def set_marker(self, cell, count=1):
+		""" Устанавливает число маркеров в клетке "x,y" (при разборе начального состояния). """
+		index = self._cell_index(cell)
+		if index is not None:
+			try:
+				self._marker_counts[index] = max(0, min(255, int(count)))
+			except (ValueError, TypeError):
+				self.logger.warning(f"Invalid marker count {count!r} at {cell}")
+
+	@property
+	def walls(self):
+		""" Пользовательские стены в виде строк "x1,y1,x2,y2" (снимок для JSON). """
+		w = self.width
+		walls = set()
+		for index, present in enumerate(self._h_walls):
+			if present:
+				y, x = divmod(index, w)
+				walls.add(f"{x},{y},{x + 1},{y}")
+		for index, present in enumerate(self._v_walls):
+			if present:
+				y, x = divmod(index, w + 1)
+				walls.add(f"{x},{y},{x},{y + 1}")
+		return walls
+
+	@property
+	def permanent_walls(self):
+		""" Границы поля в виде строк "x1,y1,x2,y2" (для совместимости; проверки считают их арифметически). """
 		w = set()
 		# Горизонтальные
 		for x in range(self.width):
@@ -88,19 +176,27 @@ class SimulatedRobot:
 			w.add(f"{self.width},{y},{self.width},{y + 1}")  # Правая граница
 		return w
 
+	@property
+	def colored_cells(self):
+		""" Закрашенные клетки в виде строк "x,y" (снимок для JSON). """
+		w = self.width
+		return {f"{index % w},{index // w}" for index, painted in enumerate(self._painted) if painted}
+
+	@property
+	def markers(self):
+		""" Маркеры {"x,y": число} (снимок для JSON). """
+		w = self.width
+		return {f"{index % w},{index // w}": count for index, count in enumerate(self._marker_counts) if count}
+
 	def reset(self, new_width=None, new_height=None):
 		""" Resets robot state, optionally resizes. """
-		# ... (код reset без изменений) ...
 		if new_width is not None and isinstance(new_width, int) and new_width >= 1: self.width = new_width
 		if new_height is not None and isinstance(new_height, int) and new_height >= 1: self.height = new_height
 		self.robot_pos = {'x': 0, 'y': 0}
-		self.walls.clear();
-		self.markers.clear();
-		self.colored_cells.clear()
+		self._allocate_grid()
 		self.symbols.clear();
 		self.radiation.clear();
 		self.temperature.clear()
-		self.permanent_walls = self._setup_permanent_walls()
 		self.logger.info(f"Robot Reset: Field size {self.width}x{self.height}, Position {self.robot_pos}.")
 
 	def reset_position(self):
@@ -108,150 +204,140 @@ class SimulatedRobot:
 		self.robot_pos = {'x': 0, 'y': 0}
 		self.logger.info("Robot position reset to (0,0).")
 
+	def _blocked(self, x, y, direction):
+		"""
+		Проверяет, закрыт ли выход из клетки (x, y) в направлении direction:
+		(outside, wall) - цель вне поля / между клетками стена.
+		"""
+		w = self.width
+		if direction == "right":
+			if x + 1 >= w:
+				return True, False
+			return False, bool(self._v_walls[y * (w + 1) + x + 1])
+		if direction == "left":
+			if x <= 0:
+				return True, False
+			return False, bool(self._v_walls[y * (w + 1) + x])
+		if direction == "down":
+			if y + 1 >= self.height:
+				return True, False
+			return False, bool(self._h_walls[(y + 1) * w + x])
+		if direction == "up":
+			if y <= 0:
+				return True, False
+			return False, bool(self._h_walls[y * w + x])
+		raise ValueError(f"Unknown direction for check: {direction}")
+
 	def _is_wall_between(self, x1, y1, x2, y2):
 		""" Проверяет наличие стены (пользовательской или границы) между двумя соседними клетками. """
-		wall_key = None
-		# Определяем ключ стены в зависимости от направления
-		if x2 > x1:  # Движение вправо
-			wall_key = f"{x2},{y1},{x2},{y1 + 1}"  # Правая стена клетки (x1, y1)
-		elif x1 > x2:  # Движение влево
-			wall_key = f"{x1},{y1},{x1},{y1 + 1}"  # Левая стена клетки (x1, y1)
-		elif y2 > y1:  # Движение вниз
-			wall_key = f"{x1},{y2},{x1 + 1},{y2}"  # Нижняя стена клетки (x1, y1)
-		elif y1 > y2:  # Движение вверх
-			wall_key = f"{x1},{y1},{x1 + 1},{y1}"  # Верхняя стена клетки (x1, y1)
-
-		if wall_key:
-			# Проверяем наличие стены в пользовательских стенах и границах
-			return wall_key in self.walls or wall_key in self.permanent_walls
-		return False  # Нет движения или не соседние клетки
+		# Определяем направление движения
+		if x2 > x1:
+			direction = "right"
+		elif x1 > x2:
+			direction = "left"
+		elif y2 > y1:
+			direction = "down"
+		elif y1 > y2:
+			direction = "up"
+		else:
+			return False  # Нет движения
+		outside, wall = self._blocked(x1, y1, direction)
+		return outside or wall
 
 	def is_move_allowed(self, target_x, target_y):
 		""" Проверяет, разрешено ли движение в целевую клетку. """
 		# 1. Проверка выхода за границы поля
 		if not (0 <= target_x < self.width and 0 <= target_y < self.height):
 			self.logger.debug(
-				f"Move denied: Target ({target_x},{target_y}) is outside field bounds (0..{self.width - 1}, 0..{self.height - 1}).")
+				"Move denied: Target (%d,%d) is outside field bounds (0..%d, 0..%d).",
+				target_x, target_y, self.width - 1, self.height - 1)
 			return False
 
 		# 2. Проверка наличия стены между текущей и целевой клетками
 		current_x, current_y = self.robot_pos["x"], self.robot_pos["y"]
 		if self._is_wall_between(current_x, current_y, target_x, target_y):
 			self.logger.debug(
-				f"Move denied: Wall detected between ({current_x},{current_y}) and ({target_x},{target_y}).")
+				"Move denied: Wall detected between (%d,%d) and (%d,%d).", current_x, current_y, target_x, target_y)
 			return False
 
 		# Если прошли все проверки - движение разрешено
 		return True
 
-	# --- Методы движения (используют is_move_allowed) ---
+	# --- Методы движения ---
+	def _move(self, direction, dx, dy, label, error_message):
+		x, y = self.robot_pos["x"], self.robot_pos["y"]
+		outside, wall = self._blocked(x, y, direction)
+		if outside or wall:
+			self.error_direction = direction  # Устанавливаем направление ошибки
+			if self.trace_recorder is not None:
+				self.trace_recorder.record_move_failed(direction)
+			raise RobotError(error_message)
+		nx, ny = x + dx, y + dy
+		self.robot_pos["x"] = nx
+		self.robot_pos["y"] = ny
+		self.error_direction = None  # Очищаем ошибку движения при успешном движении
+		self.logger.info("Moved %s -> (%d,%d)", label, nx, ny)
+		if self.trace_recorder is not None:
+			self.trace_recorder.record_move(nx, ny)
+
 	def go_right(self):
-		nx, ny = self.robot_pos["x"] + 1, self.robot_pos["y"]
-		if self.is_move_allowed(nx, ny):
-			self.robot_pos["x"] = nx
-			self.error_direction = None  # Очищаем ошибку движения при успешном движении
-			self.logger.info(f"Moved Right -> ({nx},{ny})")
-		else:
-			self.error_direction = "right"  # Устанавливаем направление ошибки
-			raise RobotError("Стена/граница справа!")
+		self._move("right", 1, 0, "Right", "Стена/граница справа!")
 
 	def go_left(self):
-		nx, ny = self.robot_pos["x"] - 1, self.robot_pos["y"]
-		if self.is_move_allowed(nx, ny):
-			self.robot_pos["x"] = nx
-			self.error_direction = None  # Очищаем ошибку движения при успешном движении
-			self.logger.info(f"Moved Left -> ({nx},{ny})")
-		else:
-			self.error_direction = "left"  # Устанавливаем направление ошибки
-			raise RobotError("Стена/граница слева!")
+		self._move("left", -1, 0, "Left", "Стена/граница слева!")
 
 	def go_up(self):
-		nx, ny = self.robot_pos["x"], self.robot_pos["y"] - 1
-		if self.is_move_allowed(nx, ny):
-			self.robot_pos["y"] = ny
-			self.error_direction = None  # Очищаем ошибку движения при успешном движении
-			self.logger.info(f"Moved Up -> ({nx},{ny})")
-		else:
-			self.error_direction = "up"  # Устанавливаем направление ошибки
-			raise RobotError("Стена/граница сверху!")
+		self._move("up", 0, -1, "Up", "Стена/граница сверху!")
 
 	def go_down(self):
-		nx, ny = self.robot_pos["x"], self.robot_pos["y"] + 1
-		if self.is_move_allowed(nx, ny):
-			self.robot_pos["y"] = ny
-			self.error_direction = None  # Очищаем ошибку движения при успешном движении
-			self.logger.info(f"Moved Down -> ({nx},{ny})")
-		else:
-			self.error_direction = "down"  # Устанавливаем направление ошибки
-			raise RobotError("Стена/граница снизу!")
+		self._move("down", 0, 1, "Down", "Стена/граница снизу!")
 
 	# --- Метод закраски (без ошибки при повторе) ---
 	def do_paint(self):
 		""" Закрашивает текущую клетку. Не генерирует ошибку, если уже закрашена. """
-		k = f"{self.robot_pos['x']},{self.robot_pos['y']}"
-		if k in self.colored_cells:
-			self.logger.debug(f"Cell {k} is already painted. No action taken.")  # Используем debug или info
+		x, y = self.robot_pos['x'], self.robot_pos['y']
+		index = y * self.width + x
+		if self._painted[index]:
+			self.logger.debug("Cell %d,%d is already painted. No action taken.", x, y)
 		else:
-			self.colored_cells.add(k)
-			self.logger.info(f"Cell {k} painted.")
+			self._painted[index] = 1
+			self.logger.info("Cell %d,%d painted.", x, y)
+			if self.trace_recorder is not None:
+				self.trace_recorder.record_paint(x, y)
 
 	# --- Сенсоры ---
 	def check_direction(self, direction, status_to_check):
-		"""
-		Проверяет состояние в указанном направлении ('wall' или 'free').
-		Использует _is_wall_between для проверки стен.
-		"""
+		""" Проверяет состояние в указанном направлении ('wall' или 'free'). Выход за поле считается стеной. """
 		cx, cy = self.robot_pos['x'], self.robot_pos['y']
-		tx, ty = cx, cy  # Координаты целевой клетки
-
-		if direction == "left":
-			tx -= 1
-		elif direction == "right":
-			tx += 1
-		elif direction == "up":
-			ty -= 1
-		elif direction == "down":
-			ty += 1
-		else:
-			raise ValueError(f"Unknown direction for check: {direction}")
-
-		# Проверяем, находится ли целевая клетка вне поля
-		is_outside = not (0 <= tx < self.width and 0 <= ty < self.height)
-
-		# Проверяем стену между текущей и целевой (если целевая в пределах поля)
-		has_wall = False
-		if not is_outside:
-			has_wall = self._is_wall_between(cx, cy, tx, ty)
+		is_outside, has_wall = self._blocked(cx, cy, direction)
 
 		# Определяем результат в зависимости от того, что проверяем
 		if status_to_check == "wall":
 			# Стена есть, если она существует ИЛИ если вышли за границу
 			result = has_wall or is_outside
-			self.logger.debug(
-				f"Check '{direction} wall' from ({cx},{cy}): outside={is_outside}, wall_exists={has_wall} -> {result}")
-			return result
 		elif status_to_check == "free":
 			# Свободно, только если НЕ вышли за границу И НЕТ стены
 			result = not is_outside and not has_wall
-			self.logger.debug(
-				f"Check '{direction} free' from ({cx},{cy}): outside={is_outside}, wall_exists={has_wall} -> {result}")
-			return result
 		else:
 			raise ValueError(f"Unknown status for check_direction: {status_to_check}")
+		self.logger.debug(
+			"Check '%s %s' from (%d,%d): outside=%s, wall_exists=%s -> %s",
+			direction, status_to_check, cx, cy, is_outside, has_wall, result)
+		return result
 
 	def check_cell(self, status_to_check):
 		""" Проверяет состояние текущей клетки ('painted' или 'clear'). """
-		k = f"{self.robot_pos['x']},{self.robot_pos['y']}"
-		is_painted = k in self.colored_cells
+		x, y = self.robot_pos['x'], self.robot_pos['y']
+		is_painted = bool(self._painted[y * self.width + x])
 
 		if status_to_check == "painted":
-			self.logger.debug(f"Check 'cell painted' at {k}: {is_painted}")
-			return is_painted
+			result = is_painted
 		elif status_to_check == "clear":
-			self.logger.debug(f"Check 'cell clear' at {k}: {not is_painted}")
-			return not is_painted
+			result = not is_painted
 		else:
 			raise ValueError(f"Unknown status for check_cell: {status_to_check}")
+		self.logger.debug("Check 'cell %s' at %d,%d: %s", status_to_check, x, y, result)
+		return result
 
 	def do_measurement(self, measure_type):
 		""" Возвращает значение радиации или температуры в текущей клетке. """
@@ -277,37 +363,43 @@ class SimulatedRobot:
 
 	def put_marker(self):
 		""" Поставить маркер в текущей клетке. """
-		pos_key = f"{self.robot_pos['x']},{self.robot_pos['y']}"
-		self.logger.debug(f"Attempting to put marker at {pos_key}")
+		x, y = self.robot_pos['x'], self.robot_pos['y']
+		index = y * self.width + x
+		self.logger.debug("Attempting to put marker at %d,%d", x, y)
 		
 		# Проверяем, есть ли уже маркер в этой клетке
-		if pos_key in self.markers and self.markers[pos_key] > 0:
-			self.logger.warning(f"Marker already exists at {pos_key}")
-			raise RobotError(f"В клетке ({self.robot_pos['x']},{self.robot_pos['y']}) уже есть маркер")
+		if self._marker_counts[index]:
+			self.logger.warning("Marker already exists at %d,%d", x, y)
+			raise RobotError(f"В клетке ({x},{y}) уже есть маркер")
 		
 		# Ставим маркер
-		self.markers[pos_key] = 1
-		self.logger.info(f"Marker placed at {pos_key}")
+		self._marker_counts[index] = 1
+		self.logger.info("Marker placed at %d,%d", x, y)
+		if self.trace_recorder is not None:
+			self.trace_recorder.record_marker_put(x, y)
 
 	def pick_marker(self):
 		""" Убрать маркер из текущей клетки. """
-		pos_key = f"{self.robot_pos['x']},{self.robot_pos['y']}"
-		self.logger.debug(f"Attempting to pick marker at {pos_key}")
+		x, y = self.robot_pos['x'], self.robot_pos['y']
+		index = y * self.width + x
+		self.logger.debug("Attempting to pick marker at %d,%d", x, y)
 		
 		# Проверяем, есть ли маркер в этой клетке
-		if pos_key not in self.markers or self.markers[pos_key] <= 0:
-			self.logger.warning(f"No marker found at {pos_key}")
-			raise RobotError(f"В клетке ({self.robot_pos['x']},{self.robot_pos['y']}) нет маркера")
+		if not self._marker_counts[index]:
+			self.logger.warning("No marker found at %d,%d", x, y)
+			raise RobotError(f"В клетке ({x},{y}) нет маркера")
 		
 		# Убираем маркер
-		del self.markers[pos_key]
-		self.logger.info(f"Marker picked from {pos_key}")
+		self._marker_counts[index] = 0
+		self.logger.info("Marker picked from %d,%d", x, y)
+		if self.trace_recorder is not None:
+			self.trace_recorder.record_marker_pick(x, y)
 
 	def is_marker_here(self):
 		""" Проверить, есть ли маркер в текущей клетке. """
-		pos_key = f"{self.robot_pos['x']},{self.robot_pos['y']}"
-		has_marker = pos_key in self.markers and self.markers[pos_key] > 0
-		self.logger.debug(f"Check marker at {pos_key}: {has_marker}")
+		x, y = self.robot_pos['x'], self.robot_pos['y']
+		has_marker = self._marker_counts[y * self.width + x] > 0
+		self.logger.debug("Check marker at %d,%d: %s", x, y, has_marker)
 		return has_marker
 
 # FILE END: robot_state.py
\ No newline at end of file
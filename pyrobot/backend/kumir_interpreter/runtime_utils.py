@@ -6,75 +6,76 @@ import sys
 import logging 
 from typing import Optional
 
-# ANTLR and generated code
-from .generated.KumirLexer import KumirLexer
-from .generated.KumirParser import KumirParser
-from antlr4 import InputStream, CommonTokenStream
-from antlr4.error.ErrorListener import ErrorListener
-
 # Interpreter components
 from .interpreter_components.main_visitor import KumirInterpreterVisitor
 from .kumir_exceptions import KumirSyntaxError, KumirInputRequiredError, KumirRuntimeError, ExitSignal
+from .parse_cache import get_parse_cache
+from .parsing import parse_program
+from .compiled_engine import ENGINE_COMPILED, CompilationUnsupported, compile_program, resolve_engine
+from .file_functions import FileContext, file_context
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG) # Добавим базовую конфигурацию логирования
 
-class DiagnosticErrorListener(ErrorListener):
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        error_msg = f"Синтаксическая ошибка: {msg}"
-        # KumirSyntaxError ожидает line_index (0-based).
-        raise KumirSyntaxError(error_msg, line_index=line - 1, column_index=column)
+def _select_main_algorithm(procedures: dict) -> Optional[str]:
+    """
+    Выбирает алгоритм для запуска: "главный", а если его нет — первую
+    процедуру (алгоритм без возвращаемого значения).
+    """
+    if "главный" in procedures:
+        return "главный"
+    for alg_name_lower, alg_data in procedures.items():
+        # Процедура - это алгоритм без возвращаемого значения (is_function=False)
+        if not alg_data.get('is_function', False):
+            return alg_name_lower
+    return None
+
+
+def _compile_main(visitor, algorithm_name: str, engine: Optional[str]):
+    """
+    Скомпилированный главный алгоритм или None, если его выполняет визитор
+    (выбран визитор или компилятор не поддерживает какую-то конструкцию).
+    """
+    if resolve_engine(engine) != ENGINE_COMPILED:
+        return None
+    try:
+        return compile_program(visitor, algorithm_name)
+    except CompilationUnsupported as e:
+        logger.debug(f"Compiled engine fallback to visitor: {e}")
+        return None
+
 
-def interpret_kumir(code: str, input_data: Optional[str] = None) -> str:
+def interpret_kumir(code: str, input_data: Optional[str] = None, engine: Optional[str] = None) -> str:
     """
     Интерпретирует код на языке КуМир.
+
+    Вывод, ввод и файловое состояние принадлежат вызову (sys.stdout не
+    подменяется), поэтому функцию можно вызывать из нескольких потоков сразу.
     Args:
         code (str): Исходный код программы
         input_data (Optional[str]): Входные данные для программы.
+        engine (Optional[str]): Движок выполнения: 'visitor' или 'compiled'
+            (по умолчанию берётся из переменной окружения KUMIR_ENGINE).
     Returns:
         str: Захваченный вывод программы или сообщение об ошибке.
     """
-    # DEBUG: записываем в файл для отладки
-    with open("debug_interpret.log", "w", encoding="utf-8") as f:
-        f.write(f"interpret_kumir CALLED! Code first 200 chars:\n{code[:200]!r}\n")
-    
     logger.debug(f"interpret_kumir called with code:\\n{code}") # Лог входного кода
     
-    # Создаем лексер и парсер
-    input_stream_antl = InputStream(code)
-    lexer = KumirLexer(input_stream_antl)
-    lexer.removeErrorListeners()
-    error_listener = DiagnosticErrorListener()
-    lexer.addErrorListener(error_listener)
-
-    token_stream = CommonTokenStream(lexer)
-    parser = KumirParser(token_stream)
-    parser.removeErrorListeners()
-    parser.addErrorListener(error_listener)
-
-    # Парсим код
+    # Парсим код (повторные запуски той же программы берут дерево из кэша)
     tree = None
     try:
-        with open("debug_interpret.log", "a", encoding="utf-8") as f:
-            f.write("About to parse code with parser.program()\n")
-        tree = parser.program()
-        with open("debug_interpret.log", "a", encoding="utf-8") as f:
-            f.write(f"Parsing successful! Tree type: {type(tree)}\n")
-            f.write(f"Tree text first 100 chars: {tree.getText()[:100]}\n")
+        tree = get_parse_cache().get_or_parse(code, parse_program)
     except KumirSyntaxError as e:
         line_info = f"строка {e.line_index + 1}" if hasattr(e, 'line_index') and e.line_index is not None else "N/A"
         col_info = f", столбец {e.column_index}" if hasattr(e, 'column_index') and e.column_index is not None else ""
         return f"Ошибка в коде: {e.args[0]} ({line_info}{col_info})"
     except Exception as e:
         error_info = f"Внутренняя ошибка парсера: {type(e).__name__}: {e}"
-        with open("debug_interpret.log", "a", encoding="utf-8") as f:
-            f.write(f"PARSING ERROR: {error_info}\n")
+        logger.debug(f"Parsing error: {error_info}")
         return error_info
 
-    # Настраиваем захват вывода
-    original_stdout = sys.stdout
+    # Вывод и входные данные этого вызова
     captured_output = StringIO()
-    sys.stdout = captured_output    # Настраиваем входные данные
     input_buffer = StringIO(input_data if input_data else "")
     program_lines_list = code.splitlines()
 
@@ -84,10 +85,7 @@ def interpret_kumir(code: str, input_data: Optional[str] = None) -> str:
         return result
     
     def output_fn(text: str):
-        logger.debug(f"output_fn called with text: '{text}'") # Лог вызова output_fn
         captured_output.write(text)
-        with open("debug_interpret.log", "a", encoding="utf-8") as f:
-            f.write(f"output_fn called with: {text!r}\n")
         
     def error_fn(text: str):
         sys.stderr.write(text)
@@ -97,49 +95,29 @@ def interpret_kumir(code: str, input_data: Optional[str] = None) -> str:
         input_stream=input_fn,
         output_stream=output_fn, 
         error_stream=error_fn,
-        program_lines=program_lines_list
+        program_lines=program_lines_list,
+        # Входные данные известны целиком: сканер ввода забирает их одним вызовом
+        input_lines=lambda: input_buffer.read().splitlines()
     )
-    
-    # DEBUG: проверяем что visitor создался
-    with open("debug_interpret.log", "a", encoding="utf-8") as f:
-        f.write(f"Visitor created successfully. Type: {type(visitor)}\n")
-        f.write(f"About to call visitor.visitProgram(tree)\n")
         
     # Выполняем программу
     try:
-        visitor.visitProgram(tree)
-        with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-            debug_f.write(f"visitor.visitProgram(tree) completed successfully\n")
-            
-        # После сбора определений алгоритмов, нужно найти и запустить главный алгоритм
-        # В КуМире обычно есть один алгоритм без параметров, который запускается автоматически
-        with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-            debug_f.write(f"Available procedures: {list(visitor.procedure_manager.procedures.keys())}\n")        
-        # Ищем алгоритм для запуска
-        # Может быть "главный" или единственный алгоритм
-        algorithm_to_run = None
-        
-        if visitor.procedure_manager.procedures:
-            # Сначала ищем алгоритм с именем "главный"
-            if "главный" in visitor.procedure_manager.procedures:
-                algorithm_to_run = "главный"
+        # Консоль файловых функций читает через тот же сканер, что и "ввод"
+        with file_context(FileContext(console_output=output_fn,
+                                      console_input=lambda: visitor.io_handler.get_input_line(""))):
+            visitor.visitProgram(tree)
+            # После сбора определений алгоритмов, нужно найти и запустить главный алгоритм
+            # В КуМире обычно есть один алгоритм без параметров, который запускается автоматически
+            algorithm_to_run = _select_main_algorithm(visitor.procedure_manager.procedures)
+            if algorithm_to_run:
+                logger.debug(f"Executing algorithm: {algorithm_to_run}")
+                program = _compile_main(visitor, algorithm_to_run, engine)
+                if program is not None:
+                    program.run()
+                else:
+                    visitor.execute_algorithm_node(algorithm_to_run)
             else:
-                # Если нет "главного", берем первую ПРОЦЕДУРУ (не функцию)
-                for alg_name_lower, alg_data in visitor.procedure_manager.procedures.items():
-                    # Процедура - это алгоритм без возвращаемого значения (is_function=False)
-                    if not alg_data.get('is_function', False):
-                        algorithm_to_run = alg_name_lower
-                        break
-        
-        if algorithm_to_run:
-            with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-                debug_f.write(f"Executing algorithm: {algorithm_to_run}\n")
-            visitor.execute_algorithm_node(algorithm_to_run)
-            with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-                debug_f.write(f"Algorithm {algorithm_to_run} executed successfully\n")
-        else:
-            with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-                debug_f.write(f"No algorithms found to execute\n")
+                logger.debug("No algorithms found to execute")
     except KumirInputRequiredError:
         pass
     except ExitSignal:
@@ -155,26 +133,15 @@ def interpret_kumir(code: str, input_data: Optional[str] = None) -> str:
         col_info = f", столбец {e.column_index}" if hasattr(e, 'column_index') and e.column_index is not None else ""
         captured_output.write(f"\\nОшибка выполнения: {e.args[0]} ({line_info}{col_info})")
     except Exception as e:
-        import traceback
-        tb_str = traceback.format_exc()
         captured_output.write(f"\\nВнутренняя ошибка интерпретатора: {type(e).__name__}: {e}")
-        with open("debug_interpret.log", "a", encoding="utf-8") as debug_f:
-            debug_f.write(f"EXCEPTION in visitor.visitProgram: {type(e).__name__}: {e}\n{tb_str}\n")
-    finally:
-        sys.stdout = original_stdout    # Получаем результат
+        logger.debug(f"Exception in interpret_kumir: {type(e).__name__}: {e}", exc_info=True)
     final_output = captured_output.getvalue()
     
     # Добавляем перевод строки в конец, если его нет (как в старом интерпретаторе)
     if final_output and not final_output.endswith('\n'):
         final_output += '\n'
         logger.debug("Added final newline to output") # Лог добавления перевода строки
-    
     logger.debug(f"interpret_kumir returning output:\\n{final_output}") # Лог возвращаемого значения
-    
-    # DEBUG: записываем в файл для отладки  
-    with open("debug_interpret.log", "a", encoding="utf-8") as f:
-        f.write(f"Final output: {final_output!r}\n")
-        
     return final_output
 
 def run_kumir_file(file_path: str, input_data: Optional[str] = None) -> str:
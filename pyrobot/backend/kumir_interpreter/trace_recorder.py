@@ -0,0 +1,282 @@
+# trace_recorder.py
+"""
+Компактная трасса выполнения программы с Роботом.
+
+Вместо полного снимка поля на каждый шаг (как в execution.execute_lines)
+записываются только изменения: перемещение, закраска, маркеры, неудачное
+перемещение (ошибка) и фрагменты вывода. Каждый шаг — три числа в массивах
+array.array (код операции и два аргумента), т.е. 9 байт.
+
+Раз в KEYFRAME_INTERVAL шагов сохраняется ключевой кадр — полное состояние
+изменяемой части поля. Чтобы получить состояние после шага N, берётся
+ближайший ключевой кадр не позже N и к нему применяются оставшиеся шаги.
+
+Двоичный формат (to_bytes/from_bytes), все числа little-endian:
+    заголовок   '<4sBIIB'  магия b'KTR1', версия, число шагов, интервал ключевых кадров, флаг усечения
+    ops         uint8  × число шагов
+    args_a      int32  × число шагов
+    args_b      int32  × число шагов
+    static      uint32 длина + JSON неизменяемой части поля (размеры, стены, символы...)
+    keyframes   uint32 длина + JSON списка ключевых кадров
+    output      uint32 длина + UTF-8 текст всего вывода
+"""
+
+import base64
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+from .execution_observer import ExecutionObserver
+
+# Коды операций
+OP_MOVE = 1          # a, b - новые координаты робота
+OP_MOVE_FAILED = 2   # a - направление (индекс в DIRECTIONS)
+OP_PAINT = 3         # a, b - закрашенная клетка
+OP_MARKER_PUT = 4    # a, b - клетка
+OP_MARKER_PICK = 5   # a, b - клетка
+OP_OUTPUT = 6        # a - смещение в тексте вывода, b - длина фрагмента
+
+DIRECTIONS = ('left', 'right', 'up', 'down')
+
+KEYFRAME_INTERVAL = 1024
+# Шаги сверх лимита не записываются (трасса помечается как усечённая)
+DEFAULT_MAX_TRACE_STEPS = int(os.environ.get('KUMIR_MAX_TRACE_STEPS', 200_000))
+
+TRACE_FORMAT = 'kumir-trace/1'
+_MAGIC = b'KTR1'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBIIB')
+_LENGTH = struct.Struct('<I')
+
+
+class TraceRecorder(ExecutionObserver):
+    """
+    Запись изменений поля и вывода по шагам и восстановление состояния на любом шаге.
+    Изменения поля сообщает робот (for_robot), вывод - событие output наблюдателей.
+    """
+
+    def __init__(self, static_state: Dict[str, Any], robot_pos: Dict[str, int],
+                 colored_cells, markers: Dict[str, int],
+                 keyframe_interval: int = KEYFRAME_INTERVAL,
+                 max_steps: int = DEFAULT_MAX_TRACE_STEPS):
+        self.static_state = static_state
+        self.keyframe_interval = keyframe_interval
+        self.max_steps = max_steps
+        self.truncated = False
+        self.ops = array('B')
+        self.args_a = array('i')
+        self.args_b = array('i')
+        self._output: List[str] = []
+        self._output_length = 0
+        # Текущее состояние изменяемой части поля (для ключевых кадров)
+        self._pos = (robot_pos['x'], robot_pos['y'])
+        self._colored = set(colored_cells)
+        self._markers = dict(markers)
+        self._error_direction: Optional[str] = None
+        self.keyframes: List[Dict[str, Any]] = [self._snapshot()]
+
+    @classmethod
+    def for_robot(cls, robot, **kwargs) -> 'TraceRecorder':
+        """Создаёт трассу с начальным состоянием робота и подключает её к роботу."""
+        static_state = {
+            'width': robot.width,
+            'height': robot.height,
+            'walls': sorted(robot.walls),
+            'symbols': dict(robot.symbols),
+            'radiation': dict(robot.radiation),
+            'temperature': dict(robot.temperature),
+        }
+        recorder = cls(static_state, robot.robot_pos, robot.colored_cells, robot.markers, **kwargs)
+        robot.trace_recorder = recorder
+        return recorder
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    # --- Запись ---
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            'step': len(self.ops),
+            'robot': list(self._pos),
+            'coloredCells': sorted(self._colored),
+            'markers': dict(self._markers),
+            'outputLength': self._output_length,
+            'robotErrorDirection': self._error_direction,
+        }
+
+    def _record(self, op: int, a: int, b: int) -> None:
+        if len(self.ops) >= self.max_steps:
+            self.truncated = True
+            return
+        self.ops.append(op)
+        self.args_a.append(a)
+        self.args_b.append(b)
+        _apply(op, a, b, self)
+        if len(self.ops) % self.keyframe_interval == 0:
+            self.keyframes.append(self._snapshot())
+
+    def record_move(self, x: int, y: int) -> None:
+        self._record(OP_MOVE, x, y)
+
+    def record_move_failed(self, direction: str) -> None:
+        self._record(OP_MOVE_FAILED, DIRECTIONS.index(direction), 0)
+
+    def record_paint(self, x: int, y: int) -> None:
+        self._record(OP_PAINT, x, y)
+
+    def record_marker_put(self, x: int, y: int) -> None:
+        self._record(OP_MARKER_PUT, x, y)
+
+    def record_marker_pick(self, x: int, y: int) -> None:
+        self._record(OP_MARKER_PICK, x, y)
+
+    def record_output(self, text: str) -> None:
+        if not text or len(self.ops) >= self.max_steps:
+            self.truncated = self.truncated or bool(text)
+            return
+        offset = self._output_length
+        self._output.append(text)
+        self._output_length += len(text)
+        self._record(OP_OUTPUT, offset, len(text))
+
+    on_output = record_output
+
+    # --- Восстановление ---
+
+    def state_at(self, step: int) -> Dict[str, Any]:
+        """
+        Полное состояние поля после шага step (0 - начальное состояние).
+        Формат совпадает с KumirLanguageInterpreter.get_state().
+        """
+        step = max(0, min(step, len(self.ops)))
+        keyframe = self.keyframes[min(step // self.keyframe_interval, len(self.keyframes) - 1)]
+        replay = _ReplayState(keyframe)
+        for i in range(keyframe['step'], step):
+            _apply(self.ops[i], self.args_a[i], self.args_b[i], replay)
+        output = ''.join(self._output)
+        x, y = replay._pos
+        return {
+            'step': step,
+            'output': output[:replay._output_length],
+            'robot': {'x': x, 'y': y},
+            'walls': list(self.static_state['walls']),
+            'markers': {pos: count for pos, count in replay._markers.items() if count > 0},
+            'coloredCells': sorted(replay._colored),
+            'symbols': dict(self.static_state['symbols']),
+            'radiation': dict(self.static_state['radiation']),
+            'temperature': dict(self.static_state['temperature']),
+            'robotErrorDirection': replay._error_direction,
+        }
+
+    # --- Сериализация ---
+
+    def to_bytes(self) -> bytes:
+        def as_le(values: array) -> bytes:
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            return values.tobytes()
+
+        def block(payload: bytes) -> bytes:
+            return _LENGTH.pack(len(payload)) + payload
+
+        output = ''.join(self._output)
+        return b''.join([
+            _HEADER.pack(_MAGIC, _VERSION, len(self.ops), self.keyframe_interval, int(self.truncated)),
+            self.ops.tobytes(),
+            as_le(self.args_a),
+            as_le(self.args_b),
+            block(json.dumps(self.static_state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+            block(json.dumps(self.keyframes, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+            block(output.encode('utf-8')),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TraceRecorder':
+        magic, version, steps, keyframe_interval, truncated = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Неизвестный формат трассы выполнения")
+        pos = _HEADER.size
+
+        def take_array(typecode: str) -> array:
+            nonlocal pos
+            values = array(typecode)
+            size = values.itemsize * steps
+            values.frombytes(data[pos:pos + size])
+            if sys.byteorder == 'big' and values.itemsize > 1:
+                values.byteswap()
+            pos += size
+            return values
+
+        def take_block() -> bytes:
+            nonlocal pos
+            (length,) = _LENGTH.unpack_from(data, pos)
+            pos += _LENGTH.size
+            payload = data[pos:pos + length]
+            pos += length
+            return payload
+
+        ops = take_array('B')
+        args_a = take_array('i')
+        args_b = take_array('i')
+        static_state = json.loads(take_block().decode('utf-8'))
+        keyframes = json.loads(take_block().decode('utf-8'))
+        output = take_block().decode('utf-8')
+
+        first = keyframes[0]
+        recorder = cls(static_state, {'x': first['robot'][0], 'y': first['robot'][1]},
+                       first['coloredCells'], first['markers'], keyframe_interval=keyframe_interval)
+        recorder.ops, recorder.args_a, recorder.args_b = ops, args_a, args_b
+        recorder.keyframes = keyframes
+        recorder.truncated = bool(truncated)
+        recorder._output = [output] if output else []
+        recorder._output_length = len(output)
+        return recorder
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Трасса для JSON-ответа: двоичный формат в base64."""
+        return {
+            'format': TRACE_FORMAT,
+            'steps': len(self.ops),
+            'truncated': self.truncated,
+            'data': base64.b64encode(self.to_bytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'TraceRecorder':
+        if payload.get('format') != TRACE_FORMAT:
+            raise ValueError("Неизвестный формат трассы выполнения")
+        return cls.from_bytes(base64.b64decode(payload['data']))
+
+
+class _ReplayState:
+    """Изменяемая часть поля, восстановленная из ключевого кадра."""
+
+    def __init__(self, keyframe: Dict[str, Any]):
+        self._pos = tuple(keyframe['robot'])
+        self._colored = set(keyframe['coloredCells'])
+        self._markers = dict(keyframe['markers'])
+        self._output_length = keyframe['outputLength']
+        self._error_direction = keyframe['robotErrorDirection']
+
+
+def _apply(op: int, a: int, b: int, state) -> None:
+    """Применяет одну операцию к состоянию (TraceRecorder или _ReplayState)."""
+    if op == OP_MOVE:
+        state._pos = (a, b)
+        state._error_direction = None
+    elif op == OP_MOVE_FAILED:
+        state._error_direction = DIRECTIONS[a]
+    elif op == OP_PAINT:
+        state._colored.add(f"{a},{b}")
+    elif op == OP_MARKER_PUT:
+        state._markers[f"{a},{b}"] = 1
+    elif op == OP_MARKER_PICK:
+        state._markers.pop(f"{a},{b}", None)
+    elif op == OP_OUTPUT:
+        if isinstance(state, _ReplayState):
+            state._output_length = a + b
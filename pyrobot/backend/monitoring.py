@@ -5,14 +5,18 @@
 
 import logging
 import json
+import math
+import threading
 import time
 import traceback
 import psutil
 import os
+from array import array
+from bisect import bisect_left
 from functools import wraps
 from datetime import datetime, timezone
-from typing import Dict, Any
-from flask import request, g, jsonify
+from typing import Dict, Any, List, Optional, Tuple
+from flask import request, g, jsonify, Response
 
 
 class StructuredFormatter(logging.Formatter):
@@ -51,23 +55,140 @@ class StructuredFormatter(logging.Formatter):
         return json.dumps(log_data, ensure_ascii=False)
 
 
+# Границы корзин гистограмм (верхние, включительно); последняя корзина - +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Интервал фонового снятия системных метрик и длина истории (в отсчётах)
+SAMPLE_INTERVAL = float(os.environ.get('PYROBOT_METRICS_SAMPLE_INTERVAL', 5))
+SAMPLE_HISTORY = int(os.environ.get('PYROBOT_METRICS_SAMPLE_HISTORY', 120))
+# Окно для средней длительности запроса в сводке
+RECENT_WINDOW_SECONDS = 300
+
+SYSTEM_GAUGES = ('cpu_percent', 'memory_percent', 'process_memory_mb', 'process_cpu_percent',
+                 'disk_usage_percent')
+
+
+class RingBuffer:
+    """Последние size значений в кольцевом буфере фиксированного размера."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values = array('d', bytes(8 * size))
+        self._count = 0
+
+    def append(self, value: float) -> None:
+        self._values[self._count % self.size] = value
+        self._count += 1
+
+    def __len__(self) -> int:
+        return min(self._count, self.size)
+
+    def latest(self, ago: int = 0) -> Optional[float]:
+        """Значение, записанное ago отсчётов назад (None, если его уже или ещё нет)."""
+        if ago >= len(self):
+            return None
+        return self._values[(self._count - 1 - ago) % self.size]
+
+    def values(self) -> List[float]:
+        """Значения от старых к новым."""
+        return [self._values[(self._count - len(self) + i) % self.size] for i in range(len(self))]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами: наблюдение - O(log числа корзин),
+    квантили оцениваются линейной интерполяцией внутри корзины.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.bounds):
+                    return float(self.bounds[-1])  # Корзина +Inf: известна только нижняя граница
+                lower = self.bounds[index - 1] if index else min(0.0, self.bounds[0])
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return float(self.bounds[-1])
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {'count': self.count, 'sum': self.sum}
+        snapshot['avg'] = snapshot['sum'] / snapshot['count'] if snapshot['count'] else 0.0
+        for q in QUANTILES:
+            snapshot[f'p{round(q * 100)}'] = self.quantile(q)
+        return snapshot
+
+    def cumulative_buckets(self) -> List[Tuple[str, int]]:
+        """Пары (le, накопленное число) для экспозиции Prometheus."""
+        with self._lock:
+            counts = list(self.counts)
+        result, cumulative = [], 0
+        for bound, bucket_count in zip(list(self.bounds) + ['+Inf'], counts):
+            cumulative += bucket_count
+            result.append((str(bound), cumulative))
+        return result
+
+
 class MetricsCollector:
     """
     Коллектор метрик производительности
+
+    Запросы, время разбора и выполнения программ и число команд робота
+    копятся в гистограммах с фиксированными корзинами. Системные показатели
+    снимает фоновый поток (start_sampler) раз в SAMPLE_INTERVAL секунд в
+    кольцевые буферы; тот же поток заранее собирает текст для Prometheus,
+    так что /metrics и /metrics/prometheus ничего не ждут и не перебирают.
     """
     
-    def __init__(self):
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL, history: int = SAMPLE_HISTORY):
         self.metrics = {
             'requests_total': 0,
             'requests_success': 0,
             'requests_error': 0,
-            'execution_times': [],
-            'memory_usage': [],
             'code_executions': 0,
             'robot_operations': 0,
+            'robot_operations_by_type': {},
             'errors_by_type': {}
         }
         self.start_time = time.time()
+        self.sample_interval = sample_interval
+        self.request_durations: Dict[str, Histogram] = {}
+        self.all_requests = Histogram(LATENCY_BUCKETS)
+        self.interpreter_parse = Histogram(LATENCY_BUCKETS)
+        self.interpreter_execute = Histogram(LATENCY_BUCKETS)
+        self.robot_ops_per_run = Histogram(COUNT_BUCKETS)
+        self.system = {name: RingBuffer(history) for name in SYSTEM_GAUGES}
+        self.sample_times = RingBuffer(history)
+        # Накопленные число и сумма длительностей запросов на момент каждого отсчёта (для среднего за окно)
+        self._request_count_samples = RingBuffer(history)
+        self._request_sum_samples = RingBuffer(history)
+        self._prometheus_text: Optional[str] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_lock = threading.Lock()
+        self._process = psutil.Process()
     
     def record_request(self, endpoint: str, method: str, status_code: int, duration: float):
         """Записать метрику запроса"""
@@ -78,25 +199,36 @@ class MetricsCollector:
         else:
             self.metrics['requests_error'] += 1
         
-        self.metrics['execution_times'].append({
-            'endpoint': endpoint,
-            'method': method,
-            'duration': duration,
-            'timestamp': time.time()
-        })
-        
-        # Ограничиваем размер списка
-        if len(self.metrics['execution_times']) > 1000:
-            self.metrics['execution_times'] = self.metrics['execution_times'][-500:]
+        histogram = self.request_durations.get(endpoint)
+        if histogram is None:
+            histogram = self.request_durations.setdefault(endpoint, Histogram(LATENCY_BUCKETS))
+        histogram.observe(duration)
+        self.all_requests.observe(duration)
     
     def record_code_execution(self, duration: float, lines_count: int):
         """Записать метрику выполнения кода"""
         self.metrics['code_executions'] += 1
         # Можно добавить более подробные метрики выполнения кода
     
-    def record_robot_operation(self, operation: str):
+    def record_interpreter_timings(self, timings: Optional[Dict[str, Any]]):
+        """Записать время разбора и выполнения программы и число команд робота (ExecutionResult.timings)"""
+        if not timings:
+            return
+        if 'parse' in timings:
+            self.interpreter_parse.observe(timings['parse'])
+        if 'execute' in timings:
+            self.interpreter_execute.observe(timings['execute'])
+        if 'robot_ops' in timings:
+            self.robot_ops_per_run.observe(timings['robot_ops'])
+        # Команды робота по видам (RobotCommandCounter - наблюдатель выполнения)
+        for operation, count in timings.get('robot_commands', {}).items():
+            self.record_robot_operation(operation, count)
+    
+    def record_robot_operation(self, operation: str, count: int = 1):
         """Записать операцию робота"""
-        self.metrics['robot_operations'] += 1
+        self.metrics['robot_operations'] += count
+        by_type = self.metrics['robot_operations_by_type']
+        by_type[operation] = by_type.get(operation, 0) + count
     
     def record_error(self, error_type: str, error_message: str):
         """Записать ошибку"""
@@ -104,32 +236,100 @@ class MetricsCollector:
             self.metrics['errors_by_type'][error_type] = 0
         self.metrics['errors_by_type'][error_type] += 1
     
-    def get_system_metrics(self) -> Dict[str, Any]:
-        """Получить системные метрики"""
-        process = psutil.Process()
-        
-        return {
-            'cpu_percent': psutil.cpu_percent(interval=1),
+    def start_sampler(self) -> None:
+        """Запускает фоновый поток снятия системных метрик (повторный вызов ничего не делает)."""
+        with self._sampler_lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(target=self._sampler_loop, name='metrics-sampler', daemon=True)
+            self._sampler.start()
+    
+    def _sampler_loop(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                logging.getLogger('PyRobot.Metrics').exception("Metrics sampling failed")
+            time.sleep(self.sample_interval)
+    
+    def sample(self) -> None:
+        """Снимает системные метрики (без ожидания) и пересобирает снимок для Prometheus."""
+        # cpu_percent(interval=None) сравнивает с предыдущим вызовом и не блокирует
+        values = {
+            'cpu_percent': psutil.cpu_percent(interval=None),
             'memory_percent': psutil.virtual_memory().percent,
-            'process_memory_mb': process.memory_info().rss / 1024 / 1024,
-            'process_cpu_percent': process.cpu_percent(),
+            'process_memory_mb': self._process.memory_info().rss / 1024 / 1024,
+            'process_cpu_percent': self._process.cpu_percent(interval=None),
             'disk_usage_percent': psutil.disk_usage('/').percent,
-            'uptime_seconds': time.time() - self.start_time
+        }
+        for name, value in values.items():
+            self.system[name].append(value)
+        self.sample_times.append(time.time())
+        self._request_count_samples.append(self.all_requests.count)
+        self._request_sum_samples.append(self.all_requests.sum)
+        self._prometheus_text = self._build_prometheus_text()
+    
+    def get_parse_cache_metrics(self) -> Dict[str, Any]:
+        """Получить метрики кэша деревьев разбора (попадания/промахи/вытеснения)"""
+        from .kumir_interpreter.parse_cache import get_parse_cache
+        return get_parse_cache().get_stats()
+    
+    def get_result_cache_metrics(self) -> Dict[str, Any]:
+        """Получить метрики кэша результатов выполнения (попадания в памяти и в Redis, промахи)"""
+        from .result_cache import get_result_cache
+        return get_result_cache().get_stats()
+    
+    def get_parsing_metrics(self) -> Dict[str, Any]:
+        """Получить время разбора по режимам (SLL/LL) и прогрев: этот процесс и рабочие процессы пула"""
+        from .kumir_interpreter.parsing import get_parse_stats, merge_parse_stats
+        from .execution_pool import get_execution_pool
+        return merge_parse_stats([get_parse_stats(), get_execution_pool().get_stats()['parsing']])
+    
+    def get_execution_pool_metrics(self) -> Dict[str, Any]:
+        """Получить метрики пула процессов выполнения (занятость, очередь, отказы)"""
+        from .execution_pool import get_execution_pool
+        return get_execution_pool().get_stats()
+    
+    def get_system_metrics(self) -> Dict[str, Any]:
+        """Получить системные метрики (последний отсчёт фонового потока, без ожидания)"""
+        if not len(self.sample_times):
+            self.sample()
+        metrics = {name: buffer.latest() for name, buffer in self.system.items()}
+        metrics['uptime_seconds'] = time.time() - self.start_time
+        metrics['sampled_at'] = self.sample_times.latest()
+        return metrics
+    
+    def get_system_history(self) -> Dict[str, List[float]]:
+        """Получить историю системных метрик из кольцевых буферов (от старых отсчётов к новым)"""
+        history = {name: buffer.values() for name, buffer in self.system.items()}
+        history['timestamps'] = self.sample_times.values()
+        return history
+    
+    def _recent_avg_response_time(self) -> float:
+        """Средняя длительность запроса за RECENT_WINDOW_SECONDS по накопленным значениям в отсчётах"""
+        samples = len(self._request_count_samples)
+        if not samples:
+            return self.all_requests.sum / self.all_requests.count if self.all_requests.count else 0.0
+        ago = min(samples - 1, max(0, math.ceil(RECENT_WINDOW_SECONDS / self.sample_interval) - 1))
+        count = self.all_requests.count - self._request_count_samples.latest(ago)
+        total = self.all_requests.sum - self._request_sum_samples.latest(ago)
+        return total / count if count else 0.0
+    
+    def get_latency_metrics(self) -> Dict[str, Any]:
+        """Получить гистограммы (p50/p95/p99) длительностей запросов, разбора и выполнения программ"""
+        return {
+            'requests': self.all_requests.snapshot(),
+            'endpoints': {endpoint: histogram.snapshot()
+                          for endpoint, histogram in list(self.request_durations.items())},
+            'interpreter_parse': self.interpreter_parse.snapshot(),
+            'interpreter_execute': self.interpreter_execute.snapshot(),
+            'robot_ops_per_run': self.robot_ops_per_run.snapshot(),
         }
     
     def get_summary(self) -> Dict[str, Any]:
         """Получить сводку всех метрик"""
         system_metrics = self.get_system_metrics()
-        
-        # Вычисляем средние времена выполнения
-        recent_executions = [
-            ex for ex in self.metrics['execution_times'] 
-            if time.time() - ex['timestamp'] < 300  # последние 5 минут
-        ]
-        
-        avg_response_time = 0
-        if recent_executions:
-            avg_response_time = sum(ex['duration'] for ex in recent_executions) / len(recent_executions)
+        avg_response_time = self._recent_avg_response_time()
         
         return {
             'system': system_metrics,
@@ -143,11 +343,95 @@ class MetricsCollector:
                 'avg_response_time_ms': avg_response_time * 1000,
                 'code_executions': self.metrics['code_executions'],
                 'robot_operations': self.metrics['robot_operations'],
+                'robot_operations_by_type': dict(self.metrics['robot_operations_by_type']),
                 'errors_by_type': self.metrics['errors_by_type'],
                 'recent_errors_count': sum(self.metrics['errors_by_type'].values())
             },
+            'latency': self.get_latency_metrics(),
+            'parse_cache': self.get_parse_cache_metrics(),
+            'result_cache': self.get_result_cache_metrics(),
+            'parsing': self.get_parsing_metrics(),
+            'execution_pool': self.get_execution_pool_metrics(),
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
+    
+    def get_prometheus_text(self) -> str:
+        """Текст в формате Prometheus: готовый снимок последнего отсчёта фонового потока"""
+        if self._prometheus_text is None:
+            self.sample()
+        return self._prometheus_text
+    
+    def _build_prometheus_text(self) -> str:
+        lines: List[str] = []
+        
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_prometheus_labels(labels)} {_prometheus_value(value)}")
+        
+        def histogram(name: str, help_text: str, histograms: Dict[str, Any], label: Optional[str] = None) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for label_value, hist in histograms.items():
+                labels = {label: label_value} if label else {}
+                for le, cumulative in hist.cumulative_buckets():
+                    lines.append(f"{name}_bucket{_prometheus_labels(dict(labels, le=le))} {cumulative}")
+                lines.append(f"{name}_sum{_prometheus_labels(labels)} {_prometheus_value(hist.sum)}")
+                lines.append(f"{name}_count{_prometheus_labels(labels)} {hist.count}")
+        
+        metric('pyrobot_uptime_seconds', 'gauge', 'Process uptime.', [({}, time.time() - self.start_time)])
+        metric('pyrobot_requests_total', 'counter', 'HTTP requests by outcome.',
+               [({'outcome': 'success'}, self.metrics['requests_success']),
+                ({'outcome': 'error'}, self.metrics['requests_error'])])
+        metric('pyrobot_code_executions_total', 'counter', 'Program executions.',
+               [({}, self.metrics['code_executions'])])
+        metric('pyrobot_robot_operations_total', 'counter', 'Robot operations by type.',
+               [({'operation': op}, count) for op, count in self.metrics['robot_operations_by_type'].items()])
+        metric('pyrobot_errors_total', 'counter', 'Errors by exception type.',
+               [({'type': error_type}, count) for error_type, count in self.metrics['errors_by_type'].items()])
+        for name in SYSTEM_GAUGES:
+            metric(f'pyrobot_system_{name}', 'gauge', f'System gauge {name}.', [({}, self.system[name].latest())])
+        
+        histogram('pyrobot_request_duration_seconds', 'HTTP request duration by endpoint.',
+                  dict(self.request_durations), label='endpoint')
+        histogram('pyrobot_interpreter_parse_seconds', 'Program parse time in pool workers.',
+                  {'': self.interpreter_parse})
+        histogram('pyrobot_interpreter_execute_seconds', 'Program execution time without input waits.',
+                  {'': self.interpreter_execute})
+        histogram('pyrobot_robot_operations_per_run', 'Robot commands per program run.',
+                  {'': self.robot_ops_per_run})
+        
+        pool = self.get_execution_pool_metrics()
+        metric('pyrobot_pool_workers', 'gauge', 'Pool worker processes by state.',
+               [({'state': state}, pool[state]) for state in ('idle', 'starting')])
+        metric('pyrobot_pool_waiting', 'gauge', 'Jobs waiting for a worker.', [({}, pool['waiting'])])
+        metric('pyrobot_pool_suspended_runs', 'gauge', 'Runs parked at input.', [({}, pool['suspended'])])
+        metric('pyrobot_pool_jobs_total', 'counter', 'Pool jobs by outcome.',
+               [({'outcome': outcome}, pool[f'jobs_{outcome}']) for outcome in ('completed', 'rejected', 'killed')])
+        for cache_name, stats in (('parse', self.get_parse_cache_metrics()), ('result', self.get_result_cache_metrics())):
+            metric(f'pyrobot_{cache_name}_cache_lookups_total', 'counter', f'{cache_name.capitalize()} cache lookups.',
+                   [({'outcome': 'hit'}, stats['hits'] + stats.get('redis_hits', 0)),
+                    ({'outcome': 'miss'}, stats['misses'])])
+            metric(f'pyrobot_{cache_name}_cache_entries', 'gauge', f'{cache_name.capitalize()} cache entries.',
+                   [({}, stats['entries'])])
+        return '\n'.join(lines) + '\n'
+
+
+def _prometheus_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _prometheus_value(value: Optional[float]) -> str:
+    if value is None:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
 
 
 # Глобальный экземпляр коллектора метрик
@@ -389,6 +673,15 @@ def create_health_endpoints(app) -> None:
     def metrics_endpoint():
         """Endpoint для получения метрик (для мониторинговых систем)"""
         return jsonify(metrics_collector.get_summary())
+    
+    @app.route('/metrics/prometheus', methods=['GET'])
+    def prometheus_metrics_endpoint():
+        """Метрики в текстовом формате Prometheus (готовый снимок фонового потока)"""
+        return Response(metrics_collector.get_prometheus_text(),
+                        mimetype='text/plain; version=0.0.4; charset=utf-8')
+    
+    # Системные метрики снимаются в фоне, чтобы запросы метрик не ждали psutil
+    metrics_collector.start_sampler()
 
 
 def check_redis_health() -> Dict[str, Any]:
@@ -0,0 +1,246 @@
+# result_cache.py
+"""
+Кэш результатов выполнения детерминированных программ КуМир.
+
+Учитель раз за разом запускает одну и ту же демонстрационную программу на
+одном и том же поле, и каждый раз интерпретатор выполняет её целиком.
+Программа без случайных чисел, времени и файлов при одинаковых коде, поле
+и вводе всегда даёт один и тот же результат, поэтому ответ /execute
+(итоговое поле, вывод, трасса) можно взять из кэша.
+
+Ключ - sha256 от нормализованного кода (parse_cache.normalize_source),
+канонического состояния поля и заданного ввода. Детерминированность
+проверяется по токенам лексера: программа не кэшируется, если в ней есть
+тип "файл" или имя из NONDETERMINISTIC_NAMES (случайные числа, время,
+файловые функции из file_functions).
+
+Два уровня: LRU в памяти процесса (по числу записей, объёму и TTL) и
+Redis (SETEX с тем же TTL), общий для нескольких процессов сервера.
+Кэшируются только успешные запуски: ошибка из-за лимитов зависит от нагрузки.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .kumir_interpreter import file_functions
+from .kumir_interpreter.kumir_globals import SAFE_GLOBALS
+from .kumir_interpreter.memoization import NONDETERMINISTIC_BUILTINS
+from .kumir_interpreter.parse_cache import normalize_source
+
+logger = logging.getLogger('PyRobot.ResultCache')
+
+# Настройки по умолчанию (можно переопределить через переменные окружения)
+DEFAULT_MAX_ENTRIES = int(os.environ.get('KUMIR_RESULT_CACHE_MAX_ENTRIES', 512))
+DEFAULT_MAX_BYTES = int(os.environ.get('KUMIR_RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+DEFAULT_TTL = float(os.environ.get('KUMIR_RESULT_CACHE_TTL', 3600))
+RESULT_CACHE_ENABLED = os.environ.get('KUMIR_RESULT_CACHE', '1') not in ('0', 'false', 'no')
+REDIS_KEY_PREFIX = 'kumir:result:'
+# Меняется при изменении формата результата, чтобы старые записи в Redis не использовались
+CACHE_VERSION = 1
+
+# Поля состояния, от которых зависит выполнение (cellSize и т.п. не влияют)
+FIELD_STATE_KEYS = ('width', 'height', 'robotPos', 'walls', 'markers', 'coloredCells',
+                    'symbols', 'radiation', 'temperature')
+# Поля, которые интерпретатор воспринимает как множества
+_UNORDERED_FIELD_KEYS = ('walls', 'coloredCells')
+
+_FILE_NAMES = {
+    name.lower() for name, value in SAFE_GLOBALS.items()
+    if getattr(value, '__module__', None) == file_functions.__name__
+} | {'файлы'}  # "использовать Файлы"
+NONDETERMINISTIC_NAMES = frozenset(NONDETERMINISTIC_BUILTINS | _FILE_NAMES)
+
+
+def is_deterministic(code: str) -> bool:
+    """Программа не использует случайные числа, время и файлы (проверка по токенам)."""
+    from antlr4 import InputStream
+    from .kumir_interpreter.generated.KumirLexer import KumirLexer
+
+    lexer = KumirLexer(InputStream(code))
+    lexer.removeErrorListeners()
+    for token in lexer.getAllTokens():
+        if token.type == KumirLexer.FILE_TYPE:
+            return False
+        if token.type == KumirLexer.ID and token.text.lower() in NONDETERMINISTIC_NAMES:
+            return False
+    return True
+
+
+def canonical_field_state(field_state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Состояние поля без лишних полей и с упорядоченными списками стен и клеток."""
+    if not field_state:
+        return None
+    canonical = {key: field_state[key] for key in FIELD_STATE_KEYS if field_state.get(key) is not None}
+    for key in _UNORDERED_FIELD_KEYS:
+        if key in canonical:
+            canonical[key] = sorted(set(canonical[key]))
+    return canonical
+
+
+def result_cache_key(code: str, field_state: Optional[Dict[str, Any]], input_data: Optional[str]) -> str:
+    payload = json.dumps([CACHE_VERSION, normalize_source(code), canonical_field_state(field_state),
+                          input_data or ""], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Двухуровневый кэш результатов: LRU с TTL в памяти процесса и Redis.
+
+    Значение - JSON {'result': словарь interpret(), 'width', 'height'}.
+    Ошибки Redis не мешают работе: запрос просто считается промахом.
+    """
+
+    def __init__(self, redis_client=None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()  # ключ -> (JSON, срок)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.redis_errors = 0
+
+    def lookup_key(self, code: str, field_state: Optional[Dict[str, Any]],
+                   input_data: Optional[str] = None) -> Optional[str]:
+        """Ключ кэша для запуска или None, если программа недетерминирована."""
+        if not is_deterministic(code):
+            with self._lock:
+                self.uncacheable += 1
+            return None
+        return result_cache_key(code, field_state, input_data)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[0])
+                self._remove(key)
+                self.expirations += 1
+
+        value = self._redis_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.redis_hits += 1
+        self._store_local(key, value)
+        return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Сохраняет результат; неуспешные запуски не кэшируются."""
+        if not value.get('result', {}).get('success'):
+            return
+        encoded = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        if self._store_local(key, encoded):
+            with self._lock:
+                self.stores += 1
+            self._redis_set(key, encoded)
+
+    def _store_local(self, key: str, encoded: str) -> bool:
+        size = len(encoded)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return False
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (encoded, time.monotonic() + self.ttl)
+            self._total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._total_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: str) -> None:
+        """Удаляет запись (вызывается под блокировкой)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[0])
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        if self.redis_client is None:
+            return None
+        try:
+            value = self.redis_client.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def _redis_set(self, key: str, encoded: str) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.setex(REDIS_KEY_PREFIX + key, max(1, int(self.ttl)), encoded.encode('utf-8'))
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception) -> None:
+        with self._lock:
+            self.redis_errors += 1
+        logger.warning(f"Result cache Redis error: {error}")
+
+    def clear(self) -> None:
+        """Очищает кэш процесса (Redis и счётчики не трогаются)."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша для системы мониторинга."""
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                'enabled': RESULT_CACHE_ENABLED,
+                'redis': self.redis_client is not None,
+                'hits': self.hits,
+                'redis_hits': self.redis_hits,
+                'misses': self.misses,
+                'hit_rate': ((self.hits + self.redis_hits) / lookups * 100) if lookups else 0.0,
+                'uncacheable': self.uncacheable,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'redis_errors': self.redis_errors,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            }
+
+
+# Глобальный (на процесс) экземпляр кэша
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache(redis_client=None) -> ResultCache:
+    """
+    Возвращает общий для процесса кэш результатов. redis_client учитывается
+    при первом вызове (сервер передаёт клиент, через который хранит сессии).
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(redis_client=redis_client)
+    return _result_cache
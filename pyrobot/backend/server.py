@@ -5,25 +5,28 @@ import eventlet
 eventlet.monkey_patch()
 import redis
 from redis.exceptions import ConnectionError as RedisConnectionError
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session
 from flask_cors import CORS
 from flask_session import Session
 from flask_socketio import SocketIO, join_room, emit, request as socketio_request
+import json
 import os
 from pathlib import Path
 
-# Импортируем интерпретатор и нужные исключения из нового файла
-from .kumir_interpreter.interpreter import KumirLanguageInterpreter
-from .kumir_interpreter.kumir_exceptions import (
-    KumirExecutionError, KumirEvalError,
-    KumirInputRequiredError, RobotError,
-    DeclarationError, AssignmentError, InputOutputError
-)
+# Программы выполняются в пуле рабочих процессов, а не в потоке запроса
+from .execution_pool import get_execution_pool, ExecutionPoolSaturated, ExecutionResult, RunNotOwned
+from .result_cache import get_result_cache, RESULT_CACHE_ENABLED
+from .grading import (grade, get_test_set_store, TestSetNotFound, run_on_fields, fields_report,
+                      DEFAULT_GRADE_MAX_RUNS, DEFAULT_GRADE_TIME_LIMIT, VERDICT_OK)
+from .kumir_interpreter.trace_recorder import TraceRecorder
+
+# Трасса последнего запуска хранится в сессии для /trace/frame, если не больше этого размера
+MAX_SESSION_TRACE_BYTES = int(os.environ.get('KUMIR_MAX_SESSION_TRACE_BYTES', 1 << 20))
 
 # Импортируем новую систему мониторинга
 from .monitoring import (
     setup_logging, request_logging_middleware, 
-    create_health_endpoints, log_code_execution
+    create_health_endpoints, log_code_execution, metrics_collector
 )
 
 app = Flask(__name__)
@@ -123,6 +126,113 @@ def get_field_state_from_session():
         return None
 
 
+def make_progress_callback(current_sid, logger):
+    """Callback прогресса, отправляющий дельты вывода клиенту current_sid через WebSocket."""
+    # Флаг для предотвращения повторных предупреждений
+    warned_no_sid = False
+
+    def progress_callback(progress_data):
+        # Вызывается в этом (green) потоке с дельтами вывода из рабочего процесса:
+        # {'seq', 'offset', 'delta', 'robotPos'} (см. kumir_interpreter.output_stream)
+        nonlocal warned_no_sid
+        if not current_sid:
+            if not warned_no_sid:
+                logger.warning("Cannot emit progress via WebSocket: "
+                              "No SID found in Flask session.")
+                warned_no_sid = True
+            return
+
+        try:
+            socketio.emit('execution_progress', progress_data,
+                         to=current_sid)
+        except Exception as emit_err:
+            logger.error(f"Error emitting progress to SID {current_sid}: "
+                       f"{emit_err}")
+
+    return progress_callback
+
+
+def build_execution_response(execution, logger, save_to_session=True):
+    """
+    Ответ клиенту по результату задания пула. При save_to_session итоговое
+    поле и трасса успешного запуска сохраняются в сессии.
+    """
+    result = execution.result
+    if result.get('input_required'):
+        logger.info(f"Execution requires input for variable "
+                   f"'{result.get('var_name')}', run {result.get('run_id')} "
+                   f"suspended. Returning input request.")
+        result['trace'] = result.get('trace', [])
+        return result
+
+    if not result.get('cached'):
+        metrics_collector.record_interpreter_timings(execution.timings)
+    trace_data = result.get('trace', [])
+    final_state_data = result.get('finalState')
+
+    response_data = {
+        'success': result.get('success', False),
+        'message': result.get('message', 'OK' if result.get('success')
+                             else 'Unknown Error'),
+        'finalState': final_state_data,
+        'trace': trace_data
+    }
+
+    if result.get('cached'):
+        response_data['cached'] = True
+    for report in ('profile', 'memo'):
+        if report in result:
+            response_data[report] = result[report]
+
+    trace_payload = result.get('traceData')
+    if trace_payload:
+        response_data['traceData'] = trace_payload
+    if trace_payload and save_to_session:
+        if len(trace_payload['data']) <= MAX_SESSION_TRACE_BYTES:
+            session['last_trace'] = trace_payload
+        else:
+            session.pop('last_trace', None)
+        session.modified = True
+
+    if not response_data['success']:
+        response_data['errorIndex'] = result.get('errorIndex', -1)
+        logger.warning(f"Execution finished with error: "
+                      f"{response_data['message']} "
+                      f"(Error Index: {response_data.get('errorIndex')})")
+    else:
+        logger.info("Execution completed successfully.")
+    if response_data['success'] and save_to_session:
+        try:
+            if (execution.width is not None and final_state_data and
+                final_state_data.get('robot') is not None):
+                field_state_to_save = {
+                    'width': execution.width,
+                    'height': execution.height,
+                    'robotPos': final_state_data.get('robot'),
+                    'walls': final_state_data.get('walls', []),
+                    'markers': final_state_data.get('markers', {}),
+                    'coloredCells': final_state_data.get('coloredCells', []),
+                    'symbols': final_state_data.get('symbols', {}),
+                    'radiation': final_state_data.get('radiation', {}),
+                    'temperature': final_state_data.get('temperature', {})
+                }
+                field_state_to_save = {k: v for k, v in
+                                      field_state_to_save.items()
+                                      if v is not None}
+                session['field_state'] = field_state_to_save
+                session.modified = True
+                logger.debug("Saved final field state to session after "
+                            "successful execution.")
+            else:
+                logger.warning("Could not save final state to session: "
+                              "interpreter/finalState/robotPos missing.")
+        except Exception as save_err:
+            logger.error(f"Error saving final state to session: "
+                       f"{save_err}", exc_info=True)
+
+    return response_data
+
+
 # --- Эндпоинты Flask ---
 @app.route('/updateField', methods=['POST'])
 def update_field():
@@ -226,6 +336,13 @@ def execute_code():
     data = request.get_json()
     code = data.get('code', '').strip()
     client_state = data.get('fieldState')
+    # Необязательный заранее заданный ввод (строки через перевод строки)
+    input_data = data.get('input')
+    if not isinstance(input_data, str):
+        input_data = None
+    # Профилирование (время по строкам и алгоритмам) и запоминание чистых функций - с отчётом в ответе
+    profile = bool(data.get('profile'))
+    memoize = bool(data.get('memoize'))
     
     if not code:
         logger.warning("Empty code received for execution.")
@@ -243,149 +360,217 @@ def execute_code():
         logger.info("No initial state provided or found in session, "
                    "using interpreter defaults.")
     
-    interpreter = None
-    trace_data = []
-    
+    current_sid = session.get('sid')
+    progress_callback = make_progress_callback(current_sid, logger)
+
+    # Детерминированная программа на том же поле с тем же вводом - результат из кэша
+    result_cache = get_result_cache(app.config.get('SESSION_REDIS'))
+    cache_key = (result_cache.lookup_key(code, initial_state, input_data)
+                 if RESULT_CACHE_ENABLED and not (profile or memoize) else None)
+    cached = result_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        logger.info("Execution result served from cache.")
+        cached['result']['cached'] = True
+        execution = ExecutionResult(cached['result'], cached['width'], cached['height'])
+        return jsonify(build_execution_response(execution, logger)), 200
+
     try:
-        interpreter = KumirLanguageInterpreter(code, 
-                                             initial_field_state=initial_state)
-        logger.debug("Kumir interpreter initialized successfully.")
-
-        # Флаг для предотвращения повторных предупреждений
-        warned_no_sid = False
-        
-        def progress_callback(progress_data):
-            nonlocal warned_no_sid
-            current_sid = session.get('sid')
-            if not current_sid:
-                if not warned_no_sid:
-                    logger.warning("Cannot emit progress via WebSocket: "
-                                  "No SID found in Flask session.")
-                    warned_no_sid = True
-                return
-            
-            if interpreter:
-                if hasattr(interpreter, 'robot'):
-                    progress_data['robotPos'] = interpreter.robot.robot_pos.copy()
-                progress_data['output'] = interpreter.output
-            else:
-                progress_data['output'] = ""
-            
-            try:
-                eventlet.sleep(0)
-                socketio.emit('execution_progress', progress_data, 
-                             to=current_sid)
-            except Exception as emit_err:
-                logger.error(f"Error emitting progress to SID {current_sid}: "
-                           f"{emit_err}")
-
-        result = interpreter.interpret(progress_callback=progress_callback)
-        
-        if result.get('input_required'):
-            logger.info(f"Execution requires input for variable "
-                       f"'{result.get('var_name')}'. Returning input request.")
-            result['trace'] = result.get('trace', [])
-            return jsonify(result), 200
-        
-        trace_data = result.get('trace', [])
-        final_state_data = result.get('finalState')
-        
-        response_data = {
-            'success': result.get('success', False),
-            'message': result.get('message', 'OK' if result.get('success') 
-                                 else 'Unknown Error'),
-            'finalState': final_state_data,
-            'trace': trace_data
-        }
-        
-        if not response_data['success']:
-            response_data['errorIndex'] = result.get('errorIndex', -1)
-            logger.warning(f"Execution finished with error: "
-                          f"{response_data['message']} "
-                          f"(Error Index: {response_data.get('errorIndex')})")
-        else:
-            logger.info("Execution completed successfully.")
-            try:
-                if (interpreter and final_state_data and 
-                    final_state_data.get('robot') is not None):
-                    field_state_to_save = {
-                        'width': interpreter.width,
-                        'height': interpreter.height,
-                        'robotPos': final_state_data.get('robot'),
-                        'walls': final_state_data.get('walls', []),
-                        'markers': final_state_data.get('markers', {}),
-                        'coloredCells': final_state_data.get('coloredCells', []),
-                        'symbols': final_state_data.get('symbols', {}),
-                        'radiation': final_state_data.get('radiation', {}),
-                        'temperature': final_state_data.get('temperature', {})
-                    }
-                    field_state_to_save = {k: v for k, v in 
-                                          field_state_to_save.items() 
-                                          if v is not None}
-                    session['field_state'] = field_state_to_save
-                    session.modified = True
-                    logger.debug("Saved final field state to session after "
-                                "successful execution.")
-                else:
-                    logger.warning("Could not save final state to session: "
-                                  "interpreter/finalState/robotPos missing.")
-            except Exception as save_err:
-                logger.error(f"Error saving final state to session: "
-                           f"{save_err}", exc_info=True)
-        
-        return jsonify(response_data), 200
-    
-    except (KumirExecutionError, KumirEvalError, RobotError, 
-            KumirInputRequiredError, DeclarationError, AssignmentError,
-            InputOutputError) as e:
-        logger.error(f"Ошибка выполнения: {str(e)}", exc_info=True)
-        err_msg = "Произошла ошибка выполнения. Пожалуйста, проверьте ваш код."
-        output_on_error = (interpreter.output 
-                          if interpreter and hasattr(interpreter, 'output') 
-                          else "")
-        state_on_error = {}
-        error_index = -1
-        
-        try:
-            state_on_error = (interpreter.get_state() 
-                             if interpreter and hasattr(interpreter, 'get_state') 
-                             else {})
-            state_on_error["output"] = output_on_error
-            error_index = getattr(e, 'line_index', -1)
-        except Exception as getStateErr:
-            logger.error(f"Error getting state after Kumir error: "
-                        f"{getStateErr}")
-            state_on_error = {"output": output_on_error}
-        
-        logger.error("Kumir execution error occurred.", exc_info=True)
-        return jsonify({
+        execution = get_execution_pool().execute(
+            code, field_state=initial_state, on_progress=progress_callback,
+            job_key=current_sid, input_data=input_data, profile=profile, memoize=memoize)
+    except ExecutionPoolSaturated as e:
+        logger.warning(f"Execution pool saturated, rejecting request "
+                      f"(Retry-After: {e.retry_after}s).")
+        response = jsonify({
             'success': False,
-            'message': err_msg,
-            'finalState': state_on_error,
-            'errorIndex': error_index
-        }), 200
-    
-    except Exception as e:
-        logger.exception("Unexpected server error during code execution.")
-        output_on_error = (interpreter.output 
-                          if interpreter and hasattr(interpreter, 'output') 
-                          else "")
-        state_on_error = {}
-        
-        try:
-            state_on_error = (interpreter.get_state() 
-                             if interpreter and hasattr(interpreter, 'get_state') 
-                             else {})
-        except Exception:
-            pass
-        
-        state_on_error["output"] = output_on_error
+            'message': 'Сервер перегружен, повторите попытку позже.',
+            'retryAfter': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    except Exception:
         logger.exception("Unexpected server error during code execution.")
         return jsonify({
             'success': False,
             'message': 'Внутренняя ошибка сервера',
-            'finalState': state_on_error
+            'finalState': {'output': ""}
+        }), 500
+
+    if cache_key:
+        result_cache.put(cache_key, {'result': execution.result,
+                                     'width': execution.width, 'height': execution.height})
+    return jsonify(build_execution_response(execution, logger)), 200
+
+
+@app.route('/execute/input', methods=['POST'])
+@log_code_execution
+def provide_execution_input():
+    """Продолжает программу, остановленную на вводе (run_id из ответа с input_required)."""
+    logger = logging.getLogger('PyRobot.Execute')
+    data = request.get_json(silent=True) or {}
+    run_id = data.get('runId')
+    value = data.get('value', '')
+    if not isinstance(run_id, str) or not run_id:
+        return jsonify({
+            'success': False,
+            'message': 'Не указан идентификатор запуска (runId).'
+        }), 400
+    current_sid = session.get('sid')
+    try:
+        execution = get_execution_pool().resume(
+            run_id, str(value), on_progress=make_progress_callback(current_sid, logger),
+            job_key=current_sid)
+    except RunNotOwned:
+        logger.warning(f"Rejected input for run {run_id}: it was started by another client.")
+        return jsonify({
+            'success': False,
+            'message': 'Запуск начат другим клиентом.'
+        }), 403
+    except Exception:
+        logger.exception("Unexpected server error while resuming execution.")
+        return jsonify({
+            'success': False,
+            'message': 'Внутренняя ошибка сервера',
+            'finalState': {'output': ""}
+        }), 500
+    return jsonify(build_execution_response(execution, logger)), 200
+
+
+@app.route('/execute/fields', methods=['POST'])
+@log_code_execution
+def execute_on_fields():
+    """
+    Выполнение одной программы на нескольких обстановках: {'code', 'fields': [состояние
+    поля, ...], 'timeLimit': секунды на обстановку}. Ответ - сводный отчёт
+    {'success', 'passed', 'total', 'fields': [{'field', 'success', 'message',
+    'finalState', 'steps', 'robotOps', 'time', 'limit'}, ...]} в порядке fields.
+    """
+    logger = logging.getLogger('PyRobot.Execute')
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid request content type (expected JSON).'
+        }), 415
+
+    code = data.get('code')
+    fields = data.get('fields')
+    if not isinstance(code, str) or not code.strip():
+        return jsonify({
+            'success': False,
+            'message': 'Код для выполнения пуст.'
+        }), 400
+    if not isinstance(fields, list) or not fields:
+        return jsonify({
+            'success': False,
+            'message': 'Не заданы обстановки (fields).'
+        }), 400
+    if len(fields) > DEFAULT_GRADE_MAX_RUNS:
+        return jsonify({
+            'success': False,
+            'message': f"Слишком много запусков: не более {DEFAULT_GRADE_MAX_RUNS} за запрос."
+        }), 413
+    time_limit = data.get('timeLimit')
+    if not isinstance(time_limit, (int, float)) or not 0 < time_limit <= DEFAULT_GRADE_TIME_LIMIT:
+        time_limit = DEFAULT_GRADE_TIME_LIMIT
+    logger.info(f"Executing program on {len(fields)} fields")
+
+    try:
+        runs = run_on_fields(code, fields, pool=get_execution_pool(), time_limit=time_limit)
+    except Exception:
+        logger.exception("Unexpected server error during multi-field execution.")
+        return jsonify({
+            'success': False,
+            'message': 'Внутренняя ошибка сервера'
         }), 500
+    return jsonify(fields_report(runs)), 200
+
+
+@app.route('/grade', methods=['POST'])
+@log_code_execution
+def grade_programs():
+    """
+    Проверка пакета программ на наборе тестов: {'programs': {id: код} или [код, ...],
+    'testSet': id, 'timeLimit': секунды на тест}. Ответ - NDJSON: строка на каждый
+    тест ({'program', 'case', 'verdict', 'time', 'message'}) по мере готовности,
+    последняя строка - итог {'done': true, 'programs': {id: {'passed', 'total'}}}.
+    """
+    logger = logging.getLogger('PyRobot.Grade')
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid request content type (expected JSON).'
+        }), 415
+
+    programs = data.get('programs')
+    if isinstance(programs, list):
+        programs = {str(index): code for index, code in enumerate(programs)}
+    if (not isinstance(programs, dict) or not programs or
+            not all(isinstance(code, str) for code in programs.values())):
+        return jsonify({
+            'success': False,
+            'message': 'Не заданы программы (programs).'
+        }), 400
+    programs = {str(program_id): code for program_id, code in programs.items()}
+
+    try:
+        cases = get_test_set_store().get(data.get('testSet'))
+    except TestSetNotFound:
+        return jsonify({
+            'success': False,
+            'message': f"Набор тестов '{data.get('testSet')}' не найден."
+        }), 404
+    except ValueError as e:
+        logger.error(f"Invalid test set '{data.get('testSet')}': {e}")
+        return jsonify({
+            'success': False,
+            'message': f"Некорректный набор тестов: {e}"
+        }), 500
+
+    if len(programs) * len(cases) > DEFAULT_GRADE_MAX_RUNS:
+        return jsonify({
+            'success': False,
+            'message': f"Слишком много запусков: не более {DEFAULT_GRADE_MAX_RUNS} за запрос."
+        }), 413
+    time_limit = data.get('timeLimit')
+    if not isinstance(time_limit, (int, float)) or not 0 < time_limit <= DEFAULT_GRADE_TIME_LIMIT:
+        time_limit = DEFAULT_GRADE_TIME_LIMIT
+    logger.info(f"Grading {len(programs)} programs on test set '{data.get('testSet')}' "
+               f"({len(cases)} cases)")
+
+    def stream():
+        summary = {program_id: {'passed': 0, 'total': len(cases)} for program_id in programs}
+        for verdict in grade(programs, cases, pool=get_execution_pool(), time_limit=time_limit):
+            if verdict.verdict == VERDICT_OK:
+                summary[verdict.program]['passed'] += 1
+            yield json.dumps(verdict.to_dict(), ensure_ascii=False) + '\n'
+        yield json.dumps({'done': True, 'programs': summary}, ensure_ascii=False) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+
+@app.route('/trace/frame', methods=['GET'])
+def get_trace_frame():
+    """Полное состояние поля на шаге step последнего запуска (для пошагового просмотра)."""
+    trace_payload = session.get('last_trace')
+    if not trace_payload:
+        return jsonify({
+            'success': False,
+            'message': 'Трасса выполнения отсутствует.'
+        }), 404
+    step = request.args.get('step', type=int)
+    if step is None:
+        return jsonify({
+            'success': False,
+            'message': 'Не указан номер шага (step).'
+        }), 400
+    frame = TraceRecorder.from_payload(trace_payload).state_at(step)
+    return jsonify({
+        'success': True,
+        'steps': trace_payload['steps'],
+        'frame': frame
+    }), 200
 
 
 @app.route('/reset', methods=['POST'])
@@ -394,6 +579,7 @@ def reset_simulator_session():
     logger.info(f"Reset field state request received (Session SID: "
                f"{session_id_for_log}).")
     session.pop('field_state', None)
+    session.pop('last_trace', None)
     session.modified = True
     logger.info("Field state cleared from session.")
     return jsonify({
@@ -422,6 +608,56 @@ def handle_disconnect(*args):
     logger.info(f"WebSocket client disconnected: SID={sid}")
 
 
+@socketio.on('stop')
+def handle_stop(*args):
+    # Остановка выполняющейся программы этого клиента (кнопка "Стоп")
+    logger = logging.getLogger('PyRobot.WebSocket')
+    sid = socketio_request.sid
+    cancelled = get_execution_pool().cancel(sid)
+    logger.info(f"Stop requested by SID={sid}, running job found: {cancelled}")
+    emit('stop_ack', {'cancelled': cancelled})
+
+
+@socketio.on('output_resync')
+def handle_output_resync(data=None):
+    # Клиент пропустил дельту вывода: отправляем всё после последнего полученного номера
+    sid = socketio_request.sid
+    after_seq = data.get('seq', 0) if isinstance(data, dict) else 0
+    if not isinstance(after_seq, int):
+        after_seq = 0
+    payload = get_execution_pool().resync_output(sid, after_seq)
+    if payload is not None:
+        emit('execution_progress', payload)
+
+
+@socketio.on('provide_input')
+def handle_provide_input(data=None):
+    # Ввод для программы, остановленной на "ввод": {'runId', 'value'}
+    logger = logging.getLogger('PyRobot.WebSocket')
+    sid = socketio_request.sid
+    data = data if isinstance(data, dict) else {}
+    run_id = data.get('runId')
+    if not isinstance(run_id, str) or not run_id:
+        emit('execution_result', {
+            'success': False,
+            'message': 'Не указан идентификатор запуска (runId).'
+        })
+        return
+    try:
+        execution = get_execution_pool().resume(
+            run_id, str(data.get('value', '')), on_progress=make_progress_callback(sid, logger),
+            job_key=sid)
+    except RunNotOwned:
+        logger.warning(f"Rejected input for run {run_id} from SID={sid}: it was started by another client.")
+        emit('execution_result', {
+            'success': False,
+            'message': 'Запуск начат другим клиентом.'
+        })
+        return
+    # Сессия Flask в обработчиках SocketIO не сохраняется (manage_session=False)
+    emit('execution_result', build_execution_response(execution, logger, save_to_session=False))
+
+
 @socketio.on_error_default
 def default_error_handler(e):
     logger.error(f"SocketIO error: {e}", exc_info=True)
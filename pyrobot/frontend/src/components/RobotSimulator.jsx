@@ -276,6 +276,7 @@ const RobotSimulator = memo(() => {
 	const canvasRef = useRef(null);      // Реф на основной canvas поля
 	const socketRef = useRef(null);      // Реф на объект WebSocket соединения
 	const isMountedRef = useRef(true);   // Флаг для проверки, смонтирован ли компонент (для асинхронных операций)
+	const streamedOutputRef = useRef({seq: 0, text: ''}); // Вывод, собранный из дельт execution_progress
 	const animationControllerRef = useRef({
 		stop: () => {
 		}, isRunning: false
@@ -317,8 +318,18 @@ const RobotSimulator = memo(() => {
 			// Обновляем статус и позицию робота в UI, только если сейчас НЕ идет анимация трассировки
 			// (чтобы избежать конфликтов обновления состояния)
 			if (isMountedRef.current && state.isRunning && !animationControllerRef.current.isRunning) {
+				// Сервер присылает только новые фрагменты вывода с номерами seq.
+				// При пропуске номера запрашиваем всё после последнего полученного.
+				const streamed = streamedOutputRef.current;
+				if (data.resync || data.seq === streamed.seq + 1) {
+					streamed.text = streamed.text.slice(0, data.offset) + data.delta;
+					streamed.seq = data.seq;
+				} else if (data.seq > streamed.seq + 1) {
+					socket.emit('output_resync', {seq: streamed.seq});
+					return;
+				}
 				const msgPrefix = data.error ? `[Ошибка шаг ${data.commandIndex}]` : `[Шаг ${data.commandIndex}]`;
-				const outputLines = data.output ? data.output.trim().split('\n') : [];
+				const outputLines = streamed.text ? streamed.text.trim().split('\n') : [];
 				const msgOutput = outputLines.length > 0 ? ` Вывод: ${outputLines.slice(-2).join(' \\n ')}` : ''; // Показываем последние 2 строки вывода
 				const msgError = data.error ? ` ${data.error}` : '';
 				// Обновляем сообщение для пользователя
@@ -517,6 +528,7 @@ const RobotSimulator = memo(() => {
 		dispatch({type: 'SET_INPUT_REQUEST_DATA', payload: null});
 		// Устанавливаем флаг выполнения и начальное сообщение
 		dispatch({type: 'SET_IS_RUNNING', payload: true});
+		streamedOutputRef.current = {seq: 0, text: ''}; // Новый запуск - новый поток вывода
 		dispatch({type: 'SET_STATUS_MESSAGE', payload: getHint('executionStartRequest')});
 		logger.log_event('Requesting code execution...');
 
@@ -528,63 +540,125 @@ const RobotSimulator = memo(() => {
 			symbols: state.symbols, radiation: state.radiation, temperature: state.temperature
 		};
 
-		// Отправляем асинхронный запрос на бэкенд
-		fetch(`${backendUrl}/execute`, {
-			method: 'POST',
-			credentials: 'include', // Важно для передачи cookie сессии
-			headers: {'Content-Type': 'application/json'},
-			body: JSON.stringify({code: state.code, fieldState: currentFieldState}), // Отправляем код и состояние поля
-		})
-			.then(async (response) => { // Обработка HTTP ответа
-				if (!response.ok) { // Если статус не 2xx
-					let errorMsg = `HTTP ${response.status} ${response.statusText}`;
-					try {
-						const errorData = await response.json();
-						errorMsg = errorData.message || errorMsg;
-					} catch (_) {
-					}
-					throw new Error(errorMsg); // Бросаем ошибку для .catch()
-				}
-				return response.json(); // Парсим тело ответа как JSON
+		// Отправляет запрос на бэкенд и обрабатывает ответ; после ввода значения
+		// вызывается снова для /execute/input
+		const sendExecutionRequest = (path, body) => {
+			fetch(`${backendUrl}${path}`, {
+				method: 'POST',
+				credentials: 'include', // Важно для передачи cookie сессии
+				headers: {'Content-Type': 'application/json'},
+				body: JSON.stringify(body),
 			})
-			.then(async (data) => { // Обработка данных ответа
-				if (!isMountedRef.current) return; // Проверка, что компонент еще смонтирован
-
-				// --- Обработка ЗАПРОСА ВВОДА от бэкенда ---
-				if (data.input_required) {
-					logger.log_event(`Input required for variable: ${data.var_name}`);
-					dispatch({type: 'SET_IS_RUNNING', payload: false}); // Снимаем флаг выполнения
-					dispatch({type: 'SET_IS_AWAITING_INPUT', payload: true}); // Ставим флаг ожидания ввода
-					// Сохраняем данные запроса ввода
-					dispatch({
-						type: 'SET_INPUT_REQUEST_DATA',
-						payload: {var_name: data.var_name, prompt: data.prompt, target_type: data.target_type}
-					});
-					// Устанавливаем сообщение для пользователя
-					dispatch({type: 'SET_STATUS_MESSAGE', payload: `${getHint('inputRequired')} ${data.var_name}`});
-
-					// Показываем стандартный prompt для ввода данных
-					const userInput = window.prompt(data.prompt || `Введите значение для ${data.var_name} (тип ${data.target_type || 'неизв.'}):`);
-
-					if (!isMountedRef.current) return; // Повторная проверка после prompt
-
-					if (userInput === null) { // Пользователь нажал "Отмена"
-						dispatch({type: 'SET_STATUS_MESSAGE', payload: getHint('inputCancelled')});
-						dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false}); // Снимаем флаг ожидания
-						logger.log_warning('User cancelled the input prompt.');
-					} else { // Пользователь ввел значение
-						// Сообщаем пользователю, что нужно перезапустить выполнение
+				.then(async (response) => { // Обработка HTTP ответа
+					if (!response.ok) { // Если статус не 2xx
+						let errorMsg = `HTTP ${response.status} ${response.statusText}`;
+						try {
+							const errorData = await response.json();
+							errorMsg = errorData.message || errorMsg;
+						} catch (_) {
+						}
+						throw new Error(errorMsg); // Бросаем ошибку для .catch()
+					}
+					return response.json(); // Парсим тело ответа как JSON
+				})
+				.then(async (data) => { // Обработка данных ответа
+					if (!isMountedRef.current) return; // Проверка, что компонент еще смонтирован
+
+					// --- Обработка ЗАПРОСА ВВОДА от бэкенда ---
+					if (data.input_required) {
+						logger.log_event(`Input required for variable: ${data.var_name}`);
+						dispatch({type: 'SET_IS_RUNNING', payload: false}); // Снимаем флаг выполнения
+						dispatch({type: 'SET_IS_AWAITING_INPUT', payload: true}); // Ставим флаг ожидания ввода
+						// Сохраняем данные запроса ввода
 						dispatch({
-							type: 'SET_STATUS_MESSAGE',
-							payload: `${getHint('inputReceivedNeedsRestart')} Значение: '${userInput}'.`
+							type: 'SET_INPUT_REQUEST_DATA',
+							payload: {var_name: data.var_name, prompt: data.prompt, target_type: data.target_type}
 						});
-						dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false}); // Снимаем флаг ожидания
-						logger.log_event(`User provided input '${userInput}' for ${data.var_name}. Manual re-run required.`);
-						// Здесь НЕ отправляем ввод на бэкенд и НЕ продолжаем выполнение автоматически (упрощенная модель)
+						// Устанавливаем сообщение для пользователя
+						dispatch({type: 'SET_STATUS_MESSAGE', payload: `${getHint('inputRequired')} ${data.var_name}`});
+
+						// Показываем стандартный prompt для ввода данных
+						const userInput = window.prompt(data.prompt || `Введите значение для ${data.var_name} (тип ${data.target_type || 'неизв.'}):`);
+
+						if (!isMountedRef.current) return; // Повторная проверка после prompt
+
+						if (userInput === null) { // Пользователь нажал "Отмена"
+							dispatch({type: 'SET_STATUS_MESSAGE', payload: getHint('inputCancelled')});
+							dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false}); // Снимаем флаг ожидания
+							logger.log_warning('User cancelled the input prompt.');
+						} else { // Пользователь ввел значение
+							// Программа ждёт на сервере: отправляем значение, и выполнение продолжается с места остановки
+							dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false}); // Снимаем флаг ожидания
+							dispatch({type: 'SET_IS_RUNNING', payload: true});
+							dispatch({type: 'SET_STATUS_MESSAGE', payload: `${getHint('inputSent')} '${userInput}'.`});
+							logger.log_event(`User provided input '${userInput}' for ${data.var_name}. Resuming run ${data.run_id}.`);
+							sendExecutionRequest('/execute/input', {runId: data.run_id, value: userInput});
+						}
+
+						// Применяем состояние поля, которое было ДО запроса ввода (из finalState ответа)
+						if (data.finalState) {
+							if (data.finalState.robot) dispatch({type: 'SET_ROBOT_POS', payload: data.finalState.robot});
+							if (data.finalState.coloredCells) dispatch({
+								type: 'SET_COLORED_CELLS',
+								payload: new Set(data.finalState.coloredCells)
+							});
+							if (data.finalState.symbols !== undefined) dispatch({
+								type: 'SET_SYMBOLS',
+								payload: data.finalState.symbols || {}
+							});
+							if (data.finalState.radiation !== undefined) dispatch({
+								type: 'SET_RADIATION',
+								payload: data.finalState.radiation || {}
+							});
+							if (data.finalState.temperature !== undefined) dispatch({
+								type: 'SET_TEMPERATURE',
+								payload: data.finalState.temperature || {}
+							});
+							if (data.finalState.walls) dispatch({
+								type: 'SET_WALLS',
+								payload: new Set(data.finalState.walls)
+							});
+							if (data.finalState.markers) dispatch({
+								type: 'SET_MARKERS',
+								payload: data.finalState.markers || {}
+							});
+							// Обновляем направление ошибки движения робота
+							if (data.finalState.robotErrorDirection !== undefined) dispatch({
+								type: 'SET_ROBOT_ERROR_DIRECTION',
+								payload: data.finalState.robotErrorDirection
+							});
+						}
+						return; // Завершаем обработку этого .then()
+					}
+					// --- Конец обработки ЗАПРОСА ВВОДА ---			// --- Обработка ОБЫЧНОГО завершения (успех или ошибка без ввода) ---
+				try {
+					// Анимируем трассировку, если она есть
+					if (data.trace?.length > 0) {
+						dispatch({type: 'SET_IS_RUNNING', payload: true}); // Флаг на время анимации
+						await animateTrace(data.trace);
+						// Снимаем флаг после анимации, если она не была прервана
+						if (animationControllerRef.current.isRunning === false) {
+							dispatch({type: 'SET_IS_RUNNING', payload: false});
+							}
+						} else { // Если трассировки нет
+							dispatch({type: 'SET_IS_RUNNING', payload: false}); // Сразу снимаем флаг
+							dispatch({
+								type: 'SET_STATUS_MESSAGE',
+								payload: data.message || (data.success ? getHint('executionFinishedSuccess') : getHint('executionFinishedError') + ' (нет шагов)')
+							});
+						}
+					} catch (animError) { // Ошибка во время анимации
+						console.error("Animation error:", animError);
+						logger.log_error(`Animation failed: ${animError.message}`);
+						dispatch({type: 'SET_STATUS_MESSAGE', payload: `Ошибка анимации: ${animError.message}`});
+						dispatch({type: 'SET_IS_RUNNING', payload: false}); // Снимаем флаг
 					}
 
-					// Применяем состояние поля, которое было ДО запроса ввода (из finalState ответа)
+					if (!isMountedRef.current) return; // Повторная проверка
+
+					// Применяем финальное состояние из ответа сервера, если оно есть
 					if (data.finalState) {
+						logger.log_event("Applying final state from server response.");
 						if (data.finalState.robot) dispatch({type: 'SET_ROBOT_POS', payload: data.finalState.robot});
 						if (data.finalState.coloredCells) dispatch({
 							type: 'SET_COLORED_CELLS',
@@ -602,10 +676,7 @@ const RobotSimulator = memo(() => {
 							type: 'SET_TEMPERATURE',
 							payload: data.finalState.temperature || {}
 						});
-						if (data.finalState.walls) dispatch({
-							type: 'SET_WALLS',
-							payload: new Set(data.finalState.walls)
-						});
+						if (data.finalState.walls) dispatch({type: 'SET_WALLS', payload: new Set(data.finalState.walls)});
 						if (data.finalState.markers) dispatch({
 							type: 'SET_MARKERS',
 							payload: data.finalState.markers || {}
@@ -615,103 +686,48 @@ const RobotSimulator = memo(() => {
 							type: 'SET_ROBOT_ERROR_DIRECTION',
 							payload: data.finalState.robotErrorDirection
 						});
-					}
-					return; // Завершаем обработку этого .then()
-				}
-				// --- Конец обработки ЗАПРОСА ВВОДА ---			// --- Обработка ОБЫЧНОГО завершения (успех или ошибка без ввода) ---
-			try {
-				// Анимируем трассировку, если она есть
-				if (data.trace?.length > 0) {
-					dispatch({type: 'SET_IS_RUNNING', payload: true}); // Флаг на время анимации
-					await animateTrace(data.trace);
-					// Снимаем флаг после анимации, если она не была прервана
-					if (animationControllerRef.current.isRunning === false) {
-						dispatch({type: 'SET_IS_RUNNING', payload: false});
+
+						// Устанавливаем финальное сообщение, если анимация не была прервана
+						if (animationControllerRef.current.isRunning === false) {
+							const finalMessage = data.success ? getHint('executionFinishedSuccess') : `${getHint('executionFinishedError')} ${data.message || '?'}`;
+							const finalOutput = data.finalState.output ? `\nВывод:\n${data.finalState.output.trim()}` : ""; // Добавляем вывод программы
+							dispatch({type: 'SET_STATUS_MESSAGE', payload: `${finalMessage}${finalOutput}`});
+						}
+					} else { // Если финального состояния нет в ответе (не должно быть при успехе/ошибке)
+						logger.log_warning("No finalState received from server in successful/error response.");
+						if (animationControllerRef.current.isRunning === false) {
+							dispatch({
+								type: 'SET_STATUS_MESSAGE',
+								payload: data.message || 'Нет финального состояния от сервера.'
+							});
 						}
-					} else { // Если трассировки нет
-						dispatch({type: 'SET_IS_RUNNING', payload: false}); // Сразу снимаем флаг
-						dispatch({
-							type: 'SET_STATUS_MESSAGE',
-							payload: data.message || (data.success ? getHint('executionFinishedSuccess') : getHint('executionFinishedError') + ' (нет шагов)')
-						});
 					}
-				} catch (animError) { // Ошибка во время анимации
-					console.error("Animation error:", animError);
-					logger.log_error(`Animation failed: ${animError.message}`);
-					dispatch({type: 'SET_STATUS_MESSAGE', payload: `Ошибка анимации: ${animError.message}`});
-					dispatch({type: 'SET_IS_RUNNING', payload: false}); // Снимаем флаг
-				}
 
-				if (!isMountedRef.current) return; // Повторная проверка
-
-				// Применяем финальное состояние из ответа сервера, если оно есть
-				if (data.finalState) {
-					logger.log_event("Applying final state from server response.");
-					if (data.finalState.robot) dispatch({type: 'SET_ROBOT_POS', payload: data.finalState.robot});
-					if (data.finalState.coloredCells) dispatch({
-						type: 'SET_COLORED_CELLS',
-						payload: new Set(data.finalState.coloredCells)
-					});
-					if (data.finalState.symbols !== undefined) dispatch({
-						type: 'SET_SYMBOLS',
-						payload: data.finalState.symbols || {}
-					});
-					if (data.finalState.radiation !== undefined) dispatch({
-						type: 'SET_RADIATION',
-						payload: data.finalState.radiation || {}
-					});
-					if (data.finalState.temperature !== undefined) dispatch({
-						type: 'SET_TEMPERATURE',
-						payload: data.finalState.temperature || {}
-					});
-					if (data.finalState.walls) dispatch({type: 'SET_WALLS', payload: new Set(data.finalState.walls)});
-					if (data.finalState.markers) dispatch({
-						type: 'SET_MARKERS',
-						payload: data.finalState.markers || {}
-					});
-					// Обновляем направление ошибки движения робота
-					if (data.finalState.robotErrorDirection !== undefined) dispatch({
-						type: 'SET_ROBOT_ERROR_DIRECTION',
-						payload: data.finalState.robotErrorDirection
-					});
-
-					// Устанавливаем финальное сообщение, если анимация не была прервана
-					if (animationControllerRef.current.isRunning === false) {
-						const finalMessage = data.success ? getHint('executionFinishedSuccess') : `${getHint('executionFinishedError')} ${data.message || '?'}`;
-						const finalOutput = data.finalState.output ? `\nВывод:\n${data.finalState.output.trim()}` : ""; // Добавляем вывод программы
-						dispatch({type: 'SET_STATUS_MESSAGE', payload: `${finalMessage}${finalOutput}`});
+					// Логируем результат
+					if (data.success) {
+						logger.log_event('Execution successful (server).');
+					} else {
+						logger.log_error(`Execution failed (server): ${data.message || '?'}`);
 					}
-				} else { // Если финального состояния нет в ответе (не должно быть при успехе/ошибке)
-					logger.log_warning("No finalState received from server in successful/error response.");
+
+					// Убеждаемся, что флаг выполнения снят, если анимация завершилась или ее не было
 					if (animationControllerRef.current.isRunning === false) {
-						dispatch({
-							type: 'SET_STATUS_MESSAGE',
-							payload: data.message || 'Нет финального состояния от сервера.'
-						});
+						dispatch({type: 'SET_IS_RUNNING', payload: false});
 					}
-				}
-
-				// Логируем результат
-				if (data.success) {
-					logger.log_event('Execution successful (server).');
-				} else {
-					logger.log_error(`Execution failed (server): ${data.message || '?'}`);
-				}
+				})
+				.catch((error) => { // Обработка ошибок сети или HTTP
+					if (!isMountedRef.current) return;
+					console.error(`Error during fetch ${path}:`, error);
+					const errorText = error.message || 'Неизвестная сетевая ошибка';
+					dispatch({type: 'SET_STATUS_MESSAGE', payload: `${getHint('networkError')} ${errorText}`});
+					logger.log_error(`Fetch ${path} failed: ${errorText}`);
+					dispatch({type: 'SET_IS_RUNNING', payload: false});       // Снимаем флаги
+					dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false});
+				});
+		};
 
-				// Убеждаемся, что флаг выполнения снят, если анимация завершилась или ее не было
-				if (animationControllerRef.current.isRunning === false) {
-					dispatch({type: 'SET_IS_RUNNING', payload: false});
-				}
-			})
-			.catch((error) => { // Обработка ошибок сети или HTTP
-				if (!isMountedRef.current) return;
-				console.error('Error during fetch /execute:', error);
-				const errorText = error.message || 'Неизвестная сетевая ошибка';
-				dispatch({type: 'SET_STATUS_MESSAGE', payload: `${getHint('networkError')} ${errorText}`});
-				logger.log_error(`Fetch /execute failed: ${errorText}`);
-				dispatch({type: 'SET_IS_RUNNING', payload: false});       // Снимаем флаги
-				dispatch({type: 'SET_IS_AWAITING_INPUT', payload: false});
-			});
+		// Отправляем асинхронный запрос на бэкенд
+		sendExecutionRequest('/execute', {code: state.code, fieldState: currentFieldState}); // Код и состояние поля
 		// Зависимости useCallback
 	}, [
 		state.isRunning, state.isAwaitingInput, state.inputRequestData, state.code,
@@ -73,10 +73,10 @@ export const HINTS = {
 		"Ты отменил ввод. Программа остановлена.",
 		"Отмена ввода. Запусти код снова, если нужно.",
 	],
-	inputReceivedNeedsRestart: [ // Добавляется значение и имя переменной
-		"Значение принято. Чтобы продолжить, запусти код еще раз.",
-		"Ввод сохранен. Перезапусти выполнение.",
-		"Данные получены. Нажми 'Старт' для продолжения.",
+	inputSent: [ // Добавляется введённое значение
+		"Значение отправлено, программа продолжает работу:",
+		"Ввод принят, выполнение продолжается:",
+		"Данные получены, продолжаем с того же места:",
 	],
 	networkError: [ // Добавляется сообщение об ошибке
 		"Ошибка сети:",
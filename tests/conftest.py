@@ -0,0 +1,73 @@
+"""Общие фикстуры тестов: запуск программ, движки выполнения, программы корпуса, пул процессов."""
+
+import os
+
+import pytest  # type: ignore
+
+from .test_polyakov_kum import PROGRAMS_DIR
+
+
+def pytest_addoption(parser):
+    parser.addoption("--perf", action="store_true", default=False,
+                     help="выполнять тесты производительности (@pytest.mark.perf)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: сравнение скорости по времени; выполняется только с --perf")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Тесты производительности зависят от загрузки машины и по умолчанию пропускаются."""
+    if config.getoption("--perf"):
+        return
+    skip_perf = pytest.mark.skip(reason="тест производительности: запустите pytest --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
+
+
+@pytest.fixture(params=["visitor", "compiled"])
+def engine(request) -> str:
+    """Тест выполняется каждым движком."""
+    return request.param
+
+
+@pytest.fixture
+def run_program():
+    """
+    Выполняет программу в KumirLanguageInterpreter и возвращает (результат, интерпретатор).
+
+    input_data кладётся в буфер ввода, run_options передаются в interpret()
+    (profile, observers, memoize), остальные аргументы - в конструктор.
+    """
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+
+    def run(code, input_data=None, run_options=None, **options):
+        interpreter = KumirLanguageInterpreter(code, **options)
+        interpreter.input_buffer = input_data or ''
+        return interpreter.interpret(**(run_options or {})), interpreter
+    return run
+
+
+@pytest.fixture
+def corpus_program():
+    """Текст программы корпуса tests/polyakov_kum по имени файла."""
+    def read(name: str) -> str:
+        with open(os.path.join(PROGRAMS_DIR, name), 'r', encoding='utf-8') as f:
+            return f.read()
+    return read
+
+
+@pytest.fixture
+def make_pool():
+    """Создаёт ExecutionPool с заданными параметрами; все созданные пулы останавливаются после теста."""
+    from pyrobot.backend.execution_pool import ExecutionPool
+
+    pools = []
+
+    def make(**options):
+        pools.append(ExecutionPool(**options))
+        return pools[-1]
+    yield make
+    for pool in pools:
+        pool.shutdown()
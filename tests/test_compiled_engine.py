@@ -0,0 +1,148 @@
+import pytest  # type: ignore
+
+from .test_polyakov_kum import TEST_CASES
+
+# Программы, которые компилятор не поддерживает: их целиком выполняет визитор
+COMPILED_FALLBACK = {
+    '6-format.kum', '16-repeat.kum', '2-longnum.kum', '23-func-sumdig.kum', '24-func-prime.kum',
+    '25-func-prime.kum', '35-arr-sum.kum', '46-str-ab.kum', '47-str-ops.kum', '49-str-complex.kum',
+    '50-str-num.kum', '51-str-proc.kum', '52-str-func.kum', '53-str-rec.kum', '55-matr-declare.kum',
+    '56-matr-rand.kum', '57-matr-sum.kum',
+}
+
+
+@pytest.mark.parametrize(
+    "program,input_data",
+    [(program, input_data) for program, input_data, expected in TEST_CASES if expected is not None]
+)
+def test_compiled_engine_matches_visitor(program: str, input_data: str | None, run_program, corpus_program) -> None:
+    """Компилирующий движок даёт тот же результат, что и визитор, и откатывается только для известных программ."""
+    code = corpus_program(program)
+    expected, _ = run_program(code, input_data, engine='visitor', time_limit=0)
+    result, interpreter = run_program(code, input_data, engine='compiled', time_limit=0)
+    assert interpreter.engine_used == ('visitor' if program in COMPILED_FALLBACK else 'compiled')
+    assert (result['success'], result['message'], result['finalState']['output']) == \
+        (expected['success'], expected['message'], expected['finalState']['output'])
+
+
+def _scaled(program: str, code: str):
+    """Программа корпуса с увеличенными входными данными для сравнения скорости движков: (код, ввод)."""
+    if program == '19-prime.kum':
+        return code, '400\n'
+    # 44-arr-qsort: 200 элементов вместо семи, заполняются в главном алгоритме
+    code = code.replace("цел N = 7", "цел N = 200").replace(" = {78, 6, 82, 67, 55, 44, 34 }", "")
+    return code.replace("цел i\n", "цел i\nнц для i от 1 до N\nA[i] := mod(i * 7919, 1009)\nкц\n", 1), None
+
+
+@pytest.mark.parametrize("program", ['19-prime.kum', '44-arr-qsort.kum'])
+def test_compiled_engine_runs_scaled_programs(program: str, run_program, corpus_program) -> None:
+    """Циклы и рекурсия на больших входных данных выполняются скомпилированными, без отката, с тем же выводом."""
+    code, input_data = _scaled(program, corpus_program(program))
+    expected, _ = run_program(code, input_data, engine='visitor', time_limit=0)
+    result, compiled = run_program(code, input_data, engine='compiled', time_limit=0)
+    assert result['success'] and expected['success']
+    assert compiled.engine_used == 'compiled'
+    assert result['finalState']['output'] == expected['finalState']['output']
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("program", ['19-prime.kum', '44-arr-qsort.kum'])
+def test_compiled_engine_is_faster_than_visitor(program: str, run_program, corpus_program) -> None:
+    """На циклах и рекурсии скомпилированная программа заметно быстрее визитора (pytest --perf)."""
+    code, input_data = _scaled(program, corpus_program(program))
+    _, visitor = run_program(code, input_data, engine='visitor', time_limit=0)
+    _, compiled = run_program(code, input_data, engine='compiled', time_limit=0)
+    # На увеличенных данных разрыв в десятки раз; на исходных (7 элементов) - лишь в 2-3 раза
+    assert compiled.timings['execute'] * 5 < visitor.timings['execute']
+
+
+def test_compiled_runtime_error_is_reported_without_rerun(run_program) -> None:
+    """Ошибка во время выполнения скомпилированной программы не перезапускает её визитором."""
+    code = ("алг главный\nнач\n  цел i\n  целтаб т[1:3]\n  вывод \"до\", нс\n"
+            "  нц для i от 1 до 4\n    т[i] := 10 div (3 - i)\n  кц\nкон\n")
+    expected, _ = run_program(code, engine='visitor')
+    result, interpreter = run_program(code, engine='compiled')
+    assert interpreter.engine_used == 'compiled' and not result['success']
+    assert (result['message'], result['errorIndex']) == (expected['message'], expected['errorIndex'])
+    # Вывод до ошибки не повторяется
+    assert result['finalState']['output'] == expected['finalState']['output'] == "до\n"
+
+
+def test_deep_recursion_on_explicit_stack(run_program) -> None:
+    """Рекурсия компилирующего движка не ограничена стеком Python; глубина ограничена max_depth."""
+    from pyrobot.backend.kumir_interpreter.execution_observer import ExecutionObserver
+
+    code = ("алг главный\nнач\n  вывод сумма(%d), нс\n  ханой(3, 1, 3)\nкон\n"
+            "алг цел сумма(цел n)\nнач\n  если n = 0 то знач := 0 иначе знач := n + сумма(n - 1) все\nкон\n"
+            "алг ханой(цел n, цел a, цел b)\nнач\n  если n = 0 то выход все\n"
+            "  ханой(n - 1, a, 6 - a - b)\n  вывод a, b, \" \"\n  ханой(n - 1, 6 - a - b, b)\nкон\n")
+    expected_moves = "13 12 32 13 21 23 13 "
+
+    class Balance(ExecutionObserver):
+        def __init__(self):
+            self.depth = self.max_depth = 0
+
+        def on_algorithm_enter(self, name):
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+
+        def on_algorithm_exit(self, name):
+            self.depth -= 1
+
+    balance = Balance()
+    result, interpreter = run_program(code % 5000, engine="compiled", run_options={'observers': [balance]})
+    assert result['success'], result.get('message')
+    assert interpreter.output == f"12502500\n{expected_moves}"
+    assert balance.depth == 0 and balance.max_depth == 5002
+
+    result, _ = run_program(code % 5000, engine="compiled", max_depth=100)
+    assert not result['success']
+    assert "глубина рекурсии (100)" in result['message'] and result['errorIndex'] == 7
+
+    # Визитор упирается в стек Python, но сообщает об этом как о превышении лимита
+    result, _ = run_program(code % 5000, engine="visitor")
+    assert not result['success'] and "глубина рекурсии" in result['message']
+    result, interpreter = run_program(code % 10, engine="visitor")
+    assert result['success'] and interpreter.output == f"55\n{expected_moves}"
+
+
+def test_memoized_functions_stay_compiled(run_program) -> None:
+    """С запоминанием программа остаётся скомпилированной; повторные вызовы чистой функции берутся из таблицы."""
+    code = ("алг главный\nнач\n  вывод фиб(30), \" \", фиб(30)\nкон\n"
+            "алг цел фиб(цел n)\nнач\n  если n < 2 то знач := n иначе знач := фиб(n - 1) + фиб(n - 2) все\nкон\n")
+    result, interpreter = run_program(code, engine='compiled', run_options={'memoize': True})
+    assert result['success'], result.get('message')
+    assert interpreter.engine_used == 'compiled' and interpreter.output == "832040 832040"
+    # 31 различный вызов вместо 2,7 млн; второй фиб(30) целиком из таблицы
+    assert result['memo']['by_function']['фиб'] == {'hits': 29, 'misses': 31}
+    assert result['memo']['entries'] == 31
+
+
+def test_memoized_deep_recursion_on_explicit_stack(run_program) -> None:
+    """Запоминание не отключает явный стек: рекурсия глубже DIRECT_RECURSION_DEPTH попадает в таблицу на стеке."""
+    from pyrobot.backend.kumir_interpreter.compiled_engine import DIRECT_RECURSION_DEPTH
+    from pyrobot.backend.kumir_interpreter.execution_observer import ExecutionObserver
+
+    code = ("алг главный\nнач\n  вывод шаги(3000)\nкон\n"
+            "алг цел шаги(цел n)\nнач\n"
+            "  если n < 2 то знач := 1 иначе знач := mod(шаги(n - 1) + шаги(n - 2), 10007) все\nкон\n")
+
+    class Depth(ExecutionObserver):
+        def __init__(self):
+            self.depth = self.max_depth = 0
+
+        def on_algorithm_enter(self, name):
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+
+        def on_algorithm_exit(self, name):
+            self.depth -= 1
+
+    depth = Depth()
+    result, interpreter = run_program(code, engine='compiled', run_options={'memoize': True, 'observers': [depth]})
+    assert result['success'], result.get('message')
+    assert interpreter.engine_used == 'compiled' and interpreter.output == "9916"
+    # главный и 3000 уровней шаги
+    assert depth.max_depth == 3001 > DIRECT_RECURSION_DEPTH and depth.depth == 0
+    # Второй вызов на каждом уровне - попадание; шаги(1) и шаги(0) вычисляются по разу
+    assert result['memo']['by_function']['шаги'] == {'hits': 2998, 'misses': 3001}
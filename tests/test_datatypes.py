@@ -0,0 +1,71 @@
+import sys
+import tracemalloc
+from typing import Tuple
+
+import pytest  # type: ignore
+
+from pyrobot.backend.kumir_interpreter.kumir_datatypes import KumirValue, KumirType, KumirTableVar
+from pyrobot.backend.kumir_interpreter.runtime_utils import interpret_kumir
+
+
+def _bytes_per_value(make_values) -> Tuple[float, list]:
+    """Сколько байт в среднем выделяется на одно значение из make_values() (без самого списка)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        values = make_values()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before - sys.getsizeof(values)) / len(values), values
+
+
+def test_kumir_value_allocations() -> None:
+    """Малые целые, да/нет и пустая строка не выделяют память; остальные значения компактны (__slots__)."""
+    count = 5000
+    cached_bytes, _ = _bytes_per_value(lambda: [
+        value
+        for i in range(count)
+        for value in (KumirValue(i % 1000, KumirType.INT.value),
+                      KumirValue(i % 2 == 0, KumirType.BOOL.value),
+                      KumirValue("", KumirType.STR.value))
+    ])
+    assert cached_bytes < 1
+
+    floats = [float(i) for i in range(count)]
+    real_bytes, values = _bytes_per_value(lambda: [KumirValue(x, KumirType.REAL.value) for x in floats])
+    assert real_bytes <= 56
+
+    assert KumirValue(7, KumirType.INT.value) is KumirValue(7, KumirType.INT.value)
+    with pytest.raises(AttributeError):
+        values[0].value = 1.0
+
+
+def test_numeric_table_dense_storage() -> None:
+    """Числовые таблицы хранятся плотно: ~8 байт на элемент, прежние ошибки и преобразования."""
+    program = (
+        "алг главный\nнач\n"
+        "  вещ таб а[1:3]\n  цел таб б[0:2, 1:2]\n"
+        "  а[2] := 5\n  б[2, 1] := 7\n  б[0, 2] := б[2, 1] + 1\n"
+        "  вывод а[2], \" \", б[0, 2], нс\n  вывод а[1]\n"
+        "кон\n"
+    )
+    for engine in ("visitor", "compiled"):
+        output = interpret_kumir(program, engine=engine)
+        assert output.startswith("5 8\n")
+        assert "неинициализированного элемента таблицы по индексам (1,)" in output
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table = KumirTableVar(KumirType.INT.value, [(1, 100000)], None)
+    for i in range(1, 100001):
+        table.set_value((i,), i, None)
+    per_element = (tracemalloc.get_traced_memory()[0] - before) / 100000
+    tracemalloc.stop()
+    assert table.is_dense and per_element <= 10
+    assert table.get_value((50000,), None).value == 50000
+
+    table.set_value((1,), 1 << 70, None)  # не помещается в 64 бита
+    assert not table.is_dense
+    assert table.get_value((1,), None).value == 1 << 70
+    assert table.get_value((2,), None).value == 2
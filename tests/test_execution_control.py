@@ -0,0 +1,92 @@
+import sys
+import threading
+import time
+
+from pyrobot.backend.kumir_interpreter.runtime_utils import interpret_kumir
+
+
+def test_step_budget_and_cancellation(engine: str, run_program) -> None:
+    """Бесконечный цикл прерывается по лимиту шагов и по stop() из другого потока, с номером строки."""
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+
+    code = "алг главный\nнач\n  цел к\n  к := 0\n  нц\n    к := к + 1\n  кц\nкон\n"
+    result, _ = run_program(code, engine=engine, max_steps=1000)
+    assert not result['success'] and result['errorIndex'] == 4
+    assert "Превышено максимальное число шагов выполнения (1000)" in result['message']
+
+    interpreter = KumirLanguageInterpreter(code, engine=engine, max_steps=0)
+    threading.Timer(0.2, interpreter.stop).start()
+    result = interpreter.interpret()
+    assert not result['success'] and "остановлено пользователем" in result['message']
+
+
+def test_resumable_run_parks_at_input(engine: str) -> None:
+    """Программа встаёт на вводе и продолжается с того же места; ожидание не расходует лимит времени."""
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+    from pyrobot.backend.kumir_interpreter.resumable import ResumableRun, SuspendedRuns
+
+    code = ("использовать Робот\nалг главный\nнач\n  цел a, b\n"
+            "  вправо\n  вывод \"старт\", нс\n  ввод a\n  вправо\n  ввод b\n  вывод a + b, нс\nкон\n")
+    run = ResumableRun(KumirLanguageInterpreter(code, engine=engine, time_limit=0.5))
+    result = run.start()
+    assert result['input_required'] and result['run_id'] == run.run_id
+    assert (result['var_name'], result['target_type']) == ('a', 'цел')
+    assert result['finalState']['robot'] == {'x': 1, 'y': 0}
+
+    time.sleep(0.6)  # Дольше лимита времени: пока программа ждёт ввода, время не считается
+    result = run.resume("2")
+    assert result['input_required'] and result['var_name'] == 'b'
+    result = run.resume("40")
+    assert result['success'], result['message']
+    # Вывод до первого ввода не повторяется: программа не перезапускалась
+    assert result['finalState']['output'] == "старт\n2\n40\n42\n"
+    assert result['finalState']['robot'] == {'x': 2, 'y': 0}
+
+    runs = SuspendedRuns(ttl=60, max_runs=2)
+    parked = []
+    for _ in range(3):
+        parked.append(ResumableRun(KumirLanguageInterpreter(code, engine=engine)))
+        parked[-1].start()
+        runs.park(parked[-1])
+    assert len(runs) == 2 and runs.get_stats()['evicted'] == 1
+    assert runs.take(parked[0].run_id) is None
+    assert runs.take(parked[1].run_id) is parked[1]
+    runs.ttl = 0
+    assert runs.evict_expired() == 1
+    runs.clear()
+    parked[1].abandon(join_timeout=1)
+
+
+def test_concurrent_runs_are_isolated() -> None:
+    """Программы выполняются параллельно в пуле потоков; вывод, ввод и файловое состояние у каждой свои."""
+    from concurrent.futures import ThreadPoolExecutor
+    from pyrobot.backend.kumir_interpreter import file_functions
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+
+    code = ("алг главный\nнач\n  цел i, n, s\n  ввод n\n  s := 0\n"
+            "  нц для i от 1 до n\n    s := s + i\n    вывод i, \" \"\n  кц\n  вывод нс, s\nкон\n")
+    expected = {n: interpret_kumir(code, str(n)) for n in range(1, 41)}
+    assert len(set(expected.values())) == len(expected)
+
+    def run(n):
+        if n % 2:
+            return interpret_kumir(code, str(n), engine="visitor" if n % 4 == 1 else "compiled")
+        result = KumirLanguageInterpreter(code, engine="visitor" if n % 4 else "compiled",
+                                          input_provider=lambda request: str(n)).interpret()
+        return result['finalState']['output'].rstrip('\n') + '\n'
+
+    def encoding_in_own_context(name):
+        with file_functions.file_context(file_functions.FileContext()) as files:
+            file_functions.set_encoding(name)
+            time.sleep(0.01)
+            return files.encoding, file_functions.current_file_context().encoding
+
+    stdout = sys.stdout
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(run, list(expected) * 3))
+        encodings = list(pool.map(encoding_in_own_context, ["cp1251", "koi8r", "dos", "utf8"] * 4))
+    assert sys.stdout is stdout
+    assert outputs == list(expected.values()) * 3
+    assert all(own == current for own, current in encodings)
+    assert [own for own, _ in encodings[:4]] == ["cp1251", "koi8-r", "cp866", "utf-8"]
+    assert file_functions.current_file_context().encoding == "UTF-8"
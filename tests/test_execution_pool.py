@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest  # type: ignore
+
+from pyrobot.backend.execution_pool import ExecutionPoolSaturated, RunNotOwned
+
+INPUT_PROGRAM = "алг главный\nнач\n  цел а\n  ввод а\n  вывод а * 2\nкон\n"
+ENDLESS_LOOP = "алг главный\nнач\n  цел к\n  к := 0\n  нц пока да\n    к := к + 1\n  кц\nкон\n"
+
+
+def test_execution_pool_limits_and_backpressure(make_pool) -> None:
+    """Пул процессов: обычное задание, бесконечный цикл в пределах лимитов и отказ при полной очереди."""
+    pool = make_pool(size=1, max_queue=0, cpu_time_limit=1, wall_time_limit=5)
+    progress = []
+    ok = pool.execute("алг главный\nнач\n  вывод 2 + 3, нс\nкон\n", on_progress=progress.append)
+    assert ok.result['success'] and ok.result['finalState']['output'] == "5\n"
+    assert (ok.width, ok.height) == (7, 7) and progress
+
+    runaway = {}
+    thread = threading.Thread(target=lambda: runaway.update(done=pool.execute(ENDLESS_LOOP)))
+    thread.start()
+    while pool.get_stats()['idle']:
+        time.sleep(0.01)
+    with pytest.raises(ExecutionPoolSaturated) as saturated:
+        pool.execute("алг главный\nнач\nкон\n")
+    assert saturated.value.retry_after >= 1
+    thread.join()
+    assert not runaway['done'].result['success']
+    assert "Превышено" in runaway['done'].result['message']
+
+    # Рабочий процесс пережил (или был заменён после) превышения лимита
+    assert pool.execute("алг главный\nнач\n  вывод 1\nкон\n").result['finalState']['output'] == "1"
+    assert pool.get_stats()['parsing']['modes']['sll']['count'] > 0
+
+    # Запуск, ждущий ввода, продолжается в том же процессе
+    waiting = pool.execute(INPUT_PROGRAM).result
+    assert waiting['input_required'] and pool.get_stats()['suspended'] == 1
+    resumed = pool.resume(waiting['run_id'], "21").result
+    assert resumed['success'] and resumed['finalState']['output'] == "21\n42"
+    assert not pool.resume(waiting['run_id'], "1").result['success']
+    given = pool.execute(INPUT_PROGRAM, input_data="5\n").result
+    assert given['success'] and given['finalState']['output'] == "5\n10"
+
+
+def test_execution_pool_resume_owner_and_per_job_cancel(make_pool) -> None:
+    """Продолжить запуск может только его владелец; отмена задания не задевает запуск, припаркованный в том же процессе."""
+    pool = make_pool(size=1, max_queue=1, cpu_time_limit=5, wall_time_limit=10)
+    waiting = pool.execute(INPUT_PROGRAM, job_key='alice').result
+    with pytest.raises(RunNotOwned):
+        pool.resume(waiting['run_id'], "1", job_key='bob')
+    assert pool.get_stats()['suspended'] == 1
+
+    loop = {}
+    thread = threading.Thread(target=lambda: loop.update(done=pool.execute(ENDLESS_LOOP, job_key='bob')))
+    thread.start()
+    while pool.resync_output('bob', 0) is None:
+        time.sleep(0.01)
+    assert pool.cancel('bob')
+    thread.join()
+    assert "остановлено пользователем" in loop['done'].result['message']
+
+    # Припаркованный запуск и следующее задание того же процесса не отменены
+    resumed = pool.resume(waiting['run_id'], "21", job_key='alice').result
+    assert resumed['success'] and resumed['finalState']['output'] == "21\n42"
+    assert pool.execute("алг главный\nнач\n  вывод 1\nкон\n", job_key='bob').result['success']
+    assert not pool.cancel('bob')
+
+
+def test_execution_pool_reports_memory_limit(make_pool) -> None:
+    """Нехватка памяти в рабочем процессе - превышение лимита памяти, а не внутренняя ошибка; процесс продолжает работу."""
+    pool = make_pool(size=1, max_queue=0, cpu_time_limit=10, wall_time_limit=20, memory_limit_mb=300)
+    code = "алг главный\nнач\n  лит s\n  s := \"ab\"\n  вывод \"старт\", нс\n  нц пока да\n    s := s + s\n  кц\nкон\n"
+    result = pool.execute(code).result
+    assert not result['success'] and result['limit'] == 'memory'
+    assert "Превышен лимит памяти" in result['message']
+    assert result['finalState']['output'] == "старт\n"
+    assert pool.execute("алг главный\nнач\n  вывод 1\nкон\n").result['finalState']['output'] == "1"
@@ -0,0 +1,39 @@
+import pytest  # type: ignore
+
+
+def test_file_storage_in_memory_with_quotas(tmp_path) -> None:
+    """Файлы запуска хранятся в памяти (с набором файлов учителя и квотами); диск доступен через тот же API."""
+    from pyrobot.backend.kumir_interpreter import file_functions as ff
+    from pyrobot.backend.kumir_interpreter.file_storage import DiskStorage, FileQuotaError, MemoryStorage
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+
+    bundle = {'задание/вход.txt': '3\n1 2 3\n'}
+    first, second = MemoryStorage(bundle, max_bytes=64, max_files=4), MemoryStorage(bundle)
+    with ff.file_context(ff.FileContext(storage=first)):
+        data = ff.open_for_reading('задание/./вход.txt')
+        assert data.read() == '3\n1 2 3\n' and ff.eof(data) == "да"
+        ff.close_file(data)
+        ff.set_output('ответ.txt')
+        ff.console_file().write('6')
+        assert first.get('ответ.txt') == b''  # запись буферизована до закрытия
+        with pytest.raises(Exception, match="выходит за пределы песочницы"):
+            ff.open_for_reading('../вход.txt')
+        with pytest.raises(FileQuotaError):
+            ff.open_for_writing('большой.txt').write('x' * 100)
+        with pytest.raises(Exception, match="не более 4 файлов"):
+            ff.create_directory('a/b')
+    assert first.get('ответ.txt') == b'6' and first.used_bytes == len(first.get('задание/вход.txt')) + 1
+    with ff.file_context(ff.FileContext(storage=second)):
+        assert ff.exists('ответ.txt') == "нет" and ff.exists('задание') == "да"
+
+    # Диск - прежняя песочница за тем же интерфейсом
+    with ff.file_context(ff.FileContext(storage=DiskStorage(tmp_path))):
+        output = ff.open_for_writing('out.txt')
+        output.write('на диске')
+        ff.close_file(output)
+        assert ff.full_path('out.txt') == 'out.txt' and ff.exists('../out.txt') == "нет"
+    assert (tmp_path / 'out.txt').read_text(encoding='utf-8') == 'на диске'
+
+    interpreter = KumirLanguageInterpreter("алг главный\nнач\nкон\n", file_bundle=bundle)
+    assert interpreter.interpret()['success']
+    assert interpreter.files.storage.get('задание/вход.txt') == bundle['задание/вход.txt'].encode()
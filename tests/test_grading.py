@@ -0,0 +1,81 @@
+import pytest  # type: ignore
+
+from .test_polyakov_kum import TEST_CASES
+
+
+def test_grade_batch_of_programs_on_test_set(tmp_path, corpus_program, make_pool) -> None:
+    """Пакетная проверка: вердикты по каждому тесту, набор из файла, запуски в пуле процессов с лимитом на тест."""
+    import json
+    from pyrobot.backend import grading
+
+    a_plus_b = corpus_program('3-a+b.kum')
+    (tmp_path / 'a-plus-b.json').write_text(json.dumps({'cases': [
+        {'input': data, 'expected': expected} for name, data, expected in TEST_CASES if name == '3-a+b.kum'
+    ] + [['10 -4\n', '10 -4\n6  \n\n'], ['1\n', None]]}), encoding='utf-8')
+    store = grading.TestSetStore(str(tmp_path))
+    cases = store.get('a-plus-b')
+    assert len(cases) == 3 and store.get('a-plus-b') is cases
+    with pytest.raises(grading.TestSetNotFound):
+        store.get('../a-plus-b')
+
+    programs = {
+        'ok': a_plus_b,
+        'wrong': "алг главный\nнач\n  цел а, б\n  ввод а, б\n  вывод а - б, нс\nкон\n",
+        'syntax': "алг главный\nнач\n  вывод (1 + , нс\nкон\n",
+        'loop': "алг главный\nнач\n  цел к\n  к := 0\n  нц пока да\n    к := к + 1\n  кц\nкон\n",
+    }
+    verdicts = list(grading.grade(programs, cases, time_limit=0.5, max_workers=4))
+    assert len(verdicts) == len(programs) * len(cases)
+    by_program = {}
+    for verdict in verdicts:
+        by_program.setdefault(verdict.program, {})[verdict.case] = verdict.verdict
+    assert by_program['ok'] == {0: 'ok', 1: 'ok', 2: 'error'}  # третьему тесту не хватает ввода
+    assert by_program['wrong'] == {0: 'wrong_answer', 1: 'wrong_answer', 2: 'error'}
+    assert set(by_program['syntax'].values()) == {'error'}
+    assert set(by_program['loop'].values()) == {'limit_exceeded'}
+    assert all(v.seconds < 5 for v in verdicts) and "Строка 2" in next(
+        v.message for v in verdicts if v.verdict == 'wrong_answer')
+
+    pool = make_pool(size=2, max_queue=0, cpu_time_limit=5, wall_time_limit=10)
+    in_pool = {(v.program, v.case): v.to_dict() for v in grading.grade(
+        {'ok': a_plus_b, 'loop': programs['loop']}, cases, pool=pool, time_limit=1)}
+    assert [in_pool[('ok', case)]['verdict'] for case in range(3)] == ['ok', 'ok', 'error']
+    assert in_pool[('loop', 0)]['verdict'] == 'limit_exceeded'
+    assert pool.get_stats()['suspended'] == 0  # запуски без ввода не паркуются
+
+
+def test_run_program_on_many_fields(make_pool) -> None:
+    """Одна программа на нескольких обстановках: отчёт по каждой в порядке полей, в процессе и в пуле."""
+    from pyrobot.backend import grading
+
+    code = ("использовать Робот\nалг главный\nнач\n"
+            "  нц пока свободно_справа()\n    вправо\n    закрасить\n  кц\n  вниз\nкон\n")
+    fields = [
+        {'width': 5, 'height': 2, 'robotPos': {'x': 0, 'y': 0}},
+        {'width': 5, 'height': 2, 'robotPos': {'x': 0, 'y': 0}, 'walls': ['2,0,2,1']},
+        {'width': 3, 'height': 1, 'robotPos': {'x': 0, 'y': 0}},  # вниз - в стену
+        {'width': 0, 'height': 2},
+        None,
+    ]
+    runs = grading.run_on_fields(code, fields, max_workers=3)
+    assert [run.field for run in runs] == list(range(len(fields)))
+    assert [run.success for run in runs] == [True, True, False, False, True]
+    assert runs[0].final_state['robot'] == {'x': 4, 'y': 1}
+    assert runs[0].final_state['coloredCells'] == ['1,0', '2,0', '3,0', '4,0']
+    assert runs[1].final_state['robot'] == {'x': 1, 'y': 1} and runs[1].robot_ops == 3  # датчики не считаются
+    assert runs[0].steps > runs[1].steps > 0 and runs[3].steps == 0
+    assert "Width" in runs[3].message
+
+    report = grading.fields_report(runs)
+    assert (report['success'], report['passed'], report['total']) == (False, 3, 5)
+    assert report['fields'][4]['finalState']['robot'] == {'x': 6, 'y': 1}
+
+    broken = grading.run_on_fields("алг главный\nнач\n  вправо(\nкон\n", fields[:2])
+    assert all(not run.success and run.message.startswith("Синтаксическая") for run in broken)
+
+    pool = make_pool(size=2, max_queue=0, cpu_time_limit=5, wall_time_limit=10)
+    in_pool = grading.run_on_fields(code, fields, pool=pool, time_limit=2)
+    assert [run.to_dict()['finalState'].get('robot') for run in in_pool[:2]] == [
+        {'x': 4, 'y': 1}, {'x': 1, 'y': 1}]
+    assert [run.success for run in in_pool] == [True, True, False, False, True]
+    assert in_pool[1].robot_ops == 3 and in_pool[1].steps == runs[1].steps
@@ -0,0 +1,59 @@
+import pytest  # type: ignore
+
+from pyrobot.backend.kumir_interpreter.runtime_utils import interpret_kumir
+
+
+def test_input_scanner_reads_tokens_in_bulk(monkeypatch) -> None:
+    """"ввод" читает лексемы из буфера ввода целиком (10^5 чисел в строку), литерал - остаток строки; файлы - тем же сканером."""
+    from pyrobot.backend.kumir_interpreter import file_functions as ff
+    from pyrobot.backend.kumir_interpreter.file_storage import MemoryStorage
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+    from pyrobot.backend.kumir_interpreter.interpreter_components.input_scanner import InputScanner
+
+    # Обращения сканера к источнику строк: весь буфер забирается одним вызовом read_lines
+    calls = {'read_lines': 0, 'read_line': 0}
+    scanner_init = InputScanner.__init__
+
+    def counting_init(self, read_line=None, read_lines=None):
+        def counted_line():
+            calls['read_line'] += 1
+            return read_line()
+
+        def counted_lines():
+            calls['read_lines'] += 1
+            return read_lines()
+        scanner_init(self, read_line=counted_line if read_line else None,
+                     read_lines=counted_lines if read_lines else None)
+
+    monkeypatch.setattr(InputScanner, '__init__', counting_init)
+    n = 100_000
+    code = ("алг главный\nнач\n  цел n, i, x, s\n  ввод n\n  s := 0\n"
+            "  нц для i от 1 до n\n    ввод x\n    s := s + x\n  кц\n  вывод s\nкон\n")
+    data = f"{n}\n" + " ".join(str(i) for i in range(n)) + "\n"
+    interpreter = KumirLanguageInterpreter(code, engine="compiled")
+    interpreter.input_buffer = data
+    result = interpreter.interpret()
+    assert result['success'] and interpreter.output.endswith(f"\n{n * (n - 1) // 2}")
+    assert calls == {'read_lines': 1, 'read_line': 0}
+    monkeypatch.undo()
+
+    mixed = ("алг главный\nнач\n  цел n; вещ x; лит s; сим c; лог b\n  цел таб a[1:2]\n"
+             "  ввод n, x\n  ввод s\n  ввод a[1], a[2], c, b\n  вывод нс, n + x, \"|\", s, \"|\", a[1] + a[2], c, b\nкон\n")
+    for engine in ("visitor", "compiled"):
+        output = interpret_kumir(mixed, "$1F 2,5 привет, мир\n4\n\n5 ж истина\n", engine=engine)
+        assert output.endswith("\n33.5|привет, мир|9жистина\n"), output
+        assert "Для лог типа ожидалось" in interpret_kumir(mixed, "1 2 s\n4 5 ж да\n", engine=engine)
+
+    storage = MemoryStorage({'числа.txt': '3\n1,5 2\n\n4 конец строки\n'})
+    with ff.file_context(ff.FileContext(storage=storage)):
+        f = ff.open_for_reading('числа.txt')
+        scanner = ff.file_scanner(f)
+        assert scanner.read_int() == 3 and scanner.read_real() == 1.5 and scanner.read_int() == 2
+        assert ff.eof(f) == "нет" and ff.has_data(f) == "да"
+        assert scanner.read_int() == 4 and scanner.read_str() == "конец строки"
+        assert ff.eof(f) == "да" and ff.has_data(f) == "нет"
+        ff.reset_reading(f)
+        assert ff.file_scanner(f).read_int() == 3
+        with pytest.raises(ValueError, match="конец ввода"):
+            for _ in range(6):
+                ff.file_scanner(f).token()
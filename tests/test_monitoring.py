@@ -0,0 +1,45 @@
+import time
+
+
+def test_metrics_histograms_ring_buffers_and_prometheus() -> None:
+    """Метрики: гистограммы с квантилями, кольцевые буферы системных показателей, снимок Prometheus без ожидания."""
+    from pyrobot.backend.monitoring import Histogram, MetricsCollector, RingBuffer
+
+    ring = RingBuffer(3)
+    for value in range(5):
+        ring.append(value)
+    assert ring.values() == [2.0, 3.0, 4.0] and ring.latest() == 4.0 and ring.latest(3) is None
+
+    histogram = Histogram((1, 2, 5, 10))
+    for value in [0.5] * 50 + [1.5] * 45 + [7] * 4 + [100]:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 100 and snapshot['p50'] == 1.0
+    assert 1 < snapshot['p95'] <= 2 and 5 < snapshot['p99'] <= 10
+    assert histogram.cumulative_buckets()[-1] == ('+Inf', 100)
+
+    collector = MetricsCollector(sample_interval=60, history=4)
+    for duration in (0.02, 0.03, 0.4):
+        collector.record_request('execute_code', 'POST', 200, duration)
+    collector.record_request('health_check', 'GET', 500, 0.001)
+    collector.record_interpreter_timings({'parse': 0.004, 'execute': 0.2, 'robot_ops': 42})
+    collector.record_robot_operation('вправо')
+
+    started = time.perf_counter()
+    summary = collector.get_summary()
+    text = collector.get_prometheus_text()
+    assert time.perf_counter() - started < 0.5  # Без psutil.cpu_percent(interval=1)
+    assert summary['application']['requests_total'] == 4
+    assert summary['latency']['endpoints']['execute_code']['count'] == 3
+    assert summary['latency']['robot_ops_per_run']['count'] == 1
+    assert summary['system']['memory_percent'] is not None
+    assert 'pyrobot_request_duration_seconds_bucket{endpoint="execute_code",le="0.025"} 1' in text
+    assert 'pyrobot_request_duration_seconds_count{endpoint="execute_code"} 3' in text
+    assert 'pyrobot_robot_operations_total{operation="вправо"} 1' in text
+    assert 'pyrobot_requests_total{outcome="error"} 1' in text
+    # Снимок не пересобирается до следующего отсчёта
+    collector.record_request('execute_code', 'POST', 200, 0.01)
+    assert collector.get_prometheus_text() is text
+    collector.sample()
+    assert 'pyrobot_request_duration_seconds_count{endpoint="execute_code"} 4' in collector.get_prometheus_text()
+    assert len(collector.get_system_history()['timestamps']) == 2
@@ -0,0 +1,143 @@
+def test_output_streamed_as_sequenced_deltas(run_program) -> None:
+    """Прогресс передаёт только новые фрагменты вывода; по дельтам восстанавливается весь вывод."""
+    from pyrobot.backend.kumir_interpreter.output_stream import OutputLog
+
+    code = "алг главный\nнач\n  цел i\n  нц для i от 1 до 3000\n    вывод i, нс\n  кц\nкон\n"
+    deltas = []
+    result, interpreter = run_program(code, engine="visitor", run_options={'progress_callback': deltas.append})
+    expected = "".join(f"{i}\n" for i in range(1, 3001))
+    assert result['success'] and interpreter.output == expected
+
+    assert [d['seq'] for d in deltas] == list(range(1, len(deltas) + 1))
+    assert sum(len(d['delta']) for d in deltas) == len(expected)  # O(n) байт, а не O(n²)
+    assert all('robotPos' in d and 'output' not in d for d in deltas)
+
+    log = OutputLog()
+    for delta in deltas:
+        log.append(delta)
+    assert log.getvalue() == expected
+    middle = len(deltas) // 2
+    resync = log.resync(middle)
+    assert expected[:resync['offset']] + resync['delta'] == expected
+    assert resync['seq'] == len(deltas)
+
+
+def test_trace_reconstructs_field_at_any_step(engine: str, run_program) -> None:
+    """Трасса хранит только изменения поля; состояние на любом шаге восстанавливается по ключевым кадрам."""
+    from pyrobot.backend.kumir_interpreter.trace_recorder import TraceRecorder
+
+    code = ("использовать Робот\nалг главный\nнач\n  цел i\n"
+            "  нц для i от 1 до 1500\n    вправо\n    закрасить\n    влево\n  кц\n"
+            "  вправо\n  вывод \"готово\"\nкон\n")
+    result, _ = run_program(code, engine=engine)
+    assert result['success']
+
+    payload = result['traceData']
+    # 1500 перемещений туда-обратно + 1 закраска (повторная не меняет поле) + вправо + вывод
+    assert payload['steps'] == 3003 and not payload['truncated']
+    trace = TraceRecorder.from_payload(payload)
+    assert len(trace.keyframes) == 3  # шаги 0, 1024, 2048
+
+    assert trace.state_at(0)['robot'] == {'x': 0, 'y': 0}
+    first_move = trace.state_at(1)
+    assert first_move['robot'] == {'x': 1, 'y': 0} and first_move['coloredCells'] == []
+    assert trace.state_at(2)['coloredCells'] == ["1,0"]
+    assert trace.state_at(2047)['robot'] == {'x': 0, 'y': 0} and trace.state_at(2048)['robot'] == {'x': 1, 'y': 0}
+    assert trace.state_at(3002)['robot'] == {'x': 1, 'y': 0} and trace.state_at(3002)['output'] == ""
+
+    final = trace.state_at(payload['steps'])
+    assert final['output'] == result['finalState']['output'] == "готово"
+    assert final['robot'] == result['finalState']['robot']
+    assert final['coloredCells'] == result['finalState']['coloredCells']
+    assert len(trace.to_bytes()) < 3003 * 9 + 1024
+
+
+def test_profiler_lines_algorithms_and_collapsed_stacks(engine: str, run_program) -> None:
+    """Профилировщик: выполнения и время по строкам и алгоритмам, свёрнутые стеки; без profile - без отчёта."""
+    code = ("алг главный\nнач\n  цел i, s, t\n  s := 0\n  нц для i от 1 до 5\n"
+            "    сумма(i, t)\n    s := s + t\n  кц\n  вывод s\nкон\n"
+            "алг сумма(арг цел n, рез цел r)\nнач\n"
+            "  если n <= 1 то r := 1 иначе сумма(n - 1, r); r := r + n все\nкон\n")
+    result, _ = run_program(code, engine=engine, run_options={'profile': True})
+    assert result['success'], result.get('message')
+    profile = result['profile']
+
+    lines = {entry['line']: entry for entry in profile['lines']}
+    assert lines[6]['hits'] == 5 and lines[7]['hits'] == 5 and lines[9]['hits'] == 1
+    assert lines[6]['source'] == "сумма(i, t)"
+    # Время вызова включает время тела процедуры
+    assert lines[6]['time_ms'] >= lines[13]['time_ms'] > 0
+    algorithms = {entry['name']: entry for entry in profile['algorithms']}
+    assert algorithms['главный']['calls'] == 1
+    assert algorithms['сумма']['calls'] == 1 + 2 + 3 + 4 + 5
+    # При рекурсии полное время считается по внешним входам и не превышает время главного
+    assert algorithms['сумма']['time_ms'] <= algorithms['главный']['time_ms']
+
+    stacks = dict(line.rsplit(' ', 1) for line in profile['collapsed'].splitlines())
+    assert "главный;строка 6" in stacks and "главный;сумма;сумма;строка 13" in stacks
+    assert all(int(value) > 0 for value in stacks.values())
+
+    assert 'profile' not in run_program(code, engine=engine)[0]
+
+
+def test_execution_observers_share_one_event_channel(engine: str, run_program) -> None:
+    """Наблюдатели получают события операторов, алгоритмов, команд робота, вывода и ошибок; без подписчиков ничего не оборачивается."""
+    from pyrobot.backend.kumir_interpreter.execution_observer import ExecutionObserver, ObserverDispatcher
+
+    class Recorder(ExecutionObserver):
+        def __init__(self):
+            self.events = []
+
+        def on_statement_start(self, line):
+            self.events.append(('start', line))
+
+        def on_statement_end(self, line):
+            self.events.append(('end', line))
+
+        def on_algorithm_enter(self, name):
+            self.events.append(('enter', name))
+
+        def on_algorithm_exit(self, name):
+            self.events.append(('exit', name))
+
+        def on_robot_command(self, command, ok):
+            self.events.append(('robot', command, ok))
+
+        def on_output(self, text):
+            self.events.append(('output', text))
+
+        def on_error(self, error):
+            self.events.append(('error', type(error).__name__))
+
+    code = ("использовать Робот\nалг главный\nнач\n  шаги\n  вывод \"ок\", нс\n  влево\nкон\n"
+            "алг шаги\nнач\n  вправо\nкон\n")
+    recorder = Recorder()
+    result, interpreter = run_program(code, engine=engine, run_options={'observers': [recorder]})
+    assert result['success'], result.get('message')
+    assert recorder.events == [
+        ('enter', 'главный'), ('start', 4), ('enter', 'шаги'), ('start', 10),
+        ('robot', 'вправо', True), ('end', 10), ('exit', 'шаги'), ('end', 4),
+        ('start', 5), ('output', 'ок\n'), ('end', 5),
+        ('start', 6), ('robot', 'влево', True), ('end', 6), ('exit', 'главный'),
+    ]
+    assert interpreter.timings['robot_commands'] == {'вправо': 1, 'влево': 1}
+    # Трасса получила вывод через тот же канал
+    assert interpreter.trace_recorder.state_at(len(interpreter.trace_recorder))['output'] == "ок\n"
+
+    recorder = Recorder()
+    result, _ = run_program(code.replace("  влево\n", "  влево\n  влево\n"), engine=engine,
+                            run_options={'observers': [recorder]})
+    assert not result['success']
+    assert recorder.events[-3:] == [('end', 7), ('exit', 'главный'), ('error', 'KumirRuntimeError')]
+    assert ('robot', 'влево', False) in recorder.events
+
+    # Подписчик только на вывод: визитор и операторы не оборачиваются
+    class OutputOnly(ExecutionObserver):
+        def on_output(self, text):
+            pass
+
+    dispatcher = ObserverDispatcher([OutputOnly()])
+    assert dispatcher.output is not None and dispatcher.statement_start is None
+    assert not dispatcher.wants('statement_start', 'statement_end', 'algorithm_enter')
+    code_fn = lambda frame: None
+    assert dispatcher.wrap_statement(1, code_fn) is code_fn
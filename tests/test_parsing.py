@@ -0,0 +1,29 @@
+import pytest  # type: ignore
+
+
+def test_two_stage_parsing_and_warm_up(tmp_path, corpus_program) -> None:
+    """SLL-разбор даёт то же дерево, что и LL; при ошибке откат на LL с прежним сообщением; прогрев по каталогу."""
+    from pyrobot.backend.kumir_interpreter import parsing
+    from pyrobot.backend.kumir_interpreter.kumir_exceptions import KumirSyntaxError
+
+    source = corpus_program("44-arr-qsort.kum")
+    sll_tree = parsing.parse_program(source, mode=parsing.MODE_TWO_STAGE)
+    ll_tree = parsing.parse_program(source, mode=parsing.MODE_LL)
+    assert sll_tree.toStringTree(recog=sll_tree.parser) == ll_tree.toStringTree(recog=ll_tree.parser)
+
+    before = parsing.get_parse_stats()
+    broken = "алг главный\nнач\n  цел к\n  к := (1 +\nкон\n"
+    messages = []
+    for mode in (parsing.MODE_TWO_STAGE, parsing.MODE_LL):
+        with pytest.raises(KumirSyntaxError) as error:
+            parsing.parse_program(broken, mode=mode)
+        messages.append(str(error.value))
+    assert messages[0] == messages[1]
+    after = parsing.get_parse_stats()
+    assert after['fallbacks'] == before['fallbacks'] + 1
+    assert after['modes']['ll']['count'] == before['modes']['ll']['count'] + 2
+
+    (tmp_path / "ok.kum").write_text(source, encoding="utf-8")
+    (tmp_path / "bad.kum").write_text(broken, encoding="utf-8")
+    warm_up = parsing.warm_up([tmp_path, tmp_path / "missing"])
+    assert (warm_up['files'], warm_up['failed']) == (2, 1)
@@ -0,0 +1,47 @@
+def test_result_cache_for_deterministic_runs() -> None:
+    """Кэш результатов: только детерминированные программы, канонический ключ, TTL, вытеснение и уровень Redis."""
+    from pyrobot.backend.result_cache import ResultCache, is_deterministic, result_cache_key
+
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def setex(self, key, ttl, value):
+            self.data[key] = value
+
+    robot_code = "использовать Робот\nалг главный\nнач\n  вправо\n  закрасить\nкон\n"
+    assert is_deterministic(robot_code)
+    assert not is_deterministic("алг главный\nнач\n  цел к\n  к := irand(1, 6)\nкон\n")
+    assert not is_deterministic("алг главный\nнач\n  цел т\n  т := время()\nкон\n")
+    assert not is_deterministic("алг главный\nнач\n  файл ф\n  ф := откр_для_чт(\"a.txt\")\nкон\n")
+
+    field = {'width': 5, 'height': 5, 'robotPos': {'x': 0, 'y': 0}, 'walls': ['1,0,1,1', '0,1,1,1'], 'cellSize': 50}
+    same_field = {'height': 5, 'width': 5, 'robotPos': {'x': 0, 'y': 0}, 'walls': ['0,1,1,1', '1,0,1,1']}
+    key = result_cache_key(robot_code, field, None)
+    assert key == result_cache_key(robot_code.replace("\n", "  \r\n"), same_field, "")
+    assert key != result_cache_key(robot_code, field, "1\n")
+    assert key != result_cache_key(robot_code, dict(field, robotPos={'x': 1, 'y': 0}), None)
+
+    redis = FakeRedis()
+    cache = ResultCache(redis_client=redis, max_entries=2, ttl=60)
+    assert cache.lookup_key("алг главный\nнач\n  вывод rnd(1)\nкон\n", None) is None
+    assert cache.get(key) is None
+    value = {'result': {'success': True, 'finalState': {'output': ''}}, 'width': 5, 'height': 5}
+    cache.put(key, value)
+    cache.put("failed", {'result': {'success': False}, 'width': 5, 'height': 5})
+    assert cache.get(key) == value and cache.get("failed") is None
+
+    cache.clear()  # Память процесса пуста - результат приходит из Redis
+    assert cache.get(key) == value
+    for other in ("a", "b"):
+        cache.put(other, value)
+    cache.ttl = 0
+    cache.put("c", value)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['redis_hits'], stats['uncacheable']) == (1, 1, 1)
+    assert stats['evictions'] == 2 and stats['entries'] == 2
+    redis.data.clear()
+    assert cache.get("c") is None and cache.get_stats()['expirations'] == 1
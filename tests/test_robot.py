@@ -0,0 +1,22 @@
+def test_robot_grid_walls_and_sensors(engine: str, run_program) -> None:
+    """Стены и клетки хранятся в сетке робота; строки "x1,y1,x2,y2" и "x,y" только на входе и в get_state."""
+    from pyrobot.backend.kumir_interpreter.robot_state import SimulatedRobot
+
+    code = ("использовать Робот\nалг главный\nнач\n"
+            "  нц пока свободно_справа()\n    вправо\n    закрасить\n  кц\n"
+            "  вывод стена_справа(), \" \", стена_снизу(), нс\n"
+            "  вниз\n  вывод клетка_закрашена(), \" \", стена_снизу(), нс\nкон\n")
+    field = {'width': 5, 'height': 3, 'robotPos': {'x': 0, 'y': 0},
+             'walls': ['3,0,3,1', '2,2,3,2', '0,0,1,0'], 'coloredCells': ['2,1'], 'markers': {'4,2': 1}}
+    result, _ = run_program(code, initial_field_state=field, engine=engine)
+    assert result['success'], result['message']
+    final = result['finalState']
+    assert final['output'] == "истина ложь\nистина истина\n"
+    assert final['robot'] == {'x': 2, 'y': 1}
+    assert final['walls'] == ['0,0,1,0', '2,2,3,2', '3,0,3,1']
+    assert final['coloredCells'] == ['1,0', '2,0', '2,1'] and final['markers'] == {'4,2': 1}
+
+    robot = SimulatedRobot(3, 2, initial_walls=['1,0,1,1', 'bad', '9,9,9,10'])
+    assert robot.walls == {'1,0,1,1'} and len(robot.permanent_walls) == 2 * (3 + 2)
+    assert robot.check_direction('right', 'wall') and robot.check_direction('left', 'wall')
+    assert robot.check_direction('down', 'free')
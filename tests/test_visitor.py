@@ -0,0 +1,159 @@
+from pyrobot.backend.kumir_interpreter.kumir_datatypes import KumirType, KumirValue
+from pyrobot.backend.kumir_interpreter.runtime_utils import interpret_kumir
+
+
+def test_loop_variable_shadows_local_and_callee_sees_caller_variables() -> None:
+    """Переменная цикла ДЛЯ живёт в своей области, а вызванный алгоритм видит переменные вызывающего."""
+    code = (
+        "алг главный\n"
+        "нач\n"
+        "  цел i, s\n"
+        "  s := 0\n"
+        "  нц для i от 1 до 3\n"
+        "    s := s + i\n"
+        "  кц\n"
+        "  вывод i, \" \", s, нс\n"
+        "  покажи\n"
+        "кон\n"
+        "\n"
+        "алг покажи\n"
+        "нач\n"
+        "  вывод s, нс\n"
+        "кон\n"
+    )
+    assert interpret_kumir(code) == "0 6\n6\n"
+
+
+def test_pure_function_memoization() -> None:
+    """Чистые функции находятся по дереву разбора, их вызовы берутся из таблицы запуска; по умолчанию выключено."""
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+    from pyrobot.backend.kumir_interpreter.memoization import find_pure_functions
+    from pyrobot.backend.kumir_interpreter.parse_cache import get_parse_cache
+    from pyrobot.backend.kumir_interpreter.parsing import parse_program
+    from pyrobot.backend.kumir_interpreter.interpreter_components.main_visitor import KumirInterpreterVisitor
+
+    code = ("цел k\nалг главный\nнач\n  k := 1\n  вывод fib(11), \" \", nod(14, 21), нс\nкон\n"
+            "алг цел fib(цел n)\nнач\n  если n < 2 то знач := n иначе знач := fib(n - 1) + fib(n - 2) все\nкон\n"
+            "алг цел nod(цел a, цел b)\nнач\n  цел c\n  c := mod(a, b)\n"
+            "  если c = 0 то знач := b иначе знач := nod(b, c) все\nкон\n"
+            "алг цел сглоб(цел n)\nнач\n  знач := n + k\nкон\n"
+            "алг цел спечатью(цел n)\nнач\n  вывод n\n  знач := n\nкон\n"
+            "алг цел черезнечистую(цел n)\nнач\n  знач := спечатью(n)\nкон\n"
+            "алг цел сслучаем(цел n)\nнач\n  знач := irand(0, n)\nкон\n"
+            "алг цел срез(рез цел r)\nнач\n  r := 1\n  знач := 1\nкон\n")
+    visitor = KumirInterpreterVisitor()
+    visitor.visitProgram(get_parse_cache().get_or_parse(code, parse_program))
+    assert find_pure_functions(visitor.procedure_manager.procedures) == {'fib', 'nod'}
+
+    plain = KumirLanguageInterpreter(code).interpret()
+    assert 'memo' not in plain
+    interpreter = KumirLanguageInterpreter(code)
+    result = interpreter.interpret(memoize=True)
+    assert result['success'], result.get('message')
+    assert interpreter.output == plain['finalState']['output'] == "89 7\n"
+    memo = result['memo']
+    assert memo['pure_functions'] == ['fib', 'nod']
+    # fib(11): 12 различных вызовов вместо 287
+    assert memo['by_function']['fib'] == {'hits': 9, 'misses': 12}
+    assert memo['hits'] == 9 and memo['entries'] == memo['misses']
+
+
+def test_call_binding_plans(monkeypatch) -> None:
+    """Вызов алгоритма привязывает аргументы по заранее построенному плану, построенному один раз."""
+    from pyrobot.backend.kumir_interpreter.interpreter_components.main_visitor import KumirInterpreterVisitor
+    from pyrobot.backend.kumir_interpreter.interpreter_components.scope_manager import ScopeManager
+    from pyrobot.backend.kumir_interpreter.parse_cache import get_parse_cache
+    from pyrobot.backend.kumir_interpreter.parsing import parse_program
+
+    code = ("алг главный\nнач\n  цел i, r\n  вещ s\n  s := 0\n"
+            "  нц для i от 1 до %d\n    s := s + f(i, i)\n    p(i, r)\n    s := s + r\n  кц\n  вывод s\nкон\n"
+            "алг вещ f(цел a, вещ b)\nнач\n  знач := a + b\nкон\n"
+            "алг p(цел a, рез цел b)\nнач\n  b := a\nкон\n")
+
+    def loaded(calls_count):
+        visitor = KumirInterpreterVisitor()
+        visitor.visitProgram(get_parse_cache().get_or_parse(code % calls_count, parse_program))
+        return visitor
+
+    procedures = loaded(1).procedure_manager.procedures
+    plan = procedures['f']['binding_plan']
+    assert [(b.name, b.declared.kumir_type, b.evaluator_mode) for b in plan.params] == [
+        ('a', KumirType.INT, 'arg'), ('b', KumirType.REAL, 'arg')]
+    assert plan.result.kumir_type == KumirType.REAL and plan.copy_back == ()
+    assert [(i, b.name) for i, b in procedures['p']['binding_plan'].copy_back] == [(1, 'b')]
+    assert interpret_kumir(code % 50) == "3825\n"
+
+    # Число разборов типов и объявлений через ScopeManager не зависит от числа вызовов
+    calls = {'from_string': 0, 'declare_variable': 0}
+    from_string, declare_variable = KumirType.from_string, ScopeManager.declare_variable
+
+    def counting(name, original):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return original(*args, **kwargs)
+        return wrapper
+
+    counts = []
+    for calls_count in (1, 50):
+        visitor = loaded(calls_count)
+        monkeypatch.setattr(KumirType, 'from_string', staticmethod(counting('from_string', from_string)))
+        monkeypatch.setattr(ScopeManager, 'declare_variable', counting('declare_variable', declare_variable))
+        visitor.execute_algorithm_node('главный')
+        monkeypatch.undo()
+        counts.append(dict(calls))
+        calls.update(from_string=0, declare_variable=0)
+    assert counts[0] == counts[1]
+
+    # План строится один раз (здесь - при первом вызове описания без плана) и переиспользуется
+    from pyrobot.backend.kumir_interpreter.interpreter_components import procedure_manager as pm
+
+    visitor = KumirInterpreterVisitor()
+    visitor.visitProgram(get_parse_cache().get_or_parse(
+        "алг пусто(цел a, вещ b, лит c)\nнач\nкон\n", parse_program))
+    proc_def = visitor.procedure_manager.procedures['пусто']
+    del proc_def['binding_plan']
+    built = []
+
+    class CountingPlan(pm.BindingPlan):
+        def __init__(self, *args):
+            super().__init__(*args)
+            built.append(self)
+
+    monkeypatch.setattr(pm, 'BindingPlan', CountingPlan)
+    args = [{'mode': 'арг', 'value': value, 'variable_info': None}
+            for value in (KumirValue(1, KumirType.INT.value), KumirValue(2, KumirType.INT.value),
+                          KumirValue("с", KumirType.STR.value))]
+    for _ in range(200):
+        visitor.procedure_manager.call_procedure_with_analyzed_args('пусто', args, 0, 0)
+    assert len(built) == 1 and proc_def['binding_plan'] is built[0]
+
+
+def test_operator_dispatch_tables() -> None:
+    """Бинарные и унарные операции берутся из таблиц по меткам типов; ошибка создаётся только при промахе."""
+    from pyrobot.backend.kumir_interpreter.generated.KumirLexer import KumirLexer
+    from pyrobot.backend.kumir_interpreter.interpreter import KumirLanguageInterpreter
+    from pyrobot.backend.kumir_interpreter.kumir_datatypes import TAG_INT, TAG_REAL, TAG_STR, TAG_OTHER, type_tag
+    from pyrobot.backend.kumir_interpreter.interpreter_components.operator_dispatch import (
+        BINARY_OPERATIONS, UNARY_OPERATIONS, pair_index)
+
+    assert type_tag(KumirType.INT.value) == TAG_INT and type_tag(KumirType.STR.value) == TAG_STR
+    assert type_tag(KumirType.TABLE.value) == TAG_OTHER
+    plus = BINARY_OPERATIONS[KumirLexer.PLUS]
+    int_sum, mixed_sum = plus[pair_index(TAG_INT, TAG_INT)], plus[pair_index(TAG_INT, TAG_REAL)]
+    assert (int_sum.apply(2, 3), int_sum.result_type) == (5, KumirType.INT.value)
+    assert (mixed_sum.apply(2, 0.5), mixed_sum.result_type) == (2.5, KumirType.REAL.value)
+    assert plus[pair_index(TAG_STR, TAG_STR)].apply("аб", "в") == "абв"
+    assert BINARY_OPERATIONS[KumirLexer.MINUS][pair_index(TAG_STR, TAG_INT)] is None
+    assert UNARY_OPERATIONS[KumirLexer.NOT][TAG_INT] is None
+
+    code = ("алг главный\nнач\n  цел i\n  вещ s\n  s := 0\n"
+            "  нц для i от 1 до 20\n    если i * 2 > 15 и не (i = 19) то\n      s := s + i / 4 - 2 ** 3\n    все\n  кц\n"
+            "  вывод s, \" \", -s, \" \", \"ab\" + \"c\", \" \", 7 <> 7.0\nкон\n")
+    assert interpret_kumir(code) == "-55.25 55.25 abc ложь\n"
+
+    result = KumirLanguageInterpreter("алг главный\nнач\n  лог b\n  b := да\n  вывод b + 1\nкон\n",
+                                      engine="visitor").interpret()
+    assert not result['success'] and "Операция сложения не применима к типам 'ЛОГ' и 'ЦЕЛ'" in result['message']
+    result = KumirLanguageInterpreter("алг главный\nнач\n  цел n\n  n := 0\n  вывод 1 / n\nкон\n",
+                                      engine="visitor").interpret()
+    assert not result['success'] and "Деление на ноль" in result['message'] and result['errorIndex'] == 5